@@ -1,34 +1,203 @@
 """Authentication dependencies for HR Platform."""
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+from collections import OrderedDict
+import asyncio
+import copy
+import os
+import time
 import jwt
 import bcrypt
 from database import db, JWT_SECRET, JWT_ALGORITHM
 from models.core import User
+from services.executors import run_password_work
 
 security = HTTPBearer()
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get the current authenticated user from JWT token."""
+# ============= PRINCIPAL CACHE =============
+
+# Entries are invalidated in-process by the handlers that write users, employees
+# and roles; the TTL bounds staleness for writes made by other workers.
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '30'))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '10000'))
+
+
+class Principal(BaseModel):
+    """Everything a handler needs to know about the authenticated caller."""
+    user: Dict[str, Any]
+    employee: Optional[Dict[str, Any]] = None
+    employee_id: Optional[str] = None
+    corporation_id: Optional[str] = None
+    branch_id: Optional[str] = None
+    department_id: Optional[str] = None
+    permissions: List[str] = Field(default_factory=list)
+
+
+async def load_principal(user_id: str) -> Optional[Principal]:
+    """Build a principal from the users, employees and roles collections."""
+    user, employee = await asyncio.gather(
+        db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0}),
+        db.employees.find_one({"user_id": user_id}, {"_id": 0}),
+    )
+    if not user:
+        return None
+
+    role = await db.roles.find_one({"name": user.get("role")}, {"_id": 0, "permissions": 1})
+    employee = employee or {}
+    return Principal(
+        user=user,
+        employee=employee or None,
+        employee_id=employee.get("id"),
+        corporation_id=employee.get("corporation_id"),
+        branch_id=employee.get("branch_id"),
+        department_id=employee.get("department_id"),
+        permissions=(role or {}).get("permissions", []),
+    )
+
+
+class PrincipalCache:
+    """TTL + LRU cache of principals keyed by user id.
+
+    Concurrent misses for the same user share a single load, so a dashboard that
+    fires a burst of parallel requests costs one round of lookups.
+    """
+
+    def __init__(self, loader: Callable[[str], Awaitable[Optional[Principal]]],
+                 ttl: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self._loader = loader
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._employee_users: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: str) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        future = self._inflight.get(user_id)
+        if future is None:
+            future = asyncio.ensure_future(self._loader(user_id))
+            self._inflight[user_id] = future
+            future.add_done_callback(lambda f, uid=user_id: self._store(uid, f))
+        return await asyncio.shield(future)
+
+    def _store(self, user_id: str, future: asyncio.Future):
+        # An invalidation while the load was in flight drops the future from
+        # _inflight; its (possibly stale) result must not be cached.
+        if self._inflight.get(user_id) is not future:
+            return
+        del self._inflight[user_id]
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            return
+
+        principal = future.result()
+        self._entries[user_id] = (time.monotonic() + self._ttl, principal)
+        self._entries.move_to_end(user_id)
+        if principal.employee_id:
+            self._employee_users[principal.employee_id] = user_id
+        while len(self._entries) > self._max_entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._employee_users.pop(evicted.employee_id, None)
+
+    def invalidate(self, user_id: str):
+        self._inflight.pop(user_id, None)
+        entry = self._entries.pop(user_id, None)
+        if entry and entry[1].employee_id:
+            self._employee_users.pop(entry[1].employee_id, None)
+
+    def invalidate_employee(self, employee_id: str):
+        user_id = self._employee_users.get(employee_id)
+        if user_id:
+            self.invalidate(user_id)
+
+    def invalidate_role(self, role_name: str):
+        for user_id in [uid for uid, (_, p) in self._entries.items() if p.user.get("role") == role_name]:
+            self.invalidate(user_id)
+        # Loads in flight may have read the old role document.
+        self._inflight.clear()
+
+    def clear(self):
+        self._entries.clear()
+        self._inflight.clear()
+        self._employee_users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self._ttl}
+
+
+principal_cache = PrincipalCache(load_principal)
+
+
+async def resolve_principal(user_id: str) -> Optional[Principal]:
+    """Return the cached principal for a user id, loading it on a miss."""
+    return await principal_cache.get(user_id)
+
+
+def invalidate_principal(user_id: Optional[str] = None, employee_id: Optional[str] = None):
+    """Drop cached auth state after a write to the user's users/employees documents."""
+    if user_id:
+        principal_cache.invalidate(user_id)
+    if employee_id:
+        principal_cache.invalidate_employee(employee_id)
+
+
+def invalidate_role_principals(role_name: Optional[str] = None):
+    """Drop cached auth state for every user holding a role (or all users)."""
+    if role_name:
+        principal_cache.invalidate_role(role_name)
+    else:
+        principal_cache.clear()
+
+
+async def get_employee_for_user(user_id: str) -> Optional[Dict[str, Any]]:
+    """Employee document linked to a user, served from the principal cache.
+
+    Returns a copy so handlers can mutate the result freely.
+    """
+    principal = await resolve_principal(user_id)
+    if not principal or not principal.employee:
+        return None
+    return copy.deepcopy(principal.employee)
+
+
+def decode_token_user_id(token: str) -> str:
+    """Validate a JWT and return its user id."""
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    user_id = payload.get('user_id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+
+async def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    """Get the resolved principal for the authenticated caller."""
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get('user_id')
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
-        if not user:
+        principal = await resolve_principal(decode_token_user_id(credentials.credentials))
+        if not principal:
             raise HTTPException(status_code=401, detail="User not found")
-        
-        return User(**user)
+        return principal
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get the current authenticated user from JWT token."""
+    principal = await get_current_principal(credentials)
+    return User(**principal.user)
+
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -37,3 +206,13 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     """Verify a password against its hash."""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password executor instead of the event loop."""
+    return await run_password_work(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """Verify a password on the password executor instead of the event loop."""
+    return await run_password_work(verify_password, password, hashed)
@@ -0,0 +1,62 @@
+"""Benchmark password verification throughput on the event loop vs the executor.
+
+Simulates a burst of concurrent logins (bcrypt checks at the configured cost)
+and reports verifications per second, first inline on the event loop as the
+login handler used to do, then on the password executor with 1..N workers.
+Throughput should grow with the worker count up to the number of cores.
+
+    python benchmark_passwords.py --logins 64 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import bcrypt
+
+from services.executors import BoundedExecutor, _thread_pool
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    # Same check as auth.verify_password, without importing the database settings
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+async def inline(password: str, hashed: str, logins: int) -> float:
+    async def login():
+        verify_password(password, hashed)
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return logins / (time.perf_counter() - started)
+
+
+async def on_executor(password: str, hashed: str, logins: int, workers: int) -> float:
+    executor = BoundedExecutor(f"bench-{workers}", _thread_pool("bench"), workers)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(executor.run(verify_password, password, hashed) for _ in range(logins)))
+        return logins / (time.perf_counter() - started)
+    finally:
+        executor.shutdown()
+
+
+async def main(logins: int, rounds: int, max_workers: int) -> None:
+    password = "benchmark-password"
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+    print(f"{logins} concurrent logins, bcrypt cost {rounds}, {os.cpu_count()} cores")
+    print(f"{'mode':<20}{'logins/s':>10}")
+    print(f"{'event loop':<20}{await inline(password, hashed, logins):>10.1f}")
+    workers = 1
+    while workers <= max_workers:
+        rate = await on_executor(password, hashed, logins, workers)
+        print(f"{f'executor x{workers}':<20}{rate:>10.1f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login password checks")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.rounds, args.max_workers))
@@ -1,6 +1,8 @@
 """Database connection and utilities for HR Platform."""
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Dict, Any, List
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional, Tuple
+import logging
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -39,3 +41,116 @@ def clean_mongo_response(doc: Dict[str, Any]) -> Dict[str, Any]:
 def clean_mongo_list(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Remove MongoDB _id field from a list of documents."""
     return [clean_mongo_response(doc) for doc in docs if doc is not None]
+
+# ============= INDEX REGISTRY =============
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(BaseModel):
+    """Declarative MongoDB index owned by one of the API modules."""
+    collection: str
+    keys: List[Tuple[str, Any]]
+    unique: bool = False
+    sparse: bool = False
+    name: Optional[str] = None
+    # TTL: documents expire this many seconds after the (date) indexed field
+    expire_after_seconds: Optional[int] = None
+
+    @property
+    def index_name(self) -> str:
+        """Explicit name, or the name MongoDB would generate for the key pattern."""
+        return self.name or "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    @property
+    def is_text(self) -> bool:
+        return any(direction == "text" for _, direction in self.keys)
+
+
+# collection -> index name -> spec. Populated at import time by the modules that
+# own each collection, next to their models.
+INDEX_REGISTRY: Dict[str, Dict[str, IndexSpec]] = {}
+
+
+def register_index(collection: str, keys: List[Tuple[str, Any]], unique: bool = False,
+                   sparse: bool = False, name: Optional[str] = None,
+                   expire_after_seconds: Optional[int] = None) -> IndexSpec:
+    """Declare an index that `ensure_indexes` will reconcile on startup."""
+    spec = IndexSpec(collection=collection, keys=keys, unique=unique, sparse=sparse, name=name,
+                     expire_after_seconds=expire_after_seconds)
+    INDEX_REGISTRY.setdefault(collection, {})[spec.index_name] = spec
+    return spec
+
+
+def _index_matches(spec: IndexSpec, existing: Dict[str, Any]) -> bool:
+    """Compare a declared index against `index_information()` output."""
+    if bool(existing.get("unique", False)) != spec.unique or bool(existing.get("sparse", False)) != spec.sparse:
+        return False
+    if existing.get("expireAfterSeconds") != spec.expire_after_seconds:
+        return False
+    if spec.is_text:
+        # Text indexes are stored as _fts/_ftsx plus weights; compare the indexed fields.
+        return set(existing.get("weights", {}).keys()) == {f for f, d in spec.keys if d == "text"}
+    return [(f, d) for f, d in existing.get("key", [])] == [(f, d) for f, d in spec.keys]
+
+
+async def ensure_indexes(database, dry_run: bool = False) -> Dict[str, Any]:
+    """Reconcile INDEX_REGISTRY against the database.
+
+    Missing indexes are created; existing ones that match are left alone, so the
+    call is idempotent and cheap to run on every startup. Indexes whose definition
+    differs from the registry, and indexes present in the database but not in the
+    registry, are reported as drift and never dropped automatically.
+    """
+    report: Dict[str, List[Dict[str, Any]]] = {
+        "created": [], "unchanged": [], "missing": [], "conflicts": [], "unmanaged": [], "errors": []
+    }
+
+    for collection_name, specs in INDEX_REGISTRY.items():
+        collection = database[collection_name]
+        try:
+            existing = await collection.index_information()
+        except Exception:
+            # Collection does not exist yet; every declared index is missing.
+            existing = {}
+
+        for index_name, spec in specs.items():
+            entry = {"collection": collection_name, "name": index_name, "keys": spec.keys}
+            current = existing.get(index_name)
+            if current is not None:
+                if _index_matches(spec, current):
+                    report["unchanged"].append(entry)
+                else:
+                    report["conflicts"].append({**entry, "existing": current.get("key")})
+                continue
+
+            if dry_run:
+                report["missing"].append(entry)
+                continue
+            try:
+                options = {"expireAfterSeconds": spec.expire_after_seconds} if spec.expire_after_seconds is not None else {}
+                await collection.create_index(
+                    spec.keys, name=index_name, unique=spec.unique, sparse=spec.sparse, **options
+                )
+                report["created"].append(entry)
+            except Exception as e:
+                # Typically a unique index over data that already has duplicates.
+                report["errors"].append({**entry, "error": str(e)})
+
+        for index_name, info in existing.items():
+            if index_name != "_id_" and index_name not in specs:
+                report["unmanaged"].append({
+                    "collection": collection_name, "name": index_name, "keys": info.get("key")
+                })
+
+    for item in report["created"]:
+        logger.info(f"Created index {item['collection']}.{item['name']}")
+    for item in report["conflicts"]:
+        logger.warning(f"Index drift on {item['collection']}.{item['name']}: "
+                       f"declared {item['keys']}, found {item['existing']}")
+    for item in report["unmanaged"]:
+        logger.warning(f"Unmanaged index {item['collection']}.{item['name']} {item['keys']}")
+    for item in report["errors"]:
+        logger.error(f"Failed to create index {item['collection']}.{item['name']}: {item['error']}")
+
+    return report
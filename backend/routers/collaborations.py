@@ -1,8 +1,12 @@
 """Collaborations Router - Central Hub for Team Communication & Productivity."""
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, StreamingResponse
+from pymongo import ReturnDocument
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone, timedelta
 from pydantic import BaseModel, Field, ConfigDict
+import asyncio
+import json
 import uuid
 import os
 import shutil
@@ -10,12 +14,23 @@ from pathlib import Path
 
 import sys
 sys.path.insert(0, '/app/backend')
-from database import db
-from auth import get_current_user
+from database import db, register_index
+from auth import get_current_user, decode_token_user_id, resolve_principal
 from models.core import User, UserRole
+from services.realtime import broker, Subscriber, channel_topic, PRESENCE_TOPIC
+from services.collab_search import SearchQuery, indexed, run_search, search_terms
+from services.user_directory import UserLoader, invalidate_user_status
+from services.chat_export import EXPORT_FORMATS, ChatExport, export_filename, export_path, export_query, write_export
+from services.jobs import JOBS_COLLECTION, job_handler, enqueue as enqueue_job, accepted_response as job_accepted
 
 router = APIRouter(prefix="/collaborations", tags=["Collaborations"])
 
+# Reads of searchable collections leave out the search_terms index field
+SEARCHABLE_PROJECTION = {"_id": 0, "search_terms": 0}
+
+# Idle WebSocket connections get a ping this often (keeps proxies from closing them)
+REALTIME_PING_SECONDS = float(os.environ.get("REALTIME_PING_SECONDS", "25"))
+
 # Uploads directory for collaboration files
 COLLAB_UPLOADS_DIR = Path("/app/backend/uploads/collaborations")
 COLLAB_UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
@@ -249,6 +264,37 @@ class NotificationPreference(BaseModel):
     notify_replies: bool = True
 
 
+register_index("collab_channels", [("id", 1)], unique=True)
+register_index("collab_channels", [("type", 1), ("is_archived", 1)])
+register_index("collab_channels", [("members", 1)])
+register_index("collab_messages", [("id", 1)], unique=True)
+register_index("collab_messages", [("channel_id", 1), ("is_deleted", 1), ("parent_id", 1), ("created_at", -1)])
+register_index("collab_messages", [("parent_id", 1), ("created_at", 1)])
+register_index("collab_messages", [("channel_id", 1), ("is_deleted", 1), ("created_at", 1), ("id", 1)])
+register_index("collab_files", [("id", 1)], unique=True)
+register_index("collab_files", [("channel_id", 1), ("is_deleted", 1), ("created_at", -1)])
+register_index("collab_polls", [("id", 1)], unique=True)
+register_index("collab_polls", [("channel_id", 1)])
+register_index("collab_tasks", [("id", 1)], unique=True)
+register_index("collab_categories", [("id", 1)], unique=True)
+register_index("collab_read_receipts", [("user_id", 1), ("channel_id", 1)], unique=True)
+register_index("collab_saved", [("user_id", 1), ("created_at", -1)])
+register_index("collab_user_status", [("user_id", 1)], unique=True)
+register_index("collab_notification_prefs", [("user_id", 1)])
+register_index("collab_quick_replies", [("id", 1)], unique=True)
+# Background chat exports are downloaded by file name
+register_index(JOBS_COLLECTION, [("result.name", 1)], sparse=True)
+# Search: one text index per collection plus prefix lookups on search_terms (services.collab_search)
+register_index("collab_messages", [("content", "text")], name="collab_messages_text")
+register_index("collab_messages", [("search_terms", 1)])
+register_index("collab_files", [("original_name", "text")], name="collab_files_text")
+register_index("collab_files", [("search_terms", 1)])
+register_index("collab_polls", [("question", "text")], name="collab_polls_text")
+register_index("collab_polls", [("search_terms", 1)])
+register_index("collab_channels", [("name", "text"), ("description", "text")], name="collab_channels_text")
+register_index("collab_channels", [("search_terms", 1)])
+
+
 # ============= HELPER FUNCTIONS =============
 
 def get_file_type(filename: str) -> str:
@@ -271,17 +317,21 @@ def get_file_type(filename: str) -> str:
     return 'other'
 
 
-async def get_user_info(user_id: str) -> Dict[str, Any]:
-    """Get basic user info for display"""
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
-    if user:
-        return {
-            "id": user.get("id"),
-            "name": user.get("full_name", "Unknown"),
-            "email": user.get("email"),
-            "avatar": None  # Could add profile picture
-        }
-    return {"id": user_id, "name": "Unknown User", "email": None, "avatar": None}
+def user_loader() -> UserLoader:
+    """Per-request batched user/presence lookups (see services.user_directory)"""
+    return UserLoader(db)
+
+
+async def publish_channel_event(channel_id: str, event_type: str, data: Dict[str, Any]):
+    """Push an event to everyone subscribed to the channel over the WebSocket gateway"""
+    await broker.publish(channel_topic(channel_id), event_type, data, channel_id=channel_id)
+
+
+async def update_message(message_id: str, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Apply an update and return the message as it is afterwards"""
+    return await db.collab_messages.find_one_and_update(
+        {"id": message_id}, update, projection=SEARCHABLE_PROJECTION, return_document=ReturnDocument.AFTER
+    )
 
 
 # ============= CHANNEL ROUTES =============
@@ -320,7 +370,7 @@ async def create_channel(data: Dict[str, Any], current_user: User = Depends(get_
         members=[current_user.id] + data.get("members", [])
     )
     
-    await db.collab_channels.insert_one(channel.model_dump())
+    await db.collab_channels.insert_one(indexed(channel.model_dump(), "collab_channels"))
     
     # Create system message
     system_msg = Message(
@@ -330,7 +380,7 @@ async def create_channel(data: Dict[str, Any], current_user: User = Depends(get_
         sender_id=current_user.id,
         sender_name=current_user.full_name
     )
-    await db.collab_messages.insert_one(system_msg.model_dump())
+    await db.collab_messages.insert_one(indexed(system_msg.model_dump(), "collab_messages"))
     
     return channel.model_dump()
 
@@ -338,7 +388,7 @@ async def create_channel(data: Dict[str, Any], current_user: User = Depends(get_
 @router.get("/channels/{channel_id}")
 async def get_channel(channel_id: str, current_user: User = Depends(get_current_user)):
     """Get channel details"""
-    channel = await db.collab_channels.find_one({"id": channel_id}, {"_id": 0})
+    channel = await db.collab_channels.find_one({"id": channel_id}, SEARCHABLE_PROJECTION)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
@@ -356,7 +406,7 @@ async def update_channel(
     current_user: User = Depends(get_current_user)
 ):
     """Update channel settings"""
-    channel = await db.collab_channels.find_one({"id": channel_id}, {"_id": 0})
+    channel = await db.collab_channels.find_one({"id": channel_id}, SEARCHABLE_PROJECTION)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
@@ -365,15 +415,17 @@ async def update_channel(
         raise HTTPException(status_code=403, detail="Only channel creator can update")
     
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    if "name" in data or "description" in data:
+        data["search_terms"] = search_terms(data.get("name", channel.get("name")), data.get("description", channel.get("description")))
     await db.collab_channels.update_one({"id": channel_id}, {"$set": data})
     
-    return await db.collab_channels.find_one({"id": channel_id}, {"_id": 0})
+    return await db.collab_channels.find_one({"id": channel_id}, SEARCHABLE_PROJECTION)
 
 
 @router.delete("/channels/{channel_id}")
 async def delete_channel(channel_id: str, current_user: User = Depends(get_current_user)):
     """Archive a channel"""
-    channel = await db.collab_channels.find_one({"id": channel_id}, {"_id": 0})
+    channel = await db.collab_channels.find_one({"id": channel_id}, SEARCHABLE_PROJECTION)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
@@ -392,7 +444,8 @@ async def delete_channel(channel_id: str, current_user: User = Depends(get_curre
 async def add_channel_member(
     channel_id: str, 
     data: Dict[str, Any], 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    users: UserLoader = Depends(user_loader)
 ):
     """Add member to private channel"""
     user_id = data.get("user_id")
@@ -405,7 +458,7 @@ async def add_channel_member(
     )
     
     # System message
-    user_info = await get_user_info(user_id)
+    user_info = await users.profile(user_id)
     system_msg = Message(
         channel_id=channel_id,
         content=f"{user_info['name']} was added to the channel",
@@ -413,7 +466,7 @@ async def add_channel_member(
         sender_id=current_user.id,
         sender_name=current_user.full_name
     )
-    await db.collab_messages.insert_one(system_msg.model_dump())
+    await db.collab_messages.insert_one(indexed(system_msg.model_dump(), "collab_messages"))
     
     return {"message": "Member added"}
 
@@ -449,7 +502,7 @@ async def get_messages(
         query["created_at"] = {"$lt": before}
     
     messages = await db.collab_messages.find(
-        query, {"_id": 0}
+        query, SEARCHABLE_PROJECTION
     ).sort("created_at", -1).to_list(limit)
     
     # Reverse to get chronological order
@@ -480,7 +533,7 @@ async def send_message(
         attachments=data.get("attachments", [])
     )
     
-    await db.collab_messages.insert_one(message.model_dump())
+    await db.collab_messages.insert_one(indexed(message.model_dump(), "collab_messages"))
     
     # Update channel last message time and count
     await db.collab_channels.update_one(
@@ -498,6 +551,7 @@ async def send_message(
             {"$inc": {"thread_count": 1}}
         )
     
+    await publish_channel_event(channel_id, "message.created", message.model_dump())
     return message.model_dump()
 
 
@@ -505,14 +559,14 @@ async def send_message(
 async def get_thread(message_id: str, current_user: User = Depends(get_current_user)):
     """Get thread replies for a message"""
     # Get parent message
-    parent = await db.collab_messages.find_one({"id": message_id}, {"_id": 0})
+    parent = await db.collab_messages.find_one({"id": message_id}, SEARCHABLE_PROJECTION)
     if not parent:
         raise HTTPException(status_code=404, detail="Message not found")
     
     # Get replies
     replies = await db.collab_messages.find(
         {"parent_id": message_id, "is_deleted": False},
-        {"_id": 0}
+        SEARCHABLE_PROJECTION
     ).sort("created_at", 1).to_list(100)
     
     return {"parent": parent, "replies": replies}
@@ -525,29 +579,29 @@ async def edit_message(
     current_user: User = Depends(get_current_user)
 ):
     """Edit a message"""
-    message = await db.collab_messages.find_one({"id": message_id}, {"_id": 0})
+    message = await db.collab_messages.find_one({"id": message_id}, SEARCHABLE_PROJECTION)
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
     if message["sender_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Can only edit your own messages")
     
-    await db.collab_messages.update_one(
-        {"id": message_id},
-        {"$set": {
-            "content": data.get("content", message["content"]),
-            "is_edited": True,
-            "edited_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
+    content = data.get("content", message["content"])
+    updated = await update_message(message_id, {"$set": {
+        "content": content,
+        "search_terms": search_terms(content),
+        "is_edited": True,
+        "edited_at": datetime.now(timezone.utc).isoformat()
+    }})
     
-    return await db.collab_messages.find_one({"id": message_id}, {"_id": 0})
+    await publish_channel_event(message["channel_id"], "message.updated", updated)
+    return updated
 
 
 @router.delete("/messages/{message_id}")
 async def delete_message(message_id: str, current_user: User = Depends(get_current_user)):
     """Delete a message"""
-    message = await db.collab_messages.find_one({"id": message_id}, {"_id": 0})
+    message = await db.collab_messages.find_one({"id": message_id}, SEARCHABLE_PROJECTION)
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
@@ -556,9 +610,12 @@ async def delete_message(message_id: str, current_user: User = Depends(get_curre
     
     await db.collab_messages.update_one(
         {"id": message_id},
-        {"$set": {"is_deleted": True, "content": "This message was deleted"}}
+        {"$set": {"is_deleted": True, "content": "This message was deleted", "search_terms": []}}
     )
     
+    await publish_channel_event(message["channel_id"], "message.deleted", {
+        "id": message_id, "parent_id": message.get("parent_id")
+    })
     return {"message": "Message deleted"}
 
 
@@ -574,10 +631,11 @@ async def add_reaction(
         raise HTTPException(status_code=400, detail="emoji required")
     
     # Add user to reaction
-    await db.collab_messages.update_one(
-        {"id": message_id},
-        {"$addToSet": {f"reactions.{emoji}": current_user.id}}
-    )
+    message = await update_message(message_id, {"$addToSet": {f"reactions.{emoji}": current_user.id}})
+    if message:
+        await publish_channel_event(message["channel_id"], "reaction.added", {
+            "message_id": message_id, "emoji": emoji, "user_id": current_user.id, "reactions": message["reactions"]
+        })
     
     return {"message": "Reaction added"}
 
@@ -589,10 +647,11 @@ async def remove_reaction(
     current_user: User = Depends(get_current_user)
 ):
     """Remove reaction from a message"""
-    await db.collab_messages.update_one(
-        {"id": message_id},
-        {"$pull": {f"reactions.{emoji}": current_user.id}}
-    )
+    message = await update_message(message_id, {"$pull": {f"reactions.{emoji}": current_user.id}})
+    if message:
+        await publish_channel_event(message["channel_id"], "reaction.removed", {
+            "message_id": message_id, "emoji": emoji, "user_id": current_user.id, "reactions": message["reactions"]
+        })
     
     return {"message": "Reaction removed"}
 
@@ -600,20 +659,18 @@ async def remove_reaction(
 @router.post("/messages/{message_id}/pin")
 async def pin_message(message_id: str, current_user: User = Depends(get_current_user)):
     """Pin a message"""
-    await db.collab_messages.update_one(
-        {"id": message_id},
-        {"$set": {"is_pinned": True}}
-    )
+    message = await update_message(message_id, {"$set": {"is_pinned": True}})
+    if message:
+        await publish_channel_event(message["channel_id"], "message.pinned", message)
     return {"message": "Message pinned"}
 
 
 @router.delete("/messages/{message_id}/pin")
 async def unpin_message(message_id: str, current_user: User = Depends(get_current_user)):
     """Unpin a message"""
-    await db.collab_messages.update_one(
-        {"id": message_id},
-        {"$set": {"is_pinned": False}}
-    )
+    message = await update_message(message_id, {"$set": {"is_pinned": False}})
+    if message:
+        await publish_channel_event(message["channel_id"], "message.unpinned", message)
     return {"message": "Message unpinned"}
 
 
@@ -622,7 +679,7 @@ async def get_pinned_messages(channel_id: str, current_user: User = Depends(get_
     """Get pinned messages in a channel"""
     messages = await db.collab_messages.find(
         {"channel_id": channel_id, "is_pinned": True, "is_deleted": False},
-        {"_id": 0}
+        SEARCHABLE_PROJECTION
     ).sort("created_at", -1).to_list(50)
     
     return messages
@@ -662,7 +719,7 @@ async def upload_file(
         uploaded_by_name=current_user.full_name
     )
     
-    await db.collab_files.insert_one(collab_file.model_dump())
+    await db.collab_files.insert_one(indexed(collab_file.model_dump(), "collab_files"))
     
     return collab_file.model_dump()
 
@@ -679,7 +736,7 @@ async def get_channel_files(
     if file_type:
         query["file_type"] = file_type
     
-    files = await db.collab_files.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    files = await db.collab_files.find(query, SEARCHABLE_PROJECTION).sort("created_at", -1).to_list(limit)
     return files
 
 
@@ -694,49 +751,55 @@ async def get_all_files(
     if file_type:
         query["file_type"] = file_type
     
-    files = await db.collab_files.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    files = await db.collab_files.find(query, SEARCHABLE_PROJECTION).sort("created_at", -1).to_list(limit)
     return files
 
 
 # ============= SEARCH ROUTES =============
 
+async def accessible_channel_ids(user: User, channel_id: Optional[str] = None) -> List[str]:
+    """Ids of the channels `user` may read (just `channel_id` when given and readable)"""
+    query = {"$or": [
+        {"type": "public"},
+        {"members": user.id},
+        {"created_by": user.id}
+    ]}
+    if channel_id:
+        query["id"] = channel_id
+    channels = await db.collab_channels.find(query, {"_id": 0, "id": 1}).to_list(None)
+    return [c["id"] for c in channels]
+
+
+def search_page(found: Dict[str, Any], results: Dict[str, Any], key: str):
+    results[key] = found["items"]
+    results["has_more"][key] = found["has_more"]
+
+
 @router.get("/search")
 async def search(
     q: str,
     type: Optional[str] = None,  # messages, files, channels
     channel_id: Optional[str] = None,
     limit: int = 50,
+    skip: int = 0,
     current_user: User = Depends(get_current_user)
 ):
-    """Search messages, files, and channels"""
-    results = {"messages": [], "files": [], "channels": []}
+    """Search messages, files, and channels (see services.collab_search for the query syntax)"""
+    results = {"messages": [], "files": [], "channels": [], "has_more": {}}
+    query = SearchQuery(q)
+    channel_ids = await accessible_channel_ids(current_user, channel_id)
+    in_channels = {"channel_id": {"$in": channel_ids}, "is_deleted": False}
     
     if not type or type == "messages":
-        msg_query = {"content": {"$regex": q, "$options": "i"}, "is_deleted": False}
-        if channel_id:
-            msg_query["channel_id"] = channel_id
-        
-        results["messages"] = await db.collab_messages.find(
-            msg_query, {"_id": 0}
-        ).sort("created_at", -1).to_list(limit)
+        search_page(await run_search(db.collab_messages, query, in_channels, limit, skip), results, "messages")
     
     if not type or type == "files":
-        file_query = {"original_name": {"$regex": q, "$options": "i"}, "is_deleted": False}
-        if channel_id:
-            file_query["channel_id"] = channel_id
-        
-        results["files"] = await db.collab_files.find(
-            file_query, {"_id": 0}
-        ).sort("created_at", -1).to_list(limit)
+        search_page(await run_search(db.collab_files, query, in_channels, limit, skip), results, "files")
     
     if not type or type == "channels":
-        results["channels"] = await db.collab_channels.find(
-            {"$or": [
-                {"name": {"$regex": q, "$options": "i"}},
-                {"description": {"$regex": q, "$options": "i"}}
-            ], "is_archived": False},
-            {"_id": 0}
-        ).to_list(limit)
+        search_page(await run_search(
+            db.collab_channels, query, {"id": {"$in": channel_ids}, "is_archived": False}, limit, skip
+        ), results, "channels")
     
     return results
 
@@ -755,11 +818,11 @@ async def get_saved_items(current_user: User = Depends(get_current_user)):
     enriched = []
     for item in items:
         if item["item_type"] == "message":
-            message = await db.collab_messages.find_one({"id": item["item_id"]}, {"_id": 0})
+            message = await db.collab_messages.find_one({"id": item["item_id"]}, SEARCHABLE_PROJECTION)
             if message:
                 item["content"] = message
         elif item["item_type"] == "file":
-            file = await db.collab_files.find_one({"id": item["item_id"]}, {"_id": 0})
+            file = await db.collab_files.find_one({"id": item["item_id"]}, SEARCHABLE_PROJECTION)
             if file:
                 item["content"] = file
         enriched.append(item)
@@ -819,12 +882,16 @@ async def get_tasks(
 
 
 @router.post("/tasks")
-async def create_task(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
+async def create_task(
+    data: Dict[str, Any],
+    current_user: User = Depends(get_current_user),
+    users: UserLoader = Depends(user_loader)
+):
     """Create a task"""
     # Get assignee name
     assignee_name = None
     if data.get("assignee_id"):
-        user_info = await get_user_info(data["assignee_id"])
+        user_info = await users.profile(data["assignee_id"])
         assignee_name = user_info.get("name")
     
     task = Task(
@@ -841,7 +908,8 @@ async def create_task(data: Dict[str, Any], current_user: User = Depends(get_cur
 async def update_task(
     task_id: str, 
     data: Dict[str, Any], 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    users: UserLoader = Depends(user_loader)
 ):
     """Update a task"""
     # If completing task
@@ -851,7 +919,7 @@ async def update_task(
     # Update assignee name if changed
     if "assignee_id" in data:
         if data["assignee_id"]:
-            user_info = await get_user_info(data["assignee_id"])
+            user_info = await users.profile(data["assignee_id"])
             data["assignee_name"] = user_info.get("name")
         else:
             data["assignee_name"] = None
@@ -870,7 +938,11 @@ async def delete_task(task_id: str, current_user: User = Depends(get_current_use
 # ============= DIRECT MESSAGES =============
 
 @router.post("/dm")
-async def create_direct_message(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
+async def create_direct_message(
+    data: Dict[str, Any],
+    current_user: User = Depends(get_current_user),
+    users: UserLoader = Depends(user_loader)
+):
     """Create or get direct message channel with a user"""
     other_user_id = data.get("user_id")
     if not other_user_id:
@@ -880,13 +952,13 @@ async def create_direct_message(data: Dict[str, Any], current_user: User = Depen
     existing = await db.collab_channels.find_one({
         "type": "direct",
         "members": {"$all": [current_user.id, other_user_id], "$size": 2}
-    }, {"_id": 0})
+    }, SEARCHABLE_PROJECTION)
     
     if existing:
         return existing
     
     # Get other user info
-    other_user = await get_user_info(other_user_id)
+    other_user = await users.profile(other_user_id)
     
     # Create new DM channel
     channel = Channel(
@@ -896,28 +968,33 @@ async def create_direct_message(data: Dict[str, Any], current_user: User = Depen
         created_by=current_user.id
     )
     
-    await db.collab_channels.insert_one(channel.model_dump())
+    await db.collab_channels.insert_one(indexed(channel.model_dump(), "collab_channels"))
     return channel.model_dump()
 
 
 @router.get("/dm")
-async def get_direct_messages(current_user: User = Depends(get_current_user)):
+async def get_direct_messages(
+    current_user: User = Depends(get_current_user),
+    users: UserLoader = Depends(user_loader)
+):
     """Get all direct message channels for user"""
     channels = await db.collab_channels.find(
         {"type": "direct", "members": current_user.id, "is_archived": False},
-        {"_id": 0}
+        SEARCHABLE_PROJECTION
     ).sort("last_message_at", -1).to_list(50)
     
     # Enrich with other user info
-    enriched = []
+    other_ids = {}
     for channel in channels:
         other_id = [m for m in channel["members"] if m != current_user.id]
         if other_id:
-            other_info = await get_user_info(other_id[0])
-            channel["other_user"] = other_info
-        enriched.append(channel)
+            other_ids[channel["id"]] = other_id[0]
+    profiles = await users.profiles_for(other_ids.values())
+    for channel in channels:
+        if channel["id"] in other_ids:
+            channel["other_user"] = profiles[other_ids[channel["id"]]]
     
-    return enriched
+    return channels
 
 
 # ============= DASHBOARD/STATS =============
@@ -955,7 +1032,7 @@ async def get_dashboard(current_user: User = Depends(get_current_user)):
     # Recent activity
     recent_messages = await db.collab_messages.find(
         {"is_deleted": False, "content_type": {"$ne": "system"}},
-        {"_id": 0}
+        SEARCHABLE_PROJECTION
     ).sort("created_at", -1).to_list(10)
     
     return {
@@ -971,22 +1048,22 @@ async def get_dashboard(current_user: User = Depends(get_current_user)):
 # ============= USERS LIST =============
 
 @router.get("/users")
-async def get_collaboration_users(current_user: User = Depends(get_current_user)):
+async def get_collaboration_users(
+    current_user: User = Depends(get_current_user),
+    loader: UserLoader = Depends(user_loader)
+):
     """Get list of users for mentions and DMs"""
     users = await db.users.find(
         {},
-        {"_id": 0, "password_hash": 0}
+        {"_id": 0, "id": 1, "full_name": 1, "email": 1}
     ).to_list(500)
     
-    # Get user statuses
-    statuses = {}
-    status_docs = await db.collab_user_status.find({}, {"_id": 0}).to_list(500)
-    for s in status_docs:
-        statuses[s["user_id"]] = s
+    # Statuses of exactly these users (not the first 500 status documents)
+    statuses = await loader.statuses_for(u["id"] for u in users)
     
     result = []
     for u in users:
-        user_status = statuses.get(u["id"], {})
+        user_status = statuses[u["id"]]
         result.append({
             "id": u["id"], 
             "name": u.get("full_name", ""), 
@@ -1024,7 +1101,7 @@ async def create_poll(
         created_by_name=current_user.full_name
     )
     
-    await db.collab_polls.insert_one(poll.model_dump())
+    await db.collab_polls.insert_one(indexed(poll.model_dump(), "collab_polls"))
     
     # Create message for poll
     message = Message(
@@ -1035,7 +1112,7 @@ async def create_poll(
         sender_name=current_user.full_name,
         attachments=[{"type": "poll", "poll_id": poll.id}]
     )
-    await db.collab_messages.insert_one(message.model_dump())
+    await db.collab_messages.insert_one(indexed(message.model_dump(), "collab_messages"))
     
     # Update poll with message_id
     await db.collab_polls.update_one({"id": poll.id}, {"$set": {"message_id": message.id}})
@@ -1048,7 +1125,7 @@ async def get_polls(channel_id: str, current_user: User = Depends(get_current_us
     """Get polls in a channel"""
     polls = await db.collab_polls.find(
         {"channel_id": channel_id},
-        {"_id": 0}
+        SEARCHABLE_PROJECTION
     ).sort("created_at", -1).to_list(50)
     return polls
 
@@ -1056,7 +1133,7 @@ async def get_polls(channel_id: str, current_user: User = Depends(get_current_us
 @router.get("/polls/{poll_id}")
 async def get_poll(poll_id: str, current_user: User = Depends(get_current_user)):
     """Get a single poll"""
-    poll = await db.collab_polls.find_one({"id": poll_id}, {"_id": 0})
+    poll = await db.collab_polls.find_one({"id": poll_id}, SEARCHABLE_PROJECTION)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     return poll
@@ -1069,7 +1146,7 @@ async def vote_poll(
     current_user: User = Depends(get_current_user)
 ):
     """Vote on a poll"""
-    poll = await db.collab_polls.find_one({"id": poll_id}, {"_id": 0})
+    poll = await db.collab_polls.find_one({"id": poll_id}, SEARCHABLE_PROJECTION)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
@@ -1093,13 +1170,13 @@ async def vote_poll(
     
     await db.collab_polls.update_one({"id": poll_id}, {"$set": {"options": poll["options"]}})
     
-    return await db.collab_polls.find_one({"id": poll_id}, {"_id": 0})
+    return await db.collab_polls.find_one({"id": poll_id}, SEARCHABLE_PROJECTION)
 
 
 @router.post("/polls/{poll_id}/close")
 async def close_poll(poll_id: str, current_user: User = Depends(get_current_user)):
     """Close a poll"""
-    poll = await db.collab_polls.find_one({"id": poll_id}, {"_id": 0})
+    poll = await db.collab_polls.find_one({"id": poll_id}, SEARCHABLE_PROJECTION)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
@@ -1138,7 +1215,9 @@ async def update_my_status(data: Dict[str, Any], current_user: User = Depends(ge
         {"$set": status_data},
         upsert=True
     )
+    invalidate_user_status(current_user.id)
     
+    await broker.publish(PRESENCE_TOPIC, "presence", status_data)
     return status_data
 
 
@@ -1149,6 +1228,111 @@ async def get_all_statuses(current_user: User = Depends(get_current_user)):
     return {s["user_id"]: s for s in statuses}
 
 
+# ============= REALTIME GATEWAY =============
+#
+# Clients connect to /api/collaborations/ws?token=<jwt> and send JSON frames:
+#   {"type": "subscribe", "channel_id": ...}    {"type": "unsubscribe", "channel_id": ...}
+#   {"type": "typing", "channel_id": ...}       {"type": "ping"}
+# and receive channel events (message.created, message.updated, message.deleted,
+# reaction.added, reaction.removed, message.pinned, message.unpinned, typing) for
+# the channels they subscribed to, plus presence events for everyone.
+
+async def can_access_channel(channel_id: str, user: User) -> bool:
+    channel = await db.collab_channels.find_one(
+        {"id": channel_id}, {"_id": 0, "type": 1, "members": 1, "created_by": 1}
+    )
+    if not channel:
+        return False
+    return channel["type"] == "public" or user.id in channel.get("members", []) or channel.get("created_by") == user.id
+
+
+async def set_online(user: User, online: bool):
+    """Record connection presence without touching the status the user chose"""
+    now = datetime.now(timezone.utc).isoformat()
+    await db.collab_user_status.update_one(
+        {"user_id": user.id},
+        {"$set": {"online": online, "last_active": now}, "$setOnInsert": {"status": "online"}},
+        upsert=True
+    )
+    invalidate_user_status(user.id)
+    await broker.publish(PRESENCE_TOPIC, "presence", {"user_id": user.id, "online": online, "last_active": now})
+
+
+async def pump_events(websocket: WebSocket, subscriber: Subscriber):
+    """Forward broker events to the socket; pings when idle, closes slow consumers"""
+    while True:
+        try:
+            event = await asyncio.wait_for(subscriber.queue.get(), REALTIME_PING_SECONDS)
+        except asyncio.TimeoutError:
+            await websocket.send_json({"type": "ping"})
+            continue
+        if event is None:
+            await websocket.close(code=1013, reason="Too far behind; reconnect and refetch")
+            return
+        await websocket.send_json(event)
+
+
+async def handle_frame(websocket: WebSocket, subscriber: Subscriber, user: User, frame: Dict[str, Any]):
+    kind = frame.get("type")
+    channel_id = frame.get("channel_id")
+    if kind == "ping":
+        await websocket.send_json({"type": "pong"})
+    elif kind == "subscribe":
+        if not channel_id or not await can_access_channel(channel_id, user):
+            await websocket.send_json({"type": "error", "channel_id": channel_id, "detail": "Channel not found or access denied"})
+            return
+        broker.subscribe(subscriber, channel_topic(channel_id))
+        await websocket.send_json({"type": "subscribed", "channel_id": channel_id})
+    elif kind == "unsubscribe" and channel_id:
+        broker.unsubscribe(subscriber, channel_topic(channel_id))
+        await websocket.send_json({"type": "unsubscribed", "channel_id": channel_id})
+    elif kind == "typing":
+        if channel_topic(channel_id or "") not in subscriber.topics:
+            await websocket.send_json({"type": "error", "channel_id": channel_id, "detail": "Subscribe to the channel first"})
+            return
+        await publish_channel_event(channel_id, "typing", {"user_id": user.id, "name": user.full_name})
+    else:
+        await websocket.send_json({"type": "error", "detail": f"Unsupported frame: {kind}"})
+
+
+@router.websocket("/ws")
+async def collaboration_socket(websocket: WebSocket, token: str = ""):
+    """Realtime channel events, typing and presence over one WebSocket"""
+    try:
+        principal = await resolve_principal(decode_token_user_id(token))
+    except Exception:
+        principal = None
+    if not principal:
+        await websocket.close(code=1008, reason="Invalid token")
+        return
+    user = User(**principal.user)
+    
+    await websocket.accept()
+    subscriber = Subscriber(user.id)
+    broker.subscribe(subscriber, PRESENCE_TOPIC)
+    if broker.connect(subscriber):
+        await set_online(user, True)
+    sender = asyncio.create_task(pump_events(websocket, subscriber))
+    try:
+        while True:
+            try:
+                frame = json.loads(await websocket.receive_text())
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Frames must be JSON"})
+                continue
+            await handle_frame(websocket, subscriber, user, frame if isinstance(frame, dict) else {})
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the sender already closed the socket
+        pass
+    finally:
+        # Unsubscribe before awaiting anything, so cancellation can't leak subscriptions
+        sender.cancel()
+        last_connection = broker.disconnect(subscriber)
+        await asyncio.gather(sender, return_exceptions=True)
+        if last_connection:
+            await set_online(user, False)
+
+
 # ============= CHANNEL CATEGORIES =============
 
 @router.get("/categories")
@@ -1256,7 +1440,7 @@ async def mark_channel_read(channel_id: str, current_user: User = Depends(get_cu
     # Get last message
     last_message = await db.collab_messages.find_one(
         {"channel_id": channel_id, "is_deleted": False},
-        {"_id": 0},
+        SEARCHABLE_PROJECTION,
         sort=[("created_at", -1)]
     )
     
@@ -1278,16 +1462,7 @@ async def mark_channel_read(channel_id: str, current_user: User = Depends(get_cu
 
 @router.get("/unread")
 async def get_unread_counts(current_user: User = Depends(get_current_user)):
-    """Get unread message counts per channel"""
-    # Get user's read receipts
-    receipts = await db.collab_read_receipts.find(
-        {"user_id": current_user.id},
-        {"_id": 0}
-    ).to_list(100)
-    
-    receipt_map = {r["channel_id"]: r for r in receipts}
-    
-    # Get accessible channels
+    """Get unread message counts per channel (one $group over every accessible channel)"""
     channels = await db.collab_channels.find({
         "$or": [
             {"type": "public"},
@@ -1295,33 +1470,33 @@ async def get_unread_counts(current_user: User = Depends(get_current_user)):
             {"created_by": current_user.id}
         ],
         "is_archived": False
-    }, {"_id": 0, "id": 1}).to_list(100)
+    }, {"_id": 0, "id": 1}).to_list(None)
+    channel_ids = [c["id"] for c in channels]
+    if not channel_ids:
+        return {}
     
-    unread = {}
-    for channel in channels:
-        channel_id = channel["id"]
-        receipt = receipt_map.get(channel_id)
-        
-        if receipt:
-            # Count messages after last read
-            count = await db.collab_messages.count_documents({
-                "channel_id": channel_id,
-                "created_at": {"$gt": receipt["last_read_at"]},
-                "is_deleted": False,
-                "sender_id": {"$ne": current_user.id}
-            })
-        else:
-            # All messages are unread
-            count = await db.collab_messages.count_documents({
-                "channel_id": channel_id,
-                "is_deleted": False,
-                "sender_id": {"$ne": current_user.id}
-            })
-        
-        if count > 0:
-            unread[channel_id] = count
+    receipts = await db.collab_read_receipts.find(
+        {"user_id": current_user.id, "channel_id": {"$in": channel_ids}},
+        {"_id": 0, "channel_id": 1, "last_read_at": 1}
+    ).to_list(None)
+    last_read = {r["channel_id"]: r["last_read_at"] for r in receipts}
+    
+    # Messages after the receipt in read channels, all messages in never-read ones;
+    # each branch is a range scan on (channel_id, is_deleted, created_at)
+    branches = [
+        {"channel_id": channel_id, "is_deleted": False, "created_at": {"$gt": read_at}}
+        for channel_id, read_at in last_read.items()
+    ]
+    never_read = [c for c in channel_ids if c not in last_read]
+    if never_read:
+        branches.append({"channel_id": {"$in": never_read}, "is_deleted": False})
+    
+    counts = await db.collab_messages.aggregate([
+        {"$match": {"$or": branches, "sender_id": {"$ne": current_user.id}}},
+        {"$group": {"_id": "$channel_id", "count": {"$sum": 1}}}
+    ]).to_list(None)
     
-    return unread
+    return {c["_id"]: c["count"] for c in counts if c["count"] > 0}
 
 
 # ============= NOTIFICATION PREFERENCES =============
@@ -1375,52 +1550,49 @@ async def advanced_search(
     has_attachments: Optional[bool] = None,
     is_pinned: Optional[bool] = None,
     limit: int = 50,
+    skip: int = 0,
     current_user: User = Depends(get_current_user)
 ):
     """Advanced search with filters"""
-    results = {"messages": [], "files": [], "polls": []}
+    results = {"messages": [], "files": [], "polls": [], "has_more": {}}
+    query = SearchQuery(q)
+    channel_ids = await accessible_channel_ids(current_user, channel_id)
     
-    # Build message query
-    msg_query = {"content": {"$regex": q, "$options": "i"}, "is_deleted": False}
-    
-    if channel_id:
-        msg_query["channel_id"] = channel_id
-    if sender_id:
-        msg_query["sender_id"] = sender_id
+    created_at = {}
     if date_from:
-        msg_query["created_at"] = {"$gte": date_from}
+        created_at["$gte"] = date_from
     if date_to:
-        if "created_at" in msg_query:
-            msg_query["created_at"]["$lte"] = date_to
-        else:
-            msg_query["created_at"] = {"$lte": date_to}
+        created_at["$lte"] = date_to
+    
+    # Build message filters
+    msg_filters = {"channel_id": {"$in": channel_ids}, "is_deleted": False}
+    if sender_id:
+        msg_filters["sender_id"] = sender_id
+    if created_at:
+        msg_filters["created_at"] = created_at
     if has_attachments:
-        msg_query["attachments.0"] = {"$exists": True}
+        msg_filters["attachments.0"] = {"$exists": True}
     if is_pinned is not None:
-        msg_query["is_pinned"] = is_pinned
+        msg_filters["is_pinned"] = is_pinned
     
     if not type or type == "messages":
-        results["messages"] = await db.collab_messages.find(
-            msg_query, {"_id": 0}
-        ).sort("created_at", -1).to_list(limit)
+        search_page(await run_search(db.collab_messages, query, msg_filters, limit, skip), results, "messages")
     
     if not type or type == "files":
-        file_query = {"original_name": {"$regex": q, "$options": "i"}, "is_deleted": False}
-        if channel_id:
-            file_query["channel_id"] = channel_id
-        
-        results["files"] = await db.collab_files.find(
-            file_query, {"_id": 0}
-        ).sort("created_at", -1).to_list(limit)
+        file_filters = {"channel_id": {"$in": channel_ids}, "is_deleted": False}
+        if sender_id:
+            file_filters["uploaded_by"] = sender_id
+        if created_at:
+            file_filters["created_at"] = created_at
+        search_page(await run_search(db.collab_files, query, file_filters, limit, skip), results, "files")
     
     if not type or type == "polls":
-        poll_query = {"question": {"$regex": q, "$options": "i"}}
-        if channel_id:
-            poll_query["channel_id"] = channel_id
-        
-        results["polls"] = await db.collab_polls.find(
-            poll_query, {"_id": 0}
-        ).sort("created_at", -1).to_list(limit)
+        poll_filters = {"channel_id": {"$in": channel_ids}}
+        if sender_id:
+            poll_filters["created_by"] = sender_id
+        if created_at:
+            poll_filters["created_at"] = created_at
+        search_page(await run_search(db.collab_polls, query, poll_filters, limit, skip), results, "polls")
     
     return results
 
@@ -1435,7 +1607,7 @@ async def get_my_mentions(
     """Get messages where current user is mentioned"""
     messages = await db.collab_messages.find(
         {"mentions": current_user.id, "is_deleted": False},
-        {"_id": 0}
+        SEARCHABLE_PROJECTION
     ).sort("created_at", -1).to_list(limit)
     
     return messages
@@ -1444,25 +1616,18 @@ async def get_my_mentions(
 # ============= CHANNEL MEMBERS =============
 
 @router.get("/channels/{channel_id}/members")
-async def get_channel_members(channel_id: str, current_user: User = Depends(get_current_user)):
+async def get_channel_members(
+    channel_id: str,
+    current_user: User = Depends(get_current_user),
+    users: UserLoader = Depends(user_loader)
+):
     """Get members of a channel"""
-    channel = await db.collab_channels.find_one({"id": channel_id}, {"_id": 0})
+    channel = await db.collab_channels.find_one({"id": channel_id}, SEARCHABLE_PROJECTION)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
-    member_ids = channel.get("members", [])
-    
-    # Get user info for each member
-    members = []
-    for user_id in member_ids:
-        user_info = await get_user_info(user_id)
-        # Get status
-        status = await db.collab_user_status.find_one({"user_id": user_id}, {"_id": 0})
-        user_info["status"] = status.get("status", "offline") if status else "offline"
-        user_info["status_text"] = status.get("status_text") if status else None
-        members.append(user_info)
-    
-    return members
+    # One users query and one status query, however large the channel
+    return await users.members(channel.get("members", []))
 
 
 # ============= EXPORT CHAT =============
@@ -1470,33 +1635,60 @@ async def get_channel_members(channel_id: str, current_user: User = Depends(get_
 @router.get("/channels/{channel_id}/export")
 async def export_channel_chat(
     channel_id: str,
-    format: str = "json",
+    format: str = "json",  # json, ndjson, csv, zip
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    after: Optional[str] = None,  # message id: resume right after it
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    """Export channel chat history"""
-    query = {"channel_id": channel_id, "is_deleted": False}
-    
-    if date_from:
-        query["created_at"] = {"$gte": date_from}
-    if date_to:
-        if "created_at" in query:
-            query["created_at"]["$lte"] = date_to
-        else:
-            query["created_at"] = {"$lte": date_to}
-    
-    messages = await db.collab_messages.find(query, {"_id": 0}).sort("created_at", 1).to_list(10000)
-    
-    channel = await db.collab_channels.find_one({"id": channel_id}, {"_id": 0})
-    
-    export_data = {
-        "channel": channel,
-        "exported_at": datetime.now(timezone.utc).isoformat(),
-        "exported_by": current_user.full_name,
-        "message_count": len(messages),
-        "messages": messages
-    }
-    
-    return export_data
+    """Export channel chat history, streamed (or as a background job writing a file)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    channel = await db.collab_channels.find_one({"id": channel_id}, SEARCHABLE_PROJECTION)
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
+    if not is_admin and not await can_access_channel(channel_id, current_user):
+        raise HTTPException(status_code=403, detail="Not a member of this channel")
+    query = await export_query(db, channel_id, date_from, date_to, after)
+    
+    if background:
+        job = await enqueue_job(db, "collaborations.export", {
+            "channel_id": channel_id, "format": format, "date_from": date_from, "date_to": date_to,
+            "after": after, "exported_by": current_user.full_name
+        }, created_by=current_user.id)
+        return job_accepted(job)
+    
+    export = ChatExport(db, channel, format, query, exported_by=current_user.full_name)
+    return StreamingResponse(
+        export.chunks(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(channel, format)}"'}
+    )
+
 
+@job_handler("collaborations.export")
+async def run_chat_export_job(ctx, payload: Dict[str, Any]):
+    channel = await db.collab_channels.find_one({"id": payload["channel_id"]}, SEARCHABLE_PROJECTION)
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    query = await export_query(db, channel["id"], payload.get("date_from"), payload.get("date_to"), payload.get("after"))
+    export = ChatExport(db, channel, payload["format"], query,
+                        exported_by=payload.get("exported_by"), progress=ctx.progress)
+    result = await write_export(export)
+    return {**result, "file_url": f"/api/collaborations/exports/{result['name']}"}
+
+
+@router.get("/exports/{name}")
+async def download_chat_export(name: str, current_user: User = Depends(get_current_user)):
+    """Download a file written by a background chat export (only by whoever requested it)"""
+    path = export_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Export not found or expired")
+    job = await db[JOBS_COLLECTION].find_one(
+        {"kind": "collaborations.export", "result.name": name}, {"_id": 0, "created_by": 1, "result": 1}
+    )
+    if not job or job.get("created_by") != current_user.id:
+        raise HTTPException(status_code=404, detail="Export not found or expired")
+    return FileResponse(path, media_type=EXPORT_FORMATS[job["result"]["format"]], filename=job["result"]["filename"])
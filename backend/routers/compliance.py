@@ -7,9 +7,10 @@ import uuid
 
 import sys
 sys.path.insert(0, '/app/backend')
-from database import db
-from auth import get_current_user
+from database import db, register_index
+from auth import get_current_user, get_employee_for_user
 from models.core import User, UserRole
+from services.jobs import job_handler, ProgressCallback, enqueue as enqueue_job, accepted_response as job_accepted
 
 
 router = APIRouter(prefix="/compliance", tags=["Compliance & Legal"])
@@ -166,6 +167,19 @@ class ComplianceCertification(BaseModel):
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 
+register_index("compliance_policies", [("id", 1)], unique=True)
+register_index("compliance_policies", [("status", 1)])
+register_index("policy_acknowledgements", [("policy_id", 1), ("employee_id", 1)])
+register_index("policy_acknowledgements", [("employee_id", 1)])
+register_index("compliance_trainings", [("id", 1)], unique=True)
+register_index("training_completions", [("id", 1)], unique=True)
+register_index("training_completions", [("employee_id", 1), ("status", 1)])
+register_index("compliance_incidents", [("id", 1)], unique=True)
+register_index("compliance_certifications", [("id", 1)], unique=True)
+register_index("legal_documents", [("id", 1)], unique=True)
+register_index("legal_documents", [("employee_id", 1), ("status", 1)])
+
+
 # ============= ROUTES =============
 
 # --- Dashboard ---
@@ -221,7 +235,7 @@ async def get_compliance_dashboard(current_user: User = Depends(get_current_user
 @router.get("/my-overview")
 async def get_my_compliance_overview(current_user: User = Depends(get_current_user)):
     """Get employee's compliance overview"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         return {"pending_policies": [], "pending_trainings": [], "pending_signatures": [], "my_certifications": []}
     
@@ -330,7 +344,7 @@ async def acknowledge_policy(policy_id: str, current_user: User = Depends(get_cu
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -354,7 +368,7 @@ async def acknowledge_policy(policy_id: str, current_user: User = Depends(get_cu
 @router.get("/my-acknowledgements")
 async def get_my_acknowledgements(current_user: User = Depends(get_current_user)):
     """Get my policy acknowledgements"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         return []
     
@@ -424,8 +438,9 @@ async def delete_training(training_id: str, current_user: User = Depends(get_cur
 
 
 @router.post("/trainings/{training_id}/assign")
-async def assign_training(training_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
-    """Assign training to employees"""
+async def assign_training(training_id: str, data: Dict[str, Any], background: bool = False,
+                          current_user: User = Depends(get_current_user)):
+    """Assign training to employees; background=true queues a job and returns 202"""
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         raise HTTPException(status_code=403, detail="Only admins can assign trainings")
     
@@ -434,9 +449,22 @@ async def assign_training(training_id: str, data: Dict[str, Any], current_user:
         raise HTTPException(status_code=404, detail="Training not found")
     
     employee_ids = data.get("employee_ids", [])
+    if background:
+        job = await enqueue_job(db, "compliance.assign_training", {
+            "training_id": training_id, "employee_ids": employee_ids
+        }, current_user.id)
+        return job_accepted(job)
+    return await assign_training_to_employees(training, employee_ids)
+
+
+async def assign_training_to_employees(training: Dict[str, Any], employee_ids: List[str],
+                                       progress: Optional[ProgressCallback] = None):
+    training_id = training["id"]
     completions = []
     
-    for emp_id in employee_ids:
+    for idx, emp_id in enumerate(employee_ids):
+        if progress:
+            await progress(idx, len(employee_ids))
         emp = await db.employees.find_one({"id": emp_id}, {"_id": 0})
         if emp:
             existing = await db.training_completions.find_one({
@@ -452,13 +480,23 @@ async def assign_training(training_id: str, data: Dict[str, Any], current_user:
                 await db.training_completions.insert_one(completion.model_dump())
                 completions.append(completion.model_dump())
     
+    if progress:
+        await progress(len(employee_ids), len(employee_ids))
     return {"assigned": len(completions), "completions": completions}
 
 
+@job_handler("compliance.assign_training")
+async def run_training_assignment_job(ctx, payload: Dict[str, Any]):
+    training = await db.compliance_trainings.find_one({"id": payload["training_id"]}, {"_id": 0})
+    if not training:
+        raise HTTPException(status_code=404, detail="Training not found")
+    return await assign_training_to_employees(training, payload.get("employee_ids", []), progress=ctx.progress)
+
+
 @router.get("/my-trainings")
 async def get_my_trainings(current_user: User = Depends(get_current_user)):
     """Get my assigned trainings"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         return []
     
@@ -471,7 +509,7 @@ async def get_my_trainings(current_user: User = Depends(get_current_user)):
 @router.put("/my-trainings/{completion_id}")
 async def update_my_training(completion_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Update my training progress"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -540,7 +578,7 @@ async def get_documents(
         query["employee_id"] = employee_id
     
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        emp = await get_employee_for_user(current_user.id)
         if emp:
             query["employee_id"] = emp["id"]
     
@@ -581,7 +619,7 @@ async def delete_document(document_id: str, current_user: User = Depends(get_cur
 @router.post("/documents/{document_id}/sign")
 async def sign_document(document_id: str, current_user: User = Depends(get_current_user)):
     """Sign a document"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -608,7 +646,7 @@ async def sign_document(document_id: str, current_user: User = Depends(get_curre
 @router.post("/incidents")
 async def report_incident(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Report a compliance incident"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     
     data["reported_by"] = current_user.id
     data["reported_by_name"] = emp.get("full_name") if emp else current_user.email
@@ -637,7 +675,7 @@ async def get_incidents(
         query["severity"] = severity
     
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        emp = await get_employee_for_user(current_user.id)
         query["$or"] = [
             {"reported_by": current_user.id},
             {"is_confidential": False}
@@ -701,7 +739,7 @@ async def get_certifications(
         query["employee_id"] = employee_id
     
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        emp = await get_employee_for_user(current_user.id)
         if emp:
             query["employee_id"] = emp["id"]
     
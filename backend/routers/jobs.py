@@ -0,0 +1,90 @@
+"""Background Jobs Router for HR Platform."""
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional
+import asyncio
+import json
+
+import sys
+sys.path.insert(0, '/app/backend')
+from database import db
+from auth import get_current_user
+from models.core import User, UserRole
+from services.jobs import JOBS_COLLECTION, TERMINAL_STATUSES
+
+
+# Not "/jobs": recruitment's job posting routes are registered there first
+router = APIRouter(prefix="/background-jobs", tags=["Background Jobs"])
+
+EVENT_POLL_SECONDS = 1.0
+
+
+# ============= HELPER FUNCTIONS =============
+
+def is_admin(user: User) -> bool:
+    return user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
+
+
+async def get_visible_job(job_id: str, current_user: User) -> Dict[str, Any]:
+    """Fetch a job the caller may see: their own, or any job for admins"""
+    job = await db[JOBS_COLLECTION].find_one({"id": job_id}, {"_id": 0, "payload": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.get("created_by") != current_user.id and not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Not authorized to view this job")
+    return job
+
+
+# ============= ROUTES =============
+
+@router.get("")
+async def list_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """List recent jobs (own jobs; admins see all)"""
+    query = {}
+    if not is_admin(current_user):
+        query["created_by"] = current_user.id
+    if status:
+        query["status"] = status
+    if kind:
+        query["kind"] = kind
+    return await db[JOBS_COLLECTION].find(query, {"_id": 0, "payload": 0, "result": 0}).sort(
+        "created_at", -1
+    ).to_list(100)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Poll a job's status, progress, result and error"""
+    return await get_visible_job(job_id, current_user)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, current_user: User = Depends(get_current_user)):
+    """Server-sent events with the job's progress until it completes or fails"""
+    await get_visible_job(job_id, current_user)
+
+    async def events():
+        last = None
+        while True:
+            job = await db[JOBS_COLLECTION].find_one({"id": job_id}, {"_id": 0, "payload": 0})
+            if not job:
+                yield "event: error\ndata: {\"detail\": \"Job not found\"}\n\n"
+                return
+            snapshot = (job.get("status"), json.dumps(job.get("progress"), sort_keys=True, default=str))
+            if snapshot != last:
+                last = snapshot
+                event = "progress" if job.get("status") not in TERMINAL_STATUSES else job["status"]
+                yield f"event: {event}\ndata: {json.dumps(job, default=str)}\n\n"
+            if job.get("status") in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,26 +1,35 @@
 """Scheduled Reports Router for HR Platform."""
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import FileResponse
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from pydantic import BaseModel, Field, ConfigDict
 import uuid
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 import json
 import io
+import os
 
 import sys
 sys.path.insert(0, '/app/backend')
-from database import db
+from database import db, register_index
 from auth import get_current_user
 from models.core import User, UserRole
+from services import mailer
+from services.config_cache import get_config
+from services.report_scheduler import next_run_for
+from services.report_renderer import report_window, render_report, formats_for, artifact_path, FORMATS
+from services.jobs import job_handler, enqueue as enqueue_job, accepted_response as job_accepted
 
 
 router = APIRouter(prefix="/scheduled-reports", tags=["Scheduled Reports"])
 
+# Larger rendered files are linked from the email instead of attached
+REPORT_ATTACH_MAX_BYTES = int(os.environ.get("REPORT_ATTACH_MAX_BYTES", str(5 * 1024 * 1024)))
+
 
 # ============= MODELS =============
 
@@ -81,69 +90,41 @@ class ReportRun(BaseModel):
     
     recipients: List[str] = Field(default_factory=list)
     format: str = "pdf"
+    trigger: str = "manual"  # manual, schedule
     
     file_url: Optional[str] = None
     file_size: Optional[int] = None
+    files: List[Dict[str, Any]] = Field(default_factory=list)  # one per rendered format
     
     error_message: Optional[str] = None
     
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 
+register_index("scheduled_reports", [("id", 1)], unique=True)
+register_index("scheduled_reports", [("status", 1), ("next_run", 1)])
+register_index("report_runs", [("scheduled_report_id", 1), ("started_at", -1)])
+register_index("report_runs", [("status", 1), ("started_at", 1)])
+register_index("report_runs", [("files.name", 1)], sparse=True)
+
+
 # ============= HELPER FUNCTIONS =============
 
-def calculate_next_run(frequency: str, day_of_week: int = None, day_of_month: int = None, time_of_day: str = "09:00") -> str:
-    """Calculate the next run time for a scheduled report"""
-    now = datetime.now(timezone.utc)
-    hour, minute = map(int, time_of_day.split(':'))
-    
-    if frequency == "daily":
-        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        if next_run <= now:
-            next_run += timedelta(days=1)
-    
-    elif frequency == "weekly":
-        target_day = day_of_week if day_of_week is not None else 0  # Monday default
-        days_ahead = target_day - now.weekday()
-        if days_ahead <= 0:
-            days_ahead += 7
-        next_run = now + timedelta(days=days_ahead)
-        next_run = next_run.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        if next_run <= now:
-            next_run += timedelta(weeks=1)
-    
-    elif frequency == "monthly":
-        target_day = day_of_month if day_of_month is not None else 1
-        next_run = now.replace(day=min(target_day, 28), hour=hour, minute=minute, second=0, microsecond=0)
-        if next_run <= now:
-            if now.month == 12:
-                next_run = next_run.replace(year=now.year + 1, month=1)
-            else:
-                next_run = next_run.replace(month=now.month + 1)
-    
-    else:
-        next_run = now + timedelta(days=1)
-    
-    return next_run.isoformat()
+async def count_by(collection, query: dict, *fields) -> List[Dict[str, int]]:
+    """Counts per value of each (field, default) over every matching document, in one $facet"""
+    facets = {
+        field: [{"$group": {"_id": {"$ifNull": [f"${field}", default]}, "count": {"$sum": 1}}}]
+        for field, default in fields
+    }
+    result = await collection.aggregate([{"$match": query}, {"$facet": facets}]).to_list(1)
+    result = result[0] if result else {}
+    return [{str(g["_id"]): g["count"] for g in result.get(field, [])} for field, _ in fields]
 
 
 async def generate_report_data(report_type: str, filters: dict, date_range: str) -> dict:
     """Generate report data based on type"""
     now = datetime.now(timezone.utc)
-    
-    # Calculate date range
-    if date_range == "last_7_days":
-        start_date = (now - timedelta(days=7)).strftime("%Y-%m-%d")
-        end_date = now.strftime("%Y-%m-%d")
-    elif date_range == "last_30_days":
-        start_date = (now - timedelta(days=30)).strftime("%Y-%m-%d")
-        end_date = now.strftime("%Y-%m-%d")
-    elif date_range == "last_quarter":
-        start_date = (now - timedelta(days=90)).strftime("%Y-%m-%d")
-        end_date = now.strftime("%Y-%m-%d")
-    else:  # last_period (default based on frequency)
-        start_date = (now - timedelta(days=7)).strftime("%Y-%m-%d")
-        end_date = now.strftime("%Y-%m-%d")
+    start_date, end_date = report_window(date_range, now)
     
     data = {
         "report_type": report_type,
@@ -177,23 +158,15 @@ async def generate_report_data(report_type: str, filters: dict, date_range: str)
         }
     
     elif report_type == "leave":
-        leaves = await db.leaves.find({
+        # Counts only; the individual requests go in the CSV/PDF attachment
+        by_type, by_status = await count_by(db.leaves, {
             "start_date": {"$gte": start_date}
-        }, {"_id": 0}).to_list(500)
-        
-        by_type = {}
-        by_status = {}
-        for leave in leaves:
-            lt = leave.get("leave_type", "other")
-            ls = leave.get("status", "pending")
-            by_type[lt] = by_type.get(lt, 0) + 1
-            by_status[ls] = by_status.get(ls, 0) + 1
+        }, ("leave_type", "other"), ("status", "pending"))
         
         data["data"] = {
-            "total_requests": len(leaves),
+            "total_requests": sum(by_type.values()),
             "by_type": by_type,
-            "by_status": by_status,
-            "details": leaves[:100]  # Limit for email
+            "by_status": by_status
         }
     
     elif report_type == "attendance":
@@ -227,37 +200,23 @@ async def generate_report_data(report_type: str, filters: dict, date_range: str)
         }
     
     elif report_type == "visitors":
-        visitors = await db.visitors.find({
+        by_status, by_type = await count_by(db.visitors, {
             "expected_date": {"$gte": start_date, "$lte": end_date}
-        }, {"_id": 0}).to_list(500)
-        
-        by_status = {}
-        by_type = {}
-        for v in visitors:
-            vs = v.get("status", "unknown")
-            vt = v.get("visit_type", "other")
-            by_status[vs] = by_status.get(vs, 0) + 1
-            by_type[vt] = by_type.get(vt, 0) + 1
+        }, ("status", "unknown"), ("visit_type", "other"))
         
         data["data"] = {
-            "total_visitors": len(visitors),
+            "total_visitors": sum(by_status.values()),
             "by_status": by_status,
             "by_type": by_type
         }
     
     elif report_type == "employees":
-        employees = await db.employees.find({"status": "active"}, {"_id": 0}).to_list(500)
-        
-        by_dept = {}
-        by_status = {}
-        for emp in employees:
-            dept = emp.get("department_name", "Unassigned")
-            status = emp.get("employment_status", "unknown")
-            by_dept[dept] = by_dept.get(dept, 0) + 1
-            by_status[status] = by_status.get(status, 0) + 1
+        by_dept, by_status = await count_by(
+            db.employees, {"status": "active"}, ("department_name", "Unassigned"), ("employment_status", "unknown")
+        )
         
         data["data"] = {
-            "total_employees": len(employees),
+            "total_employees": sum(by_dept.values()),
             "by_department": by_dept,
             "by_employment_status": by_status
         }
@@ -265,14 +224,15 @@ async def generate_report_data(report_type: str, filters: dict, date_range: str)
     return data
 
 
-async def send_report_email(report: dict, report_data: dict, settings: dict) -> bool:
-    """Send report via email"""
+async def send_report_email(report: dict, report_data: dict, settings: dict, sent_by: Optional[str] = None,
+                            files: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """Queue the report email, with its rendered files attached, for delivery by the mail worker"""
     smtp = settings.get("smtp", {})
     if not smtp.get("enabled") or not smtp.get("host"):
         return False
     
     try:
-        msg = MIMEMultipart('alternative')
+        msg = MIMEMultipart('mixed')
         msg['Subject'] = f"Scheduled Report: {report['name']} - {datetime.now().strftime('%Y-%m-%d')}"
         msg['From'] = f"{smtp.get('from_name', 'HR Platform')} <{smtp.get('from_email', smtp.get('username'))}>"
         msg['To'] = ', '.join(report['recipients'])
@@ -386,6 +346,20 @@ async def send_report_email(report: dict, report_data: dict, settings: dict) ->
                     </div>
             """
         
+        # Files too large to attach are linked instead
+        attachments = [f for f in files or [] if f["size"] <= REPORT_ATTACH_MAX_BYTES]
+        linked = [f for f in files or [] if f["size"] > REPORT_ATTACH_MAX_BYTES]
+        if linked:
+            html_content += f"""
+                    <div class="section">
+                        <h3>📎 Report Files</h3>
+                        <p>These files are too large to attach. Sign in to download them:</p>
+                        <ul>
+                            {''.join(f"<li>{f['filename']}: /api/scheduled-reports/files/{f['name']}</li>" for f in linked)}
+                        </ul>
+                    </div>
+            """
+        
         html_content += """
                 </div>
                 <div class="footer">
@@ -398,28 +372,25 @@ async def send_report_email(report: dict, report_data: dict, settings: dict) ->
         """
         
         msg.attach(MIMEText(html_content, 'html'))
-        
-        # Connect and send
-        host = smtp.get('host')
-        port = smtp.get('port', 587)
-        encryption = smtp.get('encryption', 'tls')
-        
-        if encryption == 'ssl':
-            server = smtplib.SMTP_SSL(host, port, timeout=30)
-        else:
-            server = smtplib.SMTP(host, port, timeout=30)
-            if encryption == 'tls':
-                server.starttls()
-        
-        server.login(smtp.get('username'), smtp.get('password'))
+        for f in attachments:
+            part = MIMEBase(*f["media_type"].split("/"))
+            with open(f["path"], "rb") as fh:
+                part.set_payload(fh.read())
+            encoders.encode_base64(part)
+            part.add_header('Content-Disposition', 'attachment', filename=f["filename"])
+            msg.attach(part)
         
         all_recipients = report['recipients'] + report.get('cc_recipients', [])
-        server.sendmail(smtp.get('from_email', smtp.get('username')), all_recipients, msg.as_string())
-        server.quit()
+        await mailer.enqueue(db, msg, all_recipients, {
+            "type": "scheduled_report",
+            "subject": f"Scheduled Report: {report['name']}",
+            "sent_by": sent_by,
+            "report_id": report.get("id")
+        })
         
         return True
     except Exception as e:
-        print(f"Failed to send report email: {e}")
+        print(f"Failed to queue report email: {e}")
         return False
 
 
@@ -445,13 +416,11 @@ async def create_scheduled_report(data: Dict[str, Any], current_user: User = Dep
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         raise HTTPException(status_code=403, detail="Only admins can create scheduled reports")
     
-    # Calculate next run
-    next_run = calculate_next_run(
-        data.get("frequency", "weekly"),
-        data.get("day_of_week"),
-        data.get("day_of_month"),
-        data.get("time_of_day", "09:00")
-    )
+    # Calculate next run in the report's timezone
+    try:
+        next_run = next_run_for(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     report = ScheduledReport(
         **data,
@@ -498,15 +467,13 @@ async def update_scheduled_report(report_id: str, data: Dict[str, Any], current_
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     # Recalculate next run if schedule changed
-    if any(k in data for k in ["frequency", "day_of_week", "day_of_month", "time_of_day"]):
+    if any(k in data for k in ["frequency", "day_of_week", "day_of_month", "time_of_day", "timezone"]):
         report = await db.scheduled_reports.find_one({"id": report_id}, {"_id": 0})
         if report:
-            data["next_run"] = calculate_next_run(
-                data.get("frequency", report.get("frequency", "weekly")),
-                data.get("day_of_week", report.get("day_of_week")),
-                data.get("day_of_month", report.get("day_of_month")),
-                data.get("time_of_day", report.get("time_of_day", "09:00"))
-            )
+            try:
+                data["next_run"] = next_run_for({**report, **data})
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
     
     await db.scheduled_reports.update_one({"id": report_id}, {"$set": data})
     return await db.scheduled_reports.find_one({"id": report_id}, {"_id": 0})
@@ -529,9 +496,10 @@ async def delete_scheduled_report(report_id: str, current_user: User = Depends(g
 async def run_report_now(
     report_id: str, 
     background_tasks: BackgroundTasks,
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    """Run a scheduled report immediately"""
+    """Run a scheduled report immediately; background=true queues a job and returns 202"""
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         raise HTTPException(status_code=403, detail="Only admins can run reports")
     
@@ -550,6 +518,15 @@ async def run_report_now(
     )
     await db.report_runs.insert_one(run.model_dump())
     
+    if background:
+        job = await enqueue_job(db, "scheduled_reports.run", {"report_id": report_id, "run_id": run.id}, current_user.id)
+        return job_accepted(job)
+    return await execute_report_run(report, run.id, current_user.id)
+
+
+async def execute_report_run(report: Dict[str, Any], run_id: str, sent_by: Optional[str]):
+    """Generate and send a report for an existing run record"""
+    report_id = report["id"]
     # Generate and send report
     try:
         # Generate report data
@@ -559,18 +536,22 @@ async def run_report_now(
             report.get("date_range", "last_period")
         )
         
+        # Render (or reuse) the attachments
+        files = await render_report(db, report, report_data, formats_for(report.get("format", "pdf")))
+        
         # Get settings for SMTP
-        settings = await db.settings.find_one({"id": "global_settings"}, {"_id": 0})
-        if not settings:
-            settings = {}
+        settings = await get_config(db, "settings") or {}
         
-        # Send email
-        success = await send_report_email(report, report_data, settings)
+        # Queue email
+        success = await send_report_email(report, report_data, settings, sent_by, files)
         
         # Update run status
         await db.report_runs.update_one(
-            {"id": run.id},
+            {"id": run_id},
             {"$set": {
+                "file_url": f"/api/scheduled-reports/files/{files[0]['name']}",
+                "file_size": sum(f["size"] for f in files),
+                "files": [{k: f[k] for k in ("format", "name", "filename", "size")} for f in files],
                 "status": "completed" if success else "failed",
                 "completed_at": datetime.now(timezone.utc).isoformat(),
                 "error_message": None if success else "Failed to send email - check SMTP settings"
@@ -580,40 +561,25 @@ async def run_report_now(
         # Update report stats
         await db.scheduled_reports.update_one(
             {"id": report_id},
-            {"$set": {
-                "last_run": datetime.now(timezone.utc).isoformat(),
-                "last_run_status": "success" if success else "failed",
-                "run_count": report.get("run_count", 0) + 1,
-                "next_run": calculate_next_run(
-                    report.get("frequency", "weekly"),
-                    report.get("day_of_week"),
-                    report.get("day_of_month"),
-                    report.get("time_of_day", "09:00")
-                )
-            }}
+            {
+                "$set": {
+                    "last_run": datetime.now(timezone.utc).isoformat(),
+                    "last_run_status": "success" if success else "failed",
+                    "next_run": next_run_for(report)
+                },
+                "$inc": {"run_count": 1}
+            }
         )
         
-        # Log email
-        if success:
-            await db.email_logs.insert_one({
-                "id": str(uuid.uuid4()),
-                "type": "scheduled_report",
-                "recipient": ", ".join(report["recipients"]),
-                "subject": f"Scheduled Report: {report['name']}",
-                "status": "sent",
-                "sent_at": datetime.now(timezone.utc).isoformat(),
-                "sent_by": current_user.id
-            })
-        
         return {
             "success": success,
-            "run_id": run.id,
-            "message": "Report generated and sent successfully" if success else "Report generated but email failed - check SMTP settings"
+            "run_id": run_id,
+            "message": "Report generated and queued for delivery" if success else "Report generated but email failed - check SMTP settings"
         }
     
     except Exception as e:
         await db.report_runs.update_one(
-            {"id": run.id},
+            {"id": run_id},
             {"$set": {
                 "status": "failed",
                 "completed_at": datetime.now(timezone.utc).isoformat(),
@@ -623,6 +589,30 @@ async def run_report_now(
         raise HTTPException(status_code=500, detail=f"Failed to run report: {str(e)}")
 
 
+# Sending is not idempotent, so a run whose worker died is failed rather than resent
+@job_handler("scheduled_reports.run", max_attempts=1)
+async def run_scheduled_report_job(ctx, payload: Dict[str, Any]):
+    report = await db.scheduled_reports.find_one({"id": payload["report_id"]}, {"_id": 0})
+    if not report:
+        raise HTTPException(status_code=404, detail="Scheduled report not found")
+    return await execute_report_run(report, payload["run_id"], ctx.created_by)
+
+
+async def run_due_report(report: Dict[str, Any]):
+    """Run a report claimed by the scheduler (services.report_scheduler)"""
+    run = ReportRun(
+        scheduled_report_id=report["id"],
+        report_name=report["name"],
+        report_type=report["report_type"],
+        recipients=report["recipients"],
+        format=report["format"],
+        status="generating",
+        trigger="schedule"
+    )
+    await db.report_runs.insert_one(run.model_dump())
+    return await execute_report_run(report, run.id, report.get("created_by"))
+
+
 @router.post("/{report_id}/pause")
 async def pause_report(report_id: str, current_user: User = Depends(get_current_user)):
     """Pause a scheduled report"""
@@ -644,12 +634,10 @@ async def resume_report(report_id: str, current_user: User = Depends(get_current
     
     report = await db.scheduled_reports.find_one({"id": report_id}, {"_id": 0})
     if report:
-        next_run = calculate_next_run(
-            report.get("frequency", "weekly"),
-            report.get("day_of_week"),
-            report.get("day_of_month"),
-            report.get("time_of_day", "09:00")
-        )
+        try:
+            next_run = next_run_for(report)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         await db.scheduled_reports.update_one(
             {"id": report_id},
@@ -677,6 +665,41 @@ async def get_report_runs(
     return runs
 
 
+@router.get("/{report_id}/download")
+async def download_report(report_id: str, format: str = "csv", current_user: User = Depends(get_current_user)):
+    """Download the report's current CSV or PDF, reusing the cached file when the data hasn't changed"""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
+        raise HTTPException(status_code=403, detail="Only admins can download reports")
+    if format not in ("csv", "pdf"):
+        raise HTTPException(status_code=400, detail="Format must be csv or pdf")
+    
+    report = await db.scheduled_reports.find_one({"id": report_id}, {"_id": 0})
+    if not report:
+        raise HTTPException(status_code=404, detail="Scheduled report not found")
+    
+    report_data = await generate_report_data(
+        report["report_type"],
+        report.get("filters", {}),
+        report.get("date_range", "last_period")
+    )
+    [file] = await render_report(db, report, report_data, [format])
+    return FileResponse(file["path"], media_type=file["media_type"], filename=file["filename"])
+
+
+@router.get("/files/{name}")
+async def get_report_file(name: str, current_user: User = Depends(get_current_user)):
+    """Download a file rendered for a report run"""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
+        raise HTTPException(status_code=403, detail="Only admins can download reports")
+    
+    path = artifact_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Report file not found or expired")
+    run = await db.report_runs.find_one({"files.name": name}, {"_id": 0, "files": 1})
+    file = next((f for f in (run or {}).get("files", []) if f["name"] == name), {})
+    return FileResponse(path, media_type=FORMATS[path.suffix[1:]], filename=file.get("filename", name))
+
+
 @router.post("/preview")
 async def preview_report(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Preview report data without sending"""
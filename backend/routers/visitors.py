@@ -7,8 +7,8 @@ import uuid
 
 import sys
 sys.path.insert(0, '/app/backend')
-from database import db
-from auth import get_current_user
+from database import db, register_index
+from auth import get_current_user, get_employee_for_user
 from models.core import User, UserRole
 
 
@@ -109,12 +109,17 @@ class VisitorBadge(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 
+register_index("visitors", [("id", 1)], unique=True)
+register_index("visitors", [("expected_date", 1), ("status", 1)])
+register_index("visitor_badges", [("visitor_id", 1)])
+
+
 # ============= ROUTES =============
 
 @router.post("")
 async def create_visitor(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Pre-register a visitor"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     
     data["registered_by"] = current_user.id
     data["registered_by_name"] = emp.get("full_name") if emp else current_user.email
@@ -155,7 +160,7 @@ async def get_visitors(
         query["visit_type"] = visit_type
     
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN, UserRole.BRANCH_MANAGER]:
-        emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        emp = await get_employee_for_user(current_user.id)
         if emp:
             query["$or"] = [
                 {"host_employee_id": emp["id"]},
@@ -177,7 +182,7 @@ async def get_todays_visitors(current_user: User = Depends(get_current_user)):
     query = {"expected_date": today}
     
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN, UserRole.BRANCH_MANAGER]:
-        emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        emp = await get_employee_for_user(current_user.id)
         if emp:
             query["$or"] = [
                 {"host_employee_id": emp["id"]},
@@ -194,7 +199,7 @@ async def get_my_visitors(
     current_user: User = Depends(get_current_user)
 ):
     """Get visitors registered by or hosted by current user"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     
     query = {"$or": [{"registered_by": current_user.id}]}
     if emp:
@@ -260,7 +265,7 @@ async def get_visitors_dashboard(current_user: User = Depends(get_current_user))
 @router.get("/my-dashboard")
 async def get_my_visitors_dashboard(current_user: User = Depends(get_current_user)):
     """Get employee's visitor dashboard"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     
     query_base = {"$or": [{"registered_by": current_user.id}]}
@@ -319,7 +324,7 @@ async def get_visitor_history(
 @router.post("/walk-in")
 async def register_walkin_visitor(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Quick registration for walk-in visitors"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     
     data["expected_date"] = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     data["expected_time"] = datetime.now(timezone.utc).strftime("%H:%M")
@@ -7,8 +7,8 @@ import uuid
 
 import sys
 sys.path.insert(0, '/app/backend')
-from database import db
-from auth import get_current_user
+from database import db, register_index
+from auth import get_current_user, get_employee_for_user
 from models.core import User, UserRole
 
 
@@ -103,6 +103,13 @@ class EmployeeAvailability(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 
+register_index("headcount_plans", [("id", 1)], unique=True)
+register_index("resource_allocations", [("id", 1)], unique=True)
+register_index("resource_allocations", [("employee_id", 1), ("status", 1)])
+register_index("workforce_scenarios", [("id", 1)], unique=True)
+register_index("employee_availability", [("employee_id", 1)])
+
+
 # ============= ROUTES =============
 
 @router.get("/dashboard")
@@ -144,7 +151,7 @@ async def get_workforce_dashboard(current_user: User = Depends(get_current_user)
 @router.get("/employee-dashboard")
 async def get_employee_workforce_dashboard(current_user: User = Depends(get_current_user)):
     """Get employee's workforce view"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         return {"allocations": [], "availability": [], "preferences": {}}
     
@@ -279,7 +286,7 @@ async def get_allocations(
         query["status"] = status
     
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN, UserRole.BRANCH_MANAGER]:
-        emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        emp = await get_employee_for_user(current_user.id)
         if emp:
             query["employee_id"] = emp["id"]
     
@@ -368,7 +375,7 @@ async def delete_scenario(scenario_id: str, current_user: User = Depends(get_cur
 @router.get("/my-availability")
 async def get_my_availability(current_user: User = Depends(get_current_user)):
     """Get my availability"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         return []
     
@@ -382,7 +389,7 @@ async def get_my_availability(current_user: User = Depends(get_current_user)):
 @router.put("/my-availability")
 async def update_my_availability(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Update my availability"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -411,7 +418,7 @@ async def update_my_availability(data: Dict[str, Any], current_user: User = Depe
 @router.put("/my-preferences")
 async def update_my_preferences(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Update my work preferences"""
-    emp = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    emp = await get_employee_for_user(current_user.id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     
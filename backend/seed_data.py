@@ -61,6 +61,11 @@ def seed_settings():
     print("✓ Created global settings")
     return settings
 
+def mark_changed(*collections):
+    """Bump the change counters running API workers check before serving cached data"""
+    for name in collections:
+        db.config_versions.update_one({"id": name}, {"$inc": {"version": 1}}, upsert=True)
+
 def seed_roles():
     """Create default roles"""
     roles = [
@@ -500,6 +505,7 @@ def main():
     org_data = seed_organization()
     users, employees = seed_users_and_employees(org_data)
     seed_leave_balances(employees)
+    mark_changed("settings", "roles", "corporations", "branches", "departments", "divisions")
     
     # Verify data integrity
     is_valid = verify_data_integrity()
@@ -1,12 +1,17 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
+import asyncio
 import shutil
+import csv
+import smtplib
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import List, Optional, Dict, Any
@@ -14,9 +19,33 @@ from enum import Enum
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
-import bcrypt
 import json
-from pywebpush import webpush, WebPushException
+from database import register_index, ensure_indexes
+from services.pagination import list_or_page, ndjson_response
+from services import snapshots
+from services import payroll as payroll_engine
+from services import employee_import
+from services import push as push_engine
+from services import mailer
+from services import notifications as notification_store
+from services import realtime
+from services.collab_search import backfill_search_terms
+from services.config_cache import config_changed, config_response, get_config
+from services.http_cache import ResponseCache
+from services.read_tracking import announcement_reads, memo_acks, backfill_read_tracking
+from services.user_directory import invalidate_user_profile, user_cache_stats
+from services import team_calendar
+from services.team_calendar import invalidate_calendar
+from services.analytics import aggregate_survey_results
+from services.executors import run_cpu_bound, executor_stats, shutdown_executors
+from services.jobs import job_handler, ProgressCallback, WorkerPool, enqueue as enqueue_job, accepted_response as job_accepted
+from services.report_scheduler import ReportScheduler
+from services.org_graph import get_org_graph, invalidate_org_graph, touches_org_fields
+from auth import (
+    resolve_principal, invalidate_principal, invalidate_role_principals,
+    get_employee_for_user, decode_token_user_id, principal_cache,
+    hash_password_async, verify_password_async
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -40,10 +69,17 @@ VAPID_PUBLIC_KEY = os.environ.get('VAPID_PUBLIC_KEY', '')
 VAPID_PRIVATE_KEY = os.environ.get('VAPID_PRIVATE_KEY', '')
 VAPID_SUBJECT = os.environ.get('VAPID_SUBJECT', 'mailto:admin@hrplatform.com')
 
+# Idle notification streams get a comment line this often so proxies keep them open
+NOTIFICATION_STREAM_PING_SECONDS = float(os.environ.get('NOTIFICATION_STREAM_PING_SECONDS', '25'))
+
 # Create the main app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
+# Conditional GETs for reference data; writers call response_cache.changed(collection)
+response_cache = ResponseCache(db)
+# Static lists (permissions, complaint categories) only change on deploy
+STATIC_REFERENCE_CACHE_CONTROL = "private, max-age=300"
 
 # ============= MONGODB HELPER FUNCTIONS =============
 
@@ -255,6 +291,28 @@ class LeaveBalance(BaseModel):
     carry_over: float = 0.0
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for core models
+register_index("users", [("id", 1)], unique=True)
+register_index("users", [("email", 1)])
+register_index("users", [("role", 1)])
+register_index("corporations", [("id", 1)], unique=True)
+register_index("branches", [("id", 1)], unique=True)
+register_index("branches", [("corporation_id", 1)])
+register_index("departments", [("id", 1)], unique=True)
+register_index("departments", [("branch_id", 1)])
+register_index("divisions", [("id", 1)], unique=True)
+register_index("divisions", [("department_id", 1)])
+register_index("employees", [("id", 1)], unique=True)
+register_index("employees", [("user_id", 1)])
+register_index("employees", [("work_email", 1)])
+register_index("employees", [("personal_email", 1)])
+register_index("employees", [("status", 1), ("department_id", 1)])
+register_index("employees", [("reporting_manager_id", 1)])
+register_index("leaves", [("id", 1)], unique=True)
+register_index("leaves", [("employee_id", 1), ("start_date", -1)])
+register_index("leaves", [("status", 1), ("start_date", 1), ("end_date", 1)])
+register_index("leave_balances", [("employee_id", 1), ("year", 1)])
+
 # ============= WORKFLOW MODELS =============
 
 class WorkflowStep(BaseModel):
@@ -859,6 +917,37 @@ class Settings(BaseModel):
     sms: Optional[SmsSettings] = Field(default_factory=SmsSettings)
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for workflow, training, document, attendance and lifecycle models
+register_index("workflows", [("id", 1)], unique=True)
+register_index("workflows", [("module", 1)])
+register_index("workflow_instances", [("id", 1)], unique=True)
+register_index("expenses", [("id", 1)], unique=True)
+register_index("expenses", [("employee_id", 1), ("created_at", -1)])
+register_index("expenses", [("status", 1)])
+register_index("training_requests", [("id", 1)], unique=True)
+register_index("training_requests", [("employee_id", 1)])
+register_index("training_courses", [("id", 1)], unique=True)
+register_index("training_assignments", [("id", 1)], unique=True)
+register_index("training_assignments", [("employee_id", 1)])
+register_index("document_approvals", [("id", 1)], unique=True)
+register_index("document_approvals", [("employee_id", 1)])
+register_index("attendance", [("id", 1)], unique=True)
+register_index("attendance", [("employee_id", 1), ("date", -1)])
+register_index("time_corrections", [("id", 1)], unique=True)
+register_index("schedules", [("id", 1)], unique=True)
+register_index("jobs", [("id", 1)], unique=True)
+register_index("applications", [("id", 1)], unique=True)
+register_index("applications", [("job_id", 1)])
+register_index("interviews", [("id", 1)], unique=True)
+register_index("onboardings", [("id", 1)], unique=True)
+register_index("onboardings", [("employee_id", 1)])
+register_index("offboardings", [("id", 1)], unique=True)
+register_index("offboardings", [("employee_id", 1)])
+register_index("offboardings", [("status", 1), ("last_working_date", 1)])
+register_index("reviews", [("id", 1)], unique=True)
+register_index("reviews", [("employee_id", 1)])
+register_index("settings", [("id", 1)], unique=True)
+
 # ============= PUSH NOTIFICATION MODELS =============
 
 class PushSubscriptionKeys(BaseModel):
@@ -919,6 +1008,12 @@ class Permission(BaseModel):
     category: str
     description: str
 
+# Indexes for push subscriptions and roles
+register_index("push_subscriptions", [("user_id", 1), ("is_active", 1)])
+register_index("push_subscriptions", [("endpoint", 1)])
+register_index("roles", [("id", 1)], unique=True)
+register_index("roles", [("name", 1)])
+
 # ============= APPRAISAL MODELS =============
 
 class AppraisalCycle(BaseModel):
@@ -979,6 +1074,12 @@ class Appraisal(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for appraisal models
+register_index("appraisal_cycles", [("id", 1)], unique=True)
+register_index("appraisals", [("id", 1)], unique=True)
+register_index("appraisals", [("employee_id", 1)])
+register_index("appraisals", [("cycle_id", 1), ("status", 1)])
+
 # ============= PAYROLL MODELS =============
 
 class SalaryStructure(BaseModel):
@@ -1100,32 +1201,31 @@ class PayrollRun(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for payroll models
+register_index("salary_structures", [("id", 1)], unique=True)
+register_index("salary_structures", [("employee_id", 1), ("status", 1)])
+register_index("salary_structures", [("status", 1), ("created_at", -1)])
+register_index("payslips", [("id", 1)], unique=True)
+register_index("payslips", [("employee_id", 1), ("pay_period", 1)], unique=True)
+register_index("payslips", [("pay_period", 1), ("status", 1)])
+register_index("payroll_runs", [("id", 1)], unique=True)
+
 # ============= AUTHENTICATION =============
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get('user_id')
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
-        if not user:
+        # User, employee link and role permissions are resolved once per user
+        # and served from the principal cache (see auth.py).
+        principal = await resolve_principal(decode_token_user_id(credentials.credentials))
+        if not principal:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return User(**user)
+        return User(**principal.user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-
 # ============= AUTH ROUTES =============
 
 @api_router.post("/auth/register", response_model=AuthResponse)
@@ -1141,7 +1241,7 @@ async def register(data: RegisterRequest):
     )
     
     user_doc = user.model_dump()
-    user_doc['password_hash'] = hash_password(data.password)
+    user_doc['password_hash'] = await hash_password_async(data.password)
     
     await db.users.insert_one(user_doc)
     
@@ -1160,7 +1260,7 @@ async def login(data: LoginRequest):
     if not user_doc:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(data.password, user_doc['password_hash']):
+    if not await verify_password_async(data.password, user_doc['password_hash']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user = User(**{k: v for k, v in user_doc.items() if k != 'password_hash' and k != '_id'})
@@ -1195,38 +1295,39 @@ async def change_password(data: Dict[str, Any], current_user: User = Depends(get
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify current password
-    if not bcrypt.checkpw(current_password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+    if not await verify_password_async(current_password, user['password_hash']):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Hash new password
-    new_password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    new_password_hash = await hash_password_async(new_password)
     
     # Update password
     await db.users.update_one({"id": current_user.id}, {"$set": {"password_hash": new_password_hash}})
+    invalidate_principal(current_user.id)
     
     return {"message": "Password changed successfully"}
 
 # ============= USERS ROUTES =============
 
 @api_router.get("/users")
-async def get_users(current_user: User = Depends(get_current_user)):
+async def get_users(limit: Optional[int] = None, cursor: Optional[str] = None, stream: bool = False, current_user: User = Depends(get_current_user)):
     """Get all users (admin only)"""
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         raise HTTPException(status_code=403, detail="Only admins can view all users")
     
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
-    return users
+    return await list_or_page(
+        db.users, {}, {"_id": 0, "password_hash": 0}, limit=limit, cursor=cursor, stream=stream
+    )
 
 # ============= SETTINGS ROUTES =============
 
+def settings_payload(settings: Optional[Dict[str, Any]]) -> Settings:
+    # Unsaved settings are served as defaults; the first update stores them
+    return Settings(**(settings or {}))
+
 @api_router.get("/settings", response_model=Settings)
-async def get_settings():
-    settings = await db.settings.find_one({"id": "global_settings"}, {"_id": 0})
-    if not settings:
-        default_settings = Settings()
-        await db.settings.insert_one(default_settings.model_dump())
-        return default_settings
-    return Settings(**settings)
+async def get_settings(request: Request):
+    return await config_response(db, request, "settings", settings_payload)
 
 @api_router.put("/settings", response_model=Settings)
 async def update_settings(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -1239,51 +1340,35 @@ async def update_settings(data: Dict[str, Any], current_user: User = Depends(get
         {"$set": data},
         upsert=True
     )
+    await config_changed(db, "settings")
     
-    settings = await db.settings.find_one({"id": "global_settings"}, {"_id": 0})
-    return Settings(**settings)
+    return settings_payload(await get_config(db, "settings"))
 
 @api_router.post("/settings/test-smtp")
 async def test_smtp_connection(smtp_config: Dict[str, Any], current_user: User = Depends(get_current_user)):
-    """Test SMTP connection with provided configuration"""
+    """Test SMTP connection with provided configuration; the test email itself is queued"""
     if current_user.role != UserRole.SUPER_ADMIN:
         raise HTTPException(status_code=403, detail="Only super admin can test SMTP")
     
-    import smtplib
     from email.mime.text import MIMEText
     
     try:
-        host = smtp_config.get('host', '')
-        port = smtp_config.get('port', 587)
-        username = smtp_config.get('username', '')
-        password = smtp_config.get('password', '')
-        encryption = smtp_config.get('encryption', 'tls')
-        from_email = smtp_config.get('from_email', username)
-        
-        if not host or not username or not password:
+        config = mailer.smtp_config(smtp_config)
+        if not config["host"] or not config["username"] or not config["password"]:
             return {"success": False, "message": "Missing required SMTP configuration"}
         
-        # Create SMTP connection based on encryption type
-        if encryption == 'ssl':
-            server = smtplib.SMTP_SSL(host, port, timeout=10)
-        else:
-            server = smtplib.SMTP(host, port, timeout=10)
-            if encryption == 'tls':
-                server.starttls()
-        
-        # Login
-        server.login(username, password)
+        # Connect and log in off the event loop
+        server = await asyncio.to_thread(mailer.open_connection, config, 10)
+        await asyncio.to_thread(server.quit)
         
         # Send test email to self
         msg = MIMEText("This is a test email from HR Platform to verify SMTP configuration.")
         msg['Subject'] = 'HR Platform - SMTP Test'
-        msg['From'] = from_email
-        msg['To'] = username
-        
-        server.sendmail(from_email, [username], msg.as_string())
-        server.quit()
+        msg['From'] = config["from_email"]
+        msg['To'] = config["username"]
+        await mailer.enqueue(db, msg, [config["username"]], {"type": "test", "sent_by": current_user.id}, config=config)
         
-        return {"success": True, "message": "SMTP connection successful! Test email sent."}
+        return {"success": True, "message": "SMTP connection successful! Test email queued."}
     except smtplib.SMTPAuthenticationError:
         return {"success": False, "message": "Authentication failed. Check username and password."}
     except smtplib.SMTPConnectError:
@@ -1294,11 +1379,10 @@ async def test_smtp_connection(smtp_config: Dict[str, Any], current_user: User =
 
 @api_router.post("/settings/send-test-email")
 async def send_test_email(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
-    """Send a test email to a custom address"""
+    """Queue a test email to a custom address"""
     if current_user.role != UserRole.SUPER_ADMIN:
         raise HTTPException(status_code=403, detail="Only super admin can send test emails")
     
-    import smtplib
     from email.mime.text import MIMEText
     from email.mime.multipart import MIMEMultipart
     
@@ -1371,37 +1455,13 @@ async def send_test_email(data: Dict[str, Any], current_user: User = Depends(get
         msg.attach(MIMEText(text_content, 'plain'))
         msg.attach(MIMEText(html_content, 'html'))
         
-        # Connect and send
-        if encryption == 'ssl':
-            server = smtplib.SMTP_SSL(host, port, timeout=15)
-        else:
-            server = smtplib.SMTP(host, port, timeout=15)
-            if encryption == 'tls':
-                server.starttls()
-        
-        server.login(username, password)
-        server.sendmail(from_email, [recipient], msg.as_string())
-        server.quit()
-        
-        # Log the email
-        email_log = {
-            "id": str(uuid.uuid4()),
-            "type": "test",
-            "recipient": recipient,
-            "subject": subject,
-            "status": "sent",
-            "sent_at": datetime.now(timezone.utc).isoformat(),
-            "sent_by": current_user.id
-        }
-        await db.email_logs.insert_one(email_log)
+        email_ids = await mailer.enqueue(
+            db, msg, [recipient], {"type": "test", "sent_by": current_user.id}, config=smtp_config
+        )
         
-        return {"success": True, "message": f"Test email sent successfully to {recipient}"}
-    except smtplib.SMTPAuthenticationError:
-        return {"success": False, "message": "Authentication failed. Check username and password."}
-    except smtplib.SMTPConnectError:
-        return {"success": False, "message": "Could not connect to SMTP server. Check host and port."}
+        return {"success": True, "message": f"Test email queued for delivery to {recipient}", "email_ids": email_ids}
     except Exception as e:
-        return {"success": False, "message": f"Failed to send email: {str(e)}"}
+        return {"success": False, "message": f"Failed to queue email: {str(e)}"}
 
 
 @api_router.get("/settings/email-logs")
@@ -1528,45 +1588,46 @@ async def test_sms_connection(sms_config: Dict[str, Any], current_user: User = D
 
 # ============= MOBILE APP SETTINGS =============
 
+DEFAULT_MOBILE_SETTINGS = {
+    "id": "mobile_config",
+    "appName": "HR Portal",
+    "appDescription": "Your complete HR management solution",
+    "primaryColor": "#2D4F38",
+    "secondaryColor": "#4F7942",
+    "accentColor": "#FFB800",
+    "logoUrl": "",
+    "splashColor": "#2D4F38",
+    "enabledModules": {
+        "dashboard": True,
+        "employees": True,
+        "leaves": True,
+        "attendance": True,
+        "payroll": True,
+        "expenses": True,
+        "tickets": True,
+        "notifications": True,
+        "training": True,
+        "benefits": True,
+        "documents": True,
+        "profile": True
+    },
+    "pushNotifications": {
+        "enabled": True,
+        "leaveApprovals": True,
+        "expenseApprovals": True,
+        "announcements": True,
+        "ticketUpdates": True,
+        "payrollAlerts": True
+    }
+}
+
+def mobile_settings_payload(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return settings or DEFAULT_MOBILE_SETTINGS
+
 @api_router.get("/settings/mobile")
-async def get_mobile_settings():
+async def get_mobile_settings(request: Request):
     """Get mobile app configuration"""
-    settings = await db.mobile_settings.find_one({"id": "mobile_config"}, {"_id": 0})
-    if not settings:
-        # Return default settings
-        return {
-            "id": "mobile_config",
-            "appName": "HR Portal",
-            "appDescription": "Your complete HR management solution",
-            "primaryColor": "#2D4F38",
-            "secondaryColor": "#4F7942",
-            "accentColor": "#FFB800",
-            "logoUrl": "",
-            "splashColor": "#2D4F38",
-            "enabledModules": {
-                "dashboard": True,
-                "employees": True,
-                "leaves": True,
-                "attendance": True,
-                "payroll": True,
-                "expenses": True,
-                "tickets": True,
-                "notifications": True,
-                "training": True,
-                "benefits": True,
-                "documents": True,
-                "profile": True
-            },
-            "pushNotifications": {
-                "enabled": True,
-                "leaveApprovals": True,
-                "expenseApprovals": True,
-                "announcements": True,
-                "ticketUpdates": True,
-                "payrollAlerts": True
-            }
-        }
-    return settings
+    return await config_response(db, request, "mobile_settings", mobile_settings_payload)
 
 @api_router.put("/settings/mobile")
 async def update_mobile_settings(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -1582,6 +1643,7 @@ async def update_mobile_settings(data: Dict[str, Any], current_user: User = Depe
         {"$set": data},
         upsert=True
     )
+    await config_changed(db, "mobile_settings")
     
     return {"message": "Mobile settings updated successfully"}
 
@@ -1591,9 +1653,13 @@ async def update_mobile_settings(data: Dict[str, Any], current_user: User = Depe
 async def create_corporation(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     corp = Corporation(**data, created_by=current_user.id)
     await db.corporations.insert_one(corp.model_dump())
+    await snapshots.record_change(db, "corporations", after=corp.model_dump())
+    invalidate_org_graph()
+    await response_cache.changed("corporations")
     return corp
 
 @api_router.get("/corporations", response_model=List[Corporation])
+@response_cache.cached("corporations")
 async def get_corporations(current_user: User = Depends(get_current_user)):
     corps = await db.corporations.find({}, {"_id": 0}).to_list(1000)
     return [Corporation(**c) for c in corps]
@@ -1611,13 +1677,18 @@ async def update_corporation(corp_id: str, data: Dict[str, Any], current_user: U
     corp = await db.corporations.find_one({"id": corp_id}, {"_id": 0})
     if not corp:
         raise HTTPException(status_code=404, detail="Corporation not found")
+    invalidate_org_graph()
+    await response_cache.changed("corporations")
     return Corporation(**corp)
 
 @api_router.delete("/corporations/{corp_id}")
 async def delete_corporation(corp_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.corporations.delete_one({"id": corp_id})
-    if result.deleted_count == 0:
+    deleted = await db.corporations.find_one_and_delete({"id": corp_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Corporation not found")
+    await snapshots.record_change(db, "corporations", before=deleted)
+    invalidate_org_graph()
+    await response_cache.changed("corporations")
     return {"message": "Corporation deleted"}
 
 # ============= BRANCH ROUTES =============
@@ -1626,9 +1697,13 @@ async def delete_corporation(corp_id: str, current_user: User = Depends(get_curr
 async def create_branch(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     branch = Branch(**data)
     await db.branches.insert_one(branch.model_dump())
+    await snapshots.record_change(db, "branches", after=branch.model_dump())
+    invalidate_org_graph()
+    await response_cache.changed("branches")
     return branch
 
 @api_router.get("/branches", response_model=List[Branch])
+@response_cache.cached("branches")
 async def get_branches(corporation_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
     query = {"corporation_id": corporation_id} if corporation_id else {}
     branches = await db.branches.find(query, {"_id": 0}).to_list(1000)
@@ -1647,13 +1722,18 @@ async def update_branch(branch_id: str, data: Dict[str, Any], current_user: User
     branch = await db.branches.find_one({"id": branch_id}, {"_id": 0})
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
+    invalidate_org_graph()
+    await response_cache.changed("branches")
     return Branch(**branch)
 
 @api_router.delete("/branches/{branch_id}")
 async def delete_branch(branch_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.branches.delete_one({"id": branch_id})
-    if result.deleted_count == 0:
+    deleted = await db.branches.find_one_and_delete({"id": branch_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Branch not found")
+    await snapshots.record_change(db, "branches", before=deleted)
+    invalidate_org_graph()
+    await response_cache.changed("branches")
     return {"message": "Branch deleted"}
 
 # ============= DEPARTMENT ROUTES =============
@@ -1662,9 +1742,13 @@ async def delete_branch(branch_id: str, current_user: User = Depends(get_current
 async def create_department(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     dept = Department(**data)
     await db.departments.insert_one(dept.model_dump())
+    await snapshots.record_change(db, "departments", after=dept.model_dump())
+    invalidate_org_graph()
+    await response_cache.changed("departments")
     return dept
 
 @api_router.get("/departments", response_model=List[Department])
+@response_cache.cached("departments")
 async def get_departments(branch_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
     query = {"branch_id": branch_id} if branch_id else {}
     depts = await db.departments.find(query, {"_id": 0}).to_list(1000)
@@ -1676,13 +1760,19 @@ async def update_department(dept_id: str, data: Dict[str, Any], current_user: Us
     dept = await db.departments.find_one({"id": dept_id}, {"_id": 0})
     if not dept:
         raise HTTPException(status_code=404, detail="Department not found")
+    await snapshots.touch(db, "departments")
+    invalidate_org_graph()
+    await response_cache.changed("departments")
     return Department(**dept)
 
 @api_router.delete("/departments/{dept_id}")
 async def delete_department(dept_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.departments.delete_one({"id": dept_id})
-    if result.deleted_count == 0:
+    deleted = await db.departments.find_one_and_delete({"id": dept_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Department not found")
+    await snapshots.record_change(db, "departments", before=deleted)
+    invalidate_org_graph()
+    await response_cache.changed("departments")
     return {"message": "Department deleted"}
 
 # ============= DIVISION ROUTES =============
@@ -1691,9 +1781,13 @@ async def delete_department(dept_id: str, current_user: User = Depends(get_curre
 async def create_division(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     division = Division(**data)
     await db.divisions.insert_one(division.model_dump())
+    await snapshots.record_change(db, "divisions", after=division.model_dump())
+    invalidate_org_graph()
+    await response_cache.changed("divisions")
     return division
 
 @api_router.get("/divisions", response_model=List[Division])
+@response_cache.cached("divisions")
 async def get_divisions(department_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
     query = {"department_id": department_id} if department_id else {}
     divisions = await db.divisions.find(query, {"_id": 0}).to_list(1000)
@@ -1712,13 +1806,18 @@ async def update_division(div_id: str, data: Dict[str, Any], current_user: User
     division = await db.divisions.find_one({"id": div_id}, {"_id": 0})
     if not division:
         raise HTTPException(status_code=404, detail="Division not found")
+    invalidate_org_graph()
+    await response_cache.changed("divisions")
     return Division(**division)
 
 @api_router.delete("/divisions/{div_id}")
 async def delete_division(div_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.divisions.delete_one({"id": div_id})
-    if result.deleted_count == 0:
+    deleted = await db.divisions.find_one_and_delete({"id": div_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Division not found")
+    await snapshots.record_change(db, "divisions", before=deleted)
+    invalidate_org_graph()
+    await response_cache.changed("divisions")
     return {"message": "Division deleted"}
 
 # ============= EMPLOYEE ROUTES =============
@@ -1726,13 +1825,17 @@ async def delete_division(div_id: str, current_user: User = Depends(get_current_
 @api_router.post("/employees", response_model=Employee)
 async def create_employee(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     emp = Employee(**data)
-    await db.employees.insert_one(emp.model_dump())
+    await db.employees.insert_one({**emp.model_dump(), **team_calendar.calendar_keys(emp.model_dump())})
+    invalidate_principal(emp.user_id)
+    await snapshots.record_change(db, "employees", after=emp.model_dump())
+    invalidate_org_graph()
+    invalidate_calendar("people")
     return emp
 
 @api_router.get("/employees/me")
 async def get_my_employee_profile(current_user: User = Depends(get_current_user)):
     """Get current user's employee profile"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         # Return basic user info if no employee record
         return {
@@ -1747,7 +1850,7 @@ async def get_my_employee_profile(current_user: User = Depends(get_current_user)
 @api_router.put("/employees/me")
 async def update_my_employee_profile(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Update current user's employee profile"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee profile not found")
     
@@ -1767,9 +1870,15 @@ async def update_my_employee_profile(data: Dict[str, Any], current_user: User =
         update_data['full_name'] = f"{update_data['first_name']} {update_data['last_name']}"
     
     if update_data:
-        await db.employees.update_one({"user_id": current_user.id}, {"$set": update_data})
+        await db.employees.update_one(
+            {"user_id": current_user.id}, {"$set": {**update_data, **team_calendar.calendar_keys(update_data)}}
+        )
+        invalidate_principal(current_user.id)
+        invalidate_org_graph()
+        if team_calendar.touches_calendar_fields(update_data):
+            invalidate_calendar("people")
     
-    return await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    return await get_employee_for_user(current_user.id)
 
 # Create employee photos directory
 EMPLOYEE_PHOTOS_DIR = ROOT_DIR / "uploads" / "employee_photos"
@@ -1829,6 +1938,9 @@ async def upload_employee_photo(
         {"id": current_user.id},
         {"$set": {"profile_picture": photo_url}}
     )
+    invalidate_principal(current_user.id)
+    invalidate_user_profile(current_user.id)
+    invalidate_org_graph()
     
     return {"profile_picture": photo_url}
 
@@ -1852,21 +1964,29 @@ async def get_employee_photo(filename: str):
     
     return FileResponse(file_path, media_type=content_type)
 
-@api_router.get("/employees", response_model=List[Employee])
-async def get_employees(branch_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+def _employee_or_none(e: Dict[str, Any]) -> Optional[Employee]:
+    # Clean up empty strings for numeric fields
+    for field in ['holiday_allowance', 'sick_leave_allowance', 'salary']:
+        if field in e and e[field] == '':
+            e[field] = None
+    try:
+        return Employee(**e)
+    except Exception:
+        return None  # Skip invalid records
+
+@api_router.get("/employees")
+async def get_employees(
+    branch_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """List employees; pass limit/cursor for keyset pages or stream=true for NDJSON"""
     query = {"branch_id": branch_id} if branch_id else {}
-    employees = await db.employees.find(query, {"_id": 0}).to_list(1000)
-    result = []
-    for e in employees:
-        # Clean up empty strings for numeric fields
-        for field in ['holiday_allowance', 'sick_leave_allowance', 'salary']:
-            if field in e and e[field] == '':
-                e[field] = None
-        try:
-            result.append(Employee(**e))
-        except Exception:
-            pass  # Skip invalid records
-    return result
+    return await list_or_page(
+        db.employees, query, limit=limit, cursor=cursor, stream=stream, transform=_employee_or_none
+    )
 
 @api_router.get("/employees/{emp_id}", response_model=Employee)
 async def get_employee(emp_id: str, current_user: User = Depends(get_current_user)):
@@ -1881,10 +2001,18 @@ async def update_employee(emp_id: str, data: Dict[str, Any], current_user: User
     for field in ['holiday_allowance', 'sick_leave_allowance', 'salary']:
         if field in data and data[field] == '':
             data[field] = None
-    await db.employees.update_one({"id": emp_id}, {"$set": data})
+    before = await db.employees.find_one_and_update(
+        {"id": emp_id}, {"$set": {**data, **team_calendar.calendar_keys(data)}}, projection={"_id": 0}
+    )
     emp = await db.employees.find_one({"id": emp_id}, {"_id": 0})
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
+    invalidate_principal(emp.get("user_id"), employee_id=emp_id)
+    await snapshots.record_change(db, "employees", before=before, after=emp)
+    if touches_org_fields(data):
+        invalidate_org_graph()
+    if team_calendar.touches_calendar_fields(data):
+        invalidate_calendar("people")
     # Clean up empty strings in retrieved document
     for field in ['holiday_allowance', 'sick_leave_allowance', 'salary']:
         if field in emp and emp[field] == '':
@@ -1893,9 +2021,13 @@ async def update_employee(emp_id: str, data: Dict[str, Any], current_user: User
 
 @api_router.delete("/employees/{emp_id}")
 async def delete_employee(emp_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.employees.delete_one({"id": emp_id})
-    if result.deleted_count == 0:
+    deleted = await db.employees.find_one_and_delete({"id": emp_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Employee not found")
+    invalidate_principal(employee_id=emp_id)
+    await snapshots.record_change(db, "employees", before=deleted)
+    invalidate_org_graph()
+    invalidate_calendar("people")
     return {"message": "Employee deleted"}
 
 @api_router.post("/employees/{emp_id}/reset-password")
@@ -1912,7 +2044,7 @@ async def reset_employee_password(emp_id: str, data: Dict[str, Any], current_use
         raise HTTPException(status_code=404, detail="Employee not found")
     
     # Update user password
-    password_hash = hash_password(new_password)
+    password_hash = await hash_password_async(new_password)
     await db.users.update_one(
         {"id": emp["user_id"]},
         {"$set": {"password_hash": password_hash}}
@@ -1923,13 +2055,18 @@ async def reset_employee_password(emp_id: str, data: Dict[str, Any], current_use
         {"id": emp_id},
         {"$set": {"password_reset_required": True}}
     )
+    invalidate_principal(emp.get("user_id"), employee_id=emp_id)
     
     return {"message": "Password reset successfully"}
 
 
 @api_router.post("/employees/bulk-import")
-async def bulk_import_employees(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
-    """Bulk import employees from CSV data"""
+async def bulk_import_employees(
+    data: Dict[str, Any],
+    background: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk import employees from CSV data; background=true queues a job and returns 202"""
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         raise HTTPException(status_code=403, detail="Only admins can bulk import employees")
     
@@ -1937,111 +2074,158 @@ async def bulk_import_employees(data: Dict[str, Any], current_user: User = Depen
     if not employees_data:
         raise HTTPException(status_code=400, detail="No employee data provided")
     
-    results = {
-        "success": 0,
-        "failed": 0,
-        "errors": [],
-        "created_employees": []
-    }
+    if background:
+        job = await enqueue_job(db, "employees.import", {"employees": employees_data}, current_user.id)
+        return job_accepted(job)
+    return await import_employees(employees_data)
+
+
+@api_router.post("/employees/bulk-import/csv")
+async def bulk_import_employees_csv(
+    file: UploadFile = File(...),
+    background: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk import employees from an uploaded CSV file (multipart); headers as in the import template"""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
+        raise HTTPException(status_code=403, detail="Only admins can bulk import employees")
+    
+    # The upload is spooled to disk by the server; parse it off the event loop
+    try:
+        employees_data = await run_in_threadpool(employee_import.read_csv_rows, file.file)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse CSV file: {e}")
+    finally:
+        await file.close()
+    if not employees_data:
+        raise HTTPException(status_code=400, detail="No employee data provided")
+    
+    if background:
+        job = await enqueue_job(db, "employees.import", {"employees": employees_data}, current_user.id)
+        return job_accepted(job)
+    return await import_employees(employees_data)
+
+
+async def import_employees(employees_data: List[Dict[str, Any]], progress: Optional[ProgressCallback] = None):
+    """Create a user, employee record and welcome notification per valid row.
     
-    for idx, emp_data in enumerate(employees_data):
+    Runs the staged pipeline in services/employee_import.py; rejected rows are
+    reported in `errors` with their row number.
+    """
+    total = len(employees_data)
+    rows, errors = employee_import.validate_rows(employees_data)
+    taken = await employee_import.existing_emails(db, [r.email for r in rows])
+    pending = []
+    for row in rows:
+        if row.email in taken:
+            errors.append(employee_import.row_error(row.row, row.email, "Email already exists"))
+            continue
         try:
-            # Validate required fields
-            required_fields = ["email", "full_name"]
-            missing_fields = [f for f in required_fields if not emp_data.get(f)]
-            if missing_fields:
-                results["errors"].append({
-                    "row": idx + 1,
-                    "email": emp_data.get("email", "N/A"),
-                    "error": f"Missing required fields: {', '.join(missing_fields)}"
-                })
-                results["failed"] += 1
-                continue
-            
-            email = emp_data["email"].strip().lower()
-            
-            # Check if email already exists
-            existing_user = await db.users.find_one({"email": email})
-            if existing_user:
-                results["errors"].append({
-                    "row": idx + 1,
-                    "email": email,
-                    "error": "Email already exists"
-                })
-                results["failed"] += 1
-                continue
-            
-            # Generate a temporary password
-            temp_password = f"Temp{str(uuid.uuid4())[:8]}!"
-            
-            # Create user
-            user_id = str(uuid.uuid4())
-            user = User(
-                id=user_id,
-                email=email,
-                password_hash=hash_password(temp_password),
-                full_name=emp_data["full_name"].strip(),
-                role=UserRole.EMPLOYEE,
-                is_active=True
-            )
-            await db.users.insert_one(user.model_dump())
-            
-            # Create employee record
-            emp_id = str(uuid.uuid4())
-            employee = Employee(
-                id=emp_id,
-                user_id=user_id,
-                employee_code=emp_data.get("employee_code") or f"EMP{str(uuid.uuid4())[:6].upper()}",
-                full_name=emp_data["full_name"].strip(),
-                email=email,
-                phone=emp_data.get("phone", ""),
-                date_of_birth=emp_data.get("date_of_birth"),
-                gender=emp_data.get("gender", ""),
-                nationality=emp_data.get("nationality", ""),
-                address=emp_data.get("address", ""),
-                city=emp_data.get("city", ""),
-                country=emp_data.get("country", ""),
-                job_title=emp_data.get("job_title", ""),
-                department_id=emp_data.get("department_id", ""),
-                division_id=emp_data.get("division_id", ""),
-                branch_id=emp_data.get("branch_id", ""),
-                corporation_id=emp_data.get("corporation_id", ""),
-                manager_id=emp_data.get("manager_id", ""),
-                employment_status=emp_data.get("employment_status", "active"),
-                employment_type=emp_data.get("employment_type", "full_time"),
-                hire_date=emp_data.get("hire_date", datetime.now(timezone.utc).strftime("%Y-%m-%d")),
-                work_location=emp_data.get("work_location", "office"),
-                password_reset_required=True,
-                portal_access_enabled=True
-            )
-            await db.employees.insert_one(employee.model_dump())
-            
-            results["success"] += 1
-            results["created_employees"].append({
-                "id": emp_id,
-                "email": email,
-                "full_name": emp_data["full_name"],
-                "temp_password": temp_password
-            })
-            
-            # Create welcome notification for the new employee
-            await create_notification_for_user(
-                user_id=user_id,
-                notification_type=NotificationType.SYSTEM,
+            row.documents = build_imported_employee(row.data, row.email)
+        except (ValueError, TypeError) as e:
+            # Bad field types fail the row, not the whole import
+            errors.append(employee_import.row_error(row.row, row.email, employee_import.build_error(e)))
+            continue
+        pending.append(row)
+    
+    created = []
+    done = total - len(pending)
+    if progress:
+        await progress(done, total)
+    for chunk in employee_import.chunks(pending):
+        temp_passwords = [f"Temp{str(uuid.uuid4())[:8]}!" for _ in chunk]
+        password_hashes = await employee_import.hash_passwords(temp_passwords)
+        
+        users, employees = [], []
+        for row, password_hash in zip(chunk, password_hashes):
+            user_doc, employee_doc = row.documents
+            user_doc["password_hash"] = password_hash
+            users.append(user_doc)
+            employees.append(employee_doc)
+        
+        failed = await employee_import.insert_chunk(db.users, users)
+        kept = [i for i in range(len(chunk)) if i not in failed]
+        employee_failed = await employee_import.insert_chunk(db.employees, [employees[i] for i in kept])
+        if employee_failed:
+            # Don't leave a login without an employee record behind
+            orphans = [users[kept[j]]["id"] for j in employee_failed]
+            await db.users.delete_many({"id": {"$in": orphans}})
+            failed.update({kept[j]: msg for j, msg in employee_failed.items()})
+            kept = [i for i in kept if i not in failed]
+        
+        await employee_import.insert_chunk(db.notifications, [
+            Notification(
+                user_id=users[i]["id"],
+                type=NotificationType.SYSTEM,
                 title="Welcome to the Team!",
-                message=f"Your account has been created. Please change your password on first login.",
+                message="Your account has been created. Please change your password on first login.",
                 priority="high"
-            )
-            
-        except Exception as e:
-            results["errors"].append({
-                "row": idx + 1,
-                "email": emp_data.get("email", "N/A"),
-                "error": str(e)
+            ).model_dump()
+            for i in kept
+        ])
+        
+        for i, msg in failed.items():
+            errors.append(employee_import.row_error(chunk[i].row, chunk[i].email, msg))
+        for i in kept:
+            created.append({
+                "id": employees[i]["id"],
+                "email": chunk[i].email,
+                "full_name": chunk[i].data["full_name"],
+                "temp_password": temp_passwords[i]
             })
-            results["failed"] += 1
-    
-    return results
+        done += len(chunk)
+        if progress:
+            await progress(done, total)
+    
+    if created:
+        await snapshots.recount(db, "employees")
+        invalidate_org_graph()
+        invalidate_calendar("people")
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "success": len(created),
+        "failed": len(errors),
+        "errors": errors,
+        "created_employees": created
+    }
+
+
+def build_imported_employee(data: Dict[str, Any], email: str):
+    """User and employee documents for one import row (password hash added by the caller)"""
+    full_name = str(data["full_name"])
+    user = User(email=email, full_name=full_name, role=UserRole.EMPLOYEE)
+    employee = Employee(
+        user_id=user.id,
+        employee_id=data.get("employee_code") or f"EMP{str(uuid.uuid4())[:6].upper()}",
+        full_name=full_name,
+        work_email=email,
+        work_phone=data.get("phone") or None,
+        home_address=data.get("address") or None,
+        date_of_birth=data.get("date_of_birth") or None,
+        gender=data.get("gender") or None,
+        job_title=data.get("job_title") or None,
+        department_id=data.get("department_id") or None,
+        division_id=data.get("division_id") or None,
+        branch_id=data.get("branch_id") or "",
+        corporation_id=data.get("corporation_id") or "",
+        reporting_manager_id=data.get("manager_id") or None,
+        employment_status=data.get("employment_status") or "active",
+        hire_date=data.get("hire_date") or datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        work_location=data.get("work_location") or "office",
+        password_reset_required=True,
+        portal_access_enabled=True
+    ).model_dump()
+    employee.update(team_calendar.calendar_keys(employee))
+    # Import-only fields the Employee model doesn't declare
+    for field in ("nationality", "city", "country", "employment_type"):
+        if data.get(field):
+            employee[field] = data[field]
+    return user.model_dump(), employee
+
+
+@job_handler("employees.import")
+async def run_employee_import_job(ctx, payload: Dict[str, Any]):
+    return await import_employees(payload.get("employees", []), progress=ctx.progress)
 
 
 @api_router.get("/employees/import-template")
@@ -2095,6 +2279,7 @@ async def toggle_portal_access(emp_id: str, data: Dict[str, Any], current_user:
         {"id": emp_id},
         {"$set": {"portal_access_enabled": portal_access_enabled}}
     )
+    invalidate_principal(employee_id=emp_id)
     
     emp = await db.employees.find_one({"id": emp_id}, {"_id": 0})
     if not emp:
@@ -2130,6 +2315,16 @@ async def trigger_workflow_for_module(module: str, reference_id: str, requester_
 
 # ============= LEAVE ROUTES =============
 
+async def add_employee_names(records: List[Dict[str, Any]]):
+    """Set employee_name on each record with a single $in lookup."""
+    employee_ids = list(set(r.get("employee_id") for r in records if r.get("employee_id")))
+    employees = await db.employees.find(
+        {"id": {"$in": employee_ids}}, {"_id": 0, "id": 1, "full_name": 1}
+    ).to_list(None)
+    emp_map = {e["id"]: e.get("full_name") for e in employees}
+    for record in records:
+        record["employee_name"] = emp_map.get(record.get("employee_id"), "Unknown")
+
 @api_router.post("/leaves", response_model=Leave)
 async def create_leave(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     leave = Leave(**data)
@@ -2149,13 +2344,23 @@ async def create_leave(data: Dict[str, Any], current_user: User = Depends(get_cu
     await db.leaves.insert_one(leave_dict)
     # Remove _id added by MongoDB before creating response model
     leave_dict.pop("_id", None)
+    await snapshots.record_change(db, "leaves", after=leave_dict)
+    invalidate_calendar("leaves")
     return Leave(**leave_dict)
 
-@api_router.get("/leaves", response_model=List[Leave])
-async def get_leaves(employee_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+@api_router.get("/leaves")
+async def get_leaves(
+    employee_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """List leave requests; pass limit/cursor for keyset pages or stream=true for NDJSON"""
     query = {"employee_id": employee_id} if employee_id else {}
-    leaves = await db.leaves.find(query, {"_id": 0}).to_list(1000)
-    return [Leave(**l) for l in leaves]
+    return await list_or_page(
+        db.leaves, query, limit=limit, cursor=cursor, stream=stream, transform=lambda l: Leave(**l)
+    )
 
 @api_router.put("/leaves/{leave_id}", response_model=Leave)
 async def update_leave(leave_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -2163,17 +2368,21 @@ async def update_leave(leave_id: str, data: Dict[str, Any], current_user: User =
     if data.get("status") == "approved":
         data["approved_by"] = current_user.id
         data["approved_at"] = datetime.now(timezone.utc).isoformat()
-    await db.leaves.update_one({"id": leave_id}, {"$set": data})
+    before = await db.leaves.find_one_and_update({"id": leave_id}, {"$set": data}, projection={"_id": 0})
     leave = await db.leaves.find_one({"id": leave_id}, {"_id": 0})
     if not leave:
         raise HTTPException(status_code=404, detail="Leave not found")
+    await snapshots.record_change(db, "leaves", before=before, after=leave)
+    invalidate_calendar("leaves")
     return Leave(**leave)
 
 @api_router.delete("/leaves/{leave_id}")
 async def delete_leave(leave_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.leaves.delete_one({"id": leave_id})
-    if result.deleted_count == 0:
+    deleted = await db.leaves.find_one_and_delete({"id": leave_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Leave not found")
+    await snapshots.record_change(db, "leaves", before=deleted)
+    invalidate_calendar("leaves")
     return {"message": "Leave request deleted"}
 
 @api_router.get("/leaves/export")
@@ -2183,9 +2392,10 @@ async def export_leaves(
     employee_id: Optional[str] = None,
     status: Optional[str] = None,
     leave_type: Optional[str] = None,
+    stream: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    """Export leave requests as JSON (frontend will convert to CSV)"""
+    """Export leave requests as JSON (frontend will convert to CSV); stream=true returns NDJSON"""
     query = {}
     if employee_id:
         query["employee_id"] = employee_id
@@ -2200,16 +2410,12 @@ async def export_leaves(
     elif end_date:
         query["start_date"] = {"$lte": end_date}
     
-    records = await db.leaves.find(query, {"_id": 0}).sort("start_date", -1).to_list(10000)
-    
-    # Get employee names for the export
-    employee_ids = list(set(r.get("employee_id") for r in records))
-    employees = await db.employees.find({"id": {"$in": employee_ids}}, {"_id": 0, "id": 1, "full_name": 1}).to_list(1000)
-    emp_map = {e["id"]: e["full_name"] for e in employees}
+    cursor = db.leaves.find(query, {"_id": 0}).sort("start_date", -1)
+    if stream:
+        return ndjson_response(cursor, filename="leaves.ndjson", enrich_batch=add_employee_names)
     
-    # Enrich records with employee names
-    for record in records:
-        record["employee_name"] = emp_map.get(record.get("employee_id"), "Unknown")
+    records = await cursor.to_list(None)
+    await add_employee_names(records)
     
     return {"records": records, "total": len(records)}
 
@@ -2421,10 +2627,16 @@ async def workflow_action(instance_id: str, data: Dict[str, Any], current_user:
             "time_correction": "time_corrections"
         }
         if instance["module"] in collection_map:
-            await db[collection_map[instance["module"]]].update_one(
+            ref_collection = collection_map[instance["module"]]
+            before = await db[ref_collection].find_one_and_update(
                 {"id": instance["reference_id"]},
-                {"$set": {"status": "rejected", "rejection_reason": comment}}
+                {"$set": {"status": "rejected", "rejection_reason": comment}},
+                projection={"_id": 0}
             )
+            if before:
+                await snapshots.record_change(db, ref_collection, before=before, after={**before, "status": "rejected"})
+                if ref_collection == "leaves":
+                    invalidate_calendar("leaves")
     elif action in ["approve", "skip"]:
         next_step = current_step + 1
         steps = workflow.get("steps", [])
@@ -2449,14 +2661,20 @@ async def workflow_action(instance_id: str, data: Dict[str, Any], current_user:
                 "time_correction": "time_corrections"
             }
             if instance["module"] in collection_map:
-                await db[collection_map[instance["module"]]].update_one(
+                ref_collection = collection_map[instance["module"]]
+                before = await db[ref_collection].find_one_and_update(
                     {"id": instance["reference_id"]},
                     {"$set": {
                         "status": "approved",
                         "approved_by": current_user.id,
                         "approved_at": datetime.now(timezone.utc).isoformat()
-                    }}
+                    }},
+                    projection={"_id": 0}
                 )
+                if before:
+                    await snapshots.record_change(db, ref_collection, before=before, after={**before, "status": "approved"})
+                    if ref_collection == "leaves":
+                        invalidate_calendar("leaves")
                 
                 # Special handling for time corrections - update attendance record
                 if instance["module"] == "time_correction":
@@ -2526,7 +2744,9 @@ async def create_expense(data: Dict[str, Any], current_user: User = Depends(get_
             {"$set": {"workflow_instance_id": instance.id, "status": "under_review"}}
         )
     
-    return await db.expenses.find_one({"id": expense.id}, {"_id": 0})
+    created = await db.expenses.find_one({"id": expense.id}, {"_id": 0})
+    await snapshots.record_change(db, "expenses", after=created)
+    return created
 
 @api_router.get("/expenses")
 async def get_expenses(
@@ -2535,6 +2755,9 @@ async def get_expenses(
     category: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     query = {}
@@ -2551,8 +2774,9 @@ async def get_expenses(
             query["expense_date"]["$lte"] = date_to
         else:
             query["expense_date"] = {"$lte": date_to}
-    expenses = await db.expenses.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return expenses
+    return await list_or_page(
+        db.expenses, query, limit=limit, cursor=cursor, stream=stream, legacy_sort=[("created_at", -1)]
+    )
 
 @api_router.get("/expenses/my")
 async def get_my_expenses(current_user: User = Depends(get_current_user)):
@@ -2565,7 +2789,7 @@ async def get_my_expenses(current_user: User = Depends(get_current_user)):
         ]
     }, {"_id": 0})
     if not employee:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
     if not employee:
         return []
     expenses = await db.expenses.find({"employee_id": employee["id"]}, {"_id": 0}).sort("created_at", -1).to_list(1000)
@@ -2630,10 +2854,11 @@ async def update_expense(expense_id: str, data: Dict[str, Any], current_user: Us
     elif data.get("status") == "paid":
         data["reimbursement_date"] = datetime.now(timezone.utc).isoformat()
     
-    result = await db.expenses.update_one({"id": expense_id}, {"$set": data})
-    if result.matched_count == 0:
+    before = await db.expenses.find_one_and_update({"id": expense_id}, {"$set": data}, projection={"_id": 0})
+    if not before:
         raise HTTPException(status_code=404, detail="Expense not found")
     expense = await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    await snapshots.record_change(db, "expenses", before=before, after=expense)
     return expense
 
 @api_router.put("/expenses/{expense_id}/approve")
@@ -2648,10 +2873,12 @@ async def approve_expense(expense_id: str, data: Dict[str, Any] = {}, current_us
     if data.get("notes"):
         update_data["notes"] = data["notes"]
     
-    result = await db.expenses.update_one({"id": expense_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    before = await db.expenses.find_one_and_update({"id": expense_id}, {"$set": update_data}, projection={"_id": 0})
+    if not before:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    expense = await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    await snapshots.record_change(db, "expenses", before=before, after=expense)
+    return expense
 
 @api_router.put("/expenses/{expense_id}/reject")
 async def reject_expense(expense_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -2664,10 +2891,12 @@ async def reject_expense(expense_id: str, data: Dict[str, Any], current_user: Us
         "updated_at": datetime.now(timezone.utc).isoformat()
     }
     
-    result = await db.expenses.update_one({"id": expense_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    before = await db.expenses.find_one_and_update({"id": expense_id}, {"$set": update_data}, projection={"_id": 0})
+    if not before:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    expense = await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    await snapshots.record_change(db, "expenses", before=before, after=expense)
+    return expense
 
 @api_router.put("/expenses/{expense_id}/mark-paid")
 async def mark_expense_paid(expense_id: str, data: Dict[str, Any] = {}, current_user: User = Depends(get_current_user)):
@@ -2680,10 +2909,12 @@ async def mark_expense_paid(expense_id: str, data: Dict[str, Any] = {}, current_
     if data.get("notes"):
         update_data["notes"] = data["notes"]
     
-    result = await db.expenses.update_one({"id": expense_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    before = await db.expenses.find_one_and_update({"id": expense_id}, {"$set": update_data}, projection={"_id": 0})
+    if not before:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    expense = await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    await snapshots.record_change(db, "expenses", before=before, after=expense)
+    return expense
 
 @api_router.get("/expenses/export")
 async def export_expenses(
@@ -2719,9 +2950,10 @@ async def export_expenses(
 
 @api_router.delete("/expenses/{expense_id}")
 async def delete_expense(expense_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.expenses.delete_one({"id": expense_id})
-    if result.deleted_count == 0:
+    deleted = await db.expenses.find_one_and_delete({"id": expense_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Expense not found")
+    await snapshots.record_change(db, "expenses", before=deleted)
     return {"message": "Expense deleted"}
 
 # ============= TRAINING ROUTES =============
@@ -2796,7 +3028,7 @@ async def get_my_training_requests(current_user: User = Depends(get_current_user
         ]
     }, {"_id": 0})
     if not employee:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
     if not employee:
         return []
     requests = await db.training_requests.find({"employee_id": employee["id"]}, {"_id": 0}).sort("created_at", -1).to_list(1000)
@@ -2974,6 +3206,7 @@ async def delete_training_request(request_id: str, current_user: User = Depends(
 # ============= TRAINING TYPES & CATEGORIES =============
 
 @api_router.get("/training-types")
+@response_cache.cached("training_types")
 async def get_training_types(current_user: User = Depends(get_current_user)):
     types = await db.training_types.find({}, {"_id": 0}).sort("order", 1).to_list(100)
     return types
@@ -2982,6 +3215,7 @@ async def get_training_types(current_user: User = Depends(get_current_user)):
 async def create_training_type(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     training_type = TrainingType(**data)
     await db.training_types.insert_one(training_type.model_dump())
+    await response_cache.changed("training_types")
     return training_type.model_dump()
 
 @api_router.put("/training-types/{type_id}")
@@ -2989,6 +3223,7 @@ async def update_training_type(type_id: str, data: Dict[str, Any], current_user:
     result = await db.training_types.update_one({"id": type_id}, {"$set": data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Training type not found")
+    await response_cache.changed("training_types")
     return await db.training_types.find_one({"id": type_id}, {"_id": 0})
 
 @api_router.delete("/training-types/{type_id}")
@@ -2996,6 +3231,7 @@ async def delete_training_type(type_id: str, current_user: User = Depends(get_cu
     result = await db.training_types.delete_one({"id": type_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Training type not found")
+    await response_cache.changed("training_types")
     return {"message": "Training type deleted"}
 
 @api_router.get("/training-categories")
@@ -3141,7 +3377,7 @@ async def get_my_training_assignments(current_user: User = Depends(get_current_u
         ]
     }, {"_id": 0})
     if not employee:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
     if not employee:
         return []
     
@@ -3321,7 +3557,7 @@ async def upload_document_file(
 async def create_document_approval(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Create a new document approval request"""
     # Get employee ID from current user - try multiple methods
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         # Fallback: try to find employee by work_email or personal_email
         employee = await db.employees.find_one({"work_email": current_user.email})
@@ -3366,7 +3602,7 @@ async def get_document_approvals(
 @api_router.get("/document-approvals/my")
 async def get_my_document_approvals(current_user: User = Depends(get_current_user)):
     """Get current user's document approval requests"""
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         # Fallback: try to find employee by email
         employee = await db.employees.find_one({"email": current_user.email})
@@ -3418,7 +3654,7 @@ async def get_document_approval_stats(current_user: User = Depends(get_current_u
 @api_router.get("/document-approvals/assigned")
 async def get_assigned_documents(current_user: User = Depends(get_current_user)):
     """Get documents assigned to current employee for acknowledgment"""
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         # Try to find by personal_email or work_email
         employee = await db.employees.find_one({"personal_email": current_user.email})
@@ -3563,7 +3799,7 @@ async def delete_document_approval(doc_id: str, current_user: User = Depends(get
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Only allow deletion of own documents or by admin
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if current_user.role not in ["super_admin", "corp_admin"]:
         if not employee or doc.get("employee_id") != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized to delete this document")
@@ -3632,6 +3868,7 @@ async def acknowledge_document(doc_id: str, current_user: User = Depends(get_cur
 # ============= DOCUMENT TYPES ROUTES =============
 
 @api_router.get("/document-types")
+@response_cache.cached("document_types")
 async def get_document_types(current_user: User = Depends(get_current_user)):
     """Get all document types"""
     types = await db.document_types.find({}, {"_id": 0}).to_list(1000)
@@ -3644,6 +3881,7 @@ async def create_document_type(data: Dict[str, Any], current_user: User = Depend
         raise HTTPException(status_code=403, detail="Only admins can create document types")
     doc_type = DocumentType(**data)
     await db.document_types.insert_one(doc_type.model_dump())
+    await response_cache.changed("document_types")
     return doc_type.model_dump()
 
 @api_router.put("/document-types/{type_id}")
@@ -3653,6 +3891,7 @@ async def update_document_type(type_id: str, data: Dict[str, Any], current_user:
         raise HTTPException(status_code=403, detail="Only admins can update document types")
     await db.document_types.update_one({"id": type_id}, {"$set": data})
     doc_type = await db.document_types.find_one({"id": type_id}, {"_id": 0})
+    await response_cache.changed("document_types")
     return doc_type
 
 @api_router.delete("/document-types/{type_id}")
@@ -3661,6 +3900,7 @@ async def delete_document_type(type_id: str, current_user: User = Depends(get_cu
     if current_user.role not in ["super_admin", "corp_admin"]:
         raise HTTPException(status_code=403, detail="Only admins can delete document types")
     await db.document_types.delete_one({"id": type_id})
+    await response_cache.changed("document_types")
     return {"message": "Document type deleted"}
 
 # ============= DOCUMENT CATEGORIES ROUTES =============
@@ -3755,7 +3995,7 @@ async def use_document_template(template_id: str, data: Dict[str, Any], current_
         raise HTTPException(status_code=404, detail="Template not found")
     
     # Get employee ID
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"personal_email": current_user.email})
     if not employee:
@@ -3821,11 +4061,20 @@ async def create_attendance(data: Dict[str, Any], current_user: User = Depends(g
     await db.attendance.insert_one(attendance.model_dump())
     return attendance
 
-@api_router.get("/attendance", response_model=List[Attendance])
-async def get_attendance(employee_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+@api_router.get("/attendance")
+async def get_attendance(
+    employee_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """List attendance records; pass limit/cursor for keyset pages or stream=true for NDJSON"""
     query = {"employee_id": employee_id} if employee_id else {}
-    records = await db.attendance.find(query, {"_id": 0}).to_list(1000)
-    return [Attendance(**r) for r in records]
+    return await list_or_page(
+        db.attendance, query, limit=limit, cursor=cursor, stream=stream, sort_field="date",
+        transform=lambda r: Attendance(**r)
+    )
 
 @api_router.put("/attendance/{attendance_id}", response_model=Attendance)
 async def update_attendance(attendance_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -3847,9 +4096,10 @@ async def export_attendance(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     employee_id: Optional[str] = None,
+    stream: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    """Export attendance records as JSON (frontend will convert to CSV)"""
+    """Export attendance records as JSON (frontend will convert to CSV); stream=true returns NDJSON"""
     query = {}
     if employee_id:
         query["employee_id"] = employee_id
@@ -3860,16 +4110,12 @@ async def export_attendance(
     elif end_date:
         query["date"] = {"$lte": end_date}
     
-    records = await db.attendance.find(query, {"_id": 0}).sort("date", -1).to_list(10000)
-    
-    # Get employee names for the export
-    employee_ids = list(set(r.get("employee_id") for r in records))
-    employees = await db.employees.find({"id": {"$in": employee_ids}}, {"_id": 0, "id": 1, "full_name": 1}).to_list(1000)
-    emp_map = {e["id"]: e["full_name"] for e in employees}
+    cursor = db.attendance.find(query, {"_id": 0}).sort("date", -1)
+    if stream:
+        return ndjson_response(cursor, filename="attendance.ndjson", enrich_batch=add_employee_names)
     
-    # Enrich records with employee names
-    for record in records:
-        record["employee_name"] = emp_map.get(record.get("employee_id"), "Unknown")
+    records = await cursor.to_list(None)
+    await add_employee_names(records)
     
     return {"records": records, "total": len(records)}
 
@@ -4002,6 +4248,7 @@ async def delete_schedule(schedule_id: str, current_user: User = Depends(get_cur
 async def assign_schedule_to_employee(emp_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     schedule_id = data.get("schedule_id")
     await db.employees.update_one({"id": emp_id}, {"$set": {"schedule_id": schedule_id}})
+    invalidate_principal(employee_id=emp_id)
     return {"message": "Schedule assigned successfully"}
 
 # ============= PERFORMANCE REVIEW ROUTES =============
@@ -4120,20 +4367,17 @@ async def get_review_stats(current_user: User = Depends(get_current_user)):
 
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
-    total_corps = await db.corporations.count_documents({})
-    total_branches = await db.branches.count_documents({})
-    total_departments = await db.departments.count_documents({})
-    total_divisions = await db.divisions.count_documents({})
-    total_employees = await db.employees.count_documents({})
-    pending_leaves = await db.leaves.count_documents({"status": "pending"})
-    
+    counters = await snapshots.read_counters(db, [
+        "corporations.total", "branches.total", "departments.total",
+        "divisions.total", "employees.total", "leaves.status.pending",
+    ])
     return {
-        "total_corporations": total_corps,
-        "total_branches": total_branches,
-        "total_departments": total_departments,
-        "total_divisions": total_divisions,
-        "total_employees": total_employees,
-        "pending_leaves": pending_leaves
+        "total_corporations": counters["corporations.total"],
+        "total_branches": counters["branches.total"],
+        "total_departments": counters["departments.total"],
+        "total_divisions": counters["divisions.total"],
+        "total_employees": counters["employees.total"],
+        "pending_leaves": counters["leaves.status.pending"]
     }
 
 # ============= ROLES & PERMISSIONS =============
@@ -4339,12 +4583,14 @@ DEFAULT_ROLES = [
 
 
 @api_router.get("/permissions")
+@response_cache.cached(cache_control=STATIC_REFERENCE_CACHE_CONTROL)
 async def get_permissions(current_user: User = Depends(get_current_user)):
     """Get all available permissions"""
     return [Permission(**p) for p in AVAILABLE_PERMISSIONS]
 
 
 @api_router.get("/permissions/categories")
+@response_cache.cached(cache_control=STATIC_REFERENCE_CACHE_CONTROL)
 async def get_permission_categories(current_user: User = Depends(get_current_user)):
     """Get permissions grouped by category"""
     categories = {}
@@ -4362,9 +4608,11 @@ async def create_role(data: Dict[str, Any], current_user: User = Depends(get_cur
     
     role = Role(**data)
     await db.roles.insert_one(role.model_dump())
+    await response_cache.changed("roles")
     return role
 
 @api_router.get("/roles", response_model=List[Role])
+@response_cache.cached("roles")
 async def get_roles(current_user: User = Depends(get_current_user)):
     roles = await db.roles.find({}, {"_id": 0}).to_list(1000)
     return [Role(**r) for r in roles]
@@ -4418,6 +4666,11 @@ async def update_role(role_id: str, data: Dict[str, Any], current_user: User = D
     
     await db.roles.update_one({"id": role_id}, {"$set": data})
     updated_role = await db.roles.find_one({"id": role_id}, {"_id": 0})
+    # Permissions (or the role name itself) changed for everyone holding the role
+    invalidate_role_principals(role["name"])
+    if updated_role.get("name") != role["name"]:
+        invalidate_role_principals(updated_role.get("name"))
+    await response_cache.changed("roles")
     return Role(**updated_role)
 
 @api_router.delete("/roles/{role_id}")
@@ -4438,6 +4691,7 @@ async def delete_role(role_id: str, current_user: User = Depends(get_current_use
         raise HTTPException(status_code=400, detail=f"Cannot delete role. {users_with_role} users are assigned to this role")
     
     await db.roles.delete_one({"id": role_id})
+    await response_cache.changed("roles")
     return {"message": "Role deleted successfully"}
 
 @api_router.post("/roles/initialize-defaults")
@@ -4464,6 +4718,8 @@ async def initialize_default_roles(current_user: User = Depends(get_current_user
         role = Role(**role_data)
         await db.roles.insert_one(role.model_dump())
     
+    invalidate_role_principals()
+    await response_cache.changed("roles")
     return {"message": f"Initialized {len(DEFAULT_ROLES)} default roles"}
 
 
@@ -4515,6 +4771,7 @@ async def assign_role_to_user(role_id: str, data: Dict[str, Any], current_user:
     
     # Update user's role
     await db.users.update_one({"id": user_id}, {"$set": {"role": role["name"]}})
+    invalidate_principal(user_id)
     
     # Create notification
     await create_notification_for_user(
@@ -4548,6 +4805,7 @@ async def remove_role_from_user(role_id: str, data: Dict[str, Any], current_user
     
     # Set to employee role
     await db.users.update_one({"id": user_id}, {"$set": {"role": "employee"}})
+    invalidate_principal(user_id)
     
     return {"message": "Role removed, user set to Employee role", "user_id": user_id}
 
@@ -4584,6 +4842,7 @@ async def duplicate_role(role_id: str, data: Dict[str, Any], current_user: User
     )
     
     await db.roles.insert_one(new_role.model_dump())
+    await response_cache.changed("roles")
     return new_role
 
 
@@ -4659,6 +4918,7 @@ async def get_job_stats(job_id: str, current_user: User = Depends(get_current_us
 async def create_job(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     job = Job(**data)
     await db.jobs.insert_one(job.model_dump())
+    await snapshots.touch(db, "jobs")
     return job.model_dump()
 
 @api_router.put("/jobs/{job_id}")
@@ -4667,6 +4927,7 @@ async def update_job(job_id: str, data: Dict[str, Any], current_user: User = Dep
     result = await db.jobs.update_one({"id": job_id}, {"$set": data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Job not found")
+    await snapshots.touch(db, "jobs")
     return await db.jobs.find_one({"id": job_id}, {"_id": 0})
 
 @api_router.delete("/jobs/{job_id}")
@@ -4677,10 +4938,12 @@ async def delete_job(job_id: str, current_user: User = Depends(get_current_user)
     # Also delete related applications and interviews
     await db.applications.delete_many({"job_id": job_id})
     await db.interviews.delete_many({"job_id": job_id})
+    await snapshots.touch(db, "jobs")
+    await snapshots.recount(db, "applications")
     return {"message": "Job deleted"}
 
 @api_router.get("/applications")
-async def get_applications(job_id: Optional[str] = None, status: Optional[str] = None, referral_employee_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_applications(job_id: Optional[str] = None, status: Optional[str] = None, referral_employee_id: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None, stream: bool = False, current_user: User = Depends(get_current_user)):
     query = {}
     if job_id:
         query["job_id"] = job_id
@@ -4688,14 +4951,15 @@ async def get_applications(job_id: Optional[str] = None, status: Optional[str] =
         query["status"] = status
     if referral_employee_id:
         query["referral_employee_id"] = referral_employee_id
-    applications = await db.applications.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return applications
+    return await list_or_page(
+        db.applications, query, limit=limit, cursor=cursor, stream=stream, legacy_sort=[("created_at", -1)]
+    )
 
 @api_router.get("/applications/my-referrals")
 async def get_my_referrals(current_user: User = Depends(get_current_user)):
     """Get applications referred by the current user"""
     # Find employee record for current user
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         return []
     applications = await db.applications.find({"referral_employee_id": employee["id"]}, {"_id": 0}).sort("created_at", -1).to_list(1000)
@@ -4741,21 +5005,25 @@ async def get_application(application_id: str, current_user: User = Depends(get_
 async def create_application(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     application = Application(**data)
     await db.applications.insert_one(application.model_dump())
+    await snapshots.record_change(db, "applications", after=application.model_dump())
     return application.model_dump()
 
 @api_router.put("/applications/{application_id}")
 async def update_application(application_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
-    result = await db.applications.update_one({"id": application_id}, {"$set": data})
-    if result.matched_count == 0:
+    before = await db.applications.find_one_and_update({"id": application_id}, {"$set": data}, projection={"_id": 0})
+    if not before:
         raise HTTPException(status_code=404, detail="Application not found")
-    return await db.applications.find_one({"id": application_id}, {"_id": 0})
+    application = await db.applications.find_one({"id": application_id}, {"_id": 0})
+    await snapshots.record_change(db, "applications", before=before, after=application)
+    return application
 
 @api_router.delete("/applications/{application_id}")
 async def delete_application(application_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.applications.delete_one({"id": application_id})
-    if result.deleted_count == 0:
+    deleted = await db.applications.find_one_and_delete({"id": application_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Application not found")
+    await snapshots.record_change(db, "applications", before=deleted)
     # Also delete related interviews
     await db.interviews.delete_many({"application_id": application_id})
     return {"message": "Application deleted"}
@@ -4778,10 +5046,13 @@ async def create_interview(data: Dict[str, Any], current_user: User = Depends(ge
     interview = Interview(**data)
     await db.interviews.insert_one(interview.model_dump())
     # Update application status to interview
-    await db.applications.update_one(
+    before = await db.applications.find_one_and_update(
         {"id": data.get("application_id")},
-        {"$set": {"status": "interview", "interview_date": data.get("scheduled_date"), "interview_type": data.get("interview_type")}}
+        {"$set": {"status": "interview", "interview_date": data.get("scheduled_date"), "interview_type": data.get("interview_type")}},
+        projection={"_id": 0}
     )
+    if before:
+        await snapshots.record_change(db, "applications", before=before, after={**before, "status": "interview"})
     return interview.model_dump()
 
 @api_router.put("/interviews/{interview_id}")
@@ -4900,7 +5171,7 @@ async def get_my_onboarding(current_user: User = Depends(get_current_user)):
     }, {"_id": 0})
     if not employee:
         # Also try to find by user_id
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
     if not employee:
         return None
     # Get active onboarding for this employee
@@ -5090,14 +5361,15 @@ async def delete_offboarding_template(template_id: str, current_user: User = Dep
     return {"message": "Template deleted"}
 
 @api_router.get("/offboardings")
-async def get_offboardings(status: Optional[str] = None, employee_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_offboardings(status: Optional[str] = None, employee_id: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None, stream: bool = False, current_user: User = Depends(get_current_user)):
     query = {}
     if status:
         query["status"] = status
     if employee_id:
         query["employee_id"] = employee_id
-    offboardings = await db.offboardings.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return offboardings
+    return await list_or_page(
+        db.offboardings, query, limit=limit, cursor=cursor, stream=stream, legacy_sort=[("created_at", -1)]
+    )
 
 @api_router.get("/offboardings/my")
 async def get_my_offboarding(current_user: User = Depends(get_current_user)):
@@ -5110,7 +5382,7 @@ async def get_my_offboarding(current_user: User = Depends(get_current_user)):
         ]
     }, {"_id": 0})
     if not employee:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
     if not employee:
         return None
     offboarding = await db.offboardings.find_one(
@@ -5181,6 +5453,7 @@ async def create_offboarding(data: Dict[str, Any], current_user: User = Depends(
     
     offboarding = Offboarding(**data)
     await db.offboardings.insert_one(offboarding.model_dump())
+    await snapshots.record_change(db, "offboardings", after=offboarding.model_dump())
     return offboarding.model_dump()
 
 @api_router.put("/offboardings/{offboarding_id}")
@@ -5191,10 +5464,12 @@ async def update_offboarding(offboarding_id: str, data: Dict[str, Any], current_
     if data.get("status") == "completed" and "completed_at" not in data:
         data["completed_at"] = datetime.now(timezone.utc).isoformat()
     
-    result = await db.offboardings.update_one({"id": offboarding_id}, {"$set": data})
-    if result.matched_count == 0:
+    before = await db.offboardings.find_one_and_update({"id": offboarding_id}, {"$set": data}, projection={"_id": 0})
+    if not before:
         raise HTTPException(status_code=404, detail="Offboarding not found")
-    return await db.offboardings.find_one({"id": offboarding_id}, {"_id": 0})
+    offboarding = await db.offboardings.find_one({"id": offboarding_id}, {"_id": 0})
+    await snapshots.record_change(db, "offboardings", before=before, after=offboarding)
+    return offboarding
 
 @api_router.put("/offboardings/{offboarding_id}/tasks/{task_index}")
 async def update_offboarding_task(offboarding_id: str, task_index: int, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -5226,6 +5501,8 @@ async def update_offboarding_task(offboarding_id: str, task_index: int, data: Di
         update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.offboardings.update_one({"id": offboarding_id}, {"$set": update_data})
+    if "status" in update_data:
+        await snapshots.record_change(db, "offboardings", before=offboarding, after={**offboarding, **update_data})
     return await db.offboardings.find_one({"id": offboarding_id}, {"_id": 0})
 
 @api_router.put("/offboardings/{offboarding_id}/clearance")
@@ -5274,9 +5551,10 @@ async def submit_offboarding_feedback(offboarding_id: str, data: Dict[str, Any],
 
 @api_router.delete("/offboardings/{offboarding_id}")
 async def delete_offboarding(offboarding_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.offboardings.delete_one({"id": offboarding_id})
-    if result.deleted_count == 0:
+    deleted = await db.offboardings.find_one_and_delete({"id": offboarding_id}, projection={"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Offboarding not found")
+    await snapshots.record_change(db, "offboardings", before=deleted)
     return {"message": "Offboarding deleted"}
 
 # ============= APPRAISAL CYCLES =============
@@ -5337,8 +5615,9 @@ async def delete_appraisal_cycle(cycle_id: str, current_user: User = Depends(get
     return {"message": "Appraisal cycle deleted"}
 
 @api_router.post("/appraisal-cycles/{cycle_id}/assign")
-async def assign_appraisals(cycle_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
-    """Assign appraisals to employees for a cycle"""
+async def assign_appraisals(cycle_id: str, data: Dict[str, Any], background: bool = False,
+                            current_user: User = Depends(get_current_user)):
+    """Assign appraisals to employees for a cycle; background=true queues a job and returns 202"""
     employee_ids = data.get("employee_ids", [])
     reviewer_id = data.get("reviewer_id")
     
@@ -5346,8 +5625,21 @@ async def assign_appraisals(cycle_id: str, data: Dict[str, Any], current_user: U
     if not cycle:
         raise HTTPException(status_code=404, detail="Appraisal cycle not found")
     
+    if background:
+        job = await enqueue_job(db, "appraisals.assign", {
+            "cycle_id": cycle_id, "employee_ids": employee_ids, "reviewer_id": reviewer_id
+        }, current_user.id)
+        return job_accepted(job)
+    return await assign_cycle_appraisals(cycle, employee_ids, reviewer_id)
+
+
+async def assign_cycle_appraisals(cycle: Dict[str, Any], employee_ids: List[str], reviewer_id: Optional[str],
+                                  progress: Optional[ProgressCallback] = None):
+    cycle_id = cycle["id"]
     created_count = 0
-    for emp_id in employee_ids:
+    for idx, emp_id in enumerate(employee_ids):
+        if progress:
+            await progress(idx, len(employee_ids))
         # Check if appraisal already exists
         existing = await db.appraisals.find_one({"cycle_id": cycle_id, "employee_id": emp_id})
         if existing:
@@ -5392,8 +5684,20 @@ async def assign_appraisals(cycle_id: str, data: Dict[str, Any], current_user: U
     if cycle.get("status") == "draft":
         await db.appraisal_cycles.update_one({"id": cycle_id}, {"$set": {"status": "active"}})
     
+    if progress:
+        await progress(len(employee_ids), len(employee_ids))
     return {"message": f"Assigned {created_count} appraisals", "created_count": created_count}
 
+
+@job_handler("appraisals.assign")
+async def run_appraisal_assignment_job(ctx, payload: Dict[str, Any]):
+    cycle = await db.appraisal_cycles.find_one({"id": payload["cycle_id"]}, {"_id": 0})
+    if not cycle:
+        raise HTTPException(status_code=404, detail="Appraisal cycle not found")
+    return await assign_cycle_appraisals(
+        cycle, payload.get("employee_ids", []), payload.get("reviewer_id"), progress=ctx.progress
+    )
+
 # ============= APPRAISALS =============
 
 @api_router.get("/appraisals")
@@ -5583,169 +5887,74 @@ async def get_appraisal_stats(current_user: User = Depends(get_current_user)):
 # ============= ORGANIZATION CHART =============
 
 @api_router.get("/org-chart")
-async def get_org_chart(current_user: User = Depends(get_current_user)):
-    """Get organization chart data with hierarchy"""
-    
-    # Fetch all required data
-    employees = await db.employees.find({}, {"_id": 0}).to_list(1000)
-    departments = await db.departments.find({}, {"_id": 0}).to_list(100)
-    divisions = await db.divisions.find({}, {"_id": 0}).to_list(100)
-    branches = await db.branches.find({}, {"_id": 0}).to_list(100)
-    corporations = await db.corporations.find({}, {"_id": 0}).to_list(100)
-    
-    # Create lookup maps
-    dept_map = {d.get("id"): d for d in departments}
-    div_map = {d.get("id"): d for d in divisions}
-    branch_map = {b.get("id"): b for b in branches}
-    corp_map = {c.get("id"): c for c in corporations}
-    emp_map = {e.get("id"): e for e in employees}
-    
-    # Build employee nodes with hierarchy info
-    def get_employee_name(emp):
-        if not emp:
-            return "Unknown"
-        first = emp.get("first_name") or emp.get("full_name", "").split()[0] if emp.get("full_name") else ""
-        last = emp.get("last_name") or ""
-        name = f"{first} {last}".strip()
-        if not name:
-            email = emp.get("work_email") or emp.get("personal_email") or ""
-            name = email.split("@")[0].replace(".", " ").replace("_", " ").title() if email else "Unknown"
-        return name
-    
-    def build_employee_node(emp):
-        dept = dept_map.get(emp.get("department_id"), {})
-        div = div_map.get(emp.get("division_id"), {})
-        branch = branch_map.get(emp.get("branch_id"), {})
-        manager = emp_map.get(emp.get("reporting_manager_id"))
-        
-        return {
-            "id": emp.get("id"),
-            "name": get_employee_name(emp),
-            "email": emp.get("work_email") or emp.get("personal_email"),
-            "job_title": emp.get("job_title") or "Employee",
-            "department": dept.get("name", ""),
-            "department_id": emp.get("department_id"),
-            "division": div.get("name", ""),
-            "division_id": emp.get("division_id"),
-            "branch": branch.get("name", ""),
-            "branch_id": emp.get("branch_id"),
-            "corporation_id": emp.get("corporation_id"),
-            "manager_id": emp.get("reporting_manager_id"),
-            "manager_name": get_employee_name(manager) if manager else None,
-            "profile_picture": emp.get("profile_picture"),
-            "status": emp.get("status", "active"),
-            "hire_date": emp.get("hire_date"),
-        }
-    
-    # Build nodes list
-    nodes = [build_employee_node(emp) for emp in employees if emp.get("status") != "inactive"]
+async def get_org_chart(
+    root: Optional[str] = None,
+    depth: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get organization chart data with hierarchy.
     
-    # Calculate direct reports for each employee
-    reports_count = {}
-    for emp in employees:
-        manager_id = emp.get("reporting_manager_id")
-        if manager_id:
-            reports_count[manager_id] = reports_count.get(manager_id, 0) + 1
-    
-    for node in nodes:
-        node["direct_reports_count"] = reports_count.get(node["id"], 0)
-    
-    # Build hierarchy tree
-    def build_tree(parent_id=None):
-        children = []
-        for node in nodes:
-            if node.get("manager_id") == parent_id:
-                child = {**node, "children": build_tree(node["id"])}
-                children.append(child)
-        return children
-    
-    # Get root nodes (employees without managers)
-    root_nodes = [n for n in nodes if not n.get("manager_id")]
-    tree = []
-    for root in root_nodes:
-        tree.append({**root, "children": build_tree(root["id"])})
+    Pass root to chart one employee's subtree and depth to cut the tree off that
+    many levels down; truncated nodes carry has_more and can be expanded with
+    /org-chart/subtree/{employee_id}.
+    """
+    if depth is not None and depth < 0:
+        raise HTTPException(status_code=400, detail="depth must be zero or positive")
+    graph = await get_org_graph(db)
+    
+    if root:
+        if root not in graph.nodes:
+            raise HTTPException(status_code=404, detail="Employee not found in org chart")
+        node_ids = graph.subtree_ids(root, depth)
+        tree = graph.tree([root], depth)
+    else:
+        node_ids = list(graph.nodes) if depth is None else [
+            emp_id for root_id in graph.roots for emp_id in graph.subtree_ids(root_id, depth)
+        ]
+        tree = graph.tree(graph.roots, depth)
+    nodes = [graph.nodes[emp_id] for emp_id in node_ids]
     
     return {
         "nodes": nodes,
         "tree": tree,
-        "departments": [{"id": d.get("id"), "name": d.get("name")} for d in departments],
-        "divisions": [{"id": d.get("id"), "name": d.get("name")} for d in divisions],
-        "branches": [{"id": b.get("id"), "name": b.get("name")} for b in branches],
-        "corporations": [{"id": c.get("id"), "name": c.get("name")} for c in corporations],
+        "departments": [{"id": d.get("id"), "name": d.get("name")} for d in graph.departments],
+        "divisions": [{"id": d.get("id"), "name": d.get("name")} for d in graph.divisions],
+        "branches": [{"id": b.get("id"), "name": b.get("name")} for b in graph.branches],
+        "corporations": [{"id": c.get("id"), "name": c.get("name")} for c in graph.corporations],
         "stats": {
             "total_employees": len(nodes),
-            "departments_count": len(departments),
-            "branches_count": len(branches),
+            "departments_count": len(graph.departments),
+            "branches_count": len(graph.branches),
         }
     }
 
+@api_router.get("/org-chart/subtree/{employee_id}")
+async def get_org_subtree(
+    employee_id: str,
+    depth: int = 1,
+    current_user: User = Depends(get_current_user)
+):
+    """Expand one org chart node lazily: the node and `depth` levels of reports"""
+    if depth < 0:
+        raise HTTPException(status_code=400, detail="depth must be zero or positive")
+    graph = await get_org_graph(db)
+    if employee_id not in graph.nodes:
+        raise HTTPException(status_code=404, detail="Employee not found in org chart")
+    
+    return graph.tree([employee_id], depth)[0]
+
 @api_router.get("/org-chart/employee/{employee_id}")
 async def get_employee_org_position(employee_id: str, current_user: User = Depends(get_current_user)):
     """Get specific employee's position in org chart with manager and direct reports"""
-    
-    employee = await db.employees.find_one({"id": employee_id}, {"_id": 0})
-    if not employee:
+    graph = await get_org_graph(db)
+    if employee_id not in graph.employees:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    employees = await db.employees.find({}, {"_id": 0}).to_list(1000)
-    emp_map = {e.get("id"): e for e in employees}
-    
-    def get_employee_name(emp):
-        if not emp:
-            return "Unknown"
-        first = emp.get("first_name") or emp.get("full_name", "").split()[0] if emp.get("full_name") else ""
-        last = emp.get("last_name") or ""
-        name = f"{first} {last}".strip()
-        if not name:
-            email = emp.get("work_email") or emp.get("personal_email") or ""
-            name = email.split("@")[0].replace(".", " ").replace("_", " ").title() if email else "Unknown"
-        return name
-    
-    def build_node(emp):
-        if not emp:
-            return None
-        return {
-            "id": emp.get("id"),
-            "name": get_employee_name(emp),
-            "email": emp.get("work_email") or emp.get("personal_email"),
-            "job_title": emp.get("job_title") or "Employee",
-            "department_id": emp.get("department_id"),
-            "profile_picture": emp.get("profile_picture"),
-        }
-    
-    # Get manager chain (up to 5 levels)
-    manager_chain = []
-    current_manager_id = employee.get("reporting_manager_id")
-    for _ in range(5):
-        if not current_manager_id:
-            break
-        manager = emp_map.get(current_manager_id)
-        if manager:
-            manager_chain.append(build_node(manager))
-            current_manager_id = manager.get("reporting_manager_id")
-        else:
-            break
-    
-    # Get direct reports
-    direct_reports = [
-        build_node(emp) for emp in employees 
-        if emp.get("reporting_manager_id") == employee_id
-    ]
-    
-    # Get peers (same manager)
-    peers = []
-    if employee.get("reporting_manager_id"):
-        peers = [
-            build_node(emp) for emp in employees 
-            if emp.get("reporting_manager_id") == employee.get("reporting_manager_id") 
-            and emp.get("id") != employee_id
-        ]
-    
     return {
-        "employee": build_node(employee),
-        "manager_chain": manager_chain,
-        "direct_reports": direct_reports,
-        "peers": peers,
+        "employee": graph.summary_node(employee_id),
+        "manager_chain": graph.manager_chain(employee_id, limit=5),
+        "direct_reports": graph.direct_reports(employee_id),
+        "peers": graph.peers(employee_id),
     }
 
 @api_router.get("/org-chart/department/{department_id}")
@@ -5756,30 +5965,8 @@ async def get_department_org_chart(department_id: str, current_user: User = Depe
     if not department:
         raise HTTPException(status_code=404, detail="Department not found")
     
-    employees = await db.employees.find({"department_id": department_id}, {"_id": 0}).to_list(500)
-    emp_map = {e.get("id"): e for e in employees}
-    
-    def get_employee_name(emp):
-        if not emp:
-            return "Unknown"
-        first = emp.get("first_name") or emp.get("full_name", "").split()[0] if emp.get("full_name") else ""
-        last = emp.get("last_name") or ""
-        name = f"{first} {last}".strip()
-        if not name:
-            email = emp.get("work_email") or emp.get("personal_email") or ""
-            name = email.split("@")[0].replace(".", " ").replace("_", " ").title() if email else "Unknown"
-        return name
-    
-    nodes = []
-    for emp in employees:
-        nodes.append({
-            "id": emp.get("id"),
-            "name": get_employee_name(emp),
-            "email": emp.get("work_email") or emp.get("personal_email"),
-            "job_title": emp.get("job_title") or "Employee",
-            "manager_id": emp.get("reporting_manager_id"),
-            "profile_picture": emp.get("profile_picture"),
-        })
+    graph = await get_org_graph(db)
+    nodes = graph.department_nodes(department_id)
     
     return {
         "department": department,
@@ -5858,7 +6045,7 @@ async def delete_salary_structure(structure_id: str, current_user: User = Depend
 # ============= PAYROLL - PAYSLIPS =============
 
 @api_router.get("/payroll/payslips")
-async def get_payslips(pay_period: Optional[str] = None, status: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_payslips(pay_period: Optional[str] = None, status: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None, stream: bool = False, current_user: User = Depends(get_current_user)):
     """Get all payslips (admin) or own payslips (employee)"""
     query = {}
     if pay_period:
@@ -5875,8 +6062,10 @@ async def get_payslips(pay_period: Optional[str] = None, status: Optional[str] =
             return []
         query["employee_id"] = employee.get("id")
     
-    payslips = await db.payslips.find(query, {"_id": 0}).sort("payment_date", -1).to_list(500)
-    return payslips
+    return await list_or_page(
+        db.payslips, query, limit=limit, cursor=cursor, stream=stream, sort_field="payment_date",
+        legacy_sort=[("payment_date", -1)]
+    )
 
 @api_router.get("/payroll/payslips/my")
 async def get_my_payslips(current_user: User = Depends(get_current_user)):
@@ -6019,97 +6208,66 @@ async def create_payroll_run(run: PayrollRun, current_user: User = Depends(get_c
     await db.payroll_runs.insert_one(run_dict)
     return {k: v for k, v in run_dict.items() if k != "_id"}
 
+def payslip_template(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Model defaults shared by every payslip of a run"""
+    return Payslip(
+        employee_id="",
+        pay_period=run.get("pay_period"),
+        pay_period_start=run.get("pay_period_start"),
+        pay_period_end=run.get("pay_period_end"),
+        payment_date=run.get("payment_date"),
+        status="draft"
+    ).model_dump()
+
+
+def payroll_generation_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "message": f"Generated {result['created']} payslips",
+        "created": result["created"],
+        "skipped": result["skipped"],
+        "total_employees": result["count"],
+        "total_gross": result["gross"],
+        "total_net": result["net"]
+    }
+
 @api_router.post("/payroll/runs/{run_id}/generate")
-async def generate_payroll(run_id: str, current_user: User = Depends(get_current_user)):
-    """Generate payslips for all employees with active salary structures"""
+async def generate_payroll(run_id: str, background: bool = False, current_user: User = Depends(get_current_user)):
+    """Generate payslips for all employees with active salary structures.
+    
+    Safe to call again after an interrupted run: employees that already have a
+    payslip for the period are skipped and the remaining ones are generated.
+    With background=true the run is claimed here and generated by a job worker.
+    """
     run = await db.payroll_runs.find_one({"id": run_id}, {"_id": 0})
     if not run:
         raise HTTPException(status_code=404, detail="Payroll run not found")
     
-    # Get all active salary structures
-    structures = await db.salary_structures.find({"status": "active"}, {"_id": 0}).to_list(500)
-    
-    created_count = 0
-    total_gross = 0
-    total_deductions = 0
-    total_net = 0
-    
-    for structure in structures:
-        # Check if payslip already exists for this period
-        existing = await db.payslips.find_one({
-            "employee_id": structure.get("employee_id"),
-            "pay_period": run.get("pay_period")
-        })
-        if existing:
-            continue
-        
-        # Calculate tax amount
-        gross = (structure.get("basic_salary", 0) + structure.get("housing_allowance", 0) +
-                 structure.get("transport_allowance", 0) + structure.get("meal_allowance", 0) +
-                 structure.get("phone_allowance", 0) + structure.get("other_allowances", 0))
-        
-        tax_amount = gross * (structure.get("tax_rate", 0) / 100)
-        
-        deductions = (tax_amount + structure.get("social_security", 0) +
-                      structure.get("health_insurance", 0) + structure.get("pension_contribution", 0) +
-                      structure.get("other_deductions", 0))
-        
-        net = gross - deductions
-        
-        payslip = Payslip(
-            employee_id=structure.get("employee_id"),
-            employee_name=structure.get("employee_name"),
-            employee_email=structure.get("employee_email"),
-            department=structure.get("department"),
-            pay_period=run.get("pay_period"),
-            pay_period_start=run.get("pay_period_start"),
-            pay_period_end=run.get("pay_period_end"),
-            payment_date=run.get("payment_date"),
-            basic_salary=structure.get("basic_salary", 0),
-            housing_allowance=structure.get("housing_allowance", 0),
-            transport_allowance=structure.get("transport_allowance", 0),
-            meal_allowance=structure.get("meal_allowance", 0),
-            phone_allowance=structure.get("phone_allowance", 0),
-            other_allowances=structure.get("other_allowances", 0),
-            gross_salary=gross,
-            tax_amount=tax_amount,
-            social_security=structure.get("social_security", 0),
-            health_insurance=structure.get("health_insurance", 0),
-            pension_contribution=structure.get("pension_contribution", 0),
-            other_deductions=structure.get("other_deductions", 0),
-            total_deductions=deductions,
-            net_salary=net,
-            currency=structure.get("currency", "USD"),
-            payment_method=structure.get("payment_method"),
-            status="draft"
-        )
-        
-        await db.payslips.insert_one(payslip.model_dump())
-        created_count += 1
-        total_gross += gross
-        total_deductions += deductions
-        total_net += net
+    if not await payroll_engine.claim_generation(db, run_id):
+        raise HTTPException(status_code=409, detail="Payslips for this run are already being generated")
     
-    # Update payroll run totals
-    await db.payroll_runs.update_one(
-        {"id": run_id},
-        {"$set": {
-            "total_employees": created_count,
-            "total_gross": total_gross,
-            "total_deductions": total_deductions,
-            "total_net": total_net,
-            "status": "processing",
-            "processed_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
+    if background:
+        job = await enqueue_job(db, "payroll.generate", {"run_id": run_id}, current_user.id)
+        return job_accepted(job)
     
-    return {
-        "message": f"Generated {created_count} payslips",
-        "total_employees": created_count,
-        "total_gross": total_gross,
-        "total_net": total_net
-    }
+    result = await payroll_engine.generate_run(db, run, payslip_template(run))
+    return payroll_generation_summary(result)
+
+@job_handler("payroll.generate")
+async def run_payroll_generation_job(ctx, payload: Dict[str, Any]):
+    run = await db.payroll_runs.find_one({"id": payload["run_id"]}, {"_id": 0})
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    # The endpoint took the generation claim; the job lease keeps retries exclusive
+    result = await payroll_engine.generate_run(db, run, payslip_template(run))
+    return payroll_generation_summary(result)
+
+@api_router.get("/payroll/runs/{run_id}/progress")
+async def get_payroll_generation_progress(run_id: str, current_user: User = Depends(get_current_user)):
+    """Progress of payslip generation for a payroll run"""
+    run = await db.payroll_runs.find_one({"id": run_id}, {"_id": 0, "id": 1, "status": 1, "generation": 1})
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    return {"run_id": run_id, "status": run.get("status"), "generation": run.get("generation")}
 
 @api_router.post("/payroll/runs/{run_id}/approve-all")
 async def approve_all_payslips(run_id: str, current_user: User = Depends(get_current_user)):
@@ -6294,10 +6452,19 @@ class AssetRequest(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for asset management models
+register_index("asset_categories", [("id", 1)], unique=True)
+register_index("assets", [("id", 1)], unique=True)
+register_index("assets", [("status", 1)])
+register_index("asset_assignments", [("asset_id", 1), ("status", 1)])
+register_index("asset_requests", [("id", 1)], unique=True)
+register_index("asset_requests", [("employee_id", 1)])
+
 # ============= ASSET MANAGEMENT ROUTES =============
 
 # Asset Categories
 @api_router.get("/asset-categories")
+@response_cache.cached("asset_categories")
 async def get_asset_categories(current_user: User = Depends(get_current_user)):
     categories = await db.asset_categories.find({}, {"_id": 0}).to_list(100)
     return categories
@@ -6308,6 +6475,7 @@ async def create_asset_category(data: Dict[str, Any], current_user: User = Depen
         raise HTTPException(status_code=403, detail="Only admins can create asset categories")
     category = AssetCategory(**data)
     await db.asset_categories.insert_one(category.model_dump())
+    await response_cache.changed("asset_categories")
     return category.model_dump()
 
 @api_router.put("/asset-categories/{category_id}")
@@ -6318,6 +6486,7 @@ async def update_asset_category(category_id: str, data: Dict[str, Any], current_
     category = await db.asset_categories.find_one({"id": category_id}, {"_id": 0})
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
+    await response_cache.changed("asset_categories")
     return category
 
 @api_router.delete("/asset-categories/{category_id}")
@@ -6331,6 +6500,7 @@ async def delete_asset_category(category_id: str, current_user: User = Depends(g
     result = await db.asset_categories.delete_one({"id": category_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    await response_cache.changed("asset_categories")
     return {"message": "Category deleted"}
 
 # Assets
@@ -6375,7 +6545,7 @@ async def get_asset_stats(current_user: User = Depends(get_current_user)):
 async def get_my_assets(current_user: User = Depends(get_current_user)):
     """Get assets assigned to current user"""
     # Find employee record
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     if not employee:
@@ -6568,7 +6738,7 @@ async def get_asset_requests(
     
     # Non-admins can only see their own requests
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             employee = await db.employees.find_one({"work_email": current_user.email})
         if employee:
@@ -6582,7 +6752,7 @@ async def get_asset_requests(
 @api_router.get("/asset-requests/my")
 async def get_my_asset_requests(current_user: User = Depends(get_current_user)):
     """Get current user's asset requests"""
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     if not employee:
@@ -6601,7 +6771,7 @@ async def get_my_asset_requests(current_user: User = Depends(get_current_user)):
 @api_router.post("/asset-requests")
 async def create_asset_request(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     # Get employee info
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     if not employee:
@@ -6739,7 +6909,7 @@ class Announcement(BaseModel):
     attachments: List[str] = []
     created_by: Optional[str] = None
     created_by_name: Optional[str] = None
-    read_by: List[str] = []  # employee IDs who have read
+    read_count: int = 0  # readers are tracked in announcement_reads
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
@@ -6755,7 +6925,7 @@ class Memo(BaseModel):
     to_names: List[str] = []
     priority: str = "normal"  # low, normal, high, urgent
     requires_acknowledgment: bool = False
-    acknowledged_by: List[Dict[str, Any]] = []  # [{employee_id, employee_name, acknowledged_at}]
+    ack_count: int = 0  # acknowledgements are tracked in memo_acks
     status: str = "sent"  # draft, sent, archived
     attachments: List[str] = []
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -6797,6 +6967,13 @@ class SurveyResponse(BaseModel):
     answers: Dict[str, Any] = {}  # {question_id: answer}
     submitted_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for announcements, memos and surveys
+register_index("announcements", [("id", 1)], unique=True)
+register_index("announcements", [("status", 1), ("created_at", -1)])
+register_index("memos", [("id", 1)], unique=True)
+register_index("surveys", [("id", 1)], unique=True)
+register_index("survey_responses", [("survey_id", 1), ("employee_id", 1)])
+
 # ============= ANNOUNCEMENTS ROUTES =============
 
 @api_router.get("/announcements")
@@ -6808,14 +6985,14 @@ async def get_announcements(
     if status:
         query["status"] = status
     
+    employee = await get_employee_for_user(current_user.id)
+    if not employee:
+        employee = await db.employees.find_one({"work_email": current_user.email})
+    
     # Non-admins only see published announcements
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         query["status"] = "published"
         # Filter by target audience
-        employee = await db.employees.find_one({"user_id": current_user.id})
-        if not employee:
-            employee = await db.employees.find_one({"work_email": current_user.email})
-        
         if employee:
             branch_id = employee.get("branch_id")
             dept_id = employee.get("department_id")
@@ -6826,11 +7003,16 @@ async def get_announcements(
             ]
     
     announcements = await db.announcements.find(query, {"_id": 0}).sort([("pinned", -1), ("created_at", -1)]).to_list(100)
+    
+    if employee:
+        read = await announcement_reads.own_reads(db, [a["id"] for a in announcements], employee["id"])
+        for announcement in announcements:
+            announcement["is_read"] = announcement["id"] in read
     return announcements
 
 @api_router.get("/announcements/unread-count")
 async def get_unread_announcements_count(current_user: User = Depends(get_current_user)):
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -6843,7 +7025,6 @@ async def get_unread_announcements_count(current_user: User = Depends(get_curren
     
     query = {
         "status": "published",
-        "read_by": {"$nin": [employee_id]},
         "$or": [
             {"type": "company"},
             {"type": "branch", "target_ids": branch_id},
@@ -6851,7 +7032,7 @@ async def get_unread_announcements_count(current_user: User = Depends(get_curren
         ]
     }
     
-    count = await db.announcements.count_documents(query)
+    count = await announcement_reads.unread_count(db, query, employee_id)
     return {"count": count}
 
 @api_router.get("/announcements/{announcement_id}")
@@ -6886,6 +7067,9 @@ async def update_announcement(announcement_id: str, data: Dict[str, Any], curren
     if existing and existing.get("status") != "published" and data.get("status") == "published":
         data["published_at"] = datetime.now(timezone.utc).isoformat()
     
+    # Readers and their count are maintained by the read endpoint only
+    for field in ("read_by", "read_count", "is_read"):
+        data.pop(field, None)
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
     await db.announcements.update_one({"id": announcement_id}, {"$set": data})
     announcement = await db.announcements.find_one({"id": announcement_id}, {"_id": 0})
@@ -6895,17 +7079,17 @@ async def update_announcement(announcement_id: str, data: Dict[str, Any], curren
 
 @api_router.post("/announcements/{announcement_id}/read")
 async def mark_announcement_read(announcement_id: str, current_user: User = Depends(get_current_user)):
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
     if not employee:
         raise HTTPException(status_code=400, detail="Employee record not found")
     
-    await db.announcements.update_one(
-        {"id": announcement_id},
-        {"$addToSet": {"read_by": employee["id"]}}
-    )
+    if not await db.announcements.find_one({"id": announcement_id}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Announcement not found")
+    
+    await announcement_reads.mark(db, announcement_id, employee["id"])
     return {"message": "Marked as read"}
 
 @api_router.delete("/announcements/{announcement_id}")
@@ -6916,16 +7100,30 @@ async def delete_announcement(announcement_id: str, current_user: User = Depends
     result = await db.announcements.delete_one({"id": announcement_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
+    await announcement_reads.delete_for(db, announcement_id)
     return {"message": "Announcement deleted"}
 
 # ============= MEMOS ROUTES =============
 
+async def with_own_acknowledgment(memos: List[Dict[str, Any]], employee: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Attach the caller's own acknowledgement; everyone's is served by /memos/{id}/acknowledgments"""
+    acks = await memo_acks.own_reads(db, [m["id"] for m in memos], employee["id"]) if employee else {}
+    for memo in memos:
+        ack = acks.get(memo["id"])
+        memo["acknowledged"] = ack is not None
+        memo["acknowledged_by"] = [{
+            "employee_id": ack["employee_id"],
+            "employee_name": ack.get("employee_name"),
+            "acknowledged_at": ack.get("acknowledged_at")
+        }] if ack else []
+    return memos
+
 @api_router.get("/memos")
 async def get_memos(
     status: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -6948,12 +7146,12 @@ async def get_memos(
             return []
     
     memos = await db.memos.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return memos
+    return await with_own_acknowledgment(memos, employee)
 
 @api_router.get("/memos/my")
 async def get_my_memos(current_user: User = Depends(get_current_user)):
     """Get memos for current employee"""
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -6974,14 +7172,38 @@ async def get_my_memos(current_user: User = Depends(get_current_user)):
     }
     
     memos = await db.memos.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return memos
+    return await with_own_acknowledgment(memos, employee)
 
 @api_router.get("/memos/{memo_id}")
 async def get_memo(memo_id: str, current_user: User = Depends(get_current_user)):
     memo = await db.memos.find_one({"id": memo_id}, {"_id": 0})
     if not memo:
         raise HTTPException(status_code=404, detail="Memo not found")
-    return memo
+    employee = await get_employee_for_user(current_user.id)
+    if not employee:
+        employee = await db.employees.find_one({"work_email": current_user.email})
+    return (await with_own_acknowledgment([memo], employee))[0]
+
+@api_router.get("/memos/{memo_id}/acknowledgments")
+async def get_memo_acknowledgments(
+    memo_id: str,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Who acknowledged a memo, newest first, in keyset pages or as NDJSON (admin only)"""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
+        raise HTTPException(status_code=403, detail="Only admins can view memo acknowledgments")
+    
+    return await list_or_page(
+        db[memo_acks.collection],
+        {"memo_id": memo_id},
+        limit=limit,
+        cursor=cursor,
+        stream=stream,
+        sort_field="acknowledged_at"
+    )
 
 @api_router.post("/memos")
 async def create_memo(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -7022,6 +7244,9 @@ async def update_memo(memo_id: str, data: Dict[str, Any], current_user: User = D
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         raise HTTPException(status_code=403, detail="Only admins can update memos")
     
+    # Acknowledgements and their count are maintained by the acknowledge endpoint only
+    for field in ("acknowledged_by", "ack_count", "acknowledged"):
+        data.pop(field, None)
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
     await db.memos.update_one({"id": memo_id}, {"$set": data})
     memo = await db.memos.find_one({"id": memo_id}, {"_id": 0})
@@ -7031,28 +7256,18 @@ async def update_memo(memo_id: str, data: Dict[str, Any], current_user: User = D
 
 @api_router.post("/memos/{memo_id}/acknowledge")
 async def acknowledge_memo(memo_id: str, current_user: User = Depends(get_current_user)):
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
     if not employee:
         raise HTTPException(status_code=400, detail="Employee record not found")
     
-    acknowledgment = {
-        "employee_id": employee["id"],
-        "employee_name": employee.get("full_name", "Unknown"),
-        "acknowledged_at": datetime.now(timezone.utc).isoformat()
-    }
+    if not await db.memos.find_one({"id": memo_id}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Memo not found")
     
-    # Check if already acknowledged
-    memo = await db.memos.find_one({"id": memo_id})
-    if memo:
-        existing_acks = memo.get("acknowledged_by", [])
-        if not any(a["employee_id"] == employee["id"] for a in existing_acks):
-            await db.memos.update_one(
-                {"id": memo_id},
-                {"$push": {"acknowledged_by": acknowledgment}}
-            )
+    # A repeat acknowledgement keeps the first one
+    await memo_acks.mark(db, memo_id, employee["id"], employee_name=employee.get("full_name", "Unknown"))
     
     return {"message": "Memo acknowledged"}
 
@@ -7064,6 +7279,7 @@ async def delete_memo(memo_id: str, current_user: User = Depends(get_current_use
     result = await db.memos.delete_one({"id": memo_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Memo not found")
+    await memo_acks.delete_for(db, memo_id)
     return {"message": "Memo deleted"}
 
 # ============= SURVEYS ROUTES =============
@@ -7080,7 +7296,7 @@ async def get_surveys(
     # Non-admins only see active surveys targeted at them
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         query["status"] = "active"
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             employee = await db.employees.find_one({"work_email": current_user.email})
         
@@ -7100,7 +7316,7 @@ async def get_surveys(
 @api_router.get("/surveys/my")
 async def get_my_surveys(current_user: User = Depends(get_current_user)):
     """Get active surveys for current employee"""
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -7154,66 +7370,7 @@ async def get_survey_results(survey_id: str, current_user: User = Depends(get_cu
     
     responses = await db.survey_responses.find({"survey_id": survey_id}, {"_id": 0}).to_list(1000)
     
-    # Aggregate results
-    results = {
-        "survey": survey,
-        "total_responses": len(responses),
-        "questions": []
-    }
-    
-    for question in survey.get("questions", []):
-        q_id = question.get("id")
-        q_type = question.get("type")
-        q_results = {
-            "question": question,
-            "responses": []
-        }
-        
-        if q_type in ["single_choice", "multiple_choice"]:
-            # Count options
-            option_counts = {}
-            for opt in question.get("options", []):
-                option_counts[opt] = 0
-            
-            for resp in responses:
-                answer = resp.get("answers", {}).get(q_id)
-                if isinstance(answer, list):
-                    for a in answer:
-                        if a in option_counts:
-                            option_counts[a] += 1
-                elif answer in option_counts:
-                    option_counts[answer] += 1
-            
-            q_results["summary"] = option_counts
-        elif q_type in ["rating", "scale"]:
-            # Calculate average
-            values = []
-            for resp in responses:
-                answer = resp.get("answers", {}).get(q_id)
-                if answer is not None:
-                    try:
-                        values.append(float(answer))
-                    except:
-                        pass
-            
-            if values:
-                q_results["summary"] = {
-                    "average": sum(values) / len(values),
-                    "min": min(values),
-                    "max": max(values),
-                    "count": len(values)
-                }
-        else:
-            # Text responses
-            q_results["responses"] = [
-                resp.get("answers", {}).get(q_id)
-                for resp in responses
-                if resp.get("answers", {}).get(q_id)
-            ]
-        
-        results["questions"].append(q_results)
-    
-    return results
+    return await run_cpu_bound(aggregate_survey_results, survey, responses)
 
 @api_router.post("/surveys")
 async def create_survey(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -7254,7 +7411,7 @@ async def submit_survey_response(survey_id: str, data: Dict[str, Any], current_u
     if survey.get("status") != "active":
         raise HTTPException(status_code=400, detail="Survey is not active")
     
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -7314,7 +7471,7 @@ async def get_communications_stats(current_user: User = Depends(get_current_user
     memos_total = await db.memos.count_documents({})
     memos_pending_ack = await db.memos.count_documents({
         "requires_acknowledgment": True,
-        "acknowledged_by": {"$size": 0}
+        "ack_count": {"$not": {"$gt": 0}}
     })
     surveys_total = await db.surveys.count_documents({})
     surveys_active = await db.surveys.count_documents({"status": "active"})
@@ -7374,6 +7531,12 @@ class ComplaintStatusHistory(BaseModel):
     notes: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for complaints models
+register_index("complaints", [("id", 1)], unique=True)
+register_index("complaints", [("status", 1), ("created_at", -1)])
+register_index("complaint_comments", [("complaint_id", 1)])
+register_index("complaint_status_history", [("complaint_id", 1)])
+
 # ============= COMPLAINTS ROUTES =============
 
 COMPLAINT_CATEGORIES = [
@@ -7388,6 +7551,7 @@ COMPLAINT_CATEGORIES = [
 ]
 
 @api_router.get("/complaints/categories")
+@response_cache.cached(cache_control=STATIC_REFERENCE_CACHE_CONTROL)
 async def get_complaint_categories(current_user: User = Depends(get_current_user)):
     return COMPLAINT_CATEGORIES
 
@@ -7403,7 +7567,7 @@ async def get_complaints(
     
     # Non-admins can only see their own non-anonymous complaints
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             employee = await db.employees.find_one({"work_email": current_user.email})
         
@@ -7430,7 +7594,7 @@ async def get_complaints(
 @api_router.get("/complaints/my")
 async def get_my_complaints(current_user: User = Depends(get_current_user)):
     """Get complaints submitted by current user (excludes anonymous)"""
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -7491,7 +7655,7 @@ async def get_complaint(complaint_id: str, current_user: User = Depends(get_curr
     
     # Check access
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or complaint.get("employee_id") != employee["id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -7520,7 +7684,7 @@ async def get_complaint_history(complaint_id: str, current_user: User = Depends(
 async def create_complaint(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     employee = None
     if not data.get("anonymous"):
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             employee = await db.employees.find_one({"work_email": current_user.email})
         
@@ -7601,7 +7765,7 @@ async def add_complaint_comment(complaint_id: str, data: Dict[str, Any], current
     
     # Check if this is the complaint owner posting anonymously
     if complaint.get("anonymous") and complaint.get("employee_id"):
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if employee and employee["id"] == complaint["employee_id"]:
             author_name = "Complainant (Anonymous)"
             author_id = None
@@ -7767,6 +7931,12 @@ class DisciplinaryNote(BaseModel):
     is_internal: bool = True  # Only visible to admins
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for disciplinary models
+register_index("disciplinary_actions", [("id", 1)], unique=True)
+register_index("disciplinary_actions", [("employee_id", 1), ("status", 1)])
+register_index("disciplinary_appeals", [("id", 1)], unique=True)
+register_index("disciplinary_notes", [("disciplinary_action_id", 1), ("created_at", 1)])
+
 # ============= DISCIPLINARY ACTIONS ROUTES =============
 
 DISCIPLINARY_ACTION_TYPES = [
@@ -7794,7 +7964,7 @@ async def get_disciplinary_actions(
     
     # Non-admins can only see their own records
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             employee = await db.employees.find_one({"work_email": current_user.email})
         if employee:
@@ -7816,7 +7986,7 @@ async def get_disciplinary_actions(
 @api_router.get("/disciplinary/actions/my")
 async def get_my_disciplinary_actions(current_user: User = Depends(get_current_user)):
     """Get disciplinary actions for current employee"""
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -7871,7 +8041,7 @@ async def get_disciplinary_action(action_id: str, current_user: User = Depends(g
     
     # Check access
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
-        employee = await db.employees.find_one({"user_id": current_user.id})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or action.get("employee_id") != employee["id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -7960,7 +8130,7 @@ async def acknowledge_disciplinary_action(action_id: str, data: Dict[str, Any],
         raise HTTPException(status_code=404, detail="Disciplinary action not found")
     
     # Verify employee is acknowledging their own action
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -8011,7 +8181,7 @@ async def submit_disciplinary_appeal(action_id: str, data: Dict[str, Any], curre
         raise HTTPException(status_code=404, detail="Disciplinary action not found")
     
     # Verify employee is appealing their own action
-    employee = await db.employees.find_one({"user_id": current_user.id})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         employee = await db.employees.find_one({"work_email": current_user.email})
     
@@ -8220,6 +8390,11 @@ class TravelRequest(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for travel models
+register_index("travel_requests", [("id", 1)], unique=True)
+register_index("travel_requests", [("employee_id", 1), ("created_at", -1)])
+register_index("travel_requests", [("status", 1)])
+
 # ============= TRAVEL API ENDPOINTS =============
 
 @api_router.get("/travel/stats")
@@ -8265,7 +8440,7 @@ async def get_travel_stats(current_user: User = Depends(get_current_user)):
 @api_router.get("/travel/my")
 async def get_my_travel_requests(current_user: User = Depends(get_current_user)):
     """Get current employee's travel requests"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         return []
     
@@ -8287,7 +8462,7 @@ async def get_travel_requests(
     
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
         # Non-admins can only see their own requests
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if employee:
             query["employee_id"] = employee["id"]
         else:
@@ -8312,7 +8487,7 @@ async def get_travel_request(request_id: str, current_user: User = Depends(get_c
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -8322,7 +8497,7 @@ async def get_travel_request(request_id: str, current_user: User = Depends(get_c
 async def create_travel_request(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Create a new travel request"""
     # Get employee info
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -8366,7 +8541,7 @@ async def update_travel_request(request_id: str, data: Dict[str, Any], current_u
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         # Employees can only update pending requests
@@ -8444,7 +8619,7 @@ async def start_travel(request_id: str, current_user: User = Depends(get_current
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -8468,7 +8643,7 @@ async def complete_travel(request_id: str, data: Dict[str, Any], current_user: U
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -8509,7 +8684,7 @@ async def cancel_travel_request(request_id: str, current_user: User = Depends(ge
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -8532,7 +8707,7 @@ async def delete_travel_request(request_id: str, current_user: User = Depends(ge
     
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         if request["status"] != "pending":
@@ -8643,6 +8818,12 @@ class Nomination(BaseModel):
     
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for recognition models
+register_index("recognition_categories", [("id", 1)], unique=True)
+register_index("recognitions", [("id", 1)], unique=True)
+register_index("recognitions", [("recipient_id", 1), ("created_at", -1)])
+register_index("nominations", [("id", 1)], unique=True)
+
 # ============= RECOGNITION API ENDPOINTS =============
 
 @api_router.get("/recognition/categories")
@@ -8758,7 +8939,7 @@ async def get_recognition_wall(
 @api_router.get("/recognition/my")
 async def get_my_recognitions(current_user: User = Depends(get_current_user)):
     """Get current user's recognitions (received and given)"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         return {"received": [], "given": [], "total_points": 0}
     
@@ -8844,7 +9025,7 @@ async def get_recognitions(
 async def create_recognition(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Give recognition to someone"""
     # Get giver info
-    giver = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    giver = await get_employee_for_user(current_user.id)
     if not giver:
         # Admin without employee profile
         giver_id = current_user.id
@@ -8964,7 +9145,7 @@ async def get_nominations(
     
     query = {}
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if employee:
             query["nominator_id"] = employee["id"]
         else:
@@ -8980,7 +9161,7 @@ async def get_nominations(
 async def create_nomination(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Create a nomination"""
     # Get nominator info
-    nominator = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    nominator = await get_employee_for_user(current_user.id)
     if not nominator:
         nominator_id = current_user.id
         nominator_name = current_user.full_name
@@ -9153,6 +9334,17 @@ class CalendarEvent(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for team calendar models
+register_index("calendar_events", [("id", 1)], unique=True)
+register_index("calendar_events", [("start_date", 1), ("end_date", 1)])
+register_index("calendar_events", [("end_date", 1), ("start_date", 1)])
+register_index("holidays", [("date", 1)])
+# Interval-overlap reads for the calendar: end_date >= range start, then start_date <= range end
+register_index("leaves", [("status", 1), ("end_date", 1), ("start_date", 1)])
+# Month-day keys ("MM-DD") for birthday and anniversary lookups
+register_index("employees", [("birth_md", 1)])
+register_index("employees", [("hire_md", 1)])
+
 # ============= TEAM CALENDAR API ENDPOINTS =============
 
 @api_router.get("/calendar/events")
@@ -9166,139 +9358,12 @@ async def get_calendar_events(
     include_anniversaries: bool = True,
     current_user: User = Depends(get_current_user)
 ):
-    """Get calendar events with filters"""
-    is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
-    
-    # Build query for custom events
-    query = {"status": {"$ne": "cancelled"}}
-    
-    if start_date and end_date:
-        query["$or"] = [
-            {"start_date": {"$gte": start_date, "$lte": end_date}},
-            {"end_date": {"$gte": start_date, "$lte": end_date}},
-            {"$and": [{"start_date": {"$lte": start_date}}, {"end_date": {"$gte": end_date}}]}
-        ]
-    
-    if event_type:
-        query["event_type"] = event_type
-    
-    if department_id:
-        query["department_id"] = department_id
-    
-    # Get custom events
-    events = await db.calendar_events.find(query, {"_id": 0}).to_list(500)
-    
-    # Get approved leaves as events
-    if include_leaves and start_date and end_date:
-        leave_query = {
-            "status": "approved",
-            "$or": [
-                {"start_date": {"$gte": start_date, "$lte": end_date}},
-                {"end_date": {"$gte": start_date, "$lte": end_date}},
-            ]
-        }
-        leaves = await db.leaves.find(leave_query, {"_id": 0}).to_list(200)
-        
-        for leave in leaves:
-            employee = await db.employees.find_one({"id": leave.get("employee_id")}, {"_id": 0})
-            emp_name = employee.get("full_name", "Employee") if employee else "Employee"
-            
-            events.append({
-                "id": f"leave-{leave.get('id', '')}",
-                "title": f"{emp_name} - {leave.get('leave_type', 'Leave')}",
-                "description": leave.get("reason", ""),
-                "event_type": "leave",
-                "start_date": leave.get("start_date"),
-                "end_date": leave.get("end_date"),
-                "all_day": True,
-                "color": "#f59e0b",
-                "organizer_name": emp_name,
-                "is_public": True,
-                "linked_leave_id": leave.get("id")
-            })
-    
-    # Get birthdays
-    if include_birthdays and start_date and end_date:
-        # Extract month-day range for birthday matching
-        employees = await db.employees.find({"date_of_birth": {"$exists": True, "$ne": None}}, {"_id": 0}).to_list(500)
-        
-        start = datetime.fromisoformat(start_date.replace('Z', '+00:00')) if start_date else datetime.now(timezone.utc)
-        end = datetime.fromisoformat(end_date.replace('Z', '+00:00')) if end_date else start + timedelta(days=30)
-        
-        for emp in employees:
-            dob = emp.get("date_of_birth")
-            if dob:
-                try:
-                    birth_date = datetime.fromisoformat(dob.replace('Z', '+00:00'))
-                    # Check each year in range
-                    for year in range(start.year, end.year + 1):
-                        birthday_this_year = birth_date.replace(year=year)
-                        if start <= birthday_this_year <= end:
-                            events.append({
-                                "id": f"birthday-{emp.get('id')}-{year}",
-                                "title": f"🎂 {emp.get('full_name', 'Employee')}'s Birthday",
-                                "event_type": "birthday",
-                                "start_date": birthday_this_year.strftime("%Y-%m-%d"),
-                                "end_date": birthday_this_year.strftime("%Y-%m-%d"),
-                                "all_day": True,
-                                "color": "#ec4899",
-                                "is_public": True
-                            })
-                except:
-                    pass
-    
-    # Get work anniversaries
-    if include_anniversaries and start_date and end_date:
-        employees = await db.employees.find({"date_of_joining": {"$exists": True, "$ne": None}}, {"_id": 0}).to_list(500)
-        
-        start = datetime.fromisoformat(start_date.replace('Z', '+00:00')) if start_date else datetime.now(timezone.utc)
-        end = datetime.fromisoformat(end_date.replace('Z', '+00:00')) if end_date else start + timedelta(days=30)
-        
-        for emp in employees:
-            join_date = emp.get("date_of_joining")
-            if join_date:
-                try:
-                    joined = datetime.fromisoformat(join_date.replace('Z', '+00:00'))
-                    for year in range(start.year, end.year + 1):
-                        if year > joined.year:  # Only show anniversaries after first year
-                            anniversary = joined.replace(year=year)
-                            years = year - joined.year
-                            if start <= anniversary <= end:
-                                events.append({
-                                    "id": f"anniversary-{emp.get('id')}-{year}",
-                                    "title": f"🎉 {emp.get('full_name', 'Employee')}'s {years} Year Anniversary",
-                                    "event_type": "anniversary",
-                                    "start_date": anniversary.strftime("%Y-%m-%d"),
-                                    "end_date": anniversary.strftime("%Y-%m-%d"),
-                                    "all_day": True,
-                                    "color": "#8b5cf6",
-                                    "is_public": True
-                                })
-                except:
-                    pass
-    
-    # Get holidays
-    holidays = await db.holidays.find({}, {"_id": 0}).to_list(100)
-    for holiday in holidays:
-        if start_date and end_date:
-            h_date = holiday.get("date", "")
-            if h_date >= start_date and h_date <= end_date:
-                events.append({
-                    "id": f"holiday-{holiday.get('id', '')}",
-                    "title": f"🏖️ {holiday.get('name', 'Holiday')}",
-                    "event_type": "holiday",
-                    "start_date": h_date,
-                    "end_date": h_date,
-                    "all_day": True,
-                    "color": "#10b981",
-                    "is_public": True,
-                    "is_company_wide": True
-                })
-    
-    # Sort by start date
-    events.sort(key=lambda x: x.get("start_date", ""))
-    
-    return events
+    """Get calendar events with filters (assembled and cached by services.team_calendar)"""
+    return await team_calendar.get_range(
+        db, start_date, end_date, event_type=event_type, department_id=department_id,
+        include_leaves=include_leaves, include_birthdays=include_birthdays,
+        include_anniversaries=include_anniversaries
+    )
 
 @api_router.post("/calendar/events")
 async def create_calendar_event(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -9306,7 +9371,7 @@ async def create_calendar_event(data: Dict[str, Any], current_user: User = Depen
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     
     # Get organizer info
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     
     organizer_id = employee["id"] if employee else current_user.id
     organizer_name = employee.get("full_name") if employee else current_user.full_name
@@ -9333,6 +9398,7 @@ async def create_calendar_event(data: Dict[str, Any], current_user: User = Depen
     
     event = CalendarEvent(**event_data)
     await db.calendar_events.insert_one(event.model_dump())
+    invalidate_calendar("events")
     
     return event.model_dump()
 
@@ -9352,7 +9418,7 @@ async def update_calendar_event(event_id: str, data: Dict[str, Any], current_use
         raise HTTPException(status_code=404, detail="Event not found")
     
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     organizer_id = employee["id"] if employee else current_user.id
     
     # Check permission
@@ -9361,6 +9427,7 @@ async def update_calendar_event(event_id: str, data: Dict[str, Any], current_use
     
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
     await db.calendar_events.update_one({"id": event_id}, {"$set": data})
+    invalidate_calendar("events")
     
     return await db.calendar_events.find_one({"id": event_id}, {"_id": 0})
 
@@ -9372,13 +9439,14 @@ async def delete_calendar_event(event_id: str, current_user: User = Depends(get_
         raise HTTPException(status_code=404, detail="Event not found")
     
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     organizer_id = employee["id"] if employee else current_user.id
     
     if not is_admin and event["organizer_id"] != organizer_id:
         raise HTTPException(status_code=403, detail="Only the organizer can delete this event")
     
     await db.calendar_events.delete_one({"id": event_id})
+    invalidate_calendar("events")
     return {"message": "Event deleted"}
 
 @api_router.post("/calendar/events/{event_id}/respond")
@@ -9388,7 +9456,7 @@ async def respond_to_event(event_id: str, data: Dict[str, Any], current_user: Us
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     attendee_id = employee["id"] if employee else current_user.id
     
     response_status = data.get("status", "accepted")  # accepted, declined, tentative
@@ -9411,6 +9479,7 @@ async def respond_to_event(event_id: str, data: Dict[str, Any], current_user: Us
         })
     
     await db.calendar_events.update_one({"id": event_id}, {"$set": {"attendees": attendees}})
+    invalidate_calendar("events")
     
     return {"message": f"Response recorded: {response_status}"}
 
@@ -9466,14 +9535,7 @@ async def get_upcoming_events(
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     end_date = (datetime.now(timezone.utc) + timedelta(days=days)).strftime("%Y-%m-%d")
     
-    events = await get_calendar_events(
-        start_date=today,
-        end_date=end_date,
-        include_leaves=True,
-        include_birthdays=True,
-        include_anniversaries=True,
-        current_user=current_user
-    )
+    events = await team_calendar.get_range(db, today, end_date)
     
     return events[:20]  # Limit to 20 events
 
@@ -9584,6 +9646,12 @@ class TalentPoolEntry(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for succession planning models
+register_index("key_positions", [("id", 1)], unique=True)
+register_index("succession_candidates", [("id", 1)], unique=True)
+register_index("succession_candidates", [("position_id", 1), ("status", 1)])
+register_index("talent_pool", [("id", 1)], unique=True)
+
 # ============= SUCCESSION PLANNING API ENDPOINTS =============
 
 @api_router.get("/succession/stats")
@@ -10010,7 +10078,7 @@ async def get_nine_box_data(current_user: User = Depends(get_current_user)):
 @api_router.get("/succession/my-status")
 async def get_my_succession_status(current_user: User = Depends(get_current_user)):
     """Get current user's succession status (if in talent pool or as candidate)"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         return {"in_talent_pool": False, "succession_positions": []}
     
@@ -10110,9 +10178,17 @@ class SkillEndorsement(BaseModel):
     
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for skills models
+register_index("skill_categories", [("id", 1)], unique=True)
+register_index("skills", [("id", 1)], unique=True)
+register_index("employee_skills", [("id", 1)], unique=True)
+register_index("employee_skills", [("employee_id", 1)])
+register_index("skill_endorsements", [("employee_skill_id", 1)])
+
 # ============= SKILLS API ENDPOINTS =============
 
 @api_router.get("/skills/categories")
+@response_cache.cached("skill_categories")
 async def get_skill_categories(current_user: User = Depends(get_current_user)):
     """Get all skill categories"""
     categories = await db.skill_categories.find({"is_active": True}, {"_id": 0}).to_list(100)
@@ -10130,6 +10206,7 @@ async def get_skill_categories(current_user: User = Depends(get_current_user)):
         for cat in default_categories:
             cat["created_at"] = datetime.now(timezone.utc).isoformat()
         await db.skill_categories.insert_many(default_categories)
+        await response_cache.changed("skill_categories")
         categories = await db.skill_categories.find({"is_active": True}, {"_id": 0}).to_list(100)
     
     return categories
@@ -10142,6 +10219,7 @@ async def create_skill_category(data: Dict[str, Any], current_user: User = Depen
     
     category = SkillCategory(**data)
     await db.skill_categories.insert_one(category.model_dump())
+    await response_cache.changed("skill_categories")
     return category.model_dump()
 
 @api_router.put("/skills/categories/{category_id}")
@@ -10151,6 +10229,7 @@ async def update_skill_category(category_id: str, data: Dict[str, Any], current_
         raise HTTPException(status_code=403, detail="Only admins can manage skill categories")
     
     await db.skill_categories.update_one({"id": category_id}, {"$set": data})
+    await response_cache.changed("skill_categories")
     return await db.skill_categories.find_one({"id": category_id}, {"_id": 0})
 
 @api_router.delete("/skills/categories/{category_id}")
@@ -10160,6 +10239,7 @@ async def delete_skill_category(category_id: str, current_user: User = Depends(g
         raise HTTPException(status_code=403, detail="Only admins can manage skill categories")
     
     await db.skill_categories.update_one({"id": category_id}, {"$set": {"is_active": False}})
+    await response_cache.changed("skill_categories")
     return {"message": "Category deactivated"}
 
 @api_router.get("/skills/library")
@@ -10291,7 +10371,7 @@ async def get_skills_stats(current_user: User = Depends(get_current_user)):
 @api_router.get("/skills/my")
 async def get_my_skills(current_user: User = Depends(get_current_user)):
     """Get current user's skills"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         return []
     
@@ -10313,7 +10393,7 @@ async def get_my_skills(current_user: User = Depends(get_current_user)):
 @api_router.post("/skills/my")
 async def add_my_skill(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Add a skill to current user's profile"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -10351,7 +10431,7 @@ async def add_my_skill(data: Dict[str, Any], current_user: User = Depends(get_cu
 @api_router.put("/skills/my/{skill_id}")
 async def update_my_skill(skill_id: str, data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Update own skill"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -10367,7 +10447,7 @@ async def update_my_skill(skill_id: str, data: Dict[str, Any], current_user: Use
 @api_router.delete("/skills/my/{skill_id}")
 async def delete_my_skill(skill_id: str, current_user: User = Depends(get_current_user)):
     """Remove a skill from own profile"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -10407,7 +10487,7 @@ async def endorse_skill(employee_skill_id: str, data: Dict[str, Any], current_us
         raise HTTPException(status_code=404, detail="Skill not found")
     
     # Get endorser info
-    endorser = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    endorser = await get_employee_for_user(current_user.id)
     endorser_id = endorser["id"] if endorser else current_user.id
     endorser_name = endorser.get("full_name") if endorser else current_user.full_name
     
@@ -10447,7 +10527,7 @@ async def endorse_skill(employee_skill_id: str, data: Dict[str, Any], current_us
 @api_router.delete("/skills/endorse/{endorsement_id}")
 async def remove_endorsement(endorsement_id: str, current_user: User = Depends(get_current_user)):
     """Remove own endorsement"""
-    endorser = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    endorser = await get_employee_for_user(current_user.id)
     endorser_id = endorser["id"] if endorser else current_user.id
     
     endorsement = await db.skill_endorsements.find_one({"id": endorsement_id}, {"_id": 0})
@@ -10647,6 +10727,12 @@ class OvertimePolicy(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for overtime models
+register_index("overtime_requests", [("id", 1)], unique=True)
+register_index("overtime_requests", [("employee_id", 1), ("date", -1)])
+register_index("overtime_requests", [("status", 1)])
+register_index("overtime_policies", [("id", 1)], unique=True)
+
 # ============= OVERTIME API ENDPOINTS =============
 
 @api_router.get("/overtime/stats")
@@ -10674,7 +10760,7 @@ async def get_overtime_stats(
     query = {"date": {"$gte": start_date, "$lt": end_date}}
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return {"total_requests": 0, "total_hours": 0, "approved_hours": 0, "pending_hours": 0}
         query["employee_id"] = employee["id"]
@@ -10756,7 +10842,7 @@ async def get_overtime_requests(
     query = {}
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return []
         query["employee_id"] = employee["id"]
@@ -10847,7 +10933,7 @@ async def get_overtime_request(request_id: str, current_user: User = Depends(get
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -10857,7 +10943,7 @@ async def get_overtime_request(request_id: str, current_user: User = Depends(get
 async def create_overtime_request(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Create a new overtime request"""
     # Get employee info
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -10928,7 +11014,7 @@ async def update_overtime_request(request_id: str, data: Dict[str, Any], current
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         # Employees can only update pending requests
@@ -10965,7 +11051,7 @@ async def delete_overtime_request(request_id: str, current_user: User = Depends(
     
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != request["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         # Employees can only delete pending requests
@@ -11199,6 +11285,14 @@ class TimesheetSettings(BaseModel):
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for timesheet models
+register_index("timesheets", [("id", 1)], unique=True)
+register_index("timesheets", [("employee_id", 1), ("period_start", -1)])
+register_index("timesheets", [("status", 1)])
+register_index("time_entries", [("id", 1)], unique=True)
+register_index("time_entries", [("timesheet_id", 1)])
+register_index("time_entries", [("project_id", 1)])
+
 # ============= TIMESHEET API ENDPOINTS =============
 
 def get_week_dates(date_str: str = None):
@@ -11231,7 +11325,7 @@ async def get_timesheet_stats(
     query = {"year": year, "month": month}
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return {"total_timesheets": 0, "total_hours": 0}
         query["employee_id"] = employee["id"]
@@ -11321,7 +11415,7 @@ async def get_timesheets(
     query = {}
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return []
         query["employee_id"] = employee["id"]
@@ -11342,7 +11436,7 @@ async def get_timesheets(
 @api_router.get("/timesheets/current")
 async def get_current_timesheet(current_user: User = Depends(get_current_user)):
     """Get or create current week's timesheet for the user"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -11406,7 +11500,7 @@ async def get_timesheet(timesheet_id: str, current_user: User = Depends(get_curr
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != timesheet["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -11421,7 +11515,7 @@ async def get_timesheet(timesheet_id: str, current_user: User = Depends(get_curr
 @api_router.post("/timesheets")
 async def create_timesheet(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Create a new timesheet"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -11471,7 +11565,7 @@ async def update_timesheet(timesheet_id: str, data: Dict[str, Any], current_user
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != timesheet["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         if timesheet["status"] not in ["draft", "revision_requested"]:
@@ -11491,7 +11585,7 @@ async def delete_timesheet(timesheet_id: str, current_user: User = Depends(get_c
     
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != timesheet["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         if timesheet["status"] != "draft":
@@ -11510,7 +11604,7 @@ async def submit_timesheet(timesheet_id: str, current_user: User = Depends(get_c
     if not timesheet:
         raise HTTPException(status_code=404, detail="Timesheet not found")
     
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee or employee["id"] != timesheet["employee_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
@@ -11619,7 +11713,7 @@ async def get_time_entries(
     query = {}
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return []
         query["employee_id"] = employee["id"]
@@ -11642,7 +11736,7 @@ async def get_time_entries(
 @api_router.post("/time-entries")
 async def create_time_entry(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Create a new time entry"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=400, detail="Employee profile not found")
     
@@ -11745,7 +11839,7 @@ async def update_time_entry(entry_id: str, data: Dict[str, Any], current_user: U
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != entry["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -11792,7 +11886,7 @@ async def delete_time_entry(entry_id: str, current_user: User = Depends(get_curr
     
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or employee["id"] != entry["employee_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
@@ -11997,6 +12091,14 @@ class ProjectComment(BaseModel):
     
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Indexes for project models
+register_index("projects", [("id", 1)], unique=True)
+register_index("project_members", [("project_id", 1)])
+register_index("project_members", [("employee_id", 1)])
+register_index("project_tasks", [("id", 1)], unique=True)
+register_index("project_tasks", [("project_id", 1)])
+register_index("project_comments", [("project_id", 1)])
+
 # ============= PROJECT API ENDPOINTS =============
 
 @api_router.get("/projects/stats")
@@ -12007,7 +12109,7 @@ async def get_project_stats(current_user: User = Depends(get_current_user)):
     if is_admin:
         projects = await db.projects.find({"is_archived": False}, {"_id": 0}).to_list(1000)
     else:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return {"total_projects": 0}
         
@@ -12075,7 +12177,7 @@ async def get_projects(
     if is_admin:
         projects = await db.projects.find(query, {"_id": 0}).sort("created_at", -1).to_list(500)
     else:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return []
         
@@ -12106,7 +12208,7 @@ async def get_project(project_id: str, current_user: User = Depends(get_current_
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if employee:
             membership = await db.project_members.find_one({
                 "project_id": project_id,
@@ -12166,7 +12268,7 @@ async def create_project(data: Dict[str, Any], current_user: User = Depends(get_
     await db.projects.insert_one(project.model_dump())
     
     # Add creator as owner member
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if employee:
         owner_member = ProjectMember(
             project_id=project.id,
@@ -12193,7 +12295,7 @@ async def update_project(project_id: str, data: Dict[str, Any], current_user: Us
     # Check access
     is_admin = current_user.role in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if employee:
             membership = await db.project_members.find_one({
                 "project_id": project_id,
@@ -12631,6 +12733,13 @@ class BenefitClaim(BaseModel):
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 
+# Indexes for benefits models
+register_index("benefit_plans", [("id", 1)], unique=True)
+register_index("benefit_enrollments", [("id", 1)], unique=True)
+register_index("benefit_enrollments", [("employee_id", 1)])
+register_index("benefit_claims", [("id", 1)], unique=True)
+register_index("benefit_claims", [("employee_id", 1)])
+
 # ============= BENEFITS API ENDPOINTS =============
 
 @api_router.get("/benefits/stats")
@@ -12644,7 +12753,7 @@ async def get_benefits_stats(current_user: User = Depends(get_current_user)):
         enrollments = await db.benefit_enrollments.find({"status": "active"}, {"_id": 0}).to_list(5000)
         claims = await db.benefit_claims.find({}, {"_id": 0}).to_list(5000)
     else:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return {"total_plans": len(plans), "my_enrollments": 0}
         enrollments = await db.benefit_enrollments.find({"employee_id": employee["id"], "status": "active"}, {"_id": 0}).to_list(100)
@@ -12768,7 +12877,7 @@ async def get_benefit_enrollments(
     
     if not is_admin:
         # Employees can only see their own enrollments
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return []
         query["employee_id"] = employee["id"]
@@ -12787,7 +12896,7 @@ async def get_benefit_enrollments(
 @api_router.get("/benefits/enrollments/my")
 async def get_my_enrollments(current_user: User = Depends(get_current_user)):
     """Get current user's enrollments"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         return []
     
@@ -12820,7 +12929,7 @@ async def create_enrollment(data: Dict[str, Any], current_user: User = Depends(g
     if is_admin and data.get("employee_id"):
         employee = await db.employees.find_one({"id": data["employee_id"]}, {"_id": 0})
     else:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
     
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
@@ -12859,7 +12968,7 @@ async def update_enrollment(enrollment_id: str, data: Dict[str, Any], current_us
     
     is_admin = current_user.role in ["super_admin", "corp_admin"]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or enrollment["employee_id"] != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -12911,7 +13020,7 @@ async def get_benefit_claims(
     query = {}
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return []
         query["employee_id"] = employee["id"]
@@ -12926,7 +13035,7 @@ async def get_benefit_claims(
 @api_router.post("/benefits/claims")
 async def submit_claim(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Submit a benefit claim"""
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -12964,7 +13073,7 @@ async def update_claim(claim_id: str, data: Dict[str, Any], current_user: User =
     is_admin = current_user.role in ["super_admin", "corp_admin"]
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or claim["employee_id"] != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized")
         if claim["status"] != "submitted":
@@ -12994,7 +13103,7 @@ async def delete_claim(claim_id: str, current_user: User = Depends(get_current_u
     
     is_admin = current_user.role in ["super_admin", "corp_admin"]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or claim["employee_id"] != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized")
         if claim["status"] != "submitted":
@@ -13246,6 +13355,12 @@ class Ticket(BaseModel):
     due_date: Optional[str] = None
 
 
+# Indexes for ticket models
+register_index("tickets", [("id", 1)], unique=True)
+register_index("tickets", [("status", 1), ("created_at", -1)])
+register_index("tickets", [("requester_id", 1), ("created_at", -1)])
+register_index("ticket_comments", [("ticket_id", 1)])
+
 # ============= TICKET MANAGEMENT API ENDPOINTS =============
 
 async def generate_ticket_number():
@@ -13271,7 +13386,7 @@ async def get_ticket_stats(current_user: User = Depends(get_current_user)):
     if is_admin:
         query = {}
     else:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return {"total": 0, "open": 0, "in_progress": 0, "resolved": 0}
         query = {"requester_id": employee["id"]}
@@ -13335,7 +13450,7 @@ async def get_tickets(
     query = {}
     
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee:
             return []
         query["requester_id"] = employee["id"]
@@ -13622,7 +13737,7 @@ async def get_ticket(ticket_id: str, current_user: User = Depends(get_current_us
     # Check access
     is_admin = current_user.role in ["super_admin", "corp_admin"]
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or ticket["requester_id"] != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -13645,7 +13760,7 @@ async def get_ticket(ticket_id: str, current_user: User = Depends(get_current_us
 async def create_ticket(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
     """Create a new ticket"""
     # Get employee info
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     
     if employee:
         requester_id = employee["id"]
@@ -13721,6 +13836,7 @@ async def create_ticket(data: Dict[str, Any], current_user: User = Depends(get_c
     
     ticket = Ticket(**ticket_data)
     await db.tickets.insert_one(ticket.model_dump())
+    await snapshots.record_change(db, "tickets", after=ticket.model_dump())
     
     # Send notification to assignee if auto-assigned
     if assigned_to:
@@ -13752,7 +13868,7 @@ async def update_ticket(ticket_id: str, data: Dict[str, Any], current_user: User
     
     # Check access - employees can only update their own tickets (limited fields)
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or ticket["requester_id"] != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized")
         # Employees can only add description or close their ticket
@@ -13824,7 +13940,9 @@ async def update_ticket(ticket_id: str, data: Dict[str, Any], current_user: User
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.tickets.update_one({"id": ticket_id}, {"$set": data})
-    return await db.tickets.find_one({"id": ticket_id}, {"_id": 0})
+    updated = await db.tickets.find_one({"id": ticket_id}, {"_id": 0})
+    await snapshots.record_change(db, "tickets", before=ticket, after=updated)
+    return updated
 
 
 @api_router.delete("/tickets/{ticket_id}")
@@ -13834,7 +13952,9 @@ async def delete_ticket(ticket_id: str, current_user: User = Depends(get_current
         raise HTTPException(status_code=403, detail="Only admins can delete tickets")
     
     await db.ticket_comments.delete_many({"ticket_id": ticket_id})
-    await db.tickets.delete_one({"id": ticket_id})
+    deleted = await db.tickets.find_one_and_delete({"id": ticket_id}, projection={"_id": 0})
+    if deleted:
+        await snapshots.record_change(db, "tickets", before=deleted)
     return {"message": "Ticket deleted"}
 
 
@@ -13851,7 +13971,7 @@ async def get_ticket_comments(ticket_id: str, current_user: User = Depends(get_c
     
     # Check access
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or ticket["requester_id"] != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -13878,14 +13998,14 @@ async def add_ticket_comment(ticket_id: str, data: Dict[str, Any], current_user:
     
     # Check access
     if not is_admin:
-        employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+        employee = await get_employee_for_user(current_user.id)
         if not employee or ticket["requester_id"] != employee["id"]:
             raise HTTPException(status_code=403, detail="Not authorized")
         # Employees cannot add internal notes
         data["is_internal"] = False
     
     # Get author info
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     author_name = employee.get("full_name") if employee else current_user.full_name
     
     comment_data = {
@@ -13938,6 +14058,8 @@ async def assign_ticket(ticket_id: str, data: Dict[str, Any], current_user: User
             update_data["first_response_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.tickets.update_one({"id": ticket_id}, {"$set": update_data})
+    if "status" in update_data:
+        await snapshots.record_change(db, "tickets", before=ticket, after={**ticket, **update_data})
     return await db.tickets.find_one({"id": ticket_id}, {"_id": 0})
 
 
@@ -13950,7 +14072,7 @@ async def rate_ticket(ticket_id: str, data: Dict[str, Any], current_user: User =
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    employee = await db.employees.find_one({"user_id": current_user.id}, {"_id": 0})
+    employee = await get_employee_for_user(current_user.id)
     if not employee or ticket["requester_id"] != employee["id"]:
         raise HTTPException(status_code=403, detail="Only the requester can rate the ticket")
     
@@ -14149,6 +14271,8 @@ class CreateNotificationRequest(BaseModel):
     send_to_all: bool = False
     send_to_admins: bool = False
     send_to_employees: bool = False
+    send_push: bool = False  # Also deliver as a web push notification
+    send_email: bool = False  # Also deliver by email (when SMTP is enabled)
 
 
 async def create_notification_for_user(
@@ -14171,9 +14295,9 @@ async def create_notification_for_user(
         reference_id=reference_id,
         reference_type=reference_type,
         priority=priority
-    )
-    await db.notifications.insert_one(notification.model_dump())
-    return notification.model_dump()
+    ).model_dump()
+    ids = await notification_store.insert_for_users(db, [user_id], notification)
+    return {**notification, "id": ids[user_id]}
 
 
 async def create_notification_for_multiple_users(
@@ -14185,25 +14309,66 @@ async def create_notification_for_multiple_users(
     reference_id: Optional[str] = None,
     reference_type: Optional[str] = None,
     priority: str = "normal"
-):
-    """Helper function to create notifications for multiple users"""
-    notifications = []
-    for user_id in user_ids:
-        notification = Notification(
-            user_id=user_id,
-            type=notification_type,
-            title=title,
-            message=message,
-            link=link,
-            reference_id=reference_id,
-            reference_type=reference_type,
-            priority=priority
-        )
-        notifications.append(notification.model_dump())
-    
-    if notifications:
-        await db.notifications.insert_many(notifications)
-    return notifications
+) -> int:
+    """Helper function to create notifications for multiple users; returns how many were written"""
+    template = Notification(
+        user_id="",
+        type=notification_type,
+        title=title,
+        message=message,
+        link=link,
+        reference_id=reference_id,
+        reference_type=reference_type,
+        priority=priority
+    ).model_dump()
+    return len(await notification_store.insert_for_users(db, user_ids, template))
+
+
+async def create_broadcast_notification(
+    audience: List[str],
+    notification_type: str,
+    title: str,
+    message: str,
+    link: Optional[str] = None,
+    reference_id: Optional[str] = None,
+    reference_type: Optional[str] = None,
+    priority: str = "normal",
+    created_by: Optional[str] = None
+) -> Dict[str, Any]:
+    """Helper function to notify a whole audience with a single broadcast document"""
+    template = Notification(
+        user_id="",
+        type=notification_type,
+        title=title,
+        message=message,
+        link=link,
+        reference_id=reference_id,
+        reference_type=reference_type,
+        priority=priority
+    ).model_dump()
+    return await notification_store.create_broadcast(db, audience, template, created_by)
+
+
+async def queue_notification_delivery(content: Dict[str, Any], channels: List[str], created_by: str,
+                                      audience: Optional[List[str]] = None, user_ids: Optional[List[str]] = None):
+    """Queue push/email delivery of a notification; returns the job, or None if no channel was asked for"""
+    if not channels:
+        return None
+    return await enqueue_job(db, "notifications.deliver", {
+        "content": content, "channels": channels, "audience": audience, "user_ids": user_ids
+    }, created_by)
+
+
+async def notification_inbox(current_user: User) -> notification_store.Inbox:
+    """The caller's own notifications merged with the broadcasts addressed to them"""
+    principal = await resolve_principal(current_user.id)
+    keys = notification_store.audience_keys(
+        current_user.role,
+        principal.department_id if principal else None,
+        principal.branch_id if principal else None,
+    )
+    since = principal.user.get("created_at") if principal else None
+    return notification_store.Inbox(db, current_user.id, keys, since=since)
 
 
 @api_router.get("/notifications")
@@ -14215,94 +14380,119 @@ async def get_notifications(
     current_user: User = Depends(get_current_user)
 ):
     """Get notifications for the current user"""
-    query = {"user_id": current_user.id, "is_archived": False}
-    
-    if is_read is not None:
-        query["is_read"] = is_read
-    if type:
-        query["type"] = type
-    
-    notifications = await db.notifications.find(
-        query, {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    
-    return notifications
+    inbox = await notification_inbox(current_user)
+    return await inbox.list(is_read=is_read, type=type, limit=limit, skip=skip)
 
 
 @api_router.get("/notifications/unread-count")
 async def get_unread_count(current_user: User = Depends(get_current_user)):
     """Get count of unread notifications"""
-    count = await db.notifications.count_documents({
-        "user_id": current_user.id,
-        "is_read": False,
-        "is_archived": False
-    })
-    return {"count": count}
+    inbox = await notification_inbox(current_user)
+    counts = await inbox.counts()
+    return {"count": counts["unread"], "by_type": counts["unread_by_type"]}
 
 
 @api_router.get("/notifications/stats")
 async def get_notification_stats(current_user: User = Depends(get_current_user)):
     """Get notification statistics for the current user"""
-    base_query = {"user_id": current_user.id, "is_archived": False}
-    
-    total = await db.notifications.count_documents(base_query)
-    unread = await db.notifications.count_documents({**base_query, "is_read": False})
-    
-    # Count by type
-    all_notifications = await db.notifications.find(base_query, {"_id": 0, "type": 1}).to_list(1000)
-    by_type = {}
-    for n in all_notifications:
-        t = n.get("type", "system")
-        by_type[t] = by_type.get(t, 0) + 1
+    inbox = await notification_inbox(current_user)
+    counts = await inbox.counts()
     
     return {
-        "total": total,
-        "unread": unread,
-        "read": total - unread,
-        "by_type": by_type
+        "total": counts["total"],
+        "unread": counts["unread"],
+        "read": counts["total"] - counts["unread"],
+        "by_type": counts["by_type"],
+        "unread_by_type": counts["unread_by_type"]
     }
 
 
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@api_router.get("/notifications/stream")
+async def stream_notifications(current_user: User = Depends(get_current_user)):
+    """Server-sent events: `counts` on connect and on every change, `notification` for each new one"""
+    inbox = await notification_inbox(current_user)
+    counts = await inbox.counts()
+    subscriber = realtime.Subscriber(current_user.id)
+    for topic in notification_store.stream_topics(current_user.id, inbox.keys):
+        realtime.broker.subscribe(subscriber, topic)
+    
+    async def events():
+        nonlocal counts
+        try:
+            yield sse_event("counts", counts)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), NOTIFICATION_STREAM_PING_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    # Too far behind; the client reconnects and starts from fresh counts
+                    yield sse_event("reset", {})
+                    return
+                data = event["data"]
+                if event["type"] == "notification":
+                    notification = {**data["notification"]}
+                    if "ids" in data:
+                        notification.update(id=data["ids"].get(current_user.id), user_id=current_user.id)
+                    else:
+                        notification = inbox.render(notification)
+                    counts = notification_store.count_new(counts, notification.get("type"))
+                    yield sse_event("notification", notification)
+                elif event["type"] == "counts":
+                    counts = data
+                else:
+                    counts = await inbox.counts()
+                yield sse_event("counts", counts)
+        finally:
+            for topic in list(subscriber.topics):
+                realtime.broker.unsubscribe(subscriber, topic)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @api_router.post("/notifications")
 async def create_notification(
     data: CreateNotificationRequest,
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    """Create notification(s) - admin only for bulk/broadcast"""
+    """Create notification(s) - admin only for bulk/broadcast; background=true queues a job and returns 202"""
     is_admin = current_user.role in ["super_admin", "corp_admin"]
     
+    content = {
+        "notification_type": data.type,
+        "title": data.title,
+        "message": data.message,
+        "link": data.link,
+        "reference_id": data.reference_id,
+        "reference_type": data.reference_type,
+        "priority": data.priority
+    }
+    channels = [c for c, wanted in (("push", data.send_push), ("email", data.send_email)) if wanted]
+    
     # Non-admins can only create notifications for themselves
     if not is_admin:
-        notification = await create_notification_for_user(
-            user_id=current_user.id,
-            notification_type=data.type,
-            title=data.title,
-            message=data.message,
-            link=data.link,
-            reference_id=data.reference_id,
-            reference_type=data.reference_type,
-            priority=data.priority
-        )
+        notification = await create_notification_for_user(user_id=current_user.id, **content)
+        await queue_notification_delivery(content, channels, current_user.id, user_ids=[current_user.id])
         return notification
     
-    # Admin can broadcast or send to specific users
-    target_user_ids = []
-    
+    # Groups get one broadcast document; named users get their own copies
+    audience = None
     if data.send_to_all:
-        users = await db.users.find({}, {"_id": 0, "id": 1}).to_list(10000)
-        target_user_ids = [u["id"] for u in users]
+        audience = notification_store.audience_for_target("all")
     elif data.send_to_admins:
-        users = await db.users.find(
-            {"role": {"$in": ["super_admin", "corp_admin"]}},
-            {"_id": 0, "id": 1}
-        ).to_list(1000)
-        target_user_ids = [u["id"] for u in users]
+        audience = notification_store.audience_for_target("admins")
     elif data.send_to_employees:
-        users = await db.users.find(
-            {"role": "employee"},
-            {"_id": 0, "id": 1}
-        ).to_list(10000)
-        target_user_ids = [u["id"] for u in users]
+        audience = notification_store.audience_for_target("employees")
     elif data.user_ids:
         target_user_ids = data.user_ids
     elif data.user_id:
@@ -14310,18 +14500,92 @@ async def create_notification(
     else:
         raise HTTPException(status_code=400, detail="Must specify target users")
     
-    notifications = await create_notification_for_multiple_users(
-        user_ids=target_user_ids,
-        notification_type=data.type,
-        title=data.title,
-        message=data.message,
-        link=data.link,
-        reference_id=data.reference_id,
-        reference_type=data.reference_type,
-        priority=data.priority
-    )
+    if audience:
+        broadcast = await create_broadcast_notification(audience, created_by=current_user.id, **content)
+        job = await queue_notification_delivery(content, channels, current_user.id, audience=audience)
+        return {
+            "message": "Broadcast notification created",
+            "broadcast_id": broadcast["id"],
+            "audience": audience,
+            "delivery_job_id": job["id"] if job else None
+        }
+    
+    if background:
+        job = await enqueue_job(db, "notifications.broadcast", {
+            "user_ids": target_user_ids, "channels": channels, **content
+        }, current_user.id)
+        return job_accepted(job)
     
-    return {"message": f"Created {len(notifications)} notifications", "count": len(notifications)}
+    count = await create_notification_for_multiple_users(user_ids=target_user_ids, **content)
+    job = await queue_notification_delivery(content, channels, current_user.id, user_ids=target_user_ids)
+    
+    return {"message": f"Created {count} notifications", "count": count, "delivery_job_id": job["id"] if job else None}
+
+
+# Broadcasts are not retried after a crash so nobody is notified twice
+@job_handler("notifications.broadcast", max_attempts=1)
+async def run_notification_broadcast_job(ctx, payload: Dict[str, Any]):
+    user_ids = payload.pop("user_ids", [])
+    channels = payload.pop("channels", [])
+    await ctx.progress(0, len(user_ids))
+    count = await create_notification_for_multiple_users(user_ids=user_ids, **payload)
+    await ctx.progress(len(user_ids), len(user_ids))
+    await queue_notification_delivery(payload, channels, ctx.created_by, user_ids=user_ids)
+    return {"message": f"Created {count} notifications", "count": count}
+
+
+def notification_email(content: Dict[str, Any], smtp: Dict[str, Any]):
+    """One message for every recipient of a notification; recipients are envelope-only"""
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = content["title"]
+    msg['From'] = mailer.sender_address(smtp)
+    msg['To'] = "undisclosed-recipients:;"
+    text = content["message"]
+    if content.get("link"):
+        text += f"\n\n{content['link']}"
+    msg.attach(MIMEText(text, 'plain'))
+    return msg
+
+
+@job_handler("notifications.deliver", max_attempts=1)
+async def run_notification_delivery_job(ctx, payload: Dict[str, Any]):
+    """Push and email fan-out for a notification, walking its recipients a batch at a time"""
+    content = payload["content"]
+    channels = payload.get("channels") or []
+    created_by = ctx.created_by
+    push_enabled = "push" in channels and get_push_dispatcher() is not None
+    smtp = await mailer.global_smtp_config(db) if "email" in channels else None
+    
+    subscriptions = []
+    email_ids = []
+    recipients = 0
+    async for batch in notification_store.iter_recipients(db, payload.get("audience"), payload.get("user_ids")):
+        recipients += len(batch)
+        if push_enabled:
+            subscriptions += await db.push_subscriptions.find(
+                {"user_id": {"$in": [u["id"] for u in batch]}, "is_active": True},
+                {"_id": 0, "endpoint": 1, "p256dh": 1, "auth": 1}
+            ).to_list(None)
+        if smtp:
+            email_ids += await mailer.enqueue(
+                db, notification_email(content, smtp), [u["email"] for u in batch if u.get("email")],
+                {"type": "notification", "subject": content["title"], "sent_by": created_by}
+            )
+        await ctx.progress(recipients, None)
+    
+    result = {"recipients": recipients, "emails_queued": len(email_ids), "push": None}
+    if subscriptions:
+        push = NotificationPayload(
+            title=content["title"],
+            body=content["message"],
+            tag=content.get("reference_type") or content.get("notification_type"),
+            url=content.get("link") or "/notifications"
+        )
+        result["push"] = await deliver_push(subscriptions, push, created_by=created_by)
+    return result
 
 
 @api_router.put("/notifications/{notification_id}/read")
@@ -14330,17 +14594,10 @@ async def mark_notification_read(
     current_user: User = Depends(get_current_user)
 ):
     """Mark a notification as read"""
-    notification = await db.notifications.find_one(
-        {"id": notification_id, "user_id": current_user.id},
-        {"_id": 0}
-    )
-    if not notification:
+    inbox = await notification_inbox(current_user)
+    if not await inbox.mark_read(notification_id):
         raise HTTPException(status_code=404, detail="Notification not found")
-    
-    await db.notifications.update_one(
-        {"id": notification_id},
-        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc).isoformat()}}
-    )
+    await inbox.publish_counts()
     
     return {"message": "Notification marked as read"}
 
@@ -14348,12 +14605,11 @@ async def mark_notification_read(
 @api_router.put("/notifications/mark-all-read")
 async def mark_all_notifications_read(current_user: User = Depends(get_current_user)):
     """Mark all notifications as read for the current user"""
-    result = await db.notifications.update_many(
-        {"user_id": current_user.id, "is_read": False},
-        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc).isoformat()}}
-    )
+    inbox = await notification_inbox(current_user)
+    marked = await inbox.mark_all_read()
+    await inbox.publish_counts()
     
-    return {"message": f"Marked {result.modified_count} notifications as read"}
+    return {"message": f"Marked {marked} notifications as read"}
 
 
 @api_router.put("/notifications/{notification_id}/archive")
@@ -14362,47 +14618,40 @@ async def archive_notification(
     current_user: User = Depends(get_current_user)
 ):
     """Archive a notification"""
-    notification = await db.notifications.find_one(
-        {"id": notification_id, "user_id": current_user.id},
-        {"_id": 0}
-    )
-    if not notification:
+    inbox = await notification_inbox(current_user)
+    if not await inbox.archive(notification_id):
         raise HTTPException(status_code=404, detail="Notification not found")
-    
-    await db.notifications.update_one(
-        {"id": notification_id},
-        {"$set": {"is_archived": True}}
-    )
+    await inbox.publish_counts()
     
     return {"message": "Notification archived"}
 
 
+# Declared before /notifications/{notification_id} so "clear-all" isn't taken for an id
+@api_router.delete("/notifications/clear-all")
+async def clear_all_notifications(current_user: User = Depends(get_current_user)):
+    """Delete all notifications for the current user"""
+    inbox = await notification_inbox(current_user)
+    deleted = await inbox.clear_all()
+    await inbox.publish_counts()
+    return {"message": f"Deleted {deleted} notifications"}
+
+
 @api_router.delete("/notifications/{notification_id}")
 async def delete_notification(
     notification_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    """Delete a notification"""
+    """Delete a notification; admins deleting a broadcast remove it for everyone"""
     is_admin = current_user.role in ["super_admin", "corp_admin"]
     
-    query = {"id": notification_id}
-    if not is_admin:
-        query["user_id"] = current_user.id
-    
-    result = await db.notifications.delete_one(query)
-    if result.deleted_count == 0:
+    inbox = await notification_inbox(current_user)
+    if not await inbox.delete(notification_id, any_user=is_admin):
         raise HTTPException(status_code=404, detail="Notification not found")
+    await inbox.publish_counts()
     
     return {"message": "Notification deleted"}
 
 
-@api_router.delete("/notifications/clear-all")
-async def clear_all_notifications(current_user: User = Depends(get_current_user)):
-    """Delete all notifications for the current user"""
-    result = await db.notifications.delete_many({"user_id": current_user.id})
-    return {"message": f"Deleted {result.deleted_count} notifications"}
-
-
 # Admin endpoint to send announcements
 @api_router.post("/notifications/announcement")
 async def send_announcement(
@@ -14418,41 +14667,36 @@ async def send_announcement(
     priority = data.get("priority", "normal")
     target = data.get("target", "all")  # all, admins, employees, department, branch
     target_id = data.get("target_id")  # department_id or branch_id if applicable
+    channels = [c for c in ("push", "email") if data.get(f"send_{c}")]
     
-    target_user_ids = []
-    
-    if target == "all":
-        users = await db.users.find({}, {"_id": 0, "id": 1}).to_list(10000)
-        target_user_ids = [u["id"] for u in users]
-    elif target == "admins":
-        users = await db.users.find(
-            {"role": {"$in": ["super_admin", "corp_admin"]}},
-            {"_id": 0, "id": 1}
-        ).to_list(1000)
-        target_user_ids = [u["id"] for u in users]
-    elif target == "employees":
-        users = await db.users.find({"role": "employee"}, {"_id": 0, "id": 1}).to_list(10000)
-        target_user_ids = [u["id"] for u in users]
-    elif target == "department" and target_id:
-        employees = await db.employees.find({"department_id": target_id}, {"_id": 0, "user_id": 1}).to_list(1000)
-        target_user_ids = [e["user_id"] for e in employees]
-    elif target == "branch" and target_id:
-        employees = await db.employees.find({"branch_id": target_id}, {"_id": 0, "user_id": 1}).to_list(1000)
-        target_user_ids = [e["user_id"] for e in employees]
-    
-    if not target_user_ids:
+    audience = notification_store.audience_for_target(target, target_id)
+    recipients = await notification_store.audience_size(db, audience) if audience else 0
+    if not recipients:
         raise HTTPException(status_code=400, detail="No target users found")
     
-    notifications = await create_notification_for_multiple_users(
-        user_ids=target_user_ids,
-        notification_type=NotificationType.ANNOUNCEMENT,
-        title=title,
-        message=message,
-        priority=priority
-    )
+    content = {
+        "notification_type": NotificationType.ANNOUNCEMENT,
+        "title": title,
+        "message": message,
+        "link": None,
+        "reference_id": None,
+        "reference_type": None,
+        "priority": priority
+    }
+    broadcast = await create_broadcast_notification(audience, created_by=current_user.id, **content)
+    job = await queue_notification_delivery(content, channels, current_user.id, audience=audience)
     
-    return {"message": f"Announcement sent to {len(notifications)} users", "count": len(notifications)}
+    return {
+        "message": f"Announcement sent to {recipients} users",
+        "count": recipients,
+        "broadcast_id": broadcast["id"],
+        "delivery_job_id": job["id"] if job else None
+    }
+
 
+# Indexes for notification models
+register_index("notifications", [("user_id", 1), ("is_archived", 1), ("is_read", 1), ("created_at", -1)])
+register_index("notifications", [("id", 1)], unique=True)
 
 # ============= REPORTING & ANALYTICS =============
 
@@ -14461,56 +14705,7 @@ async def get_reports_overview(current_user: User = Depends(get_current_user)):
     """Get high-level overview metrics for reporting dashboard"""
     if current_user.role not in ["super_admin", "corp_admin"]:
         raise HTTPException(status_code=403, detail="Only admins can access reports")
-    
-    # Employee metrics
-    total_employees = await db.employees.count_documents({})
-    active_employees = await db.employees.count_documents({"employment_status": "active"})
-    
-    # Calculate new hires (last 30 days)
-    thirty_days_ago = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
-    new_hires = await db.employees.count_documents({
-        "created_at": {"$gte": thirty_days_ago}
-    })
-    
-    # Ticket metrics
-    total_tickets = await db.tickets.count_documents({})
-    open_tickets = await db.tickets.count_documents({"status": {"$in": ["open", "in_progress"]}})
-    resolved_tickets = await db.tickets.count_documents({"status": "resolved"})
-    
-    # Leave metrics
-    pending_leaves = await db.leave_requests.count_documents({"status": "pending"})
-    approved_leaves = await db.leave_requests.count_documents({"status": "approved"})
-    
-    # Training metrics
-    total_trainings = await db.trainings.count_documents({})
-    
-    # Expense metrics
-    pending_expenses = await db.expense_claims.count_documents({"status": "pending"})
-    
-    return {
-        "employees": {
-            "total": total_employees,
-            "active": active_employees,
-            "new_hires_30d": new_hires,
-            "inactive": total_employees - active_employees
-        },
-        "tickets": {
-            "total": total_tickets,
-            "open": open_tickets,
-            "resolved": resolved_tickets,
-            "resolution_rate": round((resolved_tickets / total_tickets * 100) if total_tickets > 0 else 0, 1)
-        },
-        "leaves": {
-            "pending": pending_leaves,
-            "approved": approved_leaves
-        },
-        "trainings": {
-            "total": total_trainings
-        },
-        "expenses": {
-            "pending": pending_expenses
-        }
-    }
+    return await snapshots.read_payload(db, "reports.overview")
 
 
 @api_router.get("/reports/employees")
@@ -14518,88 +14713,7 @@ async def get_employee_reports(current_user: User = Depends(get_current_user)):
     """Get detailed employee analytics"""
     if current_user.role not in ["super_admin", "corp_admin"]:
         raise HTTPException(status_code=403, detail="Only admins can access reports")
-    
-    employees = await db.employees.find({}, {"_id": 0}).to_list(10000)
-    departments = await db.departments.find({}, {"_id": 0}).to_list(100)
-    dept_map = {d["id"]: d["name"] for d in departments}
-    
-    # By Department
-    by_department = {}
-    for emp in employees:
-        dept_id = emp.get("department_id", "unassigned")
-        dept_name = dept_map.get(dept_id, "Unassigned")
-        by_department[dept_name] = by_department.get(dept_name, 0) + 1
-    
-    # By Employment Type
-    by_employment_type = {}
-    for emp in employees:
-        emp_type = emp.get("employment_type", "full_time")
-        by_employment_type[emp_type] = by_employment_type.get(emp_type, 0) + 1
-    
-    # By Employment Status
-    by_status = {}
-    for emp in employees:
-        status = emp.get("employment_status", "active")
-        by_status[status] = by_status.get(status, 0) + 1
-    
-    # By Gender
-    by_gender = {}
-    for emp in employees:
-        gender = emp.get("gender", "not_specified") or "not_specified"
-        by_gender[gender] = by_gender.get(gender, 0) + 1
-    
-    # By Work Location
-    by_location = {}
-    for emp in employees:
-        location = emp.get("work_location", "office") or "office"
-        by_location[location] = by_location.get(location, 0) + 1
-    
-    # Tenure Distribution (years)
-    tenure_distribution = {"<1": 0, "1-2": 0, "2-5": 0, "5-10": 0, "10+": 0}
-    now = datetime.now(timezone.utc)
-    for emp in employees:
-        hire_date_str = emp.get("hire_date")
-        if hire_date_str:
-            try:
-                hire_date = datetime.fromisoformat(hire_date_str.replace("Z", "+00:00")) if "T" in hire_date_str else datetime.strptime(hire_date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-                years = (now - hire_date).days / 365
-                if years < 1:
-                    tenure_distribution["<1"] += 1
-                elif years < 2:
-                    tenure_distribution["1-2"] += 1
-                elif years < 5:
-                    tenure_distribution["2-5"] += 1
-                elif years < 10:
-                    tenure_distribution["5-10"] += 1
-                else:
-                    tenure_distribution["10+"] += 1
-            except:
-                tenure_distribution["<1"] += 1
-    
-    # Monthly hire trend (last 12 months)
-    monthly_hires = {}
-    for i in range(12):
-        month_date = now - timedelta(days=30 * i)
-        month_key = month_date.strftime("%Y-%m")
-        monthly_hires[month_key] = 0
-    
-    for emp in employees:
-        created = emp.get("created_at", "")
-        if created:
-            month_key = created[:7]
-            if month_key in monthly_hires:
-                monthly_hires[month_key] += 1
-    
-    return {
-        "total": len(employees),
-        "by_department": [{"name": k, "value": v} for k, v in sorted(by_department.items(), key=lambda x: -x[1])],
-        "by_employment_type": [{"name": k.replace("_", " ").title(), "value": v} for k, v in by_employment_type.items()],
-        "by_status": [{"name": k.replace("_", " ").title(), "value": v} for k, v in by_status.items()],
-        "by_gender": [{"name": k.replace("_", " ").title(), "value": v} for k, v in by_gender.items()],
-        "by_location": [{"name": k.replace("_", " ").title(), "value": v} for k, v in by_location.items()],
-        "tenure_distribution": [{"name": k, "value": v} for k, v in tenure_distribution.items()],
-        "monthly_hires": [{"month": k, "count": v} for k, v in sorted(monthly_hires.items())]
-    }
+    return await snapshots.read_payload(db, "reports.employees")
 
 
 @api_router.get("/reports/tickets")
@@ -14835,13 +14949,13 @@ async def get_performance_reports(current_user: User = Depends(get_current_user)
 
 # ============= TRANSLATIONS API =============
 
+def translations_payload(translations_doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return (translations_doc or {}).get("translations", {})
+
 @api_router.get("/translations")
-async def get_translations():
+async def get_translations(request: Request):
     """Get all custom translations"""
-    translations_doc = await db.translations.find_one({"id": "custom_translations"})
-    if translations_doc:
-        return translations_doc.get("translations", {})
-    return {}
+    return await config_response(db, request, "translations", translations_payload)
 
 @api_router.post("/translations")
 async def create_translation(data: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -14871,6 +14985,7 @@ async def create_translation(data: Dict[str, Any], current_user: User = Depends(
         },
         upsert=True
     )
+    await config_changed(db, "translations")
     
     return {"success": True, "key": key}
 
@@ -14892,6 +15007,7 @@ async def update_translation(key: str, data: Dict[str, Any], current_user: User
             }
         }
     )
+    await config_changed(db, "translations")
     
     return {"success": True}
 
@@ -14905,6 +15021,7 @@ async def delete_translation(key: str, current_user: User = Depends(get_current_
             "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
         }
     )
+    await config_changed(db, "translations")
     
     return {"success": True}
 
@@ -14943,6 +15060,8 @@ async def upload_branding_file(
     
     # Generate relative URL (frontend will construct full URL as needed)
     file_url = f"/api/uploads/branding/{filename}"
+    # Branding is read through the settings cache (manifest, push icons)
+    await config_changed(db, "settings")
     
     return {"url": file_url, "filename": filename}
 
@@ -14976,7 +15095,7 @@ async def get_dynamic_manifest():
     from fastapi.responses import JSONResponse
     
     # Get current settings
-    settings = await db.settings.find_one({"id": "global_settings"}, {"_id": 0})
+    settings = await get_config(db, "settings")
     
     app_name = settings.get("app_name", "HR Portal") if settings else "HR Portal"
     logo_url = settings.get("logo_url", "") if settings else ""
@@ -15063,490 +15182,31 @@ async def get_dynamic_manifest():
 async def get_analytics_overview(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get HR analytics overview - key metrics"""
     user = await get_current_user(credentials)
-    
-    # Get current date info
-    now = datetime.now(timezone.utc)
-    current_year = now.year
-    current_month = now.month
-    
-    # Get all employees
-    employees = await db.employees.find({"status": {"$ne": "terminated"}}).to_list(10000)
-    all_employees = await db.employees.find({}).to_list(10000)
-    
-    # Get offboardings (terminations)
-    offboardings = await db.offboarding.find({}).to_list(10000)
-    
-    # Get candidates/hires
-    candidates = await db.candidates.find({}).to_list(10000)
-    
-    # Calculate headcount
-    total_headcount = len(employees)
-    
-    # Calculate headcount by month for the last 12 months
-    headcount_trend = []
-    for i in range(11, -1, -1):
-        month_date = now - timedelta(days=i*30)
-        month_name = month_date.strftime("%b %Y")
-        
-        # Count employees hired before or during this month
-        count = 0
-        for emp in all_employees:
-            hire_date_str = emp.get("hire_date") or emp.get("created_at", "")
-            if hire_date_str:
-                try:
-                    if "T" in hire_date_str:
-                        hire_date = datetime.fromisoformat(hire_date_str.replace("Z", "+00:00"))
-                    else:
-                        hire_date = datetime.strptime(hire_date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-                    
-                    if hire_date <= month_date:
-                        # Check if terminated before this month
-                        terminated = False
-                        for off in offboardings:
-                            if off.get("employee_id") == emp.get("id"):
-                                term_date_str = off.get("last_working_date", "")
-                                if term_date_str:
-                                    try:
-                                        term_date = datetime.strptime(term_date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-                                        if term_date < month_date:
-                                            terminated = True
-                                    except:
-                                        pass
-                        if not terminated:
-                            count += 1
-                except:
-                    pass
-        
-        headcount_trend.append({
-            "month": month_name,
-            "headcount": count if count > 0 else total_headcount
-        })
-    
-    # Calculate turnover rate
-    terminations_this_year = len([o for o in offboardings if o.get("last_working_date", "").startswith(str(current_year))])
-    avg_headcount = total_headcount if total_headcount > 0 else 1
-    turnover_rate = round((terminations_this_year / avg_headcount) * 100, 1)
-    
-    # Calculate hiring trends
-    hires_by_month = {}
-    for emp in all_employees:
-        hire_date_str = emp.get("hire_date") or emp.get("created_at", "")
-        if hire_date_str:
-            try:
-                month_key = hire_date_str[:7]  # YYYY-MM
-                hires_by_month[month_key] = hires_by_month.get(month_key, 0) + 1
-            except:
-                pass
-    
-    hiring_trend = []
-    for i in range(11, -1, -1):
-        month_date = now - timedelta(days=i*30)
-        month_key = month_date.strftime("%Y-%m")
-        month_name = month_date.strftime("%b")
-        hiring_trend.append({
-            "month": month_name,
-            "hires": hires_by_month.get(month_key, 0)
-        })
-    
-    # Calculate salary statistics by department
-    departments = await db.departments.find({}).to_list(1000)
-    dept_map = {d["id"]: d["name"] for d in departments}
-    
-    salary_by_dept = {}
-    for emp in employees:
-        salary = emp.get("salary", 0) or 0
-        dept_id = emp.get("department_id", "unknown")
-        dept_name = dept_map.get(dept_id, "Other")
-        
-        if dept_name not in salary_by_dept:
-            salary_by_dept[dept_name] = {"total": 0, "count": 0, "salaries": []}
-        
-        if salary > 0:
-            salary_by_dept[dept_name]["total"] += salary
-            salary_by_dept[dept_name]["count"] += 1
-            salary_by_dept[dept_name]["salaries"].append(salary)
-    
-    salary_benchmarks = []
-    for dept, data in salary_by_dept.items():
-        if data["count"] > 0:
-            avg = data["total"] / data["count"]
-            salaries = sorted(data["salaries"])
-            min_sal = salaries[0] if salaries else 0
-            max_sal = salaries[-1] if salaries else 0
-            median = salaries[len(salaries)//2] if salaries else 0
-            
-            salary_benchmarks.append({
-                "department": dept,
-                "average": round(avg, 0),
-                "median": round(median, 0),
-                "min": round(min_sal, 0),
-                "max": round(max_sal, 0),
-                "count": data["count"]
-            })
-    
-    # Turnover by reason
-    turnover_reasons = {}
-    for off in offboardings:
-        reason = off.get("reason", "other")
-        turnover_reasons[reason] = turnover_reasons.get(reason, 0) + 1
-    
-    turnover_by_reason = [{"reason": k.replace("_", " ").title(), "count": v} for k, v in turnover_reasons.items()]
-    
-    # Headcount by department
-    headcount_by_dept = {}
-    for emp in employees:
-        dept_id = emp.get("department_id", "unknown")
-        dept_name = dept_map.get(dept_id, "Other")
-        headcount_by_dept[dept_name] = headcount_by_dept.get(dept_name, 0) + 1
-    
-    dept_distribution = [{"department": k, "count": v} for k, v in headcount_by_dept.items()]
-    
-    # New hires this month
-    new_hires_this_month = 0
-    for emp in all_employees:
-        hire_date_str = emp.get("hire_date") or emp.get("created_at", "")
-        if hire_date_str:
-            try:
-                if hire_date_str.startswith(f"{current_year}-{current_month:02d}"):
-                    new_hires_this_month += 1
-            except:
-                pass
-    
-    # Terminations this month
-    terminations_this_month = len([o for o in offboardings 
-                                   if o.get("last_working_date", "").startswith(f"{current_year}-{current_month:02d}")])
-    
-    # Open positions
-    open_positions = await db.jobs.count_documents({"status": "open"})
-    
-    # Pending candidates
-    pending_candidates = await db.candidates.count_documents({"status": {"$in": ["new", "screening", "interview"]}})
-    
-    return {
-        "summary": {
-            "total_headcount": total_headcount,
-            "new_hires_this_month": new_hires_this_month,
-            "terminations_this_month": terminations_this_month,
-            "turnover_rate": turnover_rate,
-            "open_positions": open_positions,
-            "pending_candidates": pending_candidates,
-            "avg_salary": round(sum(e.get("salary", 0) or 0 for e in employees) / max(len(employees), 1), 0)
-        },
-        "headcount_trend": headcount_trend,
-        "hiring_trend": hiring_trend,
-        "salary_benchmarks": sorted(salary_benchmarks, key=lambda x: x["average"], reverse=True),
-        "turnover_by_reason": turnover_by_reason,
-        "department_distribution": sorted(dept_distribution, key=lambda x: x["count"], reverse=True)
-    }
+    return await snapshots.read_payload(db, "analytics.overview")
 
 @api_router.get("/analytics/turnover")
 async def get_turnover_analytics(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get detailed turnover analytics"""
     user = await get_current_user(credentials)
-    
-    now = datetime.now(timezone.utc)
-    
-    # Get all employees and offboardings
-    employees = await db.employees.find({}).to_list(10000)
-    offboardings = await db.offboarding.find({}).to_list(10000)
-    departments = await db.departments.find({}).to_list(1000)
-    dept_map = {d["id"]: d["name"] for d in departments}
-    
-    # Monthly turnover for past 12 months
-    monthly_turnover = []
-    for i in range(11, -1, -1):
-        month_date = now - timedelta(days=i*30)
-        month_key = month_date.strftime("%Y-%m")
-        month_name = month_date.strftime("%b %Y")
-        
-        terminations = len([o for o in offboardings if o.get("last_working_date", "").startswith(month_key)])
-        monthly_turnover.append({
-            "month": month_name,
-            "terminations": terminations
-        })
-    
-    # Turnover by department
-    turnover_by_dept = {}
-    for off in offboardings:
-        emp = next((e for e in employees if e.get("id") == off.get("employee_id")), None)
-        if emp:
-            dept_id = emp.get("department_id", "unknown")
-            dept_name = dept_map.get(dept_id, "Other")
-            turnover_by_dept[dept_name] = turnover_by_dept.get(dept_name, 0) + 1
-    
-    # Turnover by tenure
-    tenure_buckets = {"0-1 year": 0, "1-2 years": 0, "2-5 years": 0, "5+ years": 0}
-    for off in offboardings:
-        emp = next((e for e in employees if e.get("id") == off.get("employee_id")), None)
-        if emp:
-            hire_date_str = emp.get("hire_date", "")
-            term_date_str = off.get("last_working_date", "")
-            if hire_date_str and term_date_str:
-                try:
-                    hire_date = datetime.strptime(hire_date_str[:10], "%Y-%m-%d")
-                    term_date = datetime.strptime(term_date_str[:10], "%Y-%m-%d")
-                    tenure_years = (term_date - hire_date).days / 365
-                    
-                    if tenure_years < 1:
-                        tenure_buckets["0-1 year"] += 1
-                    elif tenure_years < 2:
-                        tenure_buckets["1-2 years"] += 1
-                    elif tenure_years < 5:
-                        tenure_buckets["2-5 years"] += 1
-                    else:
-                        tenure_buckets["5+ years"] += 1
-                except:
-                    pass
-    
-    return {
-        "monthly_turnover": monthly_turnover,
-        "by_department": [{"department": k, "count": v} for k, v in turnover_by_dept.items()],
-        "by_tenure": [{"tenure": k, "count": v} for k, v in tenure_buckets.items()],
-        "total_terminations": len(offboardings)
-    }
+    return await snapshots.read_payload(db, "analytics.turnover")
 
 @api_router.get("/analytics/hiring")
 async def get_hiring_analytics(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get detailed hiring analytics"""
     user = await get_current_user(credentials)
-    
-    now = datetime.now(timezone.utc)
-    
-    # Get candidates and jobs
-    candidates = await db.candidates.find({}).to_list(10000)
-    jobs = await db.jobs.find({}).to_list(1000)
-    employees = await db.employees.find({}).to_list(10000)
-    
-    # Hiring funnel
-    funnel = {
-        "applied": len([c for c in candidates if c.get("status") in ["new", "screening", "interview", "offer", "hired", "rejected"]]),
-        "screening": len([c for c in candidates if c.get("status") in ["screening", "interview", "offer", "hired"]]),
-        "interview": len([c for c in candidates if c.get("status") in ["interview", "offer", "hired"]]),
-        "offer": len([c for c in candidates if c.get("status") in ["offer", "hired"]]),
-        "hired": len([c for c in candidates if c.get("status") == "hired"])
-    }
-    
-    # Time to hire (average days from application to hire)
-    hire_times = []
-    for c in candidates:
-        if c.get("status") == "hired":
-            applied = c.get("applied_at") or c.get("created_at", "")
-            hired = c.get("hired_at") or c.get("updated_at", "")
-            if applied and hired:
-                try:
-                    applied_date = datetime.fromisoformat(applied.replace("Z", "+00:00"))
-                    hired_date = datetime.fromisoformat(hired.replace("Z", "+00:00"))
-                    days = (hired_date - applied_date).days
-                    if days > 0:
-                        hire_times.append(days)
-                except:
-                    pass
-    
-    avg_time_to_hire = round(sum(hire_times) / max(len(hire_times), 1), 1)
-    
-    # Hires by source
-    source_counts = {}
-    for c in candidates:
-        if c.get("status") == "hired":
-            source = c.get("source", "Direct")
-            source_counts[source] = source_counts.get(source, 0) + 1
-    
-    # Monthly hires
-    monthly_hires = []
-    for i in range(11, -1, -1):
-        month_date = now - timedelta(days=i*30)
-        month_key = month_date.strftime("%Y-%m")
-        month_name = month_date.strftime("%b")
-        
-        hires = 0
-        for emp in employees:
-            hire_date = emp.get("hire_date") or emp.get("created_at", "")
-            if hire_date.startswith(month_key):
-                hires += 1
-        
-        monthly_hires.append({"month": month_name, "hires": hires})
-    
-    # Open positions by department
-    departments = await db.departments.find({}).to_list(1000)
-    dept_map = {d["id"]: d["name"] for d in departments}
-    
-    open_by_dept = {}
-    for job in jobs:
-        if job.get("status") == "open":
-            dept_id = job.get("department_id", "unknown")
-            dept_name = dept_map.get(dept_id, "Other")
-            open_by_dept[dept_name] = open_by_dept.get(dept_name, 0) + 1
-    
-    return {
-        "funnel": funnel,
-        "avg_time_to_hire": avg_time_to_hire,
-        "by_source": [{"source": k, "count": v} for k, v in source_counts.items()],
-        "monthly_hires": monthly_hires,
-        "open_positions_by_dept": [{"department": k, "count": v} for k, v in open_by_dept.items()],
-        "total_open_positions": len([j for j in jobs if j.get("status") == "open"]),
-        "total_candidates": len(candidates)
-    }
+    return await snapshots.read_payload(db, "analytics.hiring")
 
 @api_router.get("/analytics/salary")
 async def get_salary_analytics(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get salary benchmarking analytics"""
     user = await get_current_user(credentials)
-    
-    employees = await db.employees.find({"status": {"$ne": "terminated"}}).to_list(10000)
-    departments = await db.departments.find({}).to_list(1000)
-    dept_map = {d["id"]: d["name"] for d in departments}
-    
-    # Overall salary distribution
-    salaries = [e.get("salary", 0) or 0 for e in employees if (e.get("salary") or 0) > 0]
-    
-    if salaries:
-        sorted_salaries = sorted(salaries)
-        total_salary = sum(salaries)
-        avg_salary = total_salary / len(salaries)
-        median_salary = sorted_salaries[len(sorted_salaries)//2]
-        min_salary = sorted_salaries[0]
-        max_salary = sorted_salaries[-1]
-    else:
-        total_salary = avg_salary = median_salary = min_salary = max_salary = 0
-    
-    # Salary by department
-    salary_by_dept = {}
-    for emp in employees:
-        salary = emp.get("salary", 0) or 0
-        if salary > 0:
-            dept_id = emp.get("department_id", "unknown")
-            dept_name = dept_map.get(dept_id, "Other")
-            
-            if dept_name not in salary_by_dept:
-                salary_by_dept[dept_name] = []
-            salary_by_dept[dept_name].append(salary)
-    
-    dept_stats = []
-    for dept, sals in salary_by_dept.items():
-        sorted_sals = sorted(sals)
-        dept_stats.append({
-            "department": dept,
-            "average": round(sum(sals) / len(sals), 0),
-            "median": sorted_sals[len(sorted_sals)//2],
-            "min": sorted_sals[0],
-            "max": sorted_sals[-1],
-            "count": len(sals)
-        })
-    
-    # Salary distribution buckets
-    buckets = {"0-30k": 0, "30k-50k": 0, "50k-75k": 0, "75k-100k": 0, "100k-150k": 0, "150k+": 0}
-    for s in salaries:
-        if s < 30000:
-            buckets["0-30k"] += 1
-        elif s < 50000:
-            buckets["30k-50k"] += 1
-        elif s < 75000:
-            buckets["50k-75k"] += 1
-        elif s < 100000:
-            buckets["75k-100k"] += 1
-        elif s < 150000:
-            buckets["100k-150k"] += 1
-        else:
-            buckets["150k+"] += 1
-    
-    # Salary by job level/position
-    salary_by_position = {}
-    for emp in employees:
-        salary = emp.get("salary", 0) or 0
-        if salary > 0:
-            position = emp.get("position", "Other")
-            if position not in salary_by_position:
-                salary_by_position[position] = []
-            salary_by_position[position].append(salary)
-    
-    position_stats = []
-    for pos, sals in salary_by_position.items():
-        if len(sals) >= 1:
-            position_stats.append({
-                "position": pos,
-                "average": round(sum(sals) / len(sals), 0),
-                "count": len(sals)
-            })
-    
-    return {
-        "overall": {
-            "total_payroll": round(total_salary, 0),
-            "average": round(avg_salary, 0),
-            "median": round(median_salary, 0),
-            "min": round(min_salary, 0),
-            "max": round(max_salary, 0),
-            "employee_count": len(salaries)
-        },
-        "by_department": sorted(dept_stats, key=lambda x: x["average"], reverse=True),
-        "distribution": [{"range": k, "count": v} for k, v in buckets.items()],
-        "by_position": sorted(position_stats, key=lambda x: x["average"], reverse=True)[:10]
-    }
+    return await snapshots.read_payload(db, "analytics.salary")
 
 @api_router.get("/analytics/forecast")
 async def get_headcount_forecast(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get headcount forecasting based on historical trends"""
     user = await get_current_user(credentials)
-    
-    now = datetime.now(timezone.utc)
-    
-    employees = await db.employees.find({}).to_list(10000)
-    offboardings = await db.offboarding.find({}).to_list(10000)
-    
-    # Calculate historical monthly data
-    historical = []
-    monthly_hires = []
-    monthly_terms = []
-    
-    for i in range(11, -1, -1):
-        month_date = now - timedelta(days=i*30)
-        month_key = month_date.strftime("%Y-%m")
-        month_name = month_date.strftime("%b %Y")
-        
-        hires = len([e for e in employees if (e.get("hire_date") or e.get("created_at", "")).startswith(month_key)])
-        terms = len([o for o in offboardings if o.get("last_working_date", "").startswith(month_key)])
-        
-        monthly_hires.append(hires)
-        monthly_terms.append(terms)
-        historical.append({
-            "month": month_name,
-            "hires": hires,
-            "terminations": terms,
-            "net_change": hires - terms
-        })
-    
-    # Simple linear forecast for next 6 months
-    avg_monthly_hires = sum(monthly_hires[-6:]) / 6 if monthly_hires else 0
-    avg_monthly_terms = sum(monthly_terms[-6:]) / 6 if monthly_terms else 0
-    avg_net_change = avg_monthly_hires - avg_monthly_terms
-    
-    current_headcount = len([e for e in employees if e.get("status") != "terminated"])
-    
-    forecast = []
-    projected_headcount = current_headcount
-    for i in range(1, 7):
-        month_date = now + timedelta(days=i*30)
-        month_name = month_date.strftime("%b %Y")
-        projected_headcount = max(0, projected_headcount + avg_net_change)
-        
-        forecast.append({
-            "month": month_name,
-            "projected_headcount": round(projected_headcount),
-            "projected_hires": round(avg_monthly_hires),
-            "projected_terminations": round(avg_monthly_terms),
-            "is_forecast": True
-        })
-    
-    return {
-        "current_headcount": current_headcount,
-        "historical": historical,
-        "forecast": forecast,
-        "trends": {
-            "avg_monthly_hires": round(avg_monthly_hires, 1),
-            "avg_monthly_terminations": round(avg_monthly_terms, 1),
-            "avg_net_change": round(avg_net_change, 1),
-            "projected_year_end_headcount": round(current_headcount + (avg_net_change * 12))
-        }
-    }
+    return await snapshots.read_payload(db, "analytics.forecast")
 
 
 # ============= PUSH NOTIFICATION ENDPOINTS =============
@@ -15621,122 +15281,82 @@ async def get_push_status(credentials: HTTPAuthorizationCredentials = Depends(se
     
     return {"subscribed": subscription is not None}
 
+_push_dispatcher: Optional[push_engine.PushDispatcher] = None
+
+def get_push_dispatcher() -> Optional[push_engine.PushDispatcher]:
+    """Shared dispatcher (one pooled HTTP client per worker), or None if VAPID isn't configured"""
+    global _push_dispatcher
+    if not VAPID_PRIVATE_KEY or not VAPID_PUBLIC_KEY:
+        return None
+    if _push_dispatcher is None:
+        _push_dispatcher = push_engine.PushDispatcher(VAPID_PRIVATE_KEY, VAPID_SUBJECT)
+    return _push_dispatcher
+
+async def deliver_push(subscriptions: List[Dict[str, Any]], notification: NotificationPayload,
+                       created_by: Optional[str] = None) -> Dict[str, Any]:
+    """Send to the given subscriptions, deactivate expired ones and record delivery stats"""
+    dispatcher = get_push_dispatcher()
+    payload = push_engine.build_payload(notification, await push_engine.default_icon(db))
+    stats = await dispatcher.dispatch(subscriptions, payload)
+    await push_engine.deactivate_endpoints(db, stats.expired_endpoints)
+    if stats.failed:
+        logger.warning(f"Push delivery {stats.id}: {stats.failed} of {stats.total} failed {stats.errors}")
+    return await push_engine.record_delivery(db, stats, notification.title, created_by)
+
 async def send_push_notification(user_id: str, notification: NotificationPayload):
     """Send push notification to a specific user"""
-    if not VAPID_PRIVATE_KEY or not VAPID_PUBLIC_KEY:
+    if not get_push_dispatcher():
         logger.warning("Push notifications not configured")
         return False
     
     # Get user's subscriptions
-    subscriptions = await db.push_subscriptions.find({
-        "user_id": user_id,
-        "is_active": True
-    }).to_list(100)
+    subscriptions = await db.push_subscriptions.find(
+        {"user_id": user_id, "is_active": True},
+        {"_id": 0, "endpoint": 1, "p256dh": 1, "auth": 1}
+    ).to_list(100)
     
     if not subscriptions:
         return False
     
-    # Get branding for icon
-    settings = await db.settings.find_one({"id": "global_settings"})
-    icon_url = settings.get("logo_url", "/icon-192x192.png") if settings else "/icon-192x192.png"
-    
-    payload = json.dumps({
-        "title": notification.title,
-        "body": notification.body,
-        "icon": notification.icon or icon_url,
-        "badge": notification.badge or "/badge-72x72.png",
-        "tag": notification.tag,
-        "data": {
-            "url": notification.url or "/",
-            **(notification.data or {})
-        }
-    })
-    
-    success_count = 0
-    for sub in subscriptions:
-        try:
-            subscription_info = {
-                "endpoint": sub["endpoint"],
-                "keys": {
-                    "p256dh": sub["p256dh"],
-                    "auth": sub["auth"]
-                }
-            }
-            
-            webpush(
-                subscription_info=subscription_info,
-                data=payload,
-                vapid_private_key=VAPID_PRIVATE_KEY,
-                vapid_claims={"sub": VAPID_SUBJECT}
-            )
-            success_count += 1
-        except WebPushException as e:
-            logger.error(f"Push notification failed: {e}")
-            # If subscription expired (410 or 404), deactivate it
-            if e.response and e.response.status_code in [404, 410]:
-                await db.push_subscriptions.update_one(
-                    {"endpoint": sub["endpoint"]},
-                    {"$set": {"is_active": False}}
-                )
-        except Exception as e:
-            logger.error(f"Unexpected push error: {e}")
-    
-    return success_count > 0
+    stats = await deliver_push(subscriptions, notification, created_by=user_id)
+    return stats["sent"] > 0
 
-async def broadcast_push_notification(notification: NotificationPayload, user_ids: List[str] = None):
-    """Send push notification to multiple users or all users"""
-    if not VAPID_PRIVATE_KEY or not VAPID_PUBLIC_KEY:
-        return 0
+async def broadcast_push_notification(notification: NotificationPayload, user_ids: List[str] = None,
+                                      created_by: Optional[str] = None) -> Dict[str, Any]:
+    """Send push notification to multiple users or all users; returns the delivery stats"""
+    if not get_push_dispatcher():
+        return push_engine.DeliveryStats(0).as_dict()
     
     query = {"is_active": True}
     if user_ids:
         query["user_id"] = {"$in": user_ids}
     
-    subscriptions = await db.push_subscriptions.find(query).to_list(1000)
+    subscriptions = await db.push_subscriptions.find(
+        query, {"_id": 0, "endpoint": 1, "p256dh": 1, "auth": 1}
+    ).to_list(None)
     
-    settings = await db.settings.find_one({"id": "global_settings"})
-    icon_url = settings.get("logo_url", "/icon-192x192.png") if settings else "/icon-192x192.png"
-    
-    payload = json.dumps({
-        "title": notification.title,
-        "body": notification.body,
-        "icon": notification.icon or icon_url,
-        "badge": notification.badge or "/badge-72x72.png",
-        "tag": notification.tag,
-        "data": {
-            "url": notification.url or "/",
-            **(notification.data or {})
-        }
-    })
+    return await deliver_push(subscriptions, notification, created_by=created_by)
+
+@api_router.get("/push/deliveries")
+async def list_push_deliveries(limit: int = 50, current_user: User = Depends(get_current_user)):
+    """Recent push deliveries with their sent/failed/expired counts (admin only)"""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
+        raise HTTPException(status_code=403, detail="Only admins can view push delivery stats")
     
-    success_count = 0
-    for sub in subscriptions:
-        try:
-            subscription_info = {
-                "endpoint": sub["endpoint"],
-                "keys": {
-                    "p256dh": sub["p256dh"],
-                    "auth": sub["auth"]
-                }
-            }
-            
-            webpush(
-                subscription_info=subscription_info,
-                data=payload,
-                vapid_private_key=VAPID_PRIVATE_KEY,
-                vapid_claims={"sub": VAPID_SUBJECT}
-            )
-            success_count += 1
-        except WebPushException as e:
-            if e.response and e.response.status_code in [404, 410]:
-                await db.push_subscriptions.update_one(
-                    {"endpoint": sub["endpoint"]},
-                    {"$set": {"is_active": False}}
-                )
-        except Exception as e:
-            logger.error(f"Broadcast push error: {e}")
+    return await db[push_engine.PUSH_DELIVERIES_COLLECTION].find({}, {"_id": 0}).sort(
+        "created_at", -1
+    ).to_list(min(max(limit, 1), 500))
+
+@api_router.get("/push/deliveries/{delivery_id}")
+async def get_push_delivery(delivery_id: str, current_user: User = Depends(get_current_user)):
+    """Delivery stats for one push send or broadcast (admin only)"""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CORP_ADMIN]:
+        raise HTTPException(status_code=403, detail="Only admins can view push delivery stats")
     
-    return success_count
+    delivery = await db[push_engine.PUSH_DELIVERIES_COLLECTION].find_one({"id": delivery_id}, {"_id": 0})
+    if not delivery:
+        raise HTTPException(status_code=404, detail="Push delivery not found")
+    return delivery
 
 @api_router.post("/push/test")
 async def test_push_notification(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -15760,13 +15380,73 @@ async def test_push_notification(credentials: HTTPAuthorizationCredentials = Dep
 
 # Workforce Planning moved to routers/workforce.py
 
+# ============= SYSTEM MAINTENANCE =============
+
+@api_router.get("/system/indexes")
+async def get_index_status(current_user: User = Depends(get_current_user)):
+    """Report drift between the declared index registry and the database (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only super admin can inspect indexes")
+    
+    return await ensure_indexes(db, dry_run=True)
+
+
+@api_router.post("/system/indexes/reconcile")
+async def reconcile_indexes(current_user: User = Depends(get_current_user)):
+    """Create any declared indexes that are missing (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only super admin can reconcile indexes")
+    
+    return await ensure_indexes(db)
+
+@api_router.get("/system/auth-cache")
+async def get_auth_cache_stats(current_user: User = Depends(get_current_user)):
+    """Principal cache hit/miss counters for this worker (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only super admin can inspect caches")
+    
+    return principal_cache.stats()
+
+@api_router.get("/system/user-cache")
+async def get_user_cache_stats(current_user: User = Depends(get_current_user)):
+    """Collaboration profile/presence cache hit/miss counters for this worker (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only super admin can inspect caches")
+    
+    return user_cache_stats()
+
+@api_router.get("/system/calendar-cache")
+async def get_calendar_cache_stats(current_user: User = Depends(get_current_user)):
+    """Calendar range cache hit/miss counters for this worker (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only super admin can inspect caches")
+    
+    return team_calendar.calendar_cache_stats()
+
+@api_router.get("/system/executors")
+async def get_executor_stats(current_user: User = Depends(get_current_user)):
+    """CPU/password executor queue and timing counters for this worker (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only super admin can inspect executors")
+    
+    return executor_stats()
+
+@api_router.post("/system/analytics-snapshots/rebuild")
+async def rebuild_analytics_snapshots(current_user: User = Depends(get_current_user)):
+    """Recount snapshot counters and recompute cached reports now (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only super admin can rebuild analytics snapshots")
+    
+    return await snapshots.rebuild_all(db)
+
 # ============= INCLUDE ROUTERS =============
 # Import modular routers
 from routers.visitors import router as visitors_router
 from routers.compliance import router as compliance_router
 from routers.workforce import router as workforce_router
-from routers.scheduled_reports import router as scheduled_reports_router
+from routers.scheduled_reports import router as scheduled_reports_router, run_due_report
 from routers.collaborations import router as collaborations_router
+from routers.jobs import router as jobs_router
 
 # Include the main API router
 app.include_router(api_router)
@@ -15777,6 +15457,7 @@ app.include_router(compliance_router, prefix="/api")
 app.include_router(workforce_router, prefix="/api")
 app.include_router(scheduled_reports_router, prefix="/api")
 app.include_router(collaborations_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
 
 app.add_middleware(
     CORSMiddleware,
@@ -15792,6 +15473,93 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def ensure_db_indexes():
+    """Create declared indexes and log any drift; never blocks startup on failure."""
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Index reconciliation failed: {e}")
+
+@app.on_event("startup")
+async def start_analytics_snapshots():
+    """Seed snapshot counters on first boot and schedule the nightly rebuild."""
+    try:
+        await snapshots.ensure_snapshots(db)
+    except Exception as e:
+        logger.error(f"Analytics snapshot seeding failed: {e}")
+    app.state.snapshot_rebuild_task = asyncio.create_task(snapshots.run_nightly_rebuild(db))
+
+@app.on_event("startup")
+async def start_search_backfill():
+    """Index collaboration content written before search_terms existed, in the background."""
+    async def backfill():
+        try:
+            updated = await backfill_search_terms(db)
+            if updated:
+                logger.info(f"Backfilled search terms on {updated} collaboration documents")
+        except Exception as e:
+            logger.error(f"Search term backfill failed: {e}")
+    app.state.search_backfill_task = asyncio.create_task(backfill())
+
+@app.on_event("startup")
+async def start_read_tracking_backfill():
+    """Move announcement readers and memo acknowledgements out of their legacy arrays, in the background."""
+    async def backfill():
+        try:
+            migrated = await backfill_read_tracking(db)
+            if any(migrated.values()):
+                logger.info(f"Migrated read tracking: {migrated}")
+        except Exception as e:
+            logger.error(f"Read tracking backfill failed: {e}")
+    app.state.read_tracking_backfill_task = asyncio.create_task(backfill())
+
+@app.on_event("startup")
+async def start_calendar_backfill():
+    """Add birthday/anniversary month-day keys to employees that predate them, in the background."""
+    async def backfill():
+        try:
+            updated = await team_calendar.backfill_calendar_keys(db)
+            if updated:
+                logger.info(f"Backfilled calendar keys on {updated} employees")
+                invalidate_calendar("people")
+        except Exception as e:
+            logger.error(f"Calendar key backfill failed: {e}")
+    app.state.calendar_backfill_task = asyncio.create_task(backfill())
+
+@app.on_event("startup")
+async def start_inprocess_job_workers():
+    """Run job and mail workers and the report scheduler inside the API when JOB_INPROCESS_WORKERS > 0 (single-process deployments)."""
+    concurrency = int(os.environ.get("JOB_INPROCESS_WORKERS", "0"))
+    if concurrency > 0:
+        app.state.job_pool = WorkerPool(db, concurrency=concurrency)
+        app.state.job_pool.start()
+        app.state.mail_worker = mailer.MailWorker(db)
+        app.state.mail_worker.start()
+        app.state.report_scheduler = ReportScheduler(db, run_due_report)
+        app.state.report_scheduler.start()
+
+@app.on_event("startup")
+async def start_realtime_broker():
+    """Connect the collaboration WebSocket broker to its cross-replica backend (REALTIME_BACKEND)."""
+    await realtime.broker.start(realtime.create_backend(realtime.REALTIME_BACKEND, db))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    task = getattr(app.state, "snapshot_rebuild_task", None)
+    if task:
+        task.cancel()
+    pool = getattr(app.state, "job_pool", None)
+    if pool:
+        await pool.stop()
+    mail_worker = getattr(app.state, "mail_worker", None)
+    if mail_worker:
+        await mail_worker.stop()
+    report_scheduler = getattr(app.state, "report_scheduler", None)
+    if report_scheduler:
+        await report_scheduler.stop()
+    await realtime.broker.stop()
+    shutdown_executors()
+    if _push_dispatcher:
+        await _push_dispatcher.close()
     client.close()
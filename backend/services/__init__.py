@@ -0,0 +1,5 @@
+"""Services package for HR Platform.
+
+Shared infrastructure used by the API routes: pagination, caching, background
+work and delivery engines.
+"""
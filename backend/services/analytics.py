@@ -0,0 +1,649 @@
+"""HR analytics engine.
+
+Computes the payloads served by `/analytics/overview`, `/turnover`, `/hiring`,
+`/salary` and `/forecast`, plus the `/reports/overview` and `/reports/employees`
+dashboards. Categorical counts and salary groupings run as
+`$group`/`$facet`/`$bucket` pipelines inside MongoDB; the headcount trend and
+tenure buckets need per-employee dates and are computed in a single pass over
+projected columns instead of nested scans.
+"""
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional
+
+# The analytics endpoints have always read terminations from this collection.
+TERMINATIONS_COLLECTION = "offboarding"
+
+SALARY_BUCKETS = [
+    (30000, "0-30k"), (50000, "30k-50k"), (75000, "50k-75k"),
+    (100000, "75k-100k"), (150000, "100k-150k"),
+]
+SALARY_OVERFLOW_BUCKET = "150k+"
+TENURE_BUCKETS = ["0-1 year", "1-2 years", "2-5 years", "5+ years"]
+FUNNEL_STAGES = {
+    "applied": ["new", "screening", "interview", "offer", "hired", "rejected"],
+    "screening": ["screening", "interview", "offer", "hired"],
+    "interview": ["interview", "offer", "hired"],
+    "offer": ["offer", "hired"],
+    "hired": ["hired"],
+}
+
+
+# ============= HELPERS =============
+
+def month_windows(now: datetime) -> List[datetime]:
+    """The 12 reference points used by every trend chart, oldest first."""
+    return [now - timedelta(days=i * 30) for i in range(11, -1, -1)]
+
+
+def parse_hire_date(value: Any) -> Optional[datetime]:
+    """Parse a hire/created date the way the trend charts always have.
+
+    ISO timestamps must carry an offset; naive ones could never be compared
+    with the timezone-aware reference dates and were skipped.
+    """
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        if "T" in value:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else None
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def parse_day(value: Any, prefix_only: bool = False) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD date (optionally the first 10 chars of a timestamp)."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.strptime(value[:10] if prefix_only else value, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def hire_or_created(doc: Dict[str, Any]) -> Any:
+    return doc.get("hire_date") or doc.get("created_at", "")
+
+
+def month_key(value: Any) -> Optional[str]:
+    return value[:7] if isinstance(value, str) and value else None
+
+
+def upper_median(sorted_values: List[float]) -> float:
+    return sorted_values[len(sorted_values) // 2] if sorted_values else 0
+
+
+def hire_date_expr() -> Dict[str, Any]:
+    """Aggregation expression for `hire_date or created_at`."""
+    hire = {"$ifNull": ["$hire_date", ""]}
+    return {"$cond": [{"$eq": [hire, ""]}, {"$ifNull": ["$created_at", ""]}, hire]}
+
+
+async def count_by_month(collection, date_expr: Any, match: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """Count documents per YYYY-MM prefix of a string date expression."""
+    pipeline = [{"$match": match}] if match else []
+    pipeline += [
+        {"$project": {"_id": 0, "d": date_expr}},
+        {"$match": {"d": {"$type": "string", "$ne": ""}}},
+        {"$group": {"_id": {"$substrCP": ["$d", 0, 7]}, "count": {"$sum": 1}}},
+    ]
+    return {row["_id"]: row["count"] async for row in collection.aggregate(pipeline)}
+
+
+async def department_names(db) -> Dict[str, str]:
+    departments = await db.departments.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    return {d["id"]: d["name"] for d in departments if "id" in d}
+
+
+def positive_salary_match() -> Dict[str, Any]:
+    return {"salary": {"$type": "number", "$gt": 0}}
+
+
+def salary_summary(department: str, salaries: List[float], rounded: bool) -> Dict[str, Any]:
+    salaries = sorted(salaries)
+    r = (lambda v: round(v, 0)) if rounded else (lambda v: v)
+    return {
+        "department": department,
+        "average": round(sum(salaries) / len(salaries), 0),
+        "median": r(upper_median(salaries)),
+        "min": r(salaries[0]),
+        "max": r(salaries[-1]),
+        "count": len(salaries),
+    }
+
+
+async def salaries_by_department(db, dept_map: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Headcount and positive salaries of active employees, keyed by department name."""
+    pipeline = [
+        {"$match": {"status": {"$ne": "terminated"}}},
+        {"$group": {
+            "_id": "$department_id",
+            "headcount": {"$sum": 1},
+            "salary_total": {"$sum": "$salary"},
+            "salaries": {"$push": {"$cond": [
+                {"$and": [{"$isNumber": "$salary"}, {"$gt": ["$salary", 0]}]}, "$salary", "$$REMOVE"
+            ]}},
+        }},
+    ]
+    by_name: Dict[str, Dict[str, Any]] = {}
+    async for row in db.employees.aggregate(pipeline):
+        name = dept_map.get(row["_id"], "Other")
+        entry = by_name.setdefault(name, {"headcount": 0, "salary_total": 0, "salaries": []})
+        entry["headcount"] += row["headcount"]
+        entry["salary_total"] += row["salary_total"]
+        entry["salaries"].extend(row["salaries"])
+    return by_name
+
+
+# ============= OVERVIEW =============
+
+def headcount_trend(hires: List[datetime], exits: Dict[str, datetime], hire_by_emp: Dict[str, datetime],
+                    windows: List[datetime], fallback: int) -> List[Dict[str, Any]]:
+    """Employees hired on/before each window and not terminated before it.
+
+    `hires` is the sorted list of hire dates, so the hired count is a bisect;
+    only terminated employees need a per-window check.
+    """
+    trend = []
+    for month_date in windows:
+        count = bisect_right(hires, month_date)
+        for emp_id, term_date in exits.items():
+            if term_date < month_date and hire_by_emp[emp_id] <= month_date:
+                count -= 1
+        trend.append({"month": month_date.strftime("%b %Y"), "headcount": count if count > 0 else fallback})
+    return trend
+
+
+async def compute_overview(db, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    windows = month_windows(now)
+    this_month = f"{now.year}-{now.month:02d}"
+
+    dept_map = await department_names(db)
+    by_dept = await salaries_by_department(db, dept_map)
+    total_headcount = sum(d["headcount"] for d in by_dept.values())
+    salary_total = sum(d["salary_total"] for d in by_dept.values())
+
+    # One pass over (id, hire date) of every employee
+    hire_by_emp: Dict[str, datetime] = {}
+    hires: List[datetime] = []
+    hires_by_month: Counter = Counter()
+    new_hires_this_month = 0
+    async for emp in db.employees.find({}, {"_id": 0, "id": 1, "hire_date": 1, "created_at": 1}):
+        raw = hire_or_created(emp)
+        key = month_key(raw)
+        if key:
+            hires_by_month[key] += 1
+            if raw.startswith(this_month):
+                new_hires_this_month += 1
+        parsed = parse_hire_date(raw)
+        if parsed is not None:
+            hires.append(parsed)
+            if emp.get("id") is not None:
+                hire_by_emp[emp["id"]] = parsed
+    hires.sort()
+
+    # One pass over terminations: earliest exit per counted employee
+    exits: Dict[str, datetime] = {}
+    reasons: Counter = Counter()
+    terminations_this_year = terminations_this_month = 0
+    async for off in db[TERMINATIONS_COLLECTION].find(
+        {}, {"_id": 0, "employee_id": 1, "last_working_date": 1, "reason": 1}
+    ):
+        reason = off.get("reason", "other")
+        reasons[reason if reason is not None else "other"] += 1
+        last_day = off.get("last_working_date", "")
+        if isinstance(last_day, str):
+            terminations_this_year += last_day.startswith(str(now.year))
+            terminations_this_month += last_day.startswith(this_month)
+        emp_id = off.get("employee_id")
+        term_date = parse_day(last_day)
+        if term_date is not None and emp_id in hire_by_emp:
+            term_date = term_date.replace(tzinfo=timezone.utc)
+            if emp_id not in exits or term_date < exits[emp_id]:
+                exits[emp_id] = term_date
+
+    salary_benchmarks = [
+        salary_summary(name, d["salaries"], rounded=True) for name, d in by_dept.items() if d["salaries"]
+    ]
+
+    open_positions = await db.jobs.count_documents({"status": "open"})
+    pending_candidates = await db.candidates.count_documents({"status": {"$in": ["new", "screening", "interview"]}})
+
+    return {
+        "summary": {
+            "total_headcount": total_headcount,
+            "new_hires_this_month": new_hires_this_month,
+            "terminations_this_month": terminations_this_month,
+            "turnover_rate": round((terminations_this_year / (total_headcount or 1)) * 100, 1),
+            "open_positions": open_positions,
+            "pending_candidates": pending_candidates,
+            "avg_salary": round(salary_total / max(total_headcount, 1), 0),
+        },
+        "headcount_trend": headcount_trend(hires, exits, hire_by_emp, windows, total_headcount),
+        "hiring_trend": [
+            {"month": m.strftime("%b"), "hires": hires_by_month.get(m.strftime("%Y-%m"), 0)} for m in windows
+        ],
+        "salary_benchmarks": sorted(salary_benchmarks, key=lambda x: x["average"], reverse=True),
+        "turnover_by_reason": [
+            {"reason": k.replace("_", " ").title(), "count": v} for k, v in reasons.items()
+        ],
+        "department_distribution": sorted(
+            [{"department": k, "count": d["headcount"]} for k, d in by_dept.items()],
+            key=lambda x: x["count"], reverse=True
+        ),
+    }
+
+
+# ============= TURNOVER =============
+
+def tenure_bucket(hire_date: datetime, term_date: datetime) -> str:
+    tenure_years = (term_date - hire_date).days / 365
+    if tenure_years < 1:
+        return "0-1 year"
+    if tenure_years < 2:
+        return "1-2 years"
+    if tenure_years < 5:
+        return "2-5 years"
+    return "5+ years"
+
+
+async def compute_turnover(db, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    offboardings = await db[TERMINATIONS_COLLECTION].find(
+        {}, {"_id": 0, "employee_id": 1, "last_working_date": 1}
+    ).to_list(None)
+
+    # Hash lookup of only the employees that actually left
+    employee_ids = list({o.get("employee_id") for o in offboardings if o.get("employee_id") is not None})
+    employees = await db.employees.find(
+        {"id": {"$in": employee_ids}}, {"_id": 0, "id": 1, "department_id": 1, "hire_date": 1}
+    ).to_list(None)
+    emp_by_id: Dict[str, Dict[str, Any]] = {}
+    for emp in employees:
+        emp_by_id.setdefault(emp["id"], emp)
+    dept_map = await department_names(db)
+
+    terminations_by_month: Counter = Counter()
+    by_dept: Counter = Counter()
+    tenure = {bucket: 0 for bucket in TENURE_BUCKETS}
+    for off in offboardings:
+        key = month_key(off.get("last_working_date", ""))
+        if key:
+            terminations_by_month[key] += 1
+
+        emp = emp_by_id.get(off.get("employee_id"))
+        if not emp:
+            continue
+        by_dept[dept_map.get(emp.get("department_id", "unknown"), "Other")] += 1
+        hire_date = parse_day(emp.get("hire_date", ""), prefix_only=True)
+        term_date = parse_day(off.get("last_working_date", ""), prefix_only=True)
+        if hire_date and term_date:
+            tenure[tenure_bucket(hire_date, term_date)] += 1
+
+    return {
+        "monthly_turnover": [
+            {"month": m.strftime("%b %Y"), "terminations": terminations_by_month.get(m.strftime("%Y-%m"), 0)}
+            for m in month_windows(now)
+        ],
+        "by_department": [{"department": k, "count": v} for k, v in by_dept.items()],
+        "by_tenure": [{"tenure": k, "count": v} for k, v in tenure.items()],
+        "total_terminations": len(offboardings),
+    }
+
+
+# ============= HIRING =============
+
+def days_between_iso(start: Any, end: Any) -> Optional[int]:
+    try:
+        started = datetime.fromisoformat(start.replace("Z", "+00:00"))
+        finished = datetime.fromisoformat(end.replace("Z", "+00:00"))
+        return (finished - started).days
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+async def compute_hiring(db, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+
+    facets = await db.candidates.aggregate([
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "hired": [
+                {"$match": {"status": "hired"}},
+                {"$project": {"_id": 0, "applied_at": 1, "created_at": 1, "hired_at": 1,
+                              "updated_at": 1, "source": 1}},
+            ],
+            "total": [{"$count": "count"}],
+        }}
+    ]).to_list(1)
+    facets = facets[0] if facets else {"by_status": [], "hired": [], "total": []}
+    status_counts = {row["_id"]: row["count"] for row in facets["by_status"]}
+    funnel = {
+        stage: sum(status_counts.get(s, 0) for s in statuses) for stage, statuses in FUNNEL_STAGES.items()
+    }
+
+    hire_times = []
+    source_counts: Counter = Counter()
+    for c in facets["hired"]:
+        source_counts[c.get("source", "Direct")] += 1
+        applied = c.get("applied_at") or c.get("created_at", "")
+        hired = c.get("hired_at") or c.get("updated_at", "")
+        if applied and hired:
+            days = days_between_iso(applied, hired)
+            if days is not None and days > 0:
+                hire_times.append(days)
+
+    hires_by_month = await count_by_month(db.employees, hire_date_expr())
+    dept_map = await department_names(db)
+    open_by_dept: Counter = Counter()
+    async for row in db.jobs.aggregate([
+        {"$match": {"status": "open"}},
+        {"$group": {"_id": "$department_id", "count": {"$sum": 1}}},
+    ]):
+        open_by_dept[dept_map.get(row["_id"], "Other")] += row["count"]
+
+    return {
+        "funnel": funnel,
+        "avg_time_to_hire": round(sum(hire_times) / max(len(hire_times), 1), 1),
+        "by_source": [{"source": k, "count": v} for k, v in source_counts.items()],
+        "monthly_hires": [
+            {"month": m.strftime("%b"), "hires": hires_by_month.get(m.strftime("%Y-%m"), 0)}
+            for m in month_windows(now)
+        ],
+        "open_positions_by_dept": [{"department": k, "count": v} for k, v in open_by_dept.items()],
+        "total_open_positions": sum(open_by_dept.values()),
+        "total_candidates": facets["total"][0]["count"] if facets["total"] else 0,
+    }
+
+
+# ============= SALARY =============
+
+async def compute_salary(db) -> Dict[str, Any]:
+    dept_map = await department_names(db)
+    boundaries = [0] + [upper for upper, _ in SALARY_BUCKETS]
+    bucket_labels = {lower: label for lower, (_, label) in zip(boundaries, SALARY_BUCKETS)}
+
+    facets = await db.employees.aggregate([
+        {"$match": {"status": {"$ne": "terminated"}, **positive_salary_match()}},
+        {"$facet": {
+            "by_department": [
+                {"$sort": {"salary": 1}},
+                {"$group": {"_id": "$department_id", "salaries": {"$push": "$salary"}}},
+            ],
+            "distribution": [
+                {"$bucket": {"groupBy": "$salary", "boundaries": boundaries,
+                             "default": SALARY_OVERFLOW_BUCKET, "output": {"count": {"$sum": 1}}}},
+            ],
+            "by_position": [
+                {"$group": {"_id": {"$ifNull": ["$position", "Other"]},
+                            "average": {"$avg": "$salary"}, "count": {"$sum": 1}}},
+            ],
+        }}
+    ]).to_list(1)
+    facets = facets[0] if facets else {"by_department": [], "distribution": [], "by_position": []}
+
+    salaries_by_name: Dict[str, List[float]] = {}
+    for row in facets["by_department"]:
+        salaries_by_name.setdefault(dept_map.get(row["_id"], "Other"), []).extend(row["salaries"])
+    all_salaries = sorted(s for sals in salaries_by_name.values() for s in sals)
+
+    if all_salaries:
+        total_salary = sum(all_salaries)
+        avg_salary = total_salary / len(all_salaries)
+        median_salary, min_salary, max_salary = upper_median(all_salaries), all_salaries[0], all_salaries[-1]
+    else:
+        total_salary = avg_salary = median_salary = min_salary = max_salary = 0
+
+    buckets = {label: 0 for _, label in SALARY_BUCKETS}
+    buckets[SALARY_OVERFLOW_BUCKET] = 0
+    for row in facets["distribution"]:
+        label = bucket_labels.get(row["_id"], SALARY_OVERFLOW_BUCKET)
+        buckets[label] += row["count"]
+
+    position_stats = [
+        {"position": row["_id"], "average": round(row["average"], 0), "count": row["count"]}
+        for row in facets["by_position"]
+    ]
+
+    return {
+        "overall": {
+            "total_payroll": round(total_salary, 0),
+            "average": round(avg_salary, 0),
+            "median": round(median_salary, 0),
+            "min": round(min_salary, 0),
+            "max": round(max_salary, 0),
+            "employee_count": len(all_salaries),
+        },
+        "by_department": sorted(
+            [salary_summary(name, sals, rounded=False) for name, sals in salaries_by_name.items()],
+            key=lambda x: x["average"], reverse=True
+        ),
+        "distribution": [{"range": k, "count": v} for k, v in buckets.items()],
+        "by_position": sorted(position_stats, key=lambda x: x["average"], reverse=True)[:10],
+    }
+
+
+# ============= FORECAST =============
+
+async def compute_forecast(db, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    hires_by_month = await count_by_month(db.employees, hire_date_expr())
+    terms_by_month = await count_by_month(db[TERMINATIONS_COLLECTION], "$last_working_date")
+    current_headcount = await db.employees.count_documents({"status": {"$ne": "terminated"}})
+
+    historical = []
+    monthly_hires = []
+    monthly_terms = []
+    for month_date in month_windows(now):
+        key = month_date.strftime("%Y-%m")
+        hires = hires_by_month.get(key, 0)
+        terms = terms_by_month.get(key, 0)
+        monthly_hires.append(hires)
+        monthly_terms.append(terms)
+        historical.append({
+            "month": month_date.strftime("%b %Y"),
+            "hires": hires,
+            "terminations": terms,
+            "net_change": hires - terms,
+        })
+
+    # Simple linear forecast for next 6 months
+    avg_monthly_hires = sum(monthly_hires[-6:]) / 6
+    avg_monthly_terms = sum(monthly_terms[-6:]) / 6
+    avg_net_change = avg_monthly_hires - avg_monthly_terms
+
+    forecast = []
+    projected_headcount = current_headcount
+    for i in range(1, 7):
+        month_date = now + timedelta(days=i * 30)
+        projected_headcount = max(0, projected_headcount + avg_net_change)
+        forecast.append({
+            "month": month_date.strftime("%b %Y"),
+            "projected_headcount": round(projected_headcount),
+            "projected_hires": round(avg_monthly_hires),
+            "projected_terminations": round(avg_monthly_terms),
+            "is_forecast": True,
+        })
+
+    return {
+        "current_headcount": current_headcount,
+        "historical": historical,
+        "forecast": forecast,
+        "trends": {
+            "avg_monthly_hires": round(avg_monthly_hires, 1),
+            "avg_monthly_terminations": round(avg_monthly_terms, 1),
+            "avg_net_change": round(avg_net_change, 1),
+            "projected_year_end_headcount": round(current_headcount + (avg_net_change * 12)),
+        },
+    }
+
+
+# ============= REPORTS =============
+
+def title_counts(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    return [{"name": k.replace("_", " ").title(), "value": v} for k, v in counts.items()]
+
+
+async def compute_reports_overview(db, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    thirty_days_ago = (now - timedelta(days=30)).isoformat()
+
+    total_employees = await db.employees.count_documents({})
+    active_employees = await db.employees.count_documents({"employment_status": "active"})
+    new_hires = await db.employees.count_documents({"created_at": {"$gte": thirty_days_ago}})
+
+    total_tickets = await db.tickets.count_documents({})
+    open_tickets = await db.tickets.count_documents({"status": {"$in": ["open", "in_progress"]}})
+    resolved_tickets = await db.tickets.count_documents({"status": "resolved"})
+
+    pending_leaves = await db.leave_requests.count_documents({"status": "pending"})
+    approved_leaves = await db.leave_requests.count_documents({"status": "approved"})
+    total_trainings = await db.trainings.count_documents({})
+    pending_expenses = await db.expense_claims.count_documents({"status": "pending"})
+
+    return {
+        "employees": {
+            "total": total_employees,
+            "active": active_employees,
+            "new_hires_30d": new_hires,
+            "inactive": total_employees - active_employees,
+        },
+        "tickets": {
+            "total": total_tickets,
+            "open": open_tickets,
+            "resolved": resolved_tickets,
+            "resolution_rate": round((resolved_tickets / total_tickets * 100) if total_tickets > 0 else 0, 1),
+        },
+        "leaves": {
+            "pending": pending_leaves,
+            "approved": approved_leaves,
+        },
+        "trainings": {
+            "total": total_trainings,
+        },
+        "expenses": {
+            "pending": pending_expenses,
+        },
+    }
+
+
+def report_tenure_bucket(hire_date_str: str, now: datetime) -> str:
+    try:
+        if "T" in hire_date_str:
+            hire_date = datetime.fromisoformat(hire_date_str.replace("Z", "+00:00"))
+        else:
+            hire_date = datetime.strptime(hire_date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        years = (now - hire_date).days / 365
+    except (ValueError, TypeError):
+        return "<1"
+    if years < 1:
+        return "<1"
+    if years < 2:
+        return "1-2"
+    if years < 5:
+        return "2-5"
+    if years < 10:
+        return "5-10"
+    return "10+"
+
+
+async def compute_employee_report(db, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    dept_map = await department_names(db)
+
+    by_department: Counter = Counter()
+    by_employment_type: Counter = Counter()
+    by_status: Counter = Counter()
+    by_gender: Counter = Counter()
+    by_location: Counter = Counter()
+    tenure_distribution = {"<1": 0, "1-2": 0, "2-5": 0, "5-10": 0, "10+": 0}
+    monthly_hires = {(now - timedelta(days=30 * i)).strftime("%Y-%m"): 0 for i in range(12)}
+
+    total = 0
+    projection = {
+        "_id": 0, "department_id": 1, "employment_type": 1, "employment_status": 1,
+        "gender": 1, "work_location": 1, "hire_date": 1, "created_at": 1,
+    }
+    async for emp in db.employees.find({}, projection):
+        total += 1
+        by_department[dept_map.get(emp.get("department_id", "unassigned"), "Unassigned")] += 1
+        by_employment_type[emp.get("employment_type", "full_time")] += 1
+        by_status[emp.get("employment_status", "active")] += 1
+        by_gender[emp.get("gender", "not_specified") or "not_specified"] += 1
+        by_location[emp.get("work_location", "office") or "office"] += 1
+        if emp.get("hire_date"):
+            tenure_distribution[report_tenure_bucket(emp["hire_date"], now)] += 1
+        created = emp.get("created_at", "")
+        if created and created[:7] in monthly_hires:
+            monthly_hires[created[:7]] += 1
+
+    return {
+        "total": total,
+        "by_department": [{"name": k, "value": v} for k, v in sorted(by_department.items(), key=lambda x: -x[1])],
+        "by_employment_type": title_counts(by_employment_type),
+        "by_status": title_counts(by_status),
+        "by_gender": title_counts(by_gender),
+        "by_location": title_counts(by_location),
+        "tenure_distribution": [{"name": k, "value": v} for k, v in tenure_distribution.items()],
+        "monthly_hires": [{"month": k, "count": v} for k, v in sorted(monthly_hires.items())],
+    }
+
+
+# ============= SURVEYS =============
+
+def aggregate_survey_results(survey: Dict[str, Any], responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-question option counts, rating statistics and text answers.
+
+    Pure Python over every response; run it on the CPU executor.
+    """
+    results = {
+        "survey": survey,
+        "total_responses": len(responses),
+        "questions": []
+    }
+
+    for question in survey.get("questions", []):
+        q_id = question.get("id")
+        q_type = question.get("type")
+        q_results = {
+            "question": question,
+            "responses": []
+        }
+        answers = [resp.get("answers", {}).get(q_id) for resp in responses]
+
+        if q_type in ["single_choice", "multiple_choice"]:
+            option_counts = {opt: 0 for opt in question.get("options", [])}
+            for answer in answers:
+                if isinstance(answer, list):
+                    for a in answer:
+                        if a in option_counts:
+                            option_counts[a] += 1
+                elif answer in option_counts:
+                    option_counts[answer] += 1
+            q_results["summary"] = option_counts
+        elif q_type in ["rating", "scale"]:
+            values = []
+            for answer in answers:
+                if answer is not None:
+                    try:
+                        values.append(float(answer))
+                    except (TypeError, ValueError, OverflowError):
+                        pass
+            if values:
+                q_results["summary"] = {
+                    "average": sum(values) / len(values),
+                    "min": min(values),
+                    "max": max(values),
+                    "count": len(values)
+                }
+        else:
+            # Text responses
+            q_results["responses"] = [answer for answer in answers if answer]
+
+        results["questions"].append(q_results)
+
+    return results
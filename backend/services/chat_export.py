@@ -0,0 +1,247 @@
+"""Streaming export of a collaboration channel's history.
+
+Messages, thread replies included (they carry `parent_id`), are read from the
+Motor cursor in (created_at, id) order and encoded batch by batch, so an export
+is never capped and never held in memory:
+
+- `json`: one document {"channel", "exported_at", "exported_by", "messages",
+  "message_count"}, the shape the endpoint always returned
+- `ndjson`: one message per line
+- `csv`: one row per message, attachments flattened to `name <url>`
+- `zip`: deflated archive of channel.json, messages.ndjson, files.ndjson (the
+  channel's shared file metadata) and manifest.json
+
+Exports resume inside their date window: `after=<message id>` continues right
+after the last message a client received. The same encoders write background
+exports to `uploads/exports/` under unguessable names, fetched through the
+authenticated download endpoint and purged after CHAT_EXPORT_RETENTION_DAYS.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import csv
+import io
+import json
+import os
+import re
+import time
+import uuid
+import zipfile
+
+from fastapi import HTTPException
+
+from services.pagination import iter_batches, keyset_filter
+
+EXPORTS_DIR = Path(os.environ.get("CHAT_EXPORTS_DIR", Path(__file__).resolve().parent.parent / "uploads" / "exports"))
+CHAT_EXPORT_BATCH_SIZE = int(os.environ.get("CHAT_EXPORT_BATCH_SIZE", "1000"))
+CHAT_EXPORT_RETENTION_DAYS = float(os.environ.get("CHAT_EXPORT_RETENTION_DAYS", "7"))
+
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "zip": "application/zip",
+}
+MESSAGE_PROJECTION = {"_id": 0, "search_terms": 0}
+FILE_PROJECTION = {"_id": 0, "search_terms": 0}
+CSV_COLUMNS = [
+    "created_at", "id", "parent_id", "thread_count", "sender_id", "sender_name", "content_type",
+    "content", "attachments", "mentions", "reactions", "is_pinned", "is_edited", "edited_at",
+]
+
+ProgressCallback = Optional[Callable[..., Awaitable[None]]]
+
+
+async def export_query(db, channel_id: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                       after: Optional[str] = None) -> Dict[str, Any]:
+    """Messages of the channel inside the window, optionally after message `after`."""
+    query: Dict[str, Any] = {"channel_id": channel_id, "is_deleted": False}
+    window = {}
+    if date_from:
+        window["$gte"] = date_from
+    if date_to:
+        window["$lte"] = date_to
+    if window:
+        query["created_at"] = window
+    if after:
+        last = await db.collab_messages.find_one(
+            {"id": after, "channel_id": channel_id}, {"_id": 0, "id": 1, "created_at": 1}
+        )
+        if not last:
+            raise HTTPException(status_code=400, detail="Unknown message to resume after")
+        query = {"$and": [query, keyset_filter("created_at", 1, last.get("created_at"), last["id"])]}
+    return query
+
+
+def export_filename(channel: Dict[str, Any], fmt: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", channel.get("name") or "channel").strip("-").lower() or "channel"
+    return f"{slug}-{datetime.now(timezone.utc).strftime('%Y%m%d')}.{fmt}"
+
+
+def _message_cursor(db, query: Dict[str, Any]):
+    return db.collab_messages.find(query, MESSAGE_PROJECTION).sort([("created_at", 1), ("id", 1)])
+
+
+def _csv_row(message: Dict[str, Any]) -> List[Any]:
+    row = []
+    for column in CSV_COLUMNS:
+        value = message.get(column)
+        if column == "attachments":
+            value = "; ".join(f"{a.get('name', '')} <{a.get('url', '')}>" for a in value or [])
+        elif column == "mentions":
+            value = " ".join(value or [])
+        elif column == "reactions":
+            value = " ".join(f"{emoji}:{len(users)}" for emoji, users in (value or {}).items())
+        row.append("" if value is None else value)
+    return row
+
+
+def _ndjson_lines(docs: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(d, default=str) + "\n" for d in docs).encode("utf-8")
+
+
+class _ZipSink:
+    """Write-only file object; zipfile streams into it and we drain the chunks."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+class ChatExport:
+    """One export run; iterate `chunks()` and read `message_count` afterwards."""
+
+    def __init__(self, db, channel: Dict[str, Any], fmt: str, query: Dict[str, Any],
+                 exported_by: Optional[str] = None, progress: ProgressCallback = None):
+        if fmt not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported export format: {fmt}")
+        self.db = db
+        self.channel = channel
+        self.fmt = fmt
+        self.query = query
+        self.exported_by = exported_by
+        self.progress = progress
+        self.exported_at = datetime.now(timezone.utc).isoformat()
+        self.message_count = 0
+
+    async def _batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        total = await self.db.collab_messages.count_documents(self.query) if self.progress else None
+        async for batch in iter_batches(_message_cursor(self.db, self.query), CHAT_EXPORT_BATCH_SIZE):
+            yield batch
+            self.message_count += len(batch)
+            if self.progress:
+                await self.progress(self.message_count, total)
+
+    def chunks(self) -> AsyncIterator[bytes]:
+        return getattr(self, f"_{self.fmt}")()
+
+    async def _json(self) -> AsyncIterator[bytes]:
+        head = json.dumps({"channel": self.channel, "exported_at": self.exported_at,
+                           "exported_by": self.exported_by}, default=str)
+        yield (head[:-1] + ', "messages": [').encode("utf-8")
+        first = True
+        async for batch in self._batches():
+            body = ",".join(json.dumps(m, default=str) for m in batch)
+            yield (body if first else "," + body).encode("utf-8")
+            first = False
+        yield f'], "message_count": {self.message_count}}}'.encode("utf-8")
+
+    async def _ndjson(self) -> AsyncIterator[bytes]:
+        async for batch in self._batches():
+            yield _ndjson_lines(batch)
+
+    async def _csv(self) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        async for batch in self._batches():
+            writer.writerows(_csv_row(m) for m in batch)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    async def _zip(self) -> AsyncIterator[bytes]:
+        sink = _ZipSink()
+        archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+        archive.writestr("channel.json", json.dumps(self.channel, default=str, indent=2))
+
+        with archive.open("messages.ndjson", "w", force_zip64=True) as f:
+            async for batch in self._batches():
+                f.write(_ndjson_lines(batch))
+                yield sink.drain()
+
+        file_count = 0
+        files = self.db.collab_files.find(
+            {"channel_id": self.channel["id"], "is_deleted": False}, FILE_PROJECTION
+        ).sort([("created_at", 1), ("id", 1)])
+        with archive.open("files.ndjson", "w", force_zip64=True) as f:
+            async for batch in iter_batches(files, CHAT_EXPORT_BATCH_SIZE):
+                f.write(_ndjson_lines(batch))
+                file_count += len(batch)
+                yield sink.drain()
+
+        archive.writestr("manifest.json", json.dumps({
+            "exported_at": self.exported_at, "exported_by": self.exported_by,
+            "message_count": self.message_count, "file_count": file_count,
+        }, indent=2))
+        archive.close()
+        yield sink.drain()
+
+
+# ============= BACKGROUND EXPORT FILES =============
+
+def purge_exports(max_age_days: float = CHAT_EXPORT_RETENTION_DAYS) -> int:
+    """Delete export files older than `max_age_days`."""
+    if not EXPORTS_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for path in EXPORTS_DIR.iterdir():
+        if path.is_file() and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def export_path(name: str) -> Optional[Path]:
+    """Path of an export file by name, or None for anything that isn't one."""
+    stem, _, ext = name.partition(".")
+    if ext not in EXPORT_FORMATS or len(stem) != 32 or not all(c in "0123456789abcdef" for c in stem):
+        return None
+    path = EXPORTS_DIR / name
+    return path if path.is_file() else None
+
+
+async def write_export(export: ChatExport) -> Dict[str, Any]:
+    """Run the export into a file under EXPORTS_DIR; returns its descriptor."""
+    purge_exports()
+    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"{uuid.uuid4().hex}.{export.fmt}"
+    path = EXPORTS_DIR / name
+    tmp = path.with_suffix(".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            async for chunk in export.chunks():
+                f.write(chunk)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return {
+        "name": name,
+        "filename": export_filename(export.channel, export.fmt),
+        "format": export.fmt,
+        "size": path.stat().st_size,
+        "message_count": export.message_count,
+    }
@@ -0,0 +1,134 @@
+"""Indexed search over collaboration messages, files, polls and channels.
+
+Each searchable collection has a MongoDB text index (stemmed, ranked by
+`textScore`) plus a `search_terms` array of lower-cased tokens with a multikey
+index, maintained by the router on insert/edit/delete. The query syntax is:
+
+- `budget review`: words, ranked by relevance (documents matching more of them
+  rank higher)
+- `"quarterly budget"`: phrase, must appear as written
+- `budg*`: prefix, an anchored (index-bounded) match on `search_terms`
+- `-draft`: excluded word; a query of only exclusions matches everything
+  else, newest first, through the `search_terms` index
+
+User input never reaches a regex unescaped.
+"""
+from typing import Any, Dict, List, Optional
+import re
+
+from pymongo import UpdateOne
+
+# collection -> fields covered by its text index and search_terms
+SEARCH_FIELDS = {
+    "collab_messages": ["content"],
+    "collab_files": ["original_name"],
+    "collab_polls": ["question"],
+    "collab_channels": ["name", "description"],
+}
+MAX_SEARCH_LIMIT = 100
+MIN_PREFIX_LENGTH = 2
+BACKFILL_BATCH_SIZE = 500
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+QUERY_RE = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+
+def search_terms(*texts: Optional[str]) -> List[str]:
+    """Distinct lower-cased tokens of the given texts, in order."""
+    terms = {}
+    for text in texts:
+        for token in TOKEN_RE.findall((text or "").lower()):
+            terms[token] = None
+    return list(terms)
+
+
+def indexed(doc: Dict[str, Any], collection: str) -> Dict[str, Any]:
+    """`doc` with `search_terms` computed from the collection's searchable fields."""
+    doc["search_terms"] = search_terms(*(doc.get(f) for f in SEARCH_FIELDS[collection]))
+    return doc
+
+
+class SearchQuery:
+    def __init__(self, q: str):
+        self.words: List[str] = []
+        self.phrases: List[str] = []
+        self.prefixes: List[str] = []
+        self.excluded: List[str] = []
+        for negated, phrase, term in QUERY_RE.findall(q or ""):
+            if phrase.strip():
+                if negated:
+                    # Negated phrases are rare; exclude their words instead
+                    self.excluded.extend(search_terms(phrase))
+                else:
+                    self.phrases.append(phrase.strip())
+            elif term.startswith("-") and len(term) > 1:
+                self.excluded.extend(search_terms(term[1:]))
+            elif term.endswith("*"):
+                # Very short prefixes would match most of the index
+                self.prefixes.extend(t for t in search_terms(term.rstrip("*")) if len(t) >= MIN_PREFIX_LENGTH)
+            else:
+                self.words.extend(search_terms(term))
+
+    @property
+    def ranked(self) -> bool:
+        return bool(self.words or self.phrases)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.words or self.phrases or self.prefixes or self.excluded)
+
+    def text_search(self) -> str:
+        parts = list(self.words)
+        parts += ['"' + p.replace('"', " ") + '"' for p in self.phrases]
+        parts += [f"-{w}" for w in self.excluded]
+        return " ".join(parts)
+
+    def filter(self) -> Dict[str, Any]:
+        """Mongo filter for the query part (combine with field filters via $and)."""
+        clauses: List[Dict[str, Any]] = []
+        if self.ranked:
+            clauses.append({"$text": {"$search": self.text_search()}})
+        elif self.excluded:
+            clauses.append({"search_terms": {"$nin": self.excluded}})
+        for prefix in self.prefixes:
+            clauses.append({"search_terms": {"$regex": f"^{re.escape(prefix)}"}})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+async def run_search(collection, query: SearchQuery, filters: Dict[str, Any], limit: int,
+                     skip: int = 0, sort_field: str = "created_at") -> Dict[str, Any]:
+    """One page of matches, best first when ranked, else newest first.
+
+    Returns {"items", "has_more"}.
+    """
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    if query.empty:
+        return {"items": [], "has_more": False}
+    match = {"$and": [query.filter(), filters]} if filters else query.filter()
+    projection = {"_id": 0, "search_terms": 0}
+    if query.ranked:
+        projection["score"] = {"$meta": "textScore"}
+        sort = [("score", {"$meta": "textScore"}), (sort_field, -1)]
+    else:
+        sort = [(sort_field, -1)]
+    docs = await collection.find(match, projection).sort(sort).skip(max(skip, 0)).limit(limit + 1).to_list(limit + 1)
+    return {"items": docs[:limit], "has_more": len(docs) > limit}
+
+
+async def backfill_search_terms(db) -> int:
+    """Add `search_terms` to documents written before search indexing existed."""
+    updated = 0
+    for name, fields in SEARCH_FIELDS.items():
+        collection = db[name]
+        while True:
+            docs = await collection.find(
+                {"search_terms": {"$exists": False}}, {"_id": 1, **{f: 1 for f in fields}}
+            ).limit(BACKFILL_BATCH_SIZE).to_list(BACKFILL_BATCH_SIZE)
+            if not docs:
+                break
+            await collection.bulk_write([
+                UpdateOne({"_id": d["_id"]}, {"$set": {"search_terms": search_terms(*(d.get(f) for f in fields))}})
+                for d in docs
+            ], ordered=False)
+            updated += len(docs)
+    return updated
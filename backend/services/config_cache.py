@@ -0,0 +1,190 @@
+"""Process-local cache of the small config documents read on every app load.
+
+Entries (`settings`, `translations`, `mobile_settings`) hold the raw stored
+document and the version it was loaded at. Versions are per-collection change
+counters in the `config_versions` collection (`VersionCounters`), bumped by
+every write path, so all workers see a change:
+
+- a worker reads all versions in one query at most every
+  CONFIG_VERSION_CHECK_SECONDS, and reloads an entry only when its version
+  moved (or CONFIG_CACHE_TTL_SECONDS passed, for writes made outside the API);
+- the worker that made the change drops its entry immediately.
+
+`conditional_response()` serves a rendered entry with a weak ETag derived from
+the body, answering `If-None-Match` revalidations with 304 and no body.
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo import ReturnDocument
+
+from database import register_index
+
+CONFIG_VERSIONS_COLLECTION = "config_versions"
+CONFIG_VERSION_CHECK_SECONDS = float(os.environ.get("CONFIG_VERSION_CHECK_SECONDS", "2"))
+CONFIG_CACHE_TTL_SECONDS = float(os.environ.get("CONFIG_CACHE_TTL_SECONDS", "300"))
+
+register_index(CONFIG_VERSIONS_COLLECTION, [("id", 1)], unique=True)
+
+
+async def load_settings(db) -> Optional[Dict[str, Any]]:
+    return await db.settings.find_one({"id": "global_settings"}, {"_id": 0})
+
+
+async def load_translations(db) -> Optional[Dict[str, Any]]:
+    return await db.translations.find_one({"id": "custom_translations"}, {"_id": 0})
+
+
+async def load_mobile_settings(db) -> Optional[Dict[str, Any]]:
+    return await db.mobile_settings.find_one({"id": "mobile_config"}, {"_id": 0})
+
+
+LOADERS: Dict[str, Callable[[Any], Awaitable[Optional[Dict[str, Any]]]]] = {
+    "settings": load_settings,
+    "translations": load_translations,
+    "mobile_settings": load_mobile_settings,
+}
+
+
+class ConfigEntry:
+    """A loaded config document; `render()` memoizes each served body and its ETag."""
+
+    def __init__(self, value: Optional[Dict[str, Any]], version: int):
+        self.value = value
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self._rendered: Dict[Callable, Tuple[bytes, str]] = {}
+
+    def render(self, payload: Callable[[Optional[Dict[str, Any]]], Any]) -> Tuple[bytes, str]:
+        if payload not in self._rendered:
+            body = JSONResponse(jsonable_encoder(payload(self.value))).body
+            self._rendered[payload] = (body, f'W/"{hashlib.sha1(body).hexdigest()[:20]}"')
+        return self._rendered[payload]
+
+
+class VersionCounters:
+    """Per-collection change counters, shared by all workers through `config_versions`."""
+
+    def __init__(self, check_interval: float = CONFIG_VERSION_CHECK_SECONDS):
+        self._check_interval = check_interval
+        self._versions: Dict[str, int] = {}
+        self._checked = 0.0
+        self._checking: Optional[asyncio.Future] = None
+
+    async def current(self, db, names: Iterable[str]) -> Dict[str, int]:
+        """Versions of `names`, at most CONFIG_VERSION_CHECK_SECONDS behind other workers."""
+        if self._checked + self._check_interval <= time.monotonic():
+            # Concurrent requests share one version read
+            if self._checking is None:
+                self._checking = asyncio.ensure_future(self._read(db))
+            await asyncio.shield(self._checking)
+        return {name: self._versions.get(name, 0) for name in names}
+
+    async def _read(self, db) -> None:
+        try:
+            docs = await db[CONFIG_VERSIONS_COLLECTION].find({}, {"_id": 0, "id": 1, "version": 1}).to_list(None)
+            for doc in docs:
+                self._versions[doc["id"]] = max(self._versions.get(doc["id"], 0), doc.get("version", 0))
+            self._checked = time.monotonic()
+        finally:
+            self._checking = None
+
+    async def bump(self, db, name: str) -> int:
+        """Record a change to `name` for every worker; call after the write."""
+        doc = await db[CONFIG_VERSIONS_COLLECTION].find_one_and_update(
+            {"id": name}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        self._versions[name] = max(self._versions.get(name, 0), doc["version"])
+        return doc["version"]
+
+    def get(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def expire(self) -> None:
+        """Force a version read on the next lookup."""
+        self._checked = 0.0
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._versions)
+
+
+class ConfigCache:
+    def __init__(self, counters: Optional[VersionCounters] = None, ttl: float = CONFIG_CACHE_TTL_SECONDS):
+        self._counters = counters or VersionCounters()
+        self._ttl = ttl
+        self._entries: Dict[str, ConfigEntry] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db, name: str) -> ConfigEntry:
+        version = (await self._counters.current(db, [name]))[name]
+        entry = self._entries.get(name)
+        if entry and entry.version >= version and entry.loaded_at + self._ttl > time.monotonic():
+            self.hits += 1
+            return entry
+        self.misses += 1
+        # Stamped with the version seen before the read: a bump racing the load
+        # leaves the entry behind and the next check reloads it.
+        entry = ConfigEntry(await LOADERS[name](db), version)
+        if entry.version >= self._counters.get(name):
+            self._entries[name] = entry
+        return entry
+
+    async def bump(self, db, name: str) -> int:
+        version = await self._counters.bump(db, name)
+        self._entries.pop(name, None)
+        return version
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._counters.expire()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "versions": self._counters.stats()}
+
+
+version_counters = VersionCounters()
+config_cache = ConfigCache(version_counters)
+
+
+async def get_config(db, name: str) -> Optional[Dict[str, Any]]:
+    """The stored config document (None when it has never been saved)."""
+    return (await config_cache.get(db, name)).value
+
+
+async def config_changed(db, name: str) -> None:
+    await config_cache.bump(db, name)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" name the same representation
+    tag = etag[2:] if etag.startswith("W/") else etag
+    return any((t.strip()[2:] if t.strip().startswith("W/") else t.strip()) == tag for t in header.split(","))
+
+
+def conditional_response(request: Request, body: bytes, etag: str, cache_control: str = "no-cache") -> Response:
+    """200 with `body`, or 304 when the client already holds `etag`."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def config_response(db, request: Request, name: str,
+                          payload: Callable[[Optional[Dict[str, Any]]], Any]) -> Response:
+    """Serve config `name` shaped by `payload(document)`, honouring If-None-Match."""
+    entry = await config_cache.get(db, name)
+    body, etag = entry.render(payload)
+    return conditional_response(request, body, etag)
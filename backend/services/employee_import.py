@@ -0,0 +1,139 @@
+"""Staged bulk employee import.
+
+The import runs in stages instead of row by row: the whole file is validated
+first, emails already taken are found with one `$in` query, temporary
+passwords for a chunk are hashed on the password executor (bcrypt would
+otherwise block the event loop for every row), and users, employees and welcome
+notifications are written with one unordered `insert_many` per chunk.
+Every rejected row is reported with its 1-based row number.
+"""
+from typing import Any, BinaryIO, Dict, List, Optional, Set, Tuple
+import asyncio
+import codecs
+import csv
+import os
+import re
+
+import bcrypt
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from services.executors import password_executor
+
+IMPORT_CHUNK_SIZE = int(os.environ.get("EMPLOYEE_IMPORT_CHUNK_SIZE", "500"))
+
+REQUIRED_FIELDS = ["email", "full_name"]
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class ImportRow:
+    """A validated input row and its position in the uploaded file."""
+
+    def __init__(self, row: int, email: str, data: Dict[str, Any]):
+        self.row = row
+        self.email = email
+        self.data = data
+        # (user, employee) documents, set once the row has been built
+        self.documents: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None
+
+
+def row_error(row: int, email: Optional[str], error: str) -> Dict[str, Any]:
+    return {"row": row, "email": email or "N/A", "error": error}
+
+
+def build_error(exc: Exception) -> str:
+    """One-line reason a row's documents could not be built."""
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in exc.errors()
+        )
+    return str(exc)
+
+
+def normalize_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip whitespace from keys and string values; CSV headers are lower-cased."""
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        row[str(key).strip().lower()] = value
+    return row
+
+
+def read_csv_rows(stream: BinaryIO, encoding: str = "utf-8-sig") -> List[Dict[str, Any]]:
+    """Parse an uploaded CSV file incrementally from its (spooled) binary stream.
+
+    Blocking; call it from a thread. Blank lines are skipped.
+    """
+    reader = csv.DictReader(codecs.iterdecode(stream, encoding))
+    return [normalize_row(r) for r in reader if any((v or "").strip() for v in r.values() if isinstance(v, str))]
+
+
+def validate_rows(rows: List[Dict[str, Any]]) -> Tuple[List[ImportRow], List[Dict[str, Any]]]:
+    """Check required fields, email format and duplicates within the file."""
+    valid, errors = [], []
+    seen: Set[str] = set()
+    for idx, raw in enumerate(rows):
+        row_no = idx + 1
+        if not isinstance(raw, dict):
+            errors.append(row_error(row_no, None, "Row must be an object"))
+            continue
+        data = normalize_row(raw)
+        missing = [f for f in REQUIRED_FIELDS if not data.get(f)]
+        if missing:
+            errors.append(row_error(row_no, data.get("email"), f"Missing required fields: {', '.join(missing)}"))
+            continue
+        email = str(data["email"]).lower()
+        if not EMAIL_PATTERN.match(email):
+            errors.append(row_error(row_no, email, "Invalid email address"))
+            continue
+        if email in seen:
+            errors.append(row_error(row_no, email, "Duplicate email in file"))
+            continue
+        seen.add(email)
+        valid.append(ImportRow(row_no, email, data))
+    return valid, errors
+
+
+async def existing_emails(db, emails: List[str]) -> Set[str]:
+    """Emails that already belong to a user, resolved with a single query."""
+    if not emails:
+        return set()
+    docs = await db.users.find({"email": {"$in": emails}}, {"_id": 0, "email": 1}).to_list(None)
+    return {d["email"] for d in docs}
+
+
+# ============= PASSWORD HASHING =============
+
+def _hash_batch(passwords: List[str]) -> List[str]:
+    return [bcrypt.hashpw(p.encode("utf-8"), bcrypt.gensalt()).decode("utf-8") for p in passwords]
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """bcrypt-hash passwords in one batch per executor worker, preserving order."""
+    if not passwords:
+        return []
+    size = -(-len(passwords) // password_executor.max_workers)
+    batches = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    hashed = await asyncio.gather(*(password_executor.run(_hash_batch, b) for b in batches))
+    return [h for batch in hashed for h in batch]
+
+
+# ============= WRITES =============
+
+async def insert_chunk(collection, docs: List[Dict[str, Any]]) -> Dict[int, str]:
+    """Unordered insert of a chunk; returns {index: error message} for rejected docs."""
+    if not docs:
+        return {}
+    try:
+        await collection.insert_many(docs, ordered=False)
+        return {}
+    except BulkWriteError as e:
+        return {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+
+
+def chunks(items: List[Any], size: int = IMPORT_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,132 @@
+"""Executors for CPU-bound work that must not run on the event loop.
+
+Two shared, bounded executors:
+
+- `password_executor`: a thread pool for bcrypt. bcrypt releases the GIL
+  while hashing, so threads scale with cores without pickling overhead.
+- `cpu_executor`: a process pool for pure-Python work that holds the GIL
+  (survey aggregation, building large exports). Functions and arguments
+  must be picklable and importable from a module.
+
+Both cap the number of queued calls so a burst waits on a semaphore
+instead of piling up futures, and keep counters for `/api/system/executors`.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import multiprocessing
+import os
+import time
+
+CPU_COUNT = os.cpu_count() or 1
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "0")) or CPU_COUNT
+CPU_WORKERS = int(os.environ.get("CPU_EXECUTOR_WORKERS", "0")) or CPU_COUNT
+# Calls allowed in flight (running or queued inside the pool) per executor
+EXECUTOR_MAX_PENDING_FACTOR = int(os.environ.get("EXECUTOR_MAX_PENDING_FACTOR", "4"))
+
+
+class BoundedExecutor:
+    """Lazily started pool with a cap on pending calls and timing metrics."""
+
+    def __init__(self, name: str, factory: Callable[[int], Executor], max_workers: int,
+                 max_pending: Optional[int] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * EXECUTOR_MAX_PENDING_FACTOR
+        self._factory = factory
+        self._pool: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._waiting = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_run_seconds = 0.0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            self._pool = self._factory(self.max_workers)
+        return self._pool
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        return self._semaphore
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` in the pool and await its result."""
+        self._submitted += 1
+        self._waiting += 1
+        queued_at = time.perf_counter()
+        async with self._get_semaphore():
+            self._waiting -= 1
+            self._in_flight += 1
+            started = time.perf_counter()
+            self._wait_seconds += started - queued_at
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+                self._completed += 1
+                return result
+            except Exception:
+                self._failed += 1
+                raise
+            finally:
+                self._in_flight -= 1
+                elapsed = time.perf_counter() - started
+                self._run_seconds += elapsed
+                self._max_run_seconds = max(self._max_run_seconds, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self._completed + self._failed
+        return {
+            "name": self.name,
+            "started": self._pool is not None,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "avg_wait_ms": round(self._wait_seconds * 1000 / finished, 2) if finished else 0.0,
+            "avg_run_ms": round(self._run_seconds * 1000 / finished, 2) if finished else 0.0,
+            "max_run_ms": round(self._max_run_seconds * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _thread_pool(name: str) -> Callable[[int], Executor]:
+    return lambda workers: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+
+def _process_pool(workers: int) -> Executor:
+    # spawn: forking a process that runs an event loop and driver threads is unsafe
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+password_executor = BoundedExecutor("password", _thread_pool("bcrypt"), PASSWORD_WORKERS)
+cpu_executor = BoundedExecutor("cpu", _process_pool, CPU_WORKERS)
+
+
+async def run_password_work(fn: Callable[..., Any], *args: Any) -> Any:
+    return await password_executor.run(fn, *args)
+
+
+async def run_cpu_bound(fn: Callable[..., Any], *args: Any) -> Any:
+    return await cpu_executor.run(fn, *args)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {e.name: e.stats() for e in (password_executor, cpu_executor)}
+
+
+def shutdown_executors() -> None:
+    for executor in (password_executor, cpu_executor):
+        executor.shutdown()
@@ -0,0 +1,93 @@
+"""Conditional GET for read-heavy reference routes.
+
+`ResponseCache.cached(*collections)` wraps an `api_router` GET handler:
+
+- with collections, the weak ETag is derived from the route, its query string
+  and the collections' change counters (`VersionCounters`). A matching
+  `If-None-Match` is answered with 304 before the handler runs, so a
+  revalidation costs one small read of `config_versions` instead of the list.
+  The counters are re-read on every revalidation (unlike the config cache's
+  throttled check): a write on another worker must never be answered with a
+  304 for the list it changed;
+- without collections (static data such as AVAILABLE_PERMISSIONS) the handler
+  runs and the ETag is a hash of the encoded result.
+
+Every create/update/delete of a listed collection must call
+`await response_cache.changed(collection)` after the write.
+"""
+from typing import Any, Callable, Dict, Optional
+import functools
+import hashlib
+import inspect
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from services.config_cache import VersionCounters, etag_matches
+
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def request_key(request: Request) -> str:
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+class ResponseCache:
+    def __init__(self, db, counters: Optional[VersionCounters] = None):
+        self._db = db
+        self._counters = counters or VersionCounters(check_interval=0)
+        self.not_modified = 0
+
+    async def changed(self, *collections: str) -> None:
+        for collection in collections:
+            await self._counters.bump(self._db, collection)
+
+    async def versions(self, collections) -> Dict[str, int]:
+        return await self._counters.current(self._db, collections)
+
+    def cached(self, *collections: str, cache_control: str = DEFAULT_CACHE_CONTROL) -> Callable:
+        def decorate(handler: Callable) -> Callable:
+            signature = inspect.signature(handler)
+            # FastAPI injects the request/response for the wrapper even when the handler doesn't take them
+            wants = {name: name in signature.parameters for name in ("request", "response")}
+            extra = [
+                inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=kind)
+                for name, kind in (("request", Request), ("response", Response)) if not wants[name]
+            ]
+
+            @functools.wraps(handler)
+            async def wrapper(*args, request: Request, response: Response, **kwargs):
+                if wants["request"]:
+                    kwargs["request"] = request
+                if wants["response"]:
+                    kwargs["response"] = response
+                if collections:
+                    etag = weak_etag(request_key(request), await self.versions(collections))
+                    if etag_matches(request, etag):
+                        return self._not_modified(etag, cache_control)
+                    result = await handler(*args, **kwargs)
+                else:
+                    result = await handler(*args, **kwargs)
+                    etag = weak_etag(request_key(request), jsonable_encoder(result))
+                    if etag_matches(request, etag):
+                        return self._not_modified(etag, cache_control)
+                response.headers["ETag"] = etag
+                response.headers["Cache-Control"] = cache_control
+                return result
+
+            wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), *extra])
+            return wrapper
+        return decorate
+
+    def _not_modified(self, etag: str, cache_control: str) -> Response:
+        self.not_modified += 1
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    def stats(self) -> Dict[str, Any]:
+        return {"not_modified": self.not_modified, "versions": self._counters.stats()}
@@ -0,0 +1,255 @@
+"""Background jobs for long-running admin operations.
+
+Endpoints enqueue a job document in `background_jobs` and answer 202; a pool
+of asyncio workers (normally `python worker.py`, in a separate process from
+the API) claims queued jobs with `find_one_and_update`, runs the registered
+handler and stores its result or error. Handlers report progress through the
+`JobContext` they receive, and a heartbeat lets another worker take over a
+job whose worker died (up to the job's `max_attempts`).
+
+The recruitment module already owns the `jobs` collection and the `/api/jobs`
+routes, hence the name; jobs are polled under `/api/background-jobs`.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+
+from fastapi.responses import JSONResponse
+from pymongo import ReturnDocument
+
+from database import register_index
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "background_jobs"
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "1"))
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", "14"))
+# Progress writes are throttled to one per interval per job
+PROGRESS_WRITE_INTERVAL = 0.5
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+register_index(JOBS_COLLECTION, [("id", 1)], unique=True)
+register_index(JOBS_COLLECTION, [("status", 1), ("created_at", 1)])
+register_index(JOBS_COLLECTION, [("created_by", 1), ("created_at", -1)])
+register_index(JOBS_COLLECTION, [("finished_at", 1)], sparse=True)
+
+ProgressCallback = Callable[..., Awaitable[None]]
+JobHandler = Callable[["JobContext", Dict[str, Any]], Awaitable[Any]]
+
+
+class HandlerSpec:
+    def __init__(self, handler: JobHandler, max_attempts: int):
+        self.handler = handler
+        self.max_attempts = max_attempts
+
+
+JOB_HANDLERS: Dict[str, HandlerSpec] = {}
+
+
+def job_handler(kind: str, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """Register `handler(ctx, payload)` for jobs of `kind`.
+
+    Handlers that are not safe to run twice (e.g. sending notifications)
+    should pass max_attempts=1 so a crashed run is failed rather than retried.
+    """
+    def decorator(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = HandlerSpec(handler, max_attempts)
+        return handler
+    return decorator
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job document as returned by the API (payloads can be large and stay internal)."""
+    return {k: v for k, v in job.items() if k not in ("_id", "payload")}
+
+
+async def enqueue(db, kind: str, payload: Dict[str, Any], created_by: Optional[str] = None) -> Dict[str, Any]:
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = _now()
+    job = {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "payload": payload,
+        "status": "queued",
+        "progress": {"done": 0, "total": None, "message": None},
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "max_attempts": JOB_HANDLERS[kind].max_attempts,
+        "created_by": created_by,
+        "created_at": now,
+        "updated_at": now,
+    }
+    await db[JOBS_COLLECTION].insert_one(dict(job))
+    return public_job(job)
+
+
+def accepted_response(job: Dict[str, Any]) -> JSONResponse:
+    """202 response pointing the client at the job's status and event stream."""
+    return JSONResponse(status_code=202, content={
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "status_url": f"/api/background-jobs/{job['id']}",
+        "events_url": f"/api/background-jobs/{job['id']}/events",
+    })
+
+
+class JobContext:
+    """Passed to handlers: who asked for the job and a throttled progress reporter."""
+
+    def __init__(self, db, job: Dict[str, Any]):
+        self.db = db
+        self.job_id = job["id"]
+        self.created_by = job.get("created_by")
+        self._last_write = 0.0
+
+    async def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        now = time.monotonic()
+        finished = total is not None and done >= total
+        if not finished and now - self._last_write < PROGRESS_WRITE_INTERVAL:
+            return
+        self._last_write = now
+        update = {"progress.done": done, "updated_at": _now(), "heartbeat_at": _now()}
+        if total is not None:
+            update["progress.total"] = total
+        if message is not None:
+            update["progress.message"] = message
+        await self.db[JOBS_COLLECTION].update_one({"id": self.job_id}, {"$set": update})
+
+
+async def claim_next(db, worker_id: str) -> Optional[Dict[str, Any]]:
+    """Take the oldest queued job, or one whose worker stopped heartbeating."""
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+    now = _now()
+    return await db[JOBS_COLLECTION].find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "heartbeat_at": {"$lt": stale},
+             "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+        ]},
+        {"$set": {
+            "status": "running", "worker_id": worker_id, "started_at": now,
+            "heartbeat_at": now, "updated_at": now,
+        }, "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def fail_abandoned(db) -> int:
+    """Fail running jobs whose worker died after their last permitted attempt."""
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+    now = _now()
+    result = await db[JOBS_COLLECTION].update_many(
+        {"status": "running", "heartbeat_at": {"$lt": stale},
+         "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+        {"$set": {"status": "failed", "error": "Worker stopped while running the job",
+                  "finished_at": now, "updated_at": now}},
+    )
+    return result.modified_count
+
+
+async def purge_finished(db) -> int:
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=JOB_RETENTION_DAYS)).isoformat()
+    result = await db[JOBS_COLLECTION].delete_many(
+        {"status": {"$in": list(TERMINAL_STATUSES)}, "finished_at": {"$lt": cutoff}}
+    )
+    return result.deleted_count
+
+
+async def _heartbeat(db, job_id: str) -> None:
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        await db[JOBS_COLLECTION].update_one({"id": job_id}, {"$set": {"heartbeat_at": _now()}})
+
+
+async def run_job(db, job: Dict[str, Any]) -> None:
+    spec = JOB_HANDLERS.get(job["kind"])
+    heartbeat = asyncio.create_task(_heartbeat(db, job["id"]))
+    try:
+        if spec is None:
+            raise RuntimeError(f"No handler registered for job kind {job['kind']}")
+        result = await spec.handler(JobContext(db, job), job.get("payload") or {})
+        update = {"status": "completed", "result": result}
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e) or e.__class__.__name__
+        logger.error(f"Job {job['id']} ({job['kind']}) failed: {traceback.format_exc()}")
+        update = {"status": "failed", "error": detail}
+    finally:
+        heartbeat.cancel()
+    now = _now()
+    await db[JOBS_COLLECTION].update_one(
+        {"id": job["id"]}, {"$set": {**update, "finished_at": now, "updated_at": now}}
+    )
+
+
+class WorkerPool:
+    """`concurrency` asyncio workers polling the job queue."""
+
+    def __init__(self, db, concurrency: int = 4, poll_interval: float = JOB_POLL_SECONDS):
+        self.db = db
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = []
+
+    async def _worker(self, index: int) -> None:
+        worker_id = f"{self.worker_id}:{index}"
+        while True:
+            try:
+                job = await claim_next(self.db, worker_id)
+                if job is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                logger.info(f"{worker_id} running job {job['id']} ({job['kind']}, attempt {job['attempts']})")
+                await run_job(self.db, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _housekeeping(self) -> None:
+        while True:
+            try:
+                await fail_abandoned(self.db)
+                await purge_finished(self.db)
+            except Exception as e:
+                logger.warning(f"Job housekeeping failed: {e}")
+            await asyncio.sleep(JOB_LEASE_SECONDS)
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self) -> None:
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
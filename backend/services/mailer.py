@@ -0,0 +1,364 @@
+"""Outbound email queue and SMTP delivery worker.
+
+Request handlers build a message and `enqueue` it into `outbound_emails`;
+they never talk to an SMTP server. Recipients are split into envelopes of at
+most MAIL_BATCH_RECIPIENTS, one queue document each.
+
+`MailWorker` (run by worker.py, or in-process with JOB_INPROCESS_WORKERS)
+claims due messages in batches, groups them by SMTP configuration and sends
+each group over a persistent, already authenticated connection from
+`SmtpConnectionPool`. Transient failures (4xx replies, dropped connections,
+timeouts) are retried with backoff; permanent ones fail the message. Queue
+updates and `email_logs` entries are written in bulk per batch.
+
+smtplib is blocking, so every SMTP call runs in a worker thread.
+"""
+from datetime import datetime, timezone, timedelta
+from email.message import Message
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import smtplib
+import socket
+import time
+import uuid
+
+from pymongo import ReturnDocument, UpdateOne
+
+from database import register_index
+from services.config_cache import get_config
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_COLLECTION = "outbound_emails"
+MAIL_BATCH_RECIPIENTS = int(os.environ.get("MAIL_BATCH_RECIPIENTS", "50"))
+MAIL_CLAIM_BATCH = int(os.environ.get("MAIL_CLAIM_BATCH", "50"))
+MAIL_MAX_ATTEMPTS = int(os.environ.get("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_RETRY_SECONDS = float(os.environ.get("MAIL_RETRY_SECONDS", "30"))
+MAIL_POLL_SECONDS = float(os.environ.get("MAIL_POLL_SECONDS", "2"))
+MAIL_LEASE_SECONDS = float(os.environ.get("MAIL_LEASE_SECONDS", "300"))
+SMTP_TIMEOUT_SECONDS = float(os.environ.get("SMTP_TIMEOUT_SECONDS", "30"))
+# Idle connections are closed after this long; servers drop them anyway
+SMTP_IDLE_SECONDS = float(os.environ.get("SMTP_IDLE_SECONDS", "60"))
+# A connection unused for longer than this is probed with NOOP before reuse
+SMTP_PROBE_AFTER_SECONDS = 5.0
+
+register_index(OUTBOUND_COLLECTION, [("id", 1)], unique=True)
+register_index(OUTBOUND_COLLECTION, [("status", 1), ("next_attempt_at", 1)])
+register_index(OUTBOUND_COLLECTION, [("created_at", -1)])
+
+SMTP_FIELDS = ("host", "port", "username", "password", "encryption", "from_email", "from_name")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def smtp_config(raw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalized SMTP settings (the `smtp` block of settings, or an ad-hoc config)."""
+    raw = raw or {}
+    config = {f: raw.get(f) for f in SMTP_FIELDS}
+    config["port"] = int(config["port"] or 587)
+    config["encryption"] = config["encryption"] or "tls"
+    config["from_email"] = config["from_email"] or config["username"]
+    config["from_name"] = config["from_name"] or "HR Platform"
+    return config
+
+
+def config_key(config: Dict[str, Any]) -> Tuple:
+    return (config["host"], config["port"], config["username"], config["encryption"])
+
+
+def sender_address(config: Dict[str, Any]) -> str:
+    return f"{config['from_name']} <{config['from_email']}>"
+
+
+async def global_smtp_config(db) -> Optional[Dict[str, Any]]:
+    """SMTP settings from global settings, or None when email is disabled."""
+    settings = await get_config(db, "settings")
+    smtp = (settings or {}).get("smtp") or {}
+    if not smtp.get("enabled") or not smtp.get("host"):
+        return None
+    return smtp_config(smtp)
+
+
+async def enqueue(db, message: Message, recipients: List[str], log: Dict[str, Any],
+                  config: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Queue `message` for `recipients` (envelope addresses).
+
+    `config` is only given for ad-hoc sends (e.g. testing unsaved settings);
+    otherwise the global SMTP settings are read when the message is sent.
+    `log` holds the email_logs fields (type, subject, sent_by, ...).
+    Returns the queued message ids.
+    """
+    recipients = [r for r in dict.fromkeys(r.strip() for r in recipients) if r]
+    if not recipients:
+        return []
+    body = message.as_string()
+    now = _now().isoformat()
+    docs = []
+    for start in range(0, len(recipients), MAIL_BATCH_RECIPIENTS):
+        docs.append({
+            "id": str(uuid.uuid4()),
+            "recipients": recipients[start:start + MAIL_BATCH_RECIPIENTS],
+            "message": body,
+            "subject": message.get("Subject", ""),
+            "smtp": smtp_config(config) if config else None,
+            "log": log,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": MAIL_MAX_ATTEMPTS,
+            "next_attempt_at": now,
+            "error": None,
+            "created_at": now,
+        })
+    await db[OUTBOUND_COLLECTION].insert_many(docs)
+    return [d["id"] for d in docs]
+
+
+# ============= SMTP CONNECTIONS =============
+
+def open_connection(config: Dict[str, Any], timeout: float = SMTP_TIMEOUT_SECONDS) -> smtplib.SMTP:
+    """Connect, STARTTLS if configured and log in (blocking)."""
+    if config["encryption"] == "ssl":
+        server = smtplib.SMTP_SSL(config["host"], config["port"], timeout=timeout)
+    else:
+        server = smtplib.SMTP(config["host"], config["port"], timeout=timeout)
+        if config["encryption"] == "tls":
+            server.starttls()
+    if config.get("username") and config.get("password"):
+        server.login(config["username"], config["password"])
+    return server
+
+
+def _close(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+class SmtpConnectionPool:
+    """One persistent authenticated connection per SMTP configuration."""
+
+    def __init__(self, idle_seconds: float = SMTP_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._connections: Dict[Tuple, Tuple[smtplib.SMTP, float]] = {}
+
+    async def get(self, config: Dict[str, Any]) -> smtplib.SMTP:
+        key = config_key(config)
+        cached = self._connections.get(key)
+        if cached:
+            server, last_used = cached
+            idle = time.monotonic() - last_used
+            if idle < SMTP_PROBE_AFTER_SECONDS:
+                return server
+            if idle < self.idle_seconds:
+                try:
+                    status, _ = await asyncio.to_thread(server.noop)
+                    if status == 250:
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+            await self.discard(config)
+        server = await asyncio.to_thread(open_connection, config)
+        self._connections[key] = (server, time.monotonic())
+        return server
+
+    def touch(self, config: Dict[str, Any]) -> None:
+        key = config_key(config)
+        if key in self._connections:
+            self._connections[key] = (self._connections[key][0], time.monotonic())
+
+    async def discard(self, config: Dict[str, Any]) -> None:
+        cached = self._connections.pop(config_key(config), None)
+        if cached:
+            await asyncio.to_thread(_close, cached[0])
+
+    async def close_idle(self) -> None:
+        now = time.monotonic()
+        for key, (server, last_used) in list(self._connections.items()):
+            if now - last_used >= self.idle_seconds:
+                self._connections.pop(key, None)
+                await asyncio.to_thread(_close, server)
+
+    async def close(self) -> None:
+        for server, _ in list(self._connections.values()):
+            await asyncio.to_thread(_close, server)
+        self._connections = {}
+
+
+def classify(error: Exception) -> Tuple[bool, str]:
+    """(transient, message) for an SMTP failure."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        transient = bool(codes) and all(400 <= code < 500 for code in codes)
+        return transient, f"Recipients refused: {', '.join(error.recipients)}"
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False, "Authentication failed. Check username and password."
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500, f"{error.smtp_code} {error.smtp_error!r}"
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)):
+        return True, f"Connection failed: {error}"
+    return False, str(error) or error.__class__.__name__
+
+
+# ============= WORKER =============
+
+class MailWorker:
+    """Claims due messages and sends them over pooled SMTP connections."""
+
+    def __init__(self, db, poll_interval: float = MAIL_POLL_SECONDS, batch_size: int = MAIL_CLAIM_BATCH):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.pool = SmtpConnectionPool()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def claim_batch(self) -> List[Dict[str, Any]]:
+        now = _now()
+        stale = (now - timedelta(seconds=MAIL_LEASE_SECONDS)).isoformat()
+        batch = []
+        while len(batch) < self.batch_size:
+            doc = await self.db[OUTBOUND_COLLECTION].find_one_and_update(
+                {"$or": [
+                    {"status": "queued", "next_attempt_at": {"$lte": now.isoformat()}},
+                    {"status": "sending", "claimed_at": {"$lt": stale}},
+                ]},
+                {"$set": {"status": "sending", "claimed_at": now.isoformat(), "worker_id": self.worker_id},
+                 "$inc": {"attempts": 1}},
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                break
+            doc.pop("_id", None)
+            batch.append(doc)
+        return batch
+
+    async def send_batch(self, batch: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Send claimed messages grouped by SMTP config and record the outcomes in bulk."""
+        default_config = None
+        if any(doc.get("smtp") is None for doc in batch):
+            default_config = await global_smtp_config(self.db)
+
+        groups: Dict[Tuple, Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+        for doc in batch:
+            config = doc.get("smtp") or default_config
+            key = config_key(config) if config else None
+            groups.setdefault(key, (config, []))[1].append(doc)
+
+        outcomes: List[Tuple[Dict[str, Any], Optional[bool], Optional[str]]] = []
+        for config, docs in groups.values():
+            if config is None:
+                outcomes.extend((doc, False, "SMTP is not configured") for doc in docs)
+                continue
+            outcomes.extend(await self._send_group(config, docs))
+        return await self._record(outcomes)
+
+    async def _send_group(self, config: Dict[str, Any], docs: List[Dict[str, Any]]):
+        """(doc, transient, error) per message; error None means sent."""
+        outcomes = []
+        for doc in docs:
+            try:
+                refused = await self._sendmail(config, doc)
+                # Accepted for at least one recipient; the rest are noted in the log
+                if refused:
+                    doc["refused"] = sorted(refused)
+                outcomes.append((doc, False, None))
+            except Exception as e:
+                transient, message = classify(e)
+                if isinstance(e, (smtplib.SMTPServerDisconnected, smtplib.SMTPAuthenticationError, OSError)):
+                    await self.pool.discard(config)
+                outcomes.append((doc, transient, message))
+        return outcomes
+
+    async def _sendmail(self, config: Dict[str, Any], doc: Dict[str, Any]) -> Dict[str, Any]:
+        for attempt in range(2):
+            server = await self.pool.get(config)
+            try:
+                refused = await asyncio.to_thread(
+                    server.sendmail, config["from_email"], doc["recipients"], doc["message"]
+                )
+            except smtplib.SMTPServerDisconnected:
+                # The server closed a pooled connection; reconnect once right away
+                await self.pool.discard(config)
+                if attempt:
+                    raise
+                continue
+            self.pool.touch(config)
+            return refused
+
+    async def _record(self, outcomes) -> Dict[str, int]:
+        now = _now()
+        updates, logs = [], []
+        counts = {"sent": 0, "retrying": 0, "failed": 0}
+        for doc, transient, error in outcomes:
+            log = {
+                "id": str(uuid.uuid4()),
+                "recipient": ", ".join(doc["recipients"]),
+                "subject": doc.get("subject"),
+                "outbound_id": doc["id"],
+                **(doc.get("log") or {}),
+            }
+            if error is None:
+                counts["sent"] += 1
+                updates.append(UpdateOne({"id": doc["id"]}, {
+                    "$set": {"status": "sent", "sent_at": now.isoformat(), "error": None},
+                    "$unset": {"smtp": ""},
+                }))
+                if doc.get("refused"):
+                    log["refused"] = doc["refused"]
+                logs.append({**log, "status": "sent", "sent_at": now.isoformat()})
+            elif transient and doc["attempts"] < doc.get("max_attempts", MAIL_MAX_ATTEMPTS):
+                counts["retrying"] += 1
+                retry_at = now + timedelta(seconds=MAIL_RETRY_SECONDS * (2 ** (doc["attempts"] - 1)))
+                updates.append(UpdateOne({"id": doc["id"]}, {"$set": {
+                    "status": "queued", "next_attempt_at": retry_at.isoformat(), "error": error,
+                }}))
+            else:
+                counts["failed"] += 1
+                updates.append(UpdateOne({"id": doc["id"]}, {
+                    "$set": {"status": "failed", "failed_at": now.isoformat(), "error": error},
+                    "$unset": {"smtp": ""},
+                }))
+                logs.append({**log, "status": "failed", "error": error, "sent_at": now.isoformat()})
+        if updates:
+            await self.db[OUTBOUND_COLLECTION].bulk_write(updates, ordered=False)
+        if logs:
+            await self.db.email_logs.insert_many(logs)
+        return counts
+
+    async def run_once(self) -> Dict[str, int]:
+        batch = await self.claim_batch()
+        if not batch:
+            await self.pool.close_idle()
+            return {"sent": 0, "retrying": 0, "failed": 0}
+        return await self.send_batch(batch)
+
+    async def run_forever(self) -> None:
+        try:
+            while True:
+                try:
+                    counts = await self.run_once()
+                    if any(counts.values()):
+                        logger.info(f"Mail worker {self.worker_id}: {counts}")
+                        continue
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Mail worker error: {e}")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            await self.pool.close()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,568 @@
+"""Notification storage for named users and for broadcasts.
+
+Notifications addressed to named users are plain `notifications` documents,
+written with chunked, unordered `insert_many` from one template dict.
+
+Notifications addressed to a group (everyone, a role, a department, a branch)
+are stored once in `notification_broadcasts`, tagged with audience keys:
+`all`, `role:<name>`, `department:<id>`, `branch:<id>`. A user's read, archive
+and delete state for a broadcast lives in `notification_receipts` and is only
+written when they act on it, so a company-wide announcement costs one insert
+however many employees it reaches.
+
+`Inbox` merges both sources for one user: their audience keys select the
+broadcasts (never ones older than the account), which are read newest first a
+batch at a time; only that batch's receipts are looked up to filter and
+decorate them, so the cost does not grow with how many broadcasts the user
+has ever read or hidden. The two created_at-sorted streams are then merged.
+
+Counters: `notification_counters` holds one document per user with total and
+unread counts, overall and by type. Every create/read/archive/delete applies
+an atomic `$inc`. Broadcasts are folded in lazily: the document remembers the
+newest broadcast it has counted and a read only queries broadcasts when a
+newer one exists anywhere (checked at most every BROADCAST_CHECK_SECONDS per
+worker). Documents are rebuilt from the collections when missing, when the
+user's audience changes, or after NOTIFICATION_COUNTER_MAX_AGE_SECONDS, which
+bounds the drift of any lost race.
+
+Events: new notifications and counter changes are published on the realtime
+broker (`notifications:<user id>`, `notifications:audience:<key>`) for the
+notification event stream.
+
+Push and email delivery for either kind runs as a background job that walks
+the recipients with `iter_recipients`, a chunk at a time.
+"""
+from datetime import datetime, timezone, timedelta
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import heapq
+import os
+import time
+import uuid
+
+from pymongo import ReturnDocument, UpdateOne
+
+from database import register_index
+from services.pagination import iter_batches
+from services.realtime import broker
+
+NOTIFICATION_INSERT_CHUNK = int(os.environ.get("NOTIFICATION_INSERT_CHUNK", "1000"))
+NOTIFICATION_RECIPIENT_BATCH = int(os.environ.get("NOTIFICATION_RECIPIENT_BATCH", "1000"))
+NOTIFICATION_COUNTER_MAX_AGE_SECONDS = float(os.environ.get("NOTIFICATION_COUNTER_MAX_AGE_SECONDS", "3600"))
+BROADCAST_CHECK_SECONDS = float(os.environ.get("NOTIFICATION_BROADCAST_CHECK_SECONDS", "5"))
+BROADCAST_SCAN_BATCH = int(os.environ.get("NOTIFICATION_BROADCAST_SCAN_BATCH", "200"))
+
+BROADCASTS_COLLECTION = "notification_broadcasts"
+RECEIPTS_COLLECTION = "notification_receipts"
+COUNTERS_COLLECTION = "notification_counters"
+
+register_index(BROADCASTS_COLLECTION, [("id", 1)], unique=True)
+register_index(BROADCASTS_COLLECTION, [("audience", 1), ("created_at", -1)])
+register_index(BROADCASTS_COLLECTION, [("created_at", -1)])
+register_index(RECEIPTS_COLLECTION, [("user_id", 1), ("broadcast_id", 1)], unique=True)
+register_index(RECEIPTS_COLLECTION, [("broadcast_id", 1)])
+register_index(COUNTERS_COLLECTION, [("user_id", 1)], unique=True)
+register_index(COUNTERS_COLLECTION, [("keys", 1)])
+
+ADMIN_ROLES = ("super_admin", "corp_admin")
+BROADCAST_PROJECTION = {"_id": 0, "audience": 0, "created_by": 0}
+RECIPIENT_PROJECTION = {"_id": 0, "id": 1, "email": 1}
+# (type, read state, archive state) is all the counters need from a notification
+STATE_PROJECTION = {"_id": 0, "user_id": 1, "type": 1, "is_read": 1, "is_archived": 1}
+COUNTED_PROJECTION = {"_id": 0, "id": 1, "type": 1, "created_at": 1}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def audience_for_target(target: str, target_id: Optional[str] = None) -> Optional[List[str]]:
+    """Audience keys for an announcement target, or None if it names no group."""
+    if target == "all":
+        return ["all"]
+    if target == "admins":
+        return [f"role:{r}" for r in ADMIN_ROLES]
+    if target == "employees":
+        return ["role:employee"]
+    if target in ("department", "branch") and target_id:
+        return [f"{target}:{target_id}"]
+    return None
+
+
+def audience_keys(role: Optional[str], department_id: Optional[str] = None,
+                  branch_id: Optional[str] = None) -> List[str]:
+    """Every audience key a user belongs to."""
+    keys = ["all"]
+    if role:
+        keys.append(f"role:{role}")
+    if department_id:
+        keys.append(f"department:{department_id}")
+    if branch_id:
+        keys.append(f"branch:{branch_id}")
+    return keys
+
+
+def user_topic(user_id: str) -> str:
+    return f"notifications:{user_id}"
+
+
+def audience_topic(key: str) -> str:
+    return f"notifications:audience:{key}"
+
+
+def stream_topics(user_id: str, keys: List[str]) -> List[str]:
+    """Everything a user's notification stream listens to."""
+    return [user_topic(user_id)] + [audience_topic(k) for k in keys]
+
+
+# ============= COUNTERS =============
+
+def type_key(notification_type: Optional[str]) -> str:
+    """Notification type usable as a field name under by_type."""
+    return (notification_type or "system").replace(".", "_").replace("$", "_")
+
+
+def _add(delta: Dict[str, int], notification_type: Optional[str], total: int, unread: int) -> Dict[str, int]:
+    key = type_key(notification_type)
+    for field, n in (("total", total), (f"by_type.{key}", total),
+                     ("unread", unread), (f"unread_by_type.{key}", unread)):
+        if n:
+            delta[field] = delta.get(field, 0) + n
+    return delta
+
+
+def transition(notification_type: Optional[str], before: Tuple[bool, bool], after: Tuple[bool, bool]) -> Dict[str, int]:
+    """Counter `$inc` for a notification going from `before` to `after` (visible, unread)."""
+    return _add({}, notification_type,
+                int(after[0]) - int(before[0]),
+                int(after[0] and after[1]) - int(before[0] and before[1]))
+
+
+def own_state(doc: Optional[Dict[str, Any]]) -> Tuple[bool, bool]:
+    if not doc:
+        return (False, False)
+    return (not doc.get("is_archived"), not doc.get("is_read"))
+
+
+def receipt_state(receipt: Optional[Dict[str, Any]]) -> Tuple[bool, bool]:
+    """(visible, unread) of a broadcast for the receipt's owner; no receipt is unread."""
+    receipt = receipt or {}
+    return (not (receipt.get("is_archived") or receipt.get("is_deleted")), not receipt.get("is_read"))
+
+
+def public_counts(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "total": doc.get("total", 0),
+        "unread": doc.get("unread", 0),
+        "by_type": {t: n for t, n in (doc.get("by_type") or {}).items() if n > 0},
+        "unread_by_type": {t: n for t, n in (doc.get("unread_by_type") or {}).items() if n > 0},
+    }
+
+
+def count_new(counts: Dict[str, Any], notification_type: Optional[str]) -> Dict[str, Any]:
+    """Counts after one more unread notification; what a stream applies on a new event."""
+    key = type_key(notification_type)
+    counts = {**counts, "by_type": dict(counts["by_type"]), "unread_by_type": dict(counts["unread_by_type"])}
+    counts["total"] += 1
+    counts["unread"] += 1
+    counts["by_type"][key] = counts["by_type"].get(key, 0) + 1
+    counts["unread_by_type"][key] = counts["unread_by_type"].get(key, 0) + 1
+    return counts
+
+
+async def adjust_counters(db, user_id: str, delta: Dict[str, int], counted_at: Optional[str] = None) -> None:
+    """Apply `delta` to a user's counters, if they exist and (for a broadcast) already count it."""
+    if not delta:
+        return
+    query: Dict[str, Any] = {"user_id": user_id}
+    if counted_at:
+        query["broadcasts_through"] = {"$gte": counted_at}
+    await db[COUNTERS_COLLECTION].update_one(query, {"$inc": delta})
+
+
+_latest_broadcast: Dict[str, Any] = {"value": "", "expires": 0.0}
+
+
+async def latest_broadcast_at(db) -> str:
+    """created_at of the newest broadcast, re-read at most every BROADCAST_CHECK_SECONDS."""
+    if _latest_broadcast["expires"] > time.monotonic():
+        return _latest_broadcast["value"]
+    doc = await db[BROADCASTS_COLLECTION].find_one({}, {"_id": 0, "created_at": 1}, sort=[("created_at", -1)])
+    _latest_broadcast.update(
+        value=max(_latest_broadcast["value"], (doc or {}).get("created_at") or ""),
+        expires=time.monotonic() + BROADCAST_CHECK_SECONDS,
+    )
+    return _latest_broadcast["value"]
+
+
+def note_broadcast(created_at: str) -> None:
+    """Let this worker's readers see a broadcast it just created without waiting for the check."""
+    _latest_broadcast["value"] = max(_latest_broadcast["value"], created_at)
+
+
+async def publish_counts(user_id: str, counts: Dict[str, Any]) -> None:
+    await broker.publish(user_topic(user_id), "counts", counts)
+
+
+# ============= WRITES =============
+
+async def insert_for_users(db, user_ids: List[str], template: Dict[str, Any]) -> Dict[str, str]:
+    """Copy `template` to each user in unordered batches; returns {user_id: notification id}.
+
+    Each batch is one insert, one counter `$inc` and one stream event.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    content = {k: v for k, v in template.items() if k not in ("id", "user_id")}
+    delta = _add({}, template.get("type"), 1, 1)
+    ids: Dict[str, str] = {}
+    for start in range(0, len(user_ids), NOTIFICATION_INSERT_CHUNK):
+        chunk = {uid: str(uuid.uuid4()) for uid in user_ids[start:start + NOTIFICATION_INSERT_CHUNK]}
+        await db.notifications.insert_many(
+            [{**content, "id": nid, "user_id": uid} for uid, nid in chunk.items()], ordered=False
+        )
+        await db[COUNTERS_COLLECTION].update_many({"user_id": {"$in": list(chunk)}}, {"$inc": delta})
+        await broker.publish_many([user_topic(uid) for uid in chunk], "notification",
+                                  {"notification": content, "ids": chunk})
+        ids.update(chunk)
+    return ids
+
+
+async def create_broadcast(db, audience: List[str], template: Dict[str, Any],
+                           created_by: Optional[str] = None) -> Dict[str, Any]:
+    """Store one notification for every member of `audience`."""
+    doc = {k: v for k, v in template.items() if k not in ("user_id", "is_read", "is_archived", "read_at")}
+    doc.update(id=str(uuid.uuid4()), audience=audience, created_by=created_by)
+    await db[BROADCASTS_COLLECTION].insert_one(dict(doc))
+    note_broadcast(doc["created_at"])
+    await broker.publish_many([audience_topic(k) for k in audience], "notification", {
+        "notification": {k: v for k, v in doc.items() if k not in ("audience", "created_by")}
+    })
+    return doc
+
+
+async def delete_broadcast(db, broadcast_id: str) -> bool:
+    """Remove a broadcast for everyone, taking it out of the counters that include it."""
+    broadcast = await db[BROADCASTS_COLLECTION].find_one_and_delete({"id": broadcast_id}, {"_id": 0})
+    if not broadcast:
+        return False
+    receipts = await db[RECEIPTS_COLLECTION].find({"broadcast_id": broadcast_id}, {"_id": 0}).to_list(None)
+    hidden = [r["user_id"] for r in receipts if not receipt_state(r)[0]]
+    read = [r["user_id"] for r in receipts if r.get("is_read") and r["user_id"] not in hidden]
+    counted = {
+        "keys": {"$in": broadcast["audience"]},
+        "broadcasts_through": {"$gte": broadcast["created_at"]},
+        "$or": [{"since": None}, {"since": {"$lte": broadcast["created_at"]}}],
+    }
+    key = type_key(broadcast.get("type"))
+    await db[COUNTERS_COLLECTION].update_many(
+        {**counted, "user_id": {"$nin": hidden}}, {"$inc": {"total": -1, f"by_type.{key}": -1}}
+    )
+    await db[COUNTERS_COLLECTION].update_many(
+        {**counted, "user_id": {"$nin": hidden + read}}, {"$inc": {"unread": -1, f"unread_by_type.{key}": -1}}
+    )
+    await db[RECEIPTS_COLLECTION].delete_many({"broadcast_id": broadcast_id})
+    await broker.publish_many([audience_topic(k) for k in broadcast["audience"]], "refresh", {"id": broadcast_id})
+    return True
+
+
+async def audience_size(db, audience: List[str]) -> int:
+    """Roughly how many users an audience reaches (users in two groups count twice)."""
+    if "all" in audience:
+        return await db.users.count_documents({})
+    total = 0
+    roles = [k.partition(":")[2] for k in audience if k.startswith("role:")]
+    if roles:
+        total += await db.users.count_documents({"role": {"$in": roles}})
+    for key in audience:
+        kind, _, value = key.partition(":")
+        if kind in ("department", "branch"):
+            total += await db.employees.count_documents({f"{kind}_id": value, "user_id": {"$ne": None}})
+    return total
+
+
+async def iter_recipients(db, audience: Optional[List[str]] = None, user_ids: Optional[List[str]] = None,
+                          batch_size: int = NOTIFICATION_RECIPIENT_BATCH) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Batches of {id, email} for explicit user ids or for an audience, each user once."""
+    if user_ids is not None:
+        user_ids = list(dict.fromkeys(user_ids))
+        for start in range(0, len(user_ids), batch_size):
+            yield await db.users.find(
+                {"id": {"$in": user_ids[start:start + batch_size]}}, RECIPIENT_PROJECTION
+            ).to_list(None)
+        return
+
+    keys = [k.partition(":") for k in audience or []]
+    if any(kind == "all" for kind, _, _ in keys):
+        user_queries, employee_queries = [{}], []
+    else:
+        roles = [value for kind, _, value in keys if kind == "role"]
+        user_queries = [{"role": {"$in": roles}}] if roles else []
+        employee_queries = [{f"{kind}_id": value} for kind, _, value in keys if kind in ("department", "branch")]
+
+    seen = set()
+    for query in user_queries:
+        batch = []
+        async for user in db.users.find(query, RECIPIENT_PROJECTION).batch_size(batch_size):
+            if user["id"] not in seen:
+                seen.add(user["id"])
+                batch.append(user)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    if employee_queries:
+        ids = []
+        async for employee in db.employees.find({"$or": employee_queries}, {"_id": 0, "user_id": 1}).batch_size(batch_size):
+            uid = employee.get("user_id")
+            if uid and uid not in seen:
+                seen.add(uid)
+                ids.append(uid)
+            if len(ids) >= batch_size:
+                yield await db.users.find({"id": {"$in": ids}}, RECIPIENT_PROJECTION).to_list(None)
+                ids = []
+        if ids:
+            yield await db.users.find({"id": {"$in": ids}}, RECIPIENT_PROJECTION).to_list(None)
+
+
+# ============= READS =============
+
+class Inbox:
+    """One user's view over their own notifications and the broadcasts they receive."""
+
+    def __init__(self, db, user_id: str, keys: List[str], since: Optional[str] = None):
+        self.db = db
+        self.user_id = user_id
+        self.keys = keys
+        self.since = since
+
+    async def receipts_for(self, broadcast_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """The user's receipts for `broadcast_ids`, by broadcast id."""
+        if not broadcast_ids:
+            return {}
+        docs = await self.db[RECEIPTS_COLLECTION].find(
+            {"user_id": self.user_id, "broadcast_id": {"$in": broadcast_ids}}, {"_id": 0, "user_id": 0}
+        ).to_list(None)
+        return {r["broadcast_id"]: r for r in docs}
+
+    def _visible(self) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"audience": {"$in": self.keys}}
+        if self.since:
+            query["created_at"] = {"$gte": self.since}
+        return query
+
+    async def _with_receipts(self, query: Dict[str, Any], projection: Dict[str, Any],
+                             batch_size: int = BROADCAST_SCAN_BATCH
+                             ) -> AsyncIterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """(broadcast, receipt or None) for every broadcast matching `query`, newest first."""
+        cursor = self.db[BROADCASTS_COLLECTION].find(query, projection).sort("created_at", -1).batch_size(batch_size)
+        async for batch in iter_batches(cursor, batch_size):
+            receipts = await self.receipts_for([b["id"] for b in batch])
+            for broadcast in batch:
+                yield broadcast, receipts.get(broadcast["id"])
+
+    async def broadcasts(self, is_read: Optional[bool] = None, type: Optional[str] = None,
+                         projection: Dict[str, Any] = BROADCAST_PROJECTION,
+                         batch_size: int = BROADCAST_SCAN_BATCH
+                         ) -> AsyncIterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """Broadcasts this user has not archived or deleted, optionally by read state, with their receipts."""
+        query = self._visible()
+        if type:
+            query["type"] = type
+        async for broadcast, receipt in self._with_receipts(query, projection, batch_size):
+            visible, unread = receipt_state(receipt)
+            if visible and (is_read is None or is_read != unread):
+                yield broadcast, receipt
+
+    def render(self, broadcast: Dict[str, Any], receipt: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """A broadcast shaped like one of the user's own notifications."""
+        receipt = receipt or {}
+        return {
+            **broadcast,
+            "user_id": self.user_id,
+            "is_read": bool(receipt.get("is_read")),
+            "is_archived": False,
+            "read_at": receipt.get("read_at"),
+            "broadcast": True,
+        }
+
+    async def list(self, is_read: Optional[bool] = None, type: Optional[str] = None,
+                   limit: int = 50, skip: int = 0) -> List[Dict[str, Any]]:
+        """Newest first across both sources; each source reads at most skip + limit."""
+        window = skip + limit
+        if limit <= 0:
+            return []
+        query: Dict[str, Any] = {"user_id": self.user_id, "is_archived": False}
+        if is_read is not None:
+            query["is_read"] = is_read
+        if type:
+            query["type"] = type
+        own = await self.db.notifications.find(query, {"_id": 0}).sort("created_at", -1).limit(window).to_list(window)
+        rendered = []
+        async for broadcast, receipt in self.broadcasts(is_read, type, batch_size=min(window, BROADCAST_SCAN_BATCH)):
+            rendered.append(self.render(broadcast, receipt))
+            if len(rendered) >= window:
+                break
+        merged = heapq.merge(own, rendered, key=lambda n: n.get("created_at") or "", reverse=True)
+        return list(islice(merged, skip, window))
+
+    # ----- counters -----
+
+    async def counts(self) -> Dict[str, Any]:
+        """Total/unread counts, overall and by type, from the user's counter document."""
+        doc = await self.db[COUNTERS_COLLECTION].find_one({"user_id": self.user_id}, {"_id": 0})
+        max_age = (datetime.now(timezone.utc) - timedelta(seconds=NOTIFICATION_COUNTER_MAX_AGE_SECONDS)).isoformat()
+        if (not doc or doc.get("keys") != self.keys or doc.get("since") != self.since
+                or (doc.get("rebuilt_at") or "") < max_age):
+            doc = await self.rebuild_counts()
+        else:
+            latest = await latest_broadcast_at(self.db)
+            if latest > (doc.get("broadcasts_through") or ""):
+                doc = await self._fold(doc, latest)
+        return public_counts(doc)
+
+    async def rebuild_counts(self) -> Dict[str, Any]:
+        """Recount from the notifications, broadcasts and receipts; replaces the counter document."""
+        doc: Dict[str, Any] = {
+            "user_id": self.user_id, "keys": self.keys, "since": self.since,
+            "total": 0, "unread": 0, "by_type": {}, "unread_by_type": {},
+        }
+        counts: Dict[str, int] = {}
+        async for row in self.db.notifications.aggregate([
+            {"$match": {"user_id": self.user_id, "is_archived": False}},
+            {"$group": {"_id": {"type": "$type", "is_read": "$is_read"}, "count": {"$sum": 1}}},
+        ]):
+            n = row["count"]
+            _add(counts, row["_id"].get("type"), n, 0 if row["_id"].get("is_read") else n)
+
+        through = ""
+        async for b, receipt in self._with_receipts(self._visible(), COUNTED_PROJECTION):
+            visible, unread = receipt_state(receipt)
+            _add(counts, b.get("type"), int(visible), int(visible and unread))
+            through = max(through, b["created_at"])
+
+        for field, n in counts.items():
+            if "." in field:
+                group, key = field.split(".", 1)
+                doc[group][key] = n
+            else:
+                doc[field] = n
+        # Only what was seen is counted; anything newer is folded in by the next read
+        doc["broadcasts_through"] = through
+        doc["rebuilt_at"] = _now()
+        await self.db[COUNTERS_COLLECTION].replace_one({"user_id": self.user_id}, doc, upsert=True)
+        return doc
+
+    async def _fold(self, doc: Dict[str, Any], latest: str) -> Dict[str, Any]:
+        """Count the broadcasts created since the document last looked."""
+        through = doc.get("broadcasts_through") or ""
+        new = await self.db[BROADCASTS_COLLECTION].find(
+            {**self._visible(), "created_at": {"$gt": through}}, COUNTED_PROJECTION
+        ).to_list(None)
+        receipts = await self.receipts_for([b["id"] for b in new])
+        delta: Dict[str, int] = {}
+        for b in new:
+            visible, unread = receipt_state(receipts.get(b["id"]))
+            _add(delta, b.get("type"), int(visible), int(visible and unread))
+        mark = max([latest] + [b["created_at"] for b in new])
+        update: Dict[str, Any] = {"$set": {"broadcasts_through": mark}}
+        if delta:
+            update["$inc"] = delta
+        folded = await self.db[COUNTERS_COLLECTION].find_one_and_update(
+            {"user_id": self.user_id, "broadcasts_through": doc.get("broadcasts_through")}, update,
+            projection={"_id": 0}, return_document=ReturnDocument.AFTER,
+        )
+        if folded:
+            return folded
+        # Another request folded first
+        return await self.db[COUNTERS_COLLECTION].find_one({"user_id": self.user_id}, {"_id": 0}) or await self.rebuild_counts()
+
+    async def publish_counts(self) -> Dict[str, Any]:
+        """Push the current counts to the user's open streams; returns them."""
+        counts = await self.counts()
+        await publish_counts(self.user_id, counts)
+        return counts
+
+    # ----- state changes -----
+
+    async def _broadcast_state(self, broadcast_id: str, state: Dict[str, Any]) -> bool:
+        """Record read/archive/delete state for one visible broadcast; False if not visible."""
+        broadcast = await self.db[BROADCASTS_COLLECTION].find_one(
+            {**self._visible(), "id": broadcast_id}, {"_id": 0, "type": 1, "created_at": 1}
+        )
+        if not broadcast:
+            return False
+        before = await self.db[RECEIPTS_COLLECTION].find_one_and_update(
+            {"user_id": self.user_id, "broadcast_id": broadcast_id}, {"$set": state},
+            projection={"_id": 0}, upsert=True,
+        )
+        delta = transition(broadcast.get("type"), receipt_state(before), receipt_state({**(before or {}), **state}))
+        await adjust_counters(self.db, self.user_id, delta, counted_at=broadcast["created_at"])
+        return True
+
+    async def _own_state(self, notification_id: str, state: Dict[str, Any]) -> bool:
+        before = await self.db.notifications.find_one_and_update(
+            {"id": notification_id, "user_id": self.user_id}, {"$set": state}, projection=STATE_PROJECTION
+        )
+        if not before:
+            return False
+        delta = transition(before.get("type"), own_state(before), own_state({**before, **state}))
+        await adjust_counters(self.db, self.user_id, delta)
+        return True
+
+    async def mark_read(self, notification_id: str) -> bool:
+        state = {"is_read": True, "read_at": _now()}
+        return await self._own_state(notification_id, state) or await self._broadcast_state(notification_id, state)
+
+    async def archive(self, notification_id: str) -> bool:
+        state = {"is_archived": True}
+        return await self._own_state(notification_id, state) or await self._broadcast_state(notification_id, state)
+
+    async def delete(self, notification_id: str, any_user: bool = False) -> bool:
+        """Delete one of the user's notifications, or hide a broadcast from them.
+
+        With `any_user` (admins) any user's notification is deleted and a
+        broadcast is removed for everyone.
+        """
+        query = {"id": notification_id}
+        if not any_user:
+            query["user_id"] = self.user_id
+        before = await self.db.notifications.find_one_and_delete(query, projection=STATE_PROJECTION)
+        if before:
+            await adjust_counters(self.db, before["user_id"], transition(before.get("type"), own_state(before), (False, False)))
+            if before["user_id"] != self.user_id:
+                await broker.publish(user_topic(before["user_id"]), "refresh", {"id": notification_id})
+            return True
+        if any_user:
+            return await delete_broadcast(self.db, notification_id)
+        return await self._broadcast_state(notification_id, {"is_deleted": True})
+
+    async def _set_all(self, state: Dict[str, Any], is_read: Optional[bool] = None) -> int:
+        """Apply `state` to every visible broadcast (with `is_read`, only those in that read state)."""
+        ids = [b["id"] async for b, _ in self.broadcasts(is_read, projection={"_id": 0, "id": 1})]
+        for start in range(0, len(ids), BROADCAST_SCAN_BATCH):
+            await self.db[RECEIPTS_COLLECTION].bulk_write([
+                UpdateOne({"user_id": self.user_id, "broadcast_id": bid}, {"$set": state}, upsert=True)
+                for bid in ids[start:start + BROADCAST_SCAN_BATCH]
+            ], ordered=False)
+        return len(ids)
+
+    async def mark_all_read(self) -> int:
+        now = _now()
+        result = await self.db.notifications.update_many(
+            {"user_id": self.user_id, "is_read": False},
+            {"$set": {"is_read": True, "read_at": now}}
+        )
+        marked = await self._set_all({"is_read": True, "read_at": now}, is_read=False)
+        await self.db[COUNTERS_COLLECTION].update_one(
+            {"user_id": self.user_id}, {"$set": {"unread": 0, "unread_by_type": {}}}
+        )
+        return result.modified_count + marked
+
+    async def clear_all(self) -> int:
+        result = await self.db.notifications.delete_many({"user_id": self.user_id})
+        hidden = await self._set_all({"is_deleted": True})
+        await self.db[COUNTERS_COLLECTION].update_one(
+            {"user_id": self.user_id}, {"$set": {"total": 0, "unread": 0, "by_type": {}, "unread_by_type": {}}}
+        )
+        return result.deleted_count + hidden
@@ -0,0 +1,263 @@
+"""Organization graph for the org-chart endpoints.
+
+Employees are loaded once (no cap) into a parent -> children adjacency map
+plus per-department and per-id indexes. Trees, manager chains, peers and
+department charts are then walked from those maps in linear time instead of
+rescanning the employee list at every level.
+
+The graph is cached per worker. Handlers that change reporting lines,
+departments, status or display fields call `invalidate_org_graph()`; the TTL
+bounds staleness for writes made by other workers.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+ORG_GRAPH_TTL_SECONDS = float(os.environ.get("ORG_GRAPH_TTL_SECONDS", "60"))
+
+# Employee fields the graph reads; writes touching any of these invalidate it.
+ORG_FIELDS = (
+    "id", "first_name", "last_name", "full_name", "work_email", "personal_email",
+    "job_title", "department_id", "division_id", "branch_id", "corporation_id",
+    "reporting_manager_id", "profile_picture", "status", "hire_date",
+)
+
+
+def employee_display_name(emp: Optional[Dict[str, Any]]) -> str:
+    if not emp:
+        return "Unknown"
+    first = emp.get("first_name") or emp.get("full_name", "").split()[0] if emp.get("full_name") else ""
+    last = emp.get("last_name") or ""
+    name = f"{first} {last}".strip()
+    if not name:
+        email = emp.get("work_email") or emp.get("personal_email") or ""
+        name = email.split("@")[0].replace(".", " ").replace("_", " ").title() if email else "Unknown"
+    return name
+
+
+def touches_org_fields(fields: Iterable[str]) -> bool:
+    return any(f in ORG_FIELDS for f in fields)
+
+
+class OrgGraph:
+    """Immutable snapshot of the reporting hierarchy."""
+
+    def __init__(self, employees: List[Dict[str, Any]], departments: List[Dict[str, Any]],
+                 divisions: List[Dict[str, Any]], branches: List[Dict[str, Any]],
+                 corporations: List[Dict[str, Any]]):
+        self.departments = departments
+        self.divisions = divisions
+        self.branches = branches
+        self.corporations = corporations
+        self.employees: Dict[str, Dict[str, Any]] = {}
+        self.order: List[str] = []
+        # All reports per manager (any status) and chart children (non-inactive only)
+        self.reports: Dict[str, List[str]] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.roots: List[str] = []
+        self.by_department: Dict[str, List[str]] = {}
+        self.names: Dict[str, str] = {}
+
+        for emp in employees:
+            emp_id = emp.get("id")
+            self.employees[emp_id] = emp
+            self.order.append(emp_id)
+            self.names[emp_id] = employee_display_name(emp)
+            manager_id = emp.get("reporting_manager_id")
+            if manager_id:
+                self.reports.setdefault(manager_id, []).append(emp_id)
+            self.by_department.setdefault(emp.get("department_id"), []).append(emp_id)
+            if emp.get("status") != "inactive":
+                if manager_id:
+                    self.children.setdefault(manager_id, []).append(emp_id)
+                else:
+                    self.roots.append(emp_id)
+
+        self.nodes = self._chart_nodes()
+
+    def _chart_nodes(self) -> Dict[str, Dict[str, Any]]:
+        dept_map = {d.get("id"): d for d in self.departments}
+        div_map = {d.get("id"): d for d in self.divisions}
+        branch_map = {b.get("id"): b for b in self.branches}
+        nodes = {}
+        for emp_id in self.order:
+            emp = self.employees[emp_id]
+            if emp.get("status") == "inactive":
+                continue
+            manager_id = emp.get("reporting_manager_id")
+            nodes[emp_id] = {
+                "id": emp_id,
+                "name": self.names[emp_id],
+                "email": emp.get("work_email") or emp.get("personal_email"),
+                "job_title": emp.get("job_title") or "Employee",
+                "department": dept_map.get(emp.get("department_id"), {}).get("name", ""),
+                "department_id": emp.get("department_id"),
+                "division": div_map.get(emp.get("division_id"), {}).get("name", ""),
+                "division_id": emp.get("division_id"),
+                "branch": branch_map.get(emp.get("branch_id"), {}).get("name", ""),
+                "branch_id": emp.get("branch_id"),
+                "corporation_id": emp.get("corporation_id"),
+                "manager_id": manager_id,
+                "manager_name": self.names[manager_id] if manager_id in self.employees else None,
+                "profile_picture": emp.get("profile_picture"),
+                "status": emp.get("status", "active"),
+                "hire_date": emp.get("hire_date"),
+                "direct_reports_count": len(self.reports.get(emp_id, [])),
+            }
+        return nodes
+
+    def summary_node(self, emp_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        emp = self.employees.get(emp_id)
+        if not emp:
+            return None
+        return {
+            "id": emp.get("id"),
+            "name": self.names[emp_id],
+            "email": emp.get("work_email") or emp.get("personal_email"),
+            "job_title": emp.get("job_title") or "Employee",
+            "department_id": emp.get("department_id"),
+            "profile_picture": emp.get("profile_picture"),
+        }
+
+    def tree(self, root_ids: List[str], depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Nested chart under `root_ids`, cut off `depth` levels below the roots.
+
+        Nodes whose children were cut off carry `has_more: true` so clients can
+        expand them lazily via the subtree endpoint.
+        """
+        forest = []
+        visited = set()
+        stack = []
+        for root_id in reversed(root_ids):
+            if root_id in self.nodes:
+                node = {**self.nodes[root_id], "children": []}
+                forest.append(node)
+                stack.append((node, 0))
+        forest.reverse()
+        while stack:
+            node, level = stack.pop()
+            if node["id"] in visited:
+                continue
+            visited.add(node["id"])
+            child_ids = [c for c in self.children.get(node["id"], []) if c not in visited]
+            if depth is not None and level >= depth:
+                if child_ids:
+                    node["has_more"] = True
+                continue
+            for child_id in child_ids:
+                child = {**self.nodes[child_id], "children": []}
+                node["children"].append(child)
+                stack.append((child, level + 1))
+        return forest
+
+    def subtree_ids(self, root_id: str, depth: Optional[int] = None) -> List[str]:
+        """Chart node ids under `root_id` (inclusive) in breadth-first order."""
+        if root_id not in self.nodes:
+            return []
+        ids = [root_id]
+        seen = {root_id}
+        frontier = [root_id]
+        level = 0
+        while frontier and (depth is None or level < depth):
+            next_frontier = []
+            for emp_id in frontier:
+                for child_id in self.children.get(emp_id, []):
+                    if child_id not in seen:
+                        seen.add(child_id)
+                        ids.append(child_id)
+                        next_frontier.append(child_id)
+            frontier = next_frontier
+            level += 1
+        return ids
+
+    def manager_chain(self, emp_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        chain = []
+        seen = {emp_id}
+        manager_id = self.employees.get(emp_id, {}).get("reporting_manager_id")
+        while manager_id and manager_id in self.employees and manager_id not in seen and len(chain) < limit:
+            chain.append(self.summary_node(manager_id))
+            seen.add(manager_id)
+            manager_id = self.employees[manager_id].get("reporting_manager_id")
+        return chain
+
+    def direct_reports(self, emp_id: str) -> List[Dict[str, Any]]:
+        return [self.summary_node(r) for r in self.reports.get(emp_id, [])]
+
+    def peers(self, emp_id: str) -> List[Dict[str, Any]]:
+        manager_id = self.employees.get(emp_id, {}).get("reporting_manager_id")
+        if not manager_id:
+            return []
+        return [self.summary_node(p) for p in self.reports.get(manager_id, []) if p != emp_id]
+
+    def department_nodes(self, department_id: str) -> List[Dict[str, Any]]:
+        nodes = []
+        for emp_id in self.by_department.get(department_id, []):
+            emp = self.employees[emp_id]
+            nodes.append({
+                "id": emp_id,
+                "name": self.names[emp_id],
+                "email": emp.get("work_email") or emp.get("personal_email"),
+                "job_title": emp.get("job_title") or "Employee",
+                "manager_id": emp.get("reporting_manager_id"),
+                "profile_picture": emp.get("profile_picture"),
+            })
+        return nodes
+
+
+async def load_org_graph(db) -> OrgGraph:
+    projection = {"_id": 0, **{f: 1 for f in ORG_FIELDS}}
+    employees, departments, divisions, branches, corporations = await asyncio.gather(
+        db.employees.find({}, projection).to_list(None),
+        db.departments.find({}, {"_id": 0}).to_list(None),
+        db.divisions.find({}, {"_id": 0}).to_list(None),
+        db.branches.find({}, {"_id": 0}).to_list(None),
+        db.corporations.find({}, {"_id": 0}).to_list(None),
+    )
+    return OrgGraph(employees, departments, divisions, branches, corporations)
+
+
+class OrgGraphCache:
+    """Single cached graph; concurrent misses share one load."""
+
+    def __init__(self, ttl: float = ORG_GRAPH_TTL_SECONDS):
+        self._ttl = ttl
+        self._graph: Optional[OrgGraph] = None
+        self._expires = 0.0
+        self._generation = 0
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def get(self, db) -> OrgGraph:
+        if self._graph is not None and self._expires > time.monotonic():
+            return self._graph
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._load(db, self._generation))
+        return await asyncio.shield(self._inflight)
+
+    async def _load(self, db, generation: int) -> OrgGraph:
+        try:
+            graph = await load_org_graph(db)
+            # Don't keep a graph that an invalidation raced past
+            if generation == self._generation:
+                self._graph = graph
+                self._expires = time.monotonic() + self._ttl
+            return graph
+        finally:
+            if generation == self._generation:
+                self._inflight = None
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._graph = None
+        self._inflight = None
+
+
+org_graph_cache = OrgGraphCache()
+
+
+async def get_org_graph(db) -> OrgGraph:
+    return await org_graph_cache.get(db)
+
+
+def invalidate_org_graph() -> None:
+    org_graph_cache.invalidate()
@@ -0,0 +1,180 @@
+"""Keyset pagination and NDJSON streaming for list endpoints."""
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator, Union
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_cursor(sort_field: str, direction: int, value: Any, doc_id: str) -> str:
+    """Opaque cursor pointing just past a document in (sort_field, id) order."""
+    raw = json.dumps({"f": sort_field, "d": direction, "v": value, "id": doc_id}, default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str, direction: int) -> Dict[str, Any]:
+    """Decode a cursor produced by `encode_cursor` for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("f") != sort_field or data.get("d") != direction or "id" not in data:
+        raise HTTPException(status_code=400, detail="Cursor does not match this listing")
+    return data
+
+
+def keyset_filter(sort_field: str, direction: int, value: Any, doc_id: str) -> Dict[str, Any]:
+    """Filter selecting documents strictly after (value, doc_id) in the given order.
+
+    Missing/null sort values sort lowest in MongoDB, so they come last in a
+    descending listing and first in an ascending one.
+    """
+    op = "$lt" if direction < 0 else "$gt"
+    if value is None:
+        after_nulls = {sort_field: None, "id": {op: doc_id}}
+        if direction < 0:
+            return after_nulls
+        return {"$or": [after_nulls, {sort_field: {"$ne": None}}]}
+
+    clauses = [{sort_field: {op: value}}, {sort_field: value, "id": {op: doc_id}}]
+    if direction < 0:
+        clauses.append({sort_field: None})
+    return {"$or": clauses}
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, Any]] = None,
+    sort_field: str = "created_at",
+    direction: int = -1,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Dict[str, Any]:
+    """Fetch one page ordered by (sort_field, id).
+
+    Returns {"items", "next_cursor", "limit"}; next_cursor is None on the last page.
+    `transform` may return None to drop a document from the page.
+    """
+    limit = clamp_limit(limit)
+    if cursor:
+        position = decode_cursor(cursor, sort_field, direction)
+        query = {"$and": [query, keyset_filter(sort_field, direction, position["v"], position["id"])]}
+
+    docs = await collection.find(query, projection or {"_id": 0}).sort(
+        [(sort_field, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(sort_field, direction, last.get(sort_field), last.get("id"))
+
+    items = docs
+    if transform:
+        items = [item for item in (transform(d) for d in docs) if item is not None]
+    return {"items": items, "next_cursor": next_cursor, "limit": limit}
+
+
+async def iter_batches(motor_cursor, batch_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Group a Motor cursor into lists of at most `batch_size` documents."""
+    batch = []
+    async for doc in motor_cursor:
+        doc.pop("_id", None)
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_ndjson(
+    motor_cursor,
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    enrich_batch: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+    batch_size: int = 500,
+) -> AsyncIterator[bytes]:
+    """Yield one JSON line per document straight from a Motor cursor.
+
+    `enrich_batch` runs once per batch (e.g. a single `$in` lookup of employee
+    names) and may mutate the documents in place before they are written.
+    """
+    async for batch in iter_batches(motor_cursor, batch_size):
+        if enrich_batch:
+            await enrich_batch(batch)
+        lines = []
+        for doc in batch:
+            if transform:
+                doc = transform(doc)
+                if doc is None:
+                    continue
+                if hasattr(doc, "model_dump"):
+                    doc = doc.model_dump()
+            lines.append(json.dumps(doc, default=str))
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def ndjson_response(
+    motor_cursor,
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    filename: Optional[str] = None,
+    enrich_batch: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+) -> StreamingResponse:
+    """Stream a Motor cursor as newline-delimited JSON with chunked encoding."""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return StreamingResponse(
+        iter_ndjson(motor_cursor, transform, enrich_batch), media_type=NDJSON_MEDIA_TYPE, headers=headers
+    )
+
+
+async def list_or_page(
+    collection,
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, Any]] = None,
+    *,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    sort_field: str = "created_at",
+    direction: int = -1,
+    legacy_sort: Optional[List] = None,
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Union[List[Any], Dict[str, Any], StreamingResponse]:
+    """Serve a list endpoint in one of three modes.
+
+    - `stream=true`: NDJSON of every matching document, read lazily from the cursor.
+    - `limit` and/or `cursor` given: one keyset page (see `paginate`).
+    - neither: the legacy plain list, now complete instead of silently capped.
+    """
+    projection = projection or {"_id": 0}
+    if stream:
+        return ndjson_response(
+            collection.find(query, projection).sort([(sort_field, direction), ("id", direction)]), transform
+        )
+    if limit is not None or cursor:
+        return await paginate(collection, query, projection, sort_field, direction, limit, cursor, transform)
+
+    motor_cursor = collection.find(query, projection)
+    if legacy_sort:
+        motor_cursor = motor_cursor.sort(legacy_sort)
+    items = []
+    async for doc in motor_cursor:
+        item = transform(doc) if transform else doc
+        if item is not None:
+            items.append(item)
+    return items
@@ -0,0 +1,197 @@
+"""Bulk payslip generation for payroll runs.
+
+A run is generated in chunks: existing payslips for the pay period are
+prefetched once, amounts for a whole chunk are computed column by column,
+and the chunk is written with one unordered `insert_many`. The unique
+(employee_id, pay_period) index turns a re-run into a no-op for employees that
+already have a payslip, so a run interrupted halfway is resumed by calling
+generate again. Progress is recorded on the run document under `generation`.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+import os
+import uuid
+
+from pymongo.errors import BulkWriteError
+
+PAYROLL_CHUNK_SIZE = int(os.environ.get("PAYROLL_CHUNK_SIZE", "1000"))
+# A generation whose heartbeat is older than this is considered dead and may be resumed
+PAYROLL_LEASE_SECONDS = int(os.environ.get("PAYROLL_LEASE_SECONDS", "300"))
+
+EARNING_FIELDS = [
+    "basic_salary", "housing_allowance", "transport_allowance",
+    "meal_allowance", "phone_allowance", "other_allowances",
+]
+DEDUCTION_FIELDS = ["social_security", "health_insurance", "pension_contribution", "other_deductions"]
+DUPLICATE_KEY = 11000
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def column(structures: List[Dict[str, Any]], field: str) -> List[float]:
+    return [float(s.get(field) or 0) for s in structures]
+
+
+def add(a: List[float], b: List[float]) -> List[float]:
+    return [x + y for x, y in zip(a, b)]
+
+
+def compute_amounts(structures: List[Dict[str, Any]]) -> Dict[str, List[float]]:
+    """Gross, tax, deductions and net for every structure of a chunk at once."""
+    cols = {f: column(structures, f) for f in EARNING_FIELDS + DEDUCTION_FIELDS + ["tax_rate"]}
+    gross = cols["basic_salary"]
+    for field in EARNING_FIELDS[1:]:
+        gross = add(gross, cols[field])
+    tax = [g * (rate / 100) for g, rate in zip(gross, cols["tax_rate"])]
+    deductions = tax
+    for field in DEDUCTION_FIELDS:
+        deductions = add(deductions, cols[field])
+    net = [g - d for g, d in zip(gross, deductions)]
+    return {**cols, "gross": gross, "tax": tax, "deductions": deductions, "net": net}
+
+
+def build_payslips(structures: List[Dict[str, Any]], template: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Payslip documents for a chunk; `template` carries model defaults and run fields."""
+    columns = compute_amounts(structures)
+    now = _now()
+    docs = []
+    for i, structure in enumerate(structures):
+        doc = dict(template)
+        doc.update({
+            "id": str(uuid.uuid4()),
+            "employee_id": structure.get("employee_id"),
+            "employee_name": structure.get("employee_name"),
+            "employee_email": structure.get("employee_email"),
+            "department": structure.get("department"),
+            "gross_salary": columns["gross"][i],
+            "tax_amount": columns["tax"][i],
+            "total_deductions": columns["deductions"][i],
+            "net_salary": columns["net"][i],
+            "currency": structure.get("currency", "USD"),
+            "payment_method": structure.get("payment_method"),
+            "created_at": now,
+            "updated_at": now,
+        })
+        for field in EARNING_FIELDS + DEDUCTION_FIELDS:
+            doc[field] = columns[field][i]
+        docs.append(doc)
+    return docs
+
+
+async def insert_chunk(collection, docs: List[Dict[str, Any]]) -> int:
+    """Insert a chunk unordered; rows rejected by the unique index are skipped."""
+    if not docs:
+        return 0
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+async def claim_generation(db, run_id: str) -> Optional[Dict[str, Any]]:
+    """Mark a run as generating unless a live generation already holds it."""
+    now = datetime.now(timezone.utc)
+    stale = (now - timedelta(seconds=PAYROLL_LEASE_SECONDS)).isoformat()
+    return await db.payroll_runs.find_one_and_update(
+        {
+            "id": run_id,
+            "$or": [
+                {"generation.status": {"$ne": "running"}},
+                {"generation.heartbeat_at": {"$lt": stale}},
+            ],
+        },
+        {"$set": {
+            "generation.status": "running",
+            "generation.started_at": now.isoformat(),
+            "generation.heartbeat_at": now.isoformat(),
+            "generation.error": None,
+        }},
+        projection={"_id": 0},
+    )
+
+
+async def generate_run(db, run: Dict[str, Any], template: Dict[str, Any],
+                       chunk_size: int = PAYROLL_CHUNK_SIZE) -> Dict[str, Any]:
+    """Create missing payslips for every active salary structure and total the run.
+
+    The caller must hold the generation claim (see `claim_generation`).
+    """
+    try:
+        progress = await _generate_chunks(db, run, template, chunk_size)
+        totals = await period_totals(db, run.get("pay_period"))
+    except Exception as e:
+        await db.payroll_runs.update_one(
+            {"id": run["id"]}, {"$set": {"generation.status": "failed", "generation.error": str(e)}}
+        )
+        raise
+
+    now = _now()
+    await db.payroll_runs.update_one(
+        {"id": run["id"]},
+        {"$set": {
+            "total_employees": totals["count"],
+            "total_gross": totals["gross"],
+            "total_deductions": totals["deductions"],
+            "total_net": totals["net"],
+            "status": "processing",
+            "processed_at": now,
+            "updated_at": now,
+            "generation.status": "completed",
+            "generation.completed_at": now,
+        }}
+    )
+    return {**progress, **totals}
+
+
+async def _generate_chunks(db, run: Dict[str, Any], template: Dict[str, Any], chunk_size: int) -> Dict[str, int]:
+    run_id = run["id"]
+    existing = set(await db.payslips.distinct("employee_id", {"pay_period": run.get("pay_period")}))
+    pending = []
+    async for structure in db.salary_structures.find({"status": "active"}, {"_id": 0}):
+        employee_id = structure.get("employee_id")
+        # First active structure wins, as before
+        if employee_id in existing:
+            continue
+        existing.add(employee_id)
+        pending.append(structure)
+
+    progress = {"total": len(pending), "processed": 0, "created": 0, "skipped": 0}
+    await db.payroll_runs.update_one(
+        {"id": run_id}, {"$set": {f"generation.{k}": v for k, v in progress.items()}}
+    )
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        created = await insert_chunk(db.payslips, build_payslips(chunk, template))
+        progress["processed"] += len(chunk)
+        progress["created"] += created
+        progress["skipped"] += len(chunk) - created
+        await db.payroll_runs.update_one(
+            {"id": run_id},
+            {"$set": {
+                **{f"generation.{k}": v for k, v in progress.items()},
+                "generation.heartbeat_at": _now(),
+            }}
+        )
+    return progress
+
+
+async def period_totals(db, pay_period: str) -> Dict[str, Any]:
+    rows = await db.payslips.aggregate([
+        {"$match": {"pay_period": pay_period}},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "gross": {"$sum": "$gross_salary"},
+            "deductions": {"$sum": "$total_deductions"},
+            "net": {"$sum": "$net_salary"},
+        }},
+    ]).to_list(1)
+    if not rows:
+        return {"count": 0, "gross": 0, "deductions": 0, "net": 0}
+    return {k: rows[0][k] for k in ("count", "gross", "deductions", "net")}
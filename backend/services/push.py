@@ -0,0 +1,246 @@
+"""Concurrent Web Push delivery.
+
+`PushDispatcher` sends one notification to many subscriptions:
+
+- each subscription's payload is encrypted once (aes128gcm, via pywebpush's
+  encoder, in a worker thread) and the encrypted body is reused on retries;
+- VAPID headers are signed once per push-service origin and reused until
+  shortly before they expire;
+- requests go out over one pooled `httpx.AsyncClient` with at most
+  `concurrency` in flight, retrying 429/5xx and network errors with
+  exponential backoff (honouring a numeric Retry-After);
+- 404/410 endpoints are collected and reported so the caller can deactivate
+  them with a single `bulk_write`.
+
+The dispatcher itself doesn't touch the database, so it can be pointed at a
+local stub push service in tests; the helpers at the bottom do the reads and
+writes around a dispatch.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+import httpx
+from py_vapid import Vapid
+from pymongo import UpdateOne
+from pywebpush import WebPusher
+
+from database import register_index
+from services.config_cache import get_config
+
+logger = logging.getLogger(__name__)
+
+PUSH_CONCURRENCY = int(os.environ.get("PUSH_CONCURRENCY", "50"))
+PUSH_MAX_RETRIES = int(os.environ.get("PUSH_MAX_RETRIES", "3"))
+PUSH_TIMEOUT_SECONDS = float(os.environ.get("PUSH_TIMEOUT_SECONDS", "10"))
+PUSH_BACKOFF_SECONDS = float(os.environ.get("PUSH_BACKOFF_SECONDS", "0.5"))
+PUSH_TTL_SECONDS = int(os.environ.get("PUSH_TTL_SECONDS", "0"))
+
+VAPID_LIFETIME_SECONDS = 12 * 60 * 60
+# Re-sign VAPID headers this long before they expire
+VAPID_REFRESH_MARGIN_SECONDS = 60 * 60
+EXPIRED_STATUSES = (404, 410)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class DeliveryStats:
+    """Counters for one dispatch; `as_dict()` is what gets stored and returned."""
+
+    def __init__(self, total: int):
+        self.id = str(uuid.uuid4())
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.expired = 0
+        self.retries = 0
+        self.expired_endpoints: List[str] = []
+        self.errors: Dict[str, int] = {}
+        self._started = time.perf_counter()
+        self.duration_ms = 0.0
+
+    def error(self, reason: str) -> None:
+        self.failed += 1
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def finish(self) -> "DeliveryStats":
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "expired": self.expired,
+            "retries": self.retries,
+            "errors": self.errors,
+            "duration_ms": self.duration_ms,
+        }
+
+
+def build_payload(notification, default_icon: str) -> bytes:
+    """Serialized notification, identical for every recipient."""
+    return json.dumps({
+        "title": notification.title,
+        "body": notification.body,
+        "icon": notification.icon or default_icon,
+        "badge": notification.badge or "/badge-72x72.png",
+        "tag": notification.tag,
+        "data": {
+            "url": notification.url or "/",
+            **(notification.data or {})
+        }
+    }).encode("utf-8")
+
+
+def subscription_info(sub: Dict[str, Any]) -> Dict[str, Any]:
+    return {"endpoint": sub["endpoint"], "keys": {"p256dh": sub["p256dh"], "auth": sub["auth"]}}
+
+
+def encrypt_for(sub: Dict[str, Any], payload: bytes) -> bytes:
+    """aes128gcm body for one subscription (CPU-bound; run in a thread)."""
+    return WebPusher(subscription_info(sub)).encode(payload, "aes128gcm")["body"]
+
+
+class PushDispatcher:
+    def __init__(self, vapid_private_key: str, vapid_subject: str,
+                 concurrency: int = PUSH_CONCURRENCY, max_retries: int = PUSH_MAX_RETRIES,
+                 timeout: float = PUSH_TIMEOUT_SECONDS, backoff: float = PUSH_BACKOFF_SECONDS,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.vapid = Vapid.from_string(private_key=vapid_private_key)
+        self.vapid_subject = vapid_subject
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self._client = client
+        self._vapid_headers: Dict[str, Tuple[float, Dict[str, str]]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def vapid_headers(self, endpoint: str) -> Dict[str, str]:
+        url = urlparse(endpoint)
+        audience = f"{url.scheme}://{url.netloc}"
+        now = time.time()
+        cached = self._vapid_headers.get(audience)
+        if cached and cached[0] - VAPID_REFRESH_MARGIN_SECONDS > now:
+            return cached[1]
+        expires = int(now) + VAPID_LIFETIME_SECONDS
+        headers = self.vapid.sign({"sub": self.vapid_subject, "aud": audience, "exp": expires})
+        self._vapid_headers[audience] = (expires, headers)
+        return headers
+
+    async def dispatch(self, subscriptions: List[Dict[str, Any]], payload: bytes) -> DeliveryStats:
+        """Deliver `payload` to every subscription; never raises for delivery failures."""
+        stats = DeliveryStats(len(subscriptions))
+        queue: asyncio.Queue = asyncio.Queue()
+        for sub in subscriptions:
+            queue.put_nowait(sub)
+
+        async def worker():
+            while True:
+                try:
+                    sub = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._deliver(sub, payload, stats)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(subscriptions)))))
+        return stats.finish()
+
+    async def _deliver(self, sub: Dict[str, Any], payload: bytes, stats: DeliveryStats) -> None:
+        endpoint = sub["endpoint"]
+        try:
+            body = await asyncio.to_thread(encrypt_for, sub, payload)
+        except Exception as e:
+            logger.warning(f"Push encryption failed for {endpoint}: {e}")
+            stats.error("invalid_subscription")
+            return
+
+        headers = {
+            **self.vapid_headers(endpoint),
+            "content-encoding": "aes128gcm",
+            "ttl": str(PUSH_TTL_SECONDS),
+        }
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff * (2 ** attempt)
+            try:
+                response = await self.client.post(endpoint, content=body, headers=headers)
+            except httpx.HTTPError as e:
+                reason = "network"
+                logger.debug(f"Push to {endpoint} failed: {e}")
+            else:
+                if response.status_code < 300:
+                    stats.sent += 1
+                    return
+                if response.status_code in EXPIRED_STATUSES:
+                    stats.expired += 1
+                    stats.expired_endpoints.append(endpoint)
+                    return
+                reason = f"http_{response.status_code}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get("retry-after", "")
+                if retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            if attempt < self.max_retries:
+                stats.retries += 1
+                await asyncio.sleep(delay)
+        stats.error(reason)
+
+
+# ============= DATABASE GLUE =============
+
+PUSH_DELIVERIES_COLLECTION = "push_deliveries"
+DEFAULT_ICON = "/icon-192x192.png"
+
+register_index(PUSH_DELIVERIES_COLLECTION, [("id", 1)], unique=True)
+register_index(PUSH_DELIVERIES_COLLECTION, [("created_at", -1)])
+
+
+async def default_icon(db) -> str:
+    """Branding logo used as the notification icon, read through the config cache."""
+    settings = await get_config(db, "settings")
+    return settings.get("logo_url", DEFAULT_ICON) if settings else DEFAULT_ICON
+
+
+async def deactivate_endpoints(db, endpoints: List[str]) -> int:
+    """Mark expired subscriptions inactive in one bulk write."""
+    if not endpoints:
+        return 0
+    now = datetime.now(timezone.utc).isoformat()
+    result = await db.push_subscriptions.bulk_write(
+        [UpdateOne({"endpoint": e}, {"$set": {"is_active": False, "updated_at": now}}) for e in endpoints],
+        ordered=False,
+    )
+    return result.modified_count
+
+
+async def record_delivery(db, stats: DeliveryStats, title: str, created_by: Optional[str] = None) -> Dict[str, Any]:
+    doc = {
+        **stats.as_dict(),
+        "title": title,
+        "created_by": created_by,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    await db[PUSH_DELIVERIES_COLLECTION].insert_one(dict(doc))
+    return doc
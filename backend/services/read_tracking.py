@@ -0,0 +1,153 @@
+"""Per-employee read/acknowledgement tracking for announcements and memos.
+
+Each read is its own small document (`announcement_reads`, `memo_acks`) under
+a unique (parent, employee) index instead of an entry in an ever-growing
+array on the parent: marking something read inserts one document, and the
+parent only carries an aggregate counter (`read_count`, `ack_count`) bumped
+when a read is new.
+
+"What hasn't this employee read" is an anti-join: the parents visible to them,
+each probed with a point lookup on the unique index, keeping those with no
+match. The cost follows the number of visible parents, not the number of
+employees who have read them.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+import uuid
+
+from pymongo import UpdateOne
+
+from database import register_index
+
+BACKFILL_BATCH_SIZE = 500
+
+
+class ReadTracker:
+    def __init__(self, collection: str, parent_collection: str, parent_field: str,
+                 count_field: str, time_field: str, legacy_field: str):
+        self.collection = collection
+        self.parent_collection = parent_collection
+        self.parent_field = parent_field
+        self.count_field = count_field
+        self.time_field = time_field
+        # Array field the reads used to live in on the parent document
+        self.legacy_field = legacy_field
+        register_index(collection, [(parent_field, 1), ("employee_id", 1)], unique=True)
+        register_index(collection, [("employee_id", 1)])
+        register_index(collection, [(parent_field, 1), (time_field, -1), ("id", 1)])
+
+    async def mark(self, db, parent_id: str, employee_id: str, **fields: Any) -> bool:
+        """Record that the employee read `parent_id`; True the first time only."""
+        result = await db[self.collection].update_one(
+            {self.parent_field: parent_id, "employee_id": employee_id},
+            {"$setOnInsert": {
+                "id": str(uuid.uuid4()),
+                self.time_field: datetime.now(timezone.utc).isoformat(),
+                **fields,
+            }},
+            upsert=True,
+        )
+        if result.upserted_id is None:
+            return False
+        await db[self.parent_collection].update_one({"id": parent_id}, {"$inc": {self.count_field: 1}})
+        return True
+
+    async def own_reads(self, db, parent_ids: List[str], employee_id: str) -> Dict[str, Dict[str, Any]]:
+        """The employee's read documents for `parent_ids`, by parent id."""
+        if not parent_ids:
+            return {}
+        docs = await db[self.collection].find(
+            {"employee_id": employee_id, self.parent_field: {"$in": parent_ids}}, {"_id": 0}
+        ).to_list(None)
+        return {d[self.parent_field]: d for d in docs}
+
+    def unread_pipeline(self, parent_query: Dict[str, Any], employee_id: str) -> List[Dict[str, Any]]:
+        """Parents matching `parent_query` that the employee has not read."""
+        return [
+            {"$match": parent_query},
+            {"$project": {"_id": 0, "id": 1}},
+            {"$lookup": {
+                "from": self.collection,
+                "let": {"parent_id": "$id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$and": [
+                        {"$eq": [f"${self.parent_field}", "$$parent_id"]},
+                        {"$eq": ["$employee_id", employee_id]},
+                    ]}}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "read",
+            }},
+            {"$match": {"read": {"$size": 0}}},
+        ]
+
+    async def unread_count(self, db, parent_query: Dict[str, Any], employee_id: str) -> int:
+        rows = await db[self.parent_collection].aggregate(
+            self.unread_pipeline(parent_query, employee_id) + [{"$count": "count"}]
+        ).to_list(1)
+        return rows[0]["count"] if rows else 0
+
+    async def delete_for(self, db, parent_id: str) -> None:
+        await db[self.collection].delete_many({self.parent_field: parent_id})
+
+    async def backfill(self, db, legacy_entry=None) -> int:
+        """Move reads still stored in the parent's legacy array into the collection.
+
+        `legacy_entry` turns one array entry into (employee_id, extra fields);
+        by default entries are plain employee ids. Returns parents migrated.
+        """
+        legacy_entry = legacy_entry or (lambda entry: (entry, {}))
+        migrated = 0
+        cursor = db[self.parent_collection].find(
+            {self.legacy_field: {"$exists": True}}, {"_id": 0, "id": 1, self.legacy_field: 1}
+        )
+        async for parent in cursor:
+            ops = []
+            for entry in parent.get(self.legacy_field) or []:
+                employee_id, fields = legacy_entry(entry)
+                if not employee_id:
+                    continue
+                fields = {k: v for k, v in fields.items() if v is not None}
+                ops.append(UpdateOne(
+                    {self.parent_field: parent["id"], "employee_id": employee_id},
+                    {"$setOnInsert": {
+                        "id": str(uuid.uuid4()),
+                        self.time_field: fields.pop(self.time_field, None) or datetime.now(timezone.utc).isoformat(),
+                        **fields,
+                    }},
+                    upsert=True,
+                ))
+            for start in range(0, len(ops), BACKFILL_BATCH_SIZE):
+                await db[self.collection].bulk_write(ops[start:start + BACKFILL_BATCH_SIZE], ordered=False)
+            count = await db[self.collection].count_documents({self.parent_field: parent["id"]})
+            await db[self.parent_collection].update_one(
+                {"id": parent["id"]}, {"$set": {self.count_field: count}, "$unset": {self.legacy_field: ""}}
+            )
+            migrated += 1
+        return migrated
+
+
+announcement_reads = ReadTracker(
+    "announcement_reads", "announcements", "announcement_id",
+    count_field="read_count", time_field="read_at", legacy_field="read_by",
+)
+memo_acks = ReadTracker(
+    "memo_acks", "memos", "memo_id",
+    count_field="ack_count", time_field="acknowledged_at", legacy_field="acknowledged_by",
+)
+
+
+def legacy_memo_ack(entry: Dict[str, Any]):
+    return entry.get("employee_id"), {
+        "employee_name": entry.get("employee_name"),
+        "acknowledged_at": entry.get("acknowledged_at"),
+    }
+
+
+async def backfill_read_tracking(db) -> Dict[str, int]:
+    """Migrate legacy `read_by` / `acknowledged_by` arrays; safe to re-run."""
+    return {
+        "announcements": await announcement_reads.backfill(db),
+        "memos": await memo_acks.backfill(db, legacy_memo_ack),
+    }
@@ -0,0 +1,223 @@
+"""In-process pub/sub for realtime collaboration and notification events.
+
+WebSocket connections and notification streams subscribe a bounded queue to
+topics (`channel:<id>`, `presence`, `notifications:<user id>`); `publish()`
+fans an event out to every local subscriber at once and hands it to the
+backend so other API replicas deliver it too. `publish_many()` does the same
+for one event addressed to several topics:
+
+- `MemoryBackend`: single process (the default). Backends created with the
+  same `hub` list deliver to each other, which is how tests stand in for
+  several replicas.
+- `MongoBackend`: inserts each event into `realtime_events` (expired by a TTL
+  index) and tails that collection with a change stream; requires MongoDB to
+  run as a replica set.
+
+Events carry the publishing replica's id so a replica never delivers its own
+event twice. A subscriber that falls `REALTIME_QUEUE_SIZE` events behind is
+marked overflowed and dropped; clients reconnect and refetch over HTTP.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from database import register_index
+
+logger = logging.getLogger(__name__)
+
+REALTIME_BACKEND = os.environ.get("REALTIME_BACKEND", "memory")
+REALTIME_QUEUE_SIZE = int(os.environ.get("REALTIME_QUEUE_SIZE", "256"))
+REALTIME_EVENT_TTL_SECONDS = int(os.environ.get("REALTIME_EVENT_TTL_SECONDS", "300"))
+
+EVENTS_COLLECTION = "realtime_events"
+register_index(EVENTS_COLLECTION, [("created_at", 1)], expire_after_seconds=REALTIME_EVENT_TTL_SECONDS)
+
+
+def channel_topic(channel_id: str) -> str:
+    return f"channel:{channel_id}"
+
+
+PRESENCE_TOPIC = "presence"
+
+
+class Subscriber:
+    """One connection's inbox; the gateway drains `queue`."""
+
+    def __init__(self, user_id: str, maxsize: int = REALTIME_QUEUE_SIZE):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.topics: Set[str] = set()
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Wake the sender so it notices and closes the connection
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+# ============= BACKENDS =============
+
+class MemoryBackend:
+    """No cross-process delivery; backends sharing `hub` deliver to each other."""
+
+    def __init__(self, hub: Optional[List["MemoryBackend"]] = None):
+        self.hub = hub if hub is not None else []
+        self.broker: Optional["Broker"] = None
+
+    async def start(self, broker: "Broker") -> None:
+        self.broker = broker
+        self.hub.append(self)
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        for peer in self.hub:
+            if peer is not self and peer.broker:
+                peer.broker.deliver(envelope)
+
+    async def stop(self) -> None:
+        if self in self.hub:
+            self.hub.remove(self)
+
+
+class MongoBackend:
+    """Relays events between replicas through a change stream on `realtime_events`."""
+
+    def __init__(self, db, retry_seconds: float = 1.0):
+        self.db = db
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, broker: "Broker") -> None:
+        self._task = asyncio.create_task(self._tail(broker))
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        await self.db[EVENTS_COLLECTION].insert_one({**envelope, "created_at": datetime.now(timezone.utc)})
+
+    async def _tail(self, broker: "Broker") -> None:
+        resume_token = None
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": broker.origin}}}]
+        while True:
+            try:
+                async with self.db[EVENTS_COLLECTION].watch(pipeline, resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        doc = change["fullDocument"]
+                        broker.deliver({k: doc.get(k) for k in ("origin", "topic", "topics", "event")})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Realtime change stream interrupted: {e}")
+                await asyncio.sleep(self.retry_seconds)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def create_backend(name: str, db=None):
+    if name == "mongo":
+        return MongoBackend(db)
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown realtime backend: {name}")
+
+
+# ============= BROKER =============
+
+class Broker:
+    def __init__(self, backend=None):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.backend = backend or MemoryBackend()
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._connections: Dict[str, int] = {}
+
+    async def start(self, backend=None) -> None:
+        if backend is not None:
+            self.backend = backend
+        await self.backend.start(self)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    def subscribe(self, subscriber: Subscriber, topic: str) -> None:
+        self._topics.setdefault(topic, set()).add(subscriber)
+        subscriber.topics.add(topic)
+
+    def unsubscribe(self, subscriber: Subscriber, topic: str) -> None:
+        subscribers = self._topics.get(topic)
+        if subscribers:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._topics[topic]
+        subscriber.topics.discard(topic)
+
+    def connect(self, subscriber: Subscriber) -> bool:
+        """Track a connection; True when it is the user's first on this replica."""
+        self._connections[subscriber.user_id] = self._connections.get(subscriber.user_id, 0) + 1
+        return self._connections[subscriber.user_id] == 1
+
+    def disconnect(self, subscriber: Subscriber) -> bool:
+        """Drop all of a connection's subscriptions; True when it was the user's last."""
+        for topic in list(subscriber.topics):
+            self.unsubscribe(subscriber, topic)
+        remaining = self._connections.get(subscriber.user_id, 1) - 1
+        if remaining > 0:
+            self._connections[subscriber.user_id] = remaining
+            return False
+        self._connections.pop(subscriber.user_id, None)
+        return True
+
+    def deliver(self, envelope: Dict[str, Any]) -> None:
+        topics = envelope.get("topics") or [envelope["topic"]]
+        if len(topics) == 1:
+            subscribers = list(self._topics.get(topics[0], ()))
+        else:
+            # A subscriber on several of the topics still gets the event once
+            subscribers = set()
+            for topic in topics:
+                subscribers.update(self._topics.get(topic, ()))
+        for subscriber in subscribers:
+            subscriber.offer(envelope["event"])
+
+    async def publish(self, topic: str, event_type: str, data: Dict[str, Any], **fields: Any) -> None:
+        """Deliver locally, then relay; relay failures are logged, never raised."""
+        envelope = {"origin": self.origin, "topic": topic, "event": {"type": event_type, **fields, "data": data}}
+        await self._send(envelope)
+
+    async def publish_many(self, topics: List[str], event_type: str, data: Dict[str, Any], **fields: Any) -> None:
+        """One event to every subscriber of any of `topics`, relayed as a single envelope."""
+        if not topics:
+            return
+        envelope = {"origin": self.origin, "topic": topics[0], "topics": list(topics),
+                    "event": {"type": event_type, **fields, "data": data}}
+        await self._send(envelope)
+
+    async def _send(self, envelope: Dict[str, Any]) -> None:
+        self.deliver(envelope)
+        try:
+            await self.backend.publish(envelope)
+        except Exception as e:
+            logger.warning(f"Realtime relay of {envelope['event']['type']} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "origin": self.origin,
+            "backend": type(self.backend).__name__,
+            "topics": len(self._topics),
+            "subscriptions": sum(len(s) for s in self._topics.values()),
+            "users": len(self._connections),
+        }
+
+
+broker = Broker()
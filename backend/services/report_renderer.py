@@ -0,0 +1,314 @@
+"""CSV and PDF attachments for scheduled reports.
+
+Tabular report types (employees, leave, visitors) are streamed from the Motor
+cursor straight into a CSV file in batches, so a report is never capped by a
+`to_list()` limit and never held in memory. The PDF is then drawn from that
+CSV, page by page, in the CPU process pool (`run_cpu_bound`). Summary-only
+report types render their metrics as `metric,value` rows.
+
+Files are cached under `uploads/reports/`, named by an HMAC of (report, date
+range, filters, data version). The data version is the collection's change
+count (`snapshots.change_count`, bumped by every API write) plus the matching
+row count and newest `updated_at`/`created_at` for writes made outside the API,
+so a preview, a re-send and a download of unchanged data reuse one artifact,
+and any edit produces a new one. The HMAC
+keeps names unguessable even though `/uploads` is served statically; files
+are meant to be fetched through the authenticated download endpoints.
+"""
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import csv
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+import weakref
+
+from database import JWT_SECRET
+from services import snapshots
+from services.executors import run_cpu_bound
+from services.pagination import iter_batches
+
+REPORTS_DIR = Path(os.environ.get("REPORTS_DIR", Path(__file__).resolve().parent.parent / "uploads" / "reports"))
+REPORT_CACHE_DAYS = float(os.environ.get("REPORT_CACHE_DAYS", "7"))
+REPORT_BATCH_SIZE = int(os.environ.get("REPORT_BATCH_SIZE", "1000"))
+
+FORMATS = {"csv": "text/csv", "pdf": "application/pdf"}
+
+
+# ============= DATE RANGES =============
+
+def report_window(date_range: str, now: Optional[datetime] = None) -> Tuple[str, str]:
+    """(start, end) dates for a report's `date_range` setting."""
+    now = now or datetime.now(timezone.utc)
+    days = {"last_7_days": 7, "last_30_days": 30, "last_quarter": 90}.get(date_range, 7)
+    return (now - timedelta(days=days)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
+
+
+# ============= DATASETS =============
+
+async def _employee_names(db, rows: List[Dict[str, Any]]) -> None:
+    ids = list({r["employee_id"] for r in rows if r.get("employee_id")})
+    names = {
+        e["id"]: e.get("full_name", "")
+        async for e in db.employees.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "full_name": 1})
+    }
+    for row in rows:
+        row["employee_name"] = names.get(row.get("employee_id"), "")
+
+
+class Dataset:
+    """Where a tabular report's rows come from and which columns it shows."""
+
+    def __init__(self, collection: str, columns: List[Tuple[str, str]],
+                 query: Callable[[str, str], Dict[str, Any]], sort: List[Tuple[str, int]],
+                 enrich: Optional[Callable[[Any, List[Dict[str, Any]]], Awaitable[None]]] = None):
+        self.collection = collection
+        self.columns = columns
+        self.query = query
+        self.sort = sort
+        self.enrich = enrich
+
+    @property
+    def projection(self) -> Dict[str, int]:
+        return {"_id": 0, **{field: 1 for field, _ in self.columns}}
+
+
+DATASETS: Dict[str, Dataset] = {
+    "employees": Dataset(
+        "employees",
+        [("employee_id", "Employee ID"), ("full_name", "Name"), ("work_email", "Email"),
+         ("job_title", "Job Title"), ("department_name", "Department"),
+         ("employment_status", "Employment Status"), ("work_location", "Location"), ("hire_date", "Hire Date")],
+        lambda start, end: {"status": "active"},
+        [("full_name", 1), ("id", 1)],
+    ),
+    "leave": Dataset(
+        "leaves",
+        [("employee_id", "Employee ID"), ("employee_name", "Employee"), ("leave_type", "Type"),
+         ("start_date", "Start"), ("end_date", "End"), ("half_day", "Half Day"), ("status", "Status")],
+        lambda start, end: {"start_date": {"$gte": start}},
+        [("start_date", 1), ("id", 1)],
+        _employee_names,
+    ),
+    "visitors": Dataset(
+        "visitors",
+        [("first_name", "First Name"), ("last_name", "Last Name"), ("company", "Company"),
+         ("visit_type", "Visit Type"), ("host_name", "Host"), ("expected_date", "Date"),
+         ("expected_time", "Time"), ("status", "Status"), ("check_in_time", "Checked In"),
+         ("check_out_time", "Checked Out")],
+        lambda start, end: {"expected_date": {"$gte": start, "$lte": end}},
+        [("expected_date", 1), ("id", 1)],
+    ),
+}
+
+
+def summary_rows(data: Any, prefix: str = "") -> List[List[str]]:
+    """Flatten a summary payload into `[metric, value]` rows."""
+    if isinstance(data, dict):
+        rows = []
+        for key, value in data.items():
+            rows.extend(summary_rows(value, f"{prefix}{key}."))
+        return rows
+    if isinstance(data, list):
+        rows = []
+        for i, value in enumerate(data):
+            rows.extend(summary_rows(value, f"{prefix}{i}."))
+        return rows
+    return [[prefix.rstrip("."), "" if data is None else str(data)]]
+
+
+async def data_version(db, report_type: str, start: str, end: str, report_data: Dict[str, Any]) -> str:
+    dataset = DATASETS.get(report_type)
+    if dataset is None:
+        return hashlib.sha1(json.dumps(report_data.get("data", {}), sort_keys=True, default=str).encode()).hexdigest()
+    stats = await db[dataset.collection].aggregate([
+        {"$match": dataset.query(start, end)},
+        {"$group": {"_id": None, "rows": {"$sum": 1},
+                    "updated": {"$max": "$updated_at"}, "created": {"$max": "$created_at"}}},
+    ]).to_list(1)
+    stats = stats[0] if stats else {}
+    changes = await snapshots.change_count(db, dataset.collection)
+    return f"{changes}:{stats.get('rows', 0)}:{stats.get('updated')}:{stats.get('created')}"
+
+
+def cache_key(report: Dict[str, Any], start: str, end: str, version: str) -> str:
+    identity = json.dumps({
+        "report": report.get("id") or report.get("report_type"),
+        "type": report.get("report_type"),
+        "filters": report.get("filters", {}),
+        "start": start,
+        "end": end,
+        "version": version,
+    }, sort_keys=True, default=str)
+    return hmac.new(JWT_SECRET.encode(), identity.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+# ============= RENDERING =============
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    return str(value)
+
+
+async def write_csv(db, report_type: str, start: str, end: str, report_data: Dict[str, Any], path: Path) -> int:
+    """Stream the report's rows into `path`; returns the number of data rows."""
+    dataset = DATASETS.get(report_type)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    count = 0
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if dataset is None:
+            writer.writerow(["Metric", "Value"])
+            rows = summary_rows(report_data.get("data", {}))
+            writer.writerows(rows)
+            count = len(rows)
+        else:
+            writer.writerow([header for _, header in dataset.columns])
+            cursor = db[dataset.collection].find(dataset.query(start, end), dataset.projection).sort(dataset.sort)
+            async for batch in iter_batches(cursor, REPORT_BATCH_SIZE):
+                if dataset.enrich:
+                    await dataset.enrich(db, batch)
+                writer.writerows([_cell(doc.get(field)) for field, _ in dataset.columns] for doc in batch)
+                count += len(batch)
+    os.replace(tmp, path)
+    return count
+
+
+def render_pdf(csv_path: str, pdf_path: str, title: str, subtitle: str) -> int:
+    """Draw the CSV as a paginated landscape table (runs in the process pool).
+
+    Rows are read and drawn one at a time, so memory does not grow with the
+    report. Returns the number of pages.
+    """
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+
+    width, height = landscape(letter)
+    margin, row_height, font, size = 36, 14, "Helvetica", 8
+    # Unique per render: another process may be writing the same file
+    tmp = f"{pdf_path}.{uuid.uuid4().hex}.tmp"
+    pdf = canvas.Canvas(tmp, pagesize=(width, height))
+    pdf.setTitle(title)
+
+    def clip(text: str, limit: float) -> str:
+        if stringWidth(text, font, size) <= limit:
+            return text
+        while text and stringWidth(text + "...", font, size) > limit:
+            text = text[:-1]
+        return text + "..."
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        col_width = (width - 2 * margin) / max(len(header), 1)
+        page = 0
+
+        def start_page() -> float:
+            nonlocal page
+            page += 1
+            y = height - margin
+            if page == 1:
+                pdf.setFont("Helvetica-Bold", 14)
+                pdf.drawString(margin, y, title)
+                pdf.setFont(font, 9)
+                pdf.drawString(margin, y - 16, subtitle)
+                y -= 36
+            pdf.setFont("Helvetica-Bold", size)
+            for i, name in enumerate(header):
+                pdf.drawString(margin + i * col_width, y, clip(name, col_width - 4))
+            pdf.line(margin, y - 4, width - margin, y - 4)
+            pdf.setFont(font, 7)
+            pdf.drawRightString(width - margin, margin / 2, f"Page {page}")
+            pdf.setFont(font, size)
+            return y - row_height
+
+        y = start_page()
+        for row in reader:
+            if y < margin:
+                pdf.showPage()
+                y = start_page()
+            for i, value in enumerate(row):
+                pdf.drawString(margin + i * col_width, y, clip(value, col_width - 4))
+            y -= row_height
+    pdf.save()
+    os.replace(tmp, pdf_path)
+    return page
+
+
+# Held by every caller waiting on or rendering a key; dropped when the last one finishes
+_render_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+_last_purge = 0.0
+
+
+def purge_cache(max_age_days: float = REPORT_CACHE_DAYS) -> int:
+    """Delete cached files not used for `max_age_days`."""
+    if not REPORTS_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for path in REPORTS_DIR.iterdir():
+        if path.is_file() and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def formats_for(report_format: str) -> List[str]:
+    return ["csv", "pdf"] if report_format == "both" else [report_format if report_format in FORMATS else "pdf"]
+
+
+def artifact_path(name: str) -> Optional[Path]:
+    """Path of a cached file by name, or None for anything that isn't one."""
+    stem, _, ext = name.partition(".")
+    if ext not in FORMATS or len(stem) != 32 or not all(c in "0123456789abcdef" for c in stem):
+        return None
+    path = REPORTS_DIR / name
+    return path if path.is_file() else None
+
+
+async def render_report(db, report: Dict[str, Any], report_data: Dict[str, Any],
+                        formats: List[str]) -> List[Dict[str, Any]]:
+    """Render (or reuse) the report's files; one descriptor per format."""
+    global _last_purge
+    if time.monotonic() - _last_purge > 3600:
+        _last_purge = time.monotonic()
+        await asyncio.to_thread(purge_cache)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    report_type = report_data["report_type"]
+    start, end = report_data["date_range"]["start"], report_data["date_range"]["end"]
+    key = cache_key(report, start, end, await data_version(db, report_type, start, end, report_data))
+    csv_path, pdf_path = REPORTS_DIR / f"{key}.csv", REPORTS_DIR / f"{key}.pdf"
+
+    lock = _render_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        if not csv_path.exists():
+            await write_csv(db, report_type, start, end, report_data, csv_path)
+        if "pdf" in formats and not pdf_path.exists():
+            title = report.get("name") or f"{report_type.replace('_', ' ').title()} Report"
+            subtitle = f"{report_type.replace('_', ' ').title()} report | {start} to {end}"
+            await run_cpu_bound(render_pdf, str(csv_path), str(pdf_path), title, subtitle)
+
+    slug = "".join(c if c.isalnum() else "-" for c in (report.get("name") or report_type)).strip("-").lower()
+    files = []
+    for fmt in formats:
+        path = csv_path if fmt == "csv" else pdf_path
+        path.touch()  # keeps files in use out of the purge
+        files.append({
+            "format": fmt,
+            "name": path.name,
+            "filename": f"{slug or 'report'}-{start}-to-{end}.{fmt}",
+            "media_type": FORMATS[fmt],
+            "size": path.stat().st_size,
+            "path": str(path),
+        })
+    return files
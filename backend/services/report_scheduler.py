@@ -0,0 +1,221 @@
+"""Scheduler that fires `scheduled_reports` when their `next_run` comes due.
+
+Schedules are evaluated in the report's own timezone (`zoneinfo`), so a
+"09:00 Europe/Berlin" report follows DST, and monthly reports on the 29th-31st
+fall on the last day of shorter months instead of being capped at the 28th.
+`next_run` is always stored in UTC.
+
+One scheduler (normally in `python worker.py`) polls the `(status, next_run)`
+index. A due report is claimed with a compare-and-set `find_one_and_update`
+that moves `next_run` to the following slot, so only one replica wins a given
+run, and a report that was due several times while nothing was running fires
+once rather than once per missed slot. Claimed reports are generated
+concurrently, at most `concurrency` at a time. Between polls the scheduler
+sleeps until the earliest `next_run`, capped at `poll_interval` so newly
+created or edited schedules are picked up.
+"""
+from calendar import monthrange
+from datetime import datetime, timezone, timedelta, date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import asyncio
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+REPORT_SCHEDULER_CONCURRENCY = int(os.environ.get("REPORT_SCHEDULER_CONCURRENCY", "4"))
+REPORT_SCHEDULER_POLL_SECONDS = float(os.environ.get("REPORT_SCHEDULER_POLL_SECONDS", "30"))
+# Runs still "generating" after this long belong to a scheduler that died
+REPORT_RUN_TIMEOUT_SECONDS = float(os.environ.get("REPORT_RUN_TIMEOUT_SECONDS", "1800"))
+
+RunReport = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+# ============= SCHEDULE CALCULATION =============
+
+def report_zone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def _at(day: date, hour: int, minute: int, tz: ZoneInfo) -> datetime:
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+
+
+def _monthly(year: int, month: int, day_of_month: int) -> date:
+    return date(year, month, min(day_of_month, monthrange(year, month)[1]))
+
+
+def calculate_next_run(frequency: str, day_of_week: int = None, day_of_month: int = None,
+                       time_of_day: str = "09:00", tz_name: str = "UTC",
+                       after: Optional[datetime] = None) -> str:
+    """First run strictly after `after` (default now), as a UTC ISO timestamp.
+
+    Raises ValueError for an unknown timezone or a malformed `time_of_day`.
+    """
+    tz = report_zone(tz_name)
+    hour, minute = map(int, (time_of_day or "09:00").split(':'))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time of day: {time_of_day}")
+    after = after or datetime.now(timezone.utc)
+    local = after.astimezone(tz)
+    today = local.date()
+
+    if frequency == "daily":
+        next_run = _at(today, hour, minute, tz)
+        if next_run <= after:
+            next_run = _at(today + timedelta(days=1), hour, minute, tz)
+
+    elif frequency == "weekly":
+        target_day = day_of_week if day_of_week is not None else 0  # Monday default
+        day = today + timedelta(days=(target_day - today.weekday()) % 7)
+        next_run = _at(day, hour, minute, tz)
+        if next_run <= after:
+            next_run = _at(day + timedelta(weeks=1), hour, minute, tz)
+
+    elif frequency == "monthly":
+        target_day = day_of_month if day_of_month is not None else 1
+        next_run = _at(_monthly(today.year, today.month, target_day), hour, minute, tz)
+        if next_run <= after:
+            year, month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+            next_run = _at(_monthly(year, month, target_day), hour, minute, tz)
+
+    else:
+        next_run = after + timedelta(days=1)
+
+    return next_run.astimezone(timezone.utc).isoformat()
+
+
+def next_run_for(report: Dict[str, Any], after: Optional[datetime] = None) -> str:
+    return calculate_next_run(
+        report.get("frequency", "weekly"),
+        report.get("day_of_week"),
+        report.get("day_of_month"),
+        report.get("time_of_day", "09:00"),
+        report.get("timezone", "UTC"),
+        after,
+    )
+
+
+# ============= SCHEDULER =============
+
+class ReportScheduler:
+    """Claims due scheduled reports and runs them with bounded concurrency."""
+
+    def __init__(self, db, run_report: RunReport, concurrency: int = REPORT_SCHEDULER_CONCURRENCY,
+                 poll_interval: float = REPORT_SCHEDULER_POLL_SECONDS):
+        self.db = db
+        self.run_report = run_report
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        """Claim up to `limit` due reports by advancing their `next_run`."""
+        now = datetime.now(timezone.utc)
+        due = await self.db.scheduled_reports.find(
+            {"status": "active", "next_run": {"$lte": now.isoformat()}}, {"_id": 0}
+        ).sort("next_run", 1).to_list(limit)
+
+        claimed = []
+        for report in due:
+            try:
+                next_run = next_run_for(report, after=now)
+            except ValueError as e:
+                logger.warning(f"Pausing scheduled report {report['id']}: {e}")
+                await self.db.scheduled_reports.update_one(
+                    {"id": report["id"], "next_run": report["next_run"]},
+                    {"$set": {"status": "paused", "last_run_status": "invalid_schedule",
+                              "updated_at": now.isoformat()}}
+                )
+                continue
+            # Only the replica that still sees the old next_run gets the run
+            won = await self.db.scheduled_reports.find_one_and_update(
+                {"id": report["id"], "status": "active", "next_run": report["next_run"]},
+                {"$set": {"next_run": next_run, "claimed_at": now.isoformat(), "claimed_by": self.worker_id}},
+                projection={"_id": 0},
+            )
+            if won:
+                claimed.append({**won, "next_run": next_run})
+        return claimed
+
+    async def seconds_until_due(self) -> float:
+        upcoming = await self.db.scheduled_reports.find_one(
+            {"status": "active", "next_run": {"$ne": None}}, {"_id": 0, "next_run": 1}, sort=[("next_run", 1)]
+        )
+        if not upcoming:
+            return self.poll_interval
+        wait = (datetime.fromisoformat(upcoming["next_run"]) - datetime.now(timezone.utc)).total_seconds()
+        return min(max(wait, 0.0), self.poll_interval)
+
+    async def fail_abandoned_runs(self) -> int:
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=REPORT_RUN_TIMEOUT_SECONDS)).isoformat()
+        result = await self.db.report_runs.update_many(
+            {"status": "generating", "started_at": {"$lt": cutoff}},
+            {"$set": {"status": "failed", "completed_at": datetime.now(timezone.utc).isoformat(),
+                      "error_message": "Run was abandoned by its worker"}}
+        )
+        return result.modified_count
+
+    async def _run(self, report: Dict[str, Any]) -> None:
+        try:
+            await self.run_report(report)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Scheduled report {report['id']} failed: {e}")
+
+    async def tick(self) -> int:
+        """Start runs for due reports while there is capacity; returns how many."""
+        capacity = self.concurrency - len(self._running)
+        if capacity <= 0:
+            return 0
+        reports = await self.claim_due(capacity)
+        for report in reports:
+            logger.info(f"Running scheduled report {report['id']} ({report.get('name')})")
+            task = asyncio.create_task(self._run(report))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        return len(reports)
+
+    async def run_forever(self) -> None:
+        last_sweep = 0.0
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                delay = self.poll_interval
+                try:
+                    if loop.time() - last_sweep > REPORT_RUN_TIMEOUT_SECONDS / 2:
+                        await self.fail_abandoned_runs()
+                        last_sweep = loop.time()
+                    await self.tick()
+                    delay = await self.seconds_until_due()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Report scheduler error: {e}")
+                if self._running and (delay == 0 or len(self._running) >= self.concurrency):
+                    # At capacity (or more is due): wake when a run finishes
+                    await asyncio.wait(self._running, timeout=self.poll_interval,
+                                       return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await asyncio.sleep(delay)
+        finally:
+            for task in list(self._running):
+                task.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
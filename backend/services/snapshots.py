@@ -0,0 +1,350 @@
+"""Materialized analytics snapshots.
+
+Admin dashboards read pre-computed numbers from the `analytics_snapshots`
+collection instead of scanning raw collections on every page view. Every
+snapshot is keyed by (metric, period, department) and is one of two kinds:
+
+* counters: integer totals per collection and status, adjusted with `$inc`
+  whenever a tracked record is created, deleted or changes status;
+* payloads: full report responses tagged with the collections they were
+  computed from. Writes to those collections mark them stale and the next
+  read recomputes them once.
+
+Every recorded write also bumps a per-collection change count
+(`change_count`), which caches of rendered data use as their version.
+
+A nightly rebuild recounts every counter and recomputes every payload so that
+writes made outside the API (imports, shell scripts) cannot leave the
+snapshots drifting for long.
+"""
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import register_index
+from services import analytics
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_COLLECTION = "analytics_snapshots"
+ALL_DEPARTMENTS = "*"
+COUNTER_PERIOD = "all"
+PAYLOAD_PERIOD = "current"
+
+# Payloads contain rolling windows ("last 30 days", monthly trends), so they are
+# recomputed after this many seconds even when nothing was written.
+PAYLOAD_MAX_AGE_SECONDS = int(os.environ.get("ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS", "3600"))
+REBUILD_HOUR_UTC = int(os.environ.get("ANALYTICS_SNAPSHOT_REBUILD_HOUR", "2"))
+
+# Collections with counters, mapped to the field whose value is counted
+# (None: only the total is kept).
+COUNTED_COLLECTIONS: Dict[str, Optional[str]] = {
+    "employees": "employment_status",
+    "offboardings": "status",
+    "candidates": "status",
+    "applications": "status",
+    "leaves": "status",
+    "tickets": "status",
+    "expenses": "status",
+    "corporations": None,
+    "branches": None,
+    "departments": None,
+    "divisions": None,
+}
+# Collections whose counters are also kept per department_id
+DEPARTMENT_SCOPED = {"employees"}
+
+register_index(SNAPSHOTS_COLLECTION, [("metric", 1), ("period", 1), ("department", 1)], unique=True)
+register_index(SNAPSHOTS_COLLECTION, [("sources", 1)])
+
+
+class PayloadSpec:
+    """A cached report: how to compute it and which collections it reads."""
+
+    def __init__(self, compute: Callable[[Any], Awaitable[Dict[str, Any]]], sources: Iterable[str]):
+        self.compute = compute
+        self.sources = sorted(set(sources))
+
+
+PAYLOADS: Dict[str, PayloadSpec] = {
+    "analytics.overview": PayloadSpec(
+        analytics.compute_overview,
+        ["employees", "departments", analytics.TERMINATIONS_COLLECTION, "offboardings", "jobs", "candidates"],
+    ),
+    "analytics.turnover": PayloadSpec(
+        analytics.compute_turnover,
+        ["employees", "departments", analytics.TERMINATIONS_COLLECTION, "offboardings"],
+    ),
+    "analytics.hiring": PayloadSpec(
+        analytics.compute_hiring, ["employees", "departments", "jobs", "candidates"]
+    ),
+    "analytics.salary": PayloadSpec(analytics.compute_salary, ["employees", "departments"]),
+    "analytics.forecast": PayloadSpec(
+        analytics.compute_forecast, ["employees", analytics.TERMINATIONS_COLLECTION, "offboardings"]
+    ),
+    "reports.overview": PayloadSpec(
+        analytics.compute_reports_overview,
+        ["employees", "tickets", "leave_requests", "trainings", "expense_claims"],
+    ),
+    "reports.employees": PayloadSpec(analytics.compute_employee_report, ["employees", "departments"]),
+}
+
+_payload_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ============= COUNTERS =============
+
+def counter_metric(collection: str, status: Optional[str] = None) -> str:
+    if status is None:
+        return f"{collection}.total"
+    return f"{collection}.status.{status}"
+
+
+def change_metric(collection: str) -> str:
+    return f"changes.{collection}"
+
+
+def counter_keys(collection: str, doc: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """(metric, department) pairs a document contributes one to."""
+    if doc is None or collection not in COUNTED_COLLECTIONS:
+        return []
+    metrics = [counter_metric(collection)]
+    status_field = COUNTED_COLLECTIONS[collection]
+    if status_field:
+        metrics.append(counter_metric(collection, str(doc.get(status_field))))
+    departments = [ALL_DEPARTMENTS]
+    if collection in DEPARTMENT_SCOPED and doc.get("department_id"):
+        departments.append(doc["department_id"])
+    return [(m, d) for m in metrics for d in departments]
+
+
+def _change_op(collection: str, now: str) -> UpdateOne:
+    # Kept out of the counters: rebuild_counters never resets it, so it only grows
+    return UpdateOne(
+        {"metric": change_metric(collection), "period": COUNTER_PERIOD, "department": ALL_DEPARTMENTS},
+        {"$inc": {"value": 1}, "$set": {"kind": "changes", "updated_at": now}},
+        upsert=True,
+    )
+
+
+async def record_change(
+    db, collection: str,
+    before: Optional[Dict[str, Any]] = None,
+    after: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Apply a create (after only), delete (before only) or update to the snapshots.
+
+    Counters move by the difference between the two documents; payloads that
+    read `collection` are marked stale. Snapshot maintenance never fails the
+    write that triggered it - the nightly rebuild repairs anything missed.
+    """
+    try:
+        deltas: Counter = Counter()
+        for key in counter_keys(collection, before):
+            deltas[key] -= 1
+        for key in counter_keys(collection, after):
+            deltas[key] += 1
+        now = _now().isoformat()
+        ops = [
+            UpdateOne(
+                {"metric": metric, "period": COUNTER_PERIOD, "department": department},
+                {"$inc": {"value": delta}, "$set": {"kind": "counter", "updated_at": now}},
+                upsert=True,
+            )
+            for (metric, department), delta in deltas.items() if delta
+        ]
+        ops.append(_change_op(collection, now))
+        await db[SNAPSHOTS_COLLECTION].bulk_write(ops, ordered=False)
+        await mark_stale(db, collection)
+    except Exception as e:
+        logger.warning(f"Analytics snapshot update for {collection} failed: {e}")
+
+
+async def touch(db, collection: str) -> None:
+    """Record a write that cannot move a counter (e.g. a rename)."""
+    await record_change(db, collection)
+
+
+async def recount(db, collection: str) -> None:
+    """Record a bulk write (import, cascade delete) by recounting the collection."""
+    try:
+        await rebuild_counters(db, [collection])
+        await db[SNAPSHOTS_COLLECTION].bulk_write([_change_op(collection, _now().isoformat())])
+        await mark_stale(db, collection)
+    except Exception as e:
+        logger.warning(f"Analytics snapshot recount for {collection} failed: {e}")
+
+
+async def mark_stale(db, *collections: str) -> None:
+    """Invalidate every payload computed from any of `collections`."""
+    await db[SNAPSHOTS_COLLECTION].update_many(
+        {"kind": "payload", "sources": {"$in": list(collections)}},
+        {"$set": {"stale": True}, "$inc": {"version": 1}},
+    )
+
+
+async def read_counters(db, metrics: Iterable[str], department: str = ALL_DEPARTMENTS) -> Dict[str, int]:
+    metrics = list(metrics)
+    values = {m: 0 for m in metrics}
+    async for doc in db[SNAPSHOTS_COLLECTION].find(
+        {"metric": {"$in": metrics}, "period": COUNTER_PERIOD, "department": department},
+        {"_id": 0, "metric": 1, "value": 1},
+    ):
+        values[doc["metric"]] = doc.get("value", 0)
+    return values
+
+
+async def change_count(db, collection: str) -> int:
+    """Number of writes recorded for `collection`; moves on every create, update and delete."""
+    doc = await db[SNAPSHOTS_COLLECTION].find_one(
+        {"metric": change_metric(collection), "period": COUNTER_PERIOD, "department": ALL_DEPARTMENTS},
+        {"_id": 0, "value": 1},
+    )
+    return doc.get("value", 0) if doc else 0
+
+
+async def rebuild_counters(db, collections: Optional[Iterable[str]] = None) -> None:
+    """Recount counters from the raw collections, zeroing keys that no longer occur."""
+    now = _now().isoformat()
+    for collection in collections or COUNTED_COLLECTIONS:
+        status_field = COUNTED_COLLECTIONS[collection]
+        group_id: Dict[str, Any] = {}
+        if status_field:
+            group_id["status"] = f"${status_field}"
+        if collection in DEPARTMENT_SCOPED:
+            group_id["department"] = "$department_id"
+        counts: Counter = Counter()
+        async for row in db[collection].aggregate([{"$group": {"_id": group_id, "count": {"$sum": 1}}}]):
+            doc = {}
+            if status_field:
+                doc[status_field] = row["_id"].get("status")
+            if "department" in group_id:
+                doc["department_id"] = row["_id"].get("department")
+            for key in counter_keys(collection, doc):
+                counts[key] += row["count"]
+        counts.setdefault((counter_metric(collection), ALL_DEPARTMENTS), 0)
+
+        existing = await db[SNAPSHOTS_COLLECTION].find(
+            {"kind": "counter", "metric": {"$regex": f"^{collection}\\."}, "period": COUNTER_PERIOD},
+            {"_id": 0, "metric": 1, "department": 1},
+        ).to_list(None)
+        for doc in existing:
+            counts.setdefault((doc["metric"], doc["department"]), 0)
+
+        await db[SNAPSHOTS_COLLECTION].bulk_write([
+            UpdateOne(
+                {"metric": metric, "period": COUNTER_PERIOD, "department": department},
+                {"$set": {"kind": "counter", "value": value, "updated_at": now}},
+                upsert=True,
+            )
+            for (metric, department), value in counts.items()
+        ], ordered=False)
+
+
+# ============= PAYLOADS =============
+
+def _is_fresh(doc: Optional[Dict[str, Any]], now: datetime) -> bool:
+    if not doc or doc.get("stale", True) or "payload" not in doc:
+        return False
+    computed_at = datetime.fromisoformat(doc["computed_at"])
+    return now - computed_at < timedelta(seconds=PAYLOAD_MAX_AGE_SECONDS)
+
+
+async def refresh_payload(db, metric: str, version: Optional[int] = None) -> Dict[str, Any]:
+    """Compute a payload and store it unless a write invalidated it meanwhile."""
+    spec = PAYLOADS[metric]
+    key = {"metric": metric, "period": PAYLOAD_PERIOD, "department": ALL_DEPARTMENTS}
+    payload = await spec.compute(db)
+    update = {
+        "$set": {
+            "kind": "payload", "payload": payload, "sources": spec.sources,
+            "stale": False, "computed_at": _now().isoformat(),
+        },
+    }
+    try:
+        if version is None:
+            update["$setOnInsert"] = {"version": 0}
+            await db[SNAPSHOTS_COLLECTION].update_one(key, update, upsert=True)
+        else:
+            # A concurrent mark_stale bumped the version: keep the result stale.
+            await db[SNAPSHOTS_COLLECTION].update_one({**key, "version": version}, update)
+    except DuplicateKeyError:
+        pass
+    return payload
+
+
+async def read_payload(db, metric: str) -> Dict[str, Any]:
+    """Serve a payload from its snapshot, recomputing it once when stale."""
+    key = {"metric": metric, "period": PAYLOAD_PERIOD, "department": ALL_DEPARTMENTS}
+    doc = await db[SNAPSHOTS_COLLECTION].find_one(key, {"_id": 0})
+    if _is_fresh(doc, _now()):
+        return doc["payload"]
+
+    lock = _payload_locks.setdefault(metric, asyncio.Lock())
+    async with lock:
+        doc = await db[SNAPSHOTS_COLLECTION].find_one(key, {"_id": 0})
+        if _is_fresh(doc, _now()):
+            return doc["payload"]
+        return await refresh_payload(db, metric, doc.get("version", 0) if doc else None)
+
+
+# ============= REBUILD =============
+
+async def rebuild_all(db) -> Dict[str, Any]:
+    started = _now()
+    await rebuild_counters(db)
+    for metric in PAYLOADS:
+        doc = await db[SNAPSHOTS_COLLECTION].find_one(
+            {"metric": metric, "period": PAYLOAD_PERIOD, "department": ALL_DEPARTMENTS}, {"_id": 0, "version": 1}
+        )
+        await refresh_payload(db, metric, doc.get("version", 0) if doc else None)
+    duration = (_now() - started).total_seconds()
+    logger.info(f"Analytics snapshots rebuilt in {duration:.1f}s")
+    return {"counters": len(COUNTED_COLLECTIONS), "payloads": len(PAYLOADS), "duration_seconds": duration}
+
+
+async def claim_rebuild(db, day: str) -> bool:
+    """Let exactly one worker run the rebuild for `day`."""
+    try:
+        result = await db[SNAPSHOTS_COLLECTION].update_one(
+            {"metric": "rebuild", "period": day, "department": ALL_DEPARTMENTS},
+            {"$setOnInsert": {"kind": "lease", "claimed_at": _now().isoformat()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return result.upserted_id is not None
+
+
+async def ensure_snapshots(db) -> None:
+    """Build counters the first time a deployment starts with an empty collection."""
+    if await db[SNAPSHOTS_COLLECTION].count_documents({"kind": "counter"}, limit=1) == 0:
+        await rebuild_counters(db)
+
+
+def seconds_until_rebuild(now: datetime) -> float:
+    next_run = now.replace(hour=REBUILD_HOUR_UTC, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+async def run_nightly_rebuild(db) -> None:
+    """Background loop: rebuild all snapshots once a day at REBUILD_HOUR_UTC."""
+    while True:
+        await asyncio.sleep(seconds_until_rebuild(_now()))
+        try:
+            if await claim_rebuild(db, _now().strftime("%Y-%m-%d")):
+                await rebuild_all(db)
+        except Exception as e:
+            logger.error(f"Nightly analytics snapshot rebuild failed: {e}")
@@ -0,0 +1,311 @@
+"""Team calendar aggregation.
+
+A calendar range is assembled from four sections, each read with one indexed
+query and cached per range:
+
+- `events`: custom calendar events overlapping the range
+  (`start_date <= end and end_date >= start`)
+- `leaves`: approved leaves overlapping the range, with employee names from a
+  single `$in` lookup
+- `people`: birthdays and work anniversaries. Employees carry `birth_md` and
+  `hire_md` month-day keys ("MM-DD", maintained by `calendar_keys()` on every
+  employee write and backfilled on startup), so a month view asks the index
+  for ~31 keys instead of parsing every employee's dates in Python. 29 Feb
+  dates fall on 28 Feb in common years.
+- `holidays`: holidays dated inside the range
+
+Handlers that write leaves, calendar events, holidays or employee dates call
+`invalidate_calendar(section)`; CALENDAR_CACHE_TTL_SECONDS bounds staleness for
+writes made by other workers.
+"""
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import calendar
+import os
+import time
+
+from pymongo import UpdateOne
+
+CALENDAR_CACHE_TTL_SECONDS = float(os.environ.get("CALENDAR_CACHE_TTL_SECONDS", "300"))
+CALENDAR_CACHE_MAX_ENTRIES = int(os.environ.get("CALENDAR_CACHE_MAX_ENTRIES", "512"))
+BACKFILL_BATCH_SIZE = 500
+
+SECTIONS = ("events", "leaves", "people", "holidays")
+# Employee fields behind the month-day keys; writes touching them invalidate "people"
+DATE_FIELDS = ("date_of_birth", "hire_date", "date_of_joining")
+PEOPLE_PROJECTION = {"_id": 0, "id": 1, "full_name": 1, "date_of_birth": 1, "hire_date": 1,
+                     "date_of_joining": 1, "birth_md": 1, "hire_md": 1}
+
+
+# ============= MONTH-DAY KEYS =============
+
+def parse_day(value: Any) -> Optional[date]:
+    """The calendar date of an ISO date/datetime string, or None."""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def month_day(value: Any) -> Optional[str]:
+    day = parse_day(value)
+    return day.strftime("%m-%d") if day else None
+
+
+def calendar_keys(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """`birth_md`/`hire_md` for whichever date fields `fields` sets."""
+    keys = {}
+    if "date_of_birth" in fields:
+        keys["birth_md"] = month_day(fields["date_of_birth"])
+    if "hire_date" in fields or "date_of_joining" in fields:
+        keys["hire_md"] = month_day(fields.get("hire_date") or fields.get("date_of_joining"))
+    return keys
+
+
+def touches_calendar_fields(fields: Iterable[str]) -> bool:
+    return any(f in DATE_FIELDS for f in fields)
+
+
+def occurrence(md: str, year: int) -> date:
+    """The date a month-day key falls on in `year` (29 Feb -> 28 Feb in common years)."""
+    month, day = int(md[:2]), int(md[3:])
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        day = 28
+    return date(year, month, day)
+
+
+def range_keys(start: date, end: date) -> Optional[List[str]]:
+    """Month-day keys that occur in [start, end]; None when that is every key."""
+    if (end - start).days >= 365:
+        return None
+    keys = []
+    day = start
+    while day <= end:
+        keys.append(day.strftime("%m-%d"))
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            keys.append("02-29")
+        day += timedelta(days=1)
+    return keys
+
+
+async def backfill_calendar_keys(db) -> int:
+    """Add month-day keys to employees written before they existed."""
+    updated = 0
+    while True:
+        employees = await db.employees.find(
+            {"birth_md": {"$exists": False}}, {"_id": 1, **{f: 1 for f in DATE_FIELDS}}
+        ).limit(BACKFILL_BATCH_SIZE).to_list(BACKFILL_BATCH_SIZE)
+        if not employees:
+            return updated
+        await db.employees.bulk_write([
+            UpdateOne({"_id": e["_id"]}, {"$set": calendar_keys({f: e.get(f) for f in DATE_FIELDS})})
+            for e in employees
+        ], ordered=False)
+        updated += len(employees)
+
+
+# ============= RANGE CACHE =============
+
+class CalendarCache:
+    """TTL + LRU cache of section results keyed by (section, range, filters)."""
+
+    def __init__(self, ttl: float = CALENDAR_CACHE_TTL_SECONDS, max_entries: int = CALENDAR_CACHE_MAX_ENTRIES):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {s: 0 for s in SECTIONS}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: Tuple, load: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        section = key[0]
+        generation = self._generations[section]
+        value = await load()
+        # Don't keep a result that an invalidation raced past
+        if generation == self._generations[section]:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *sections: str) -> None:
+        sections = sections or SECTIONS
+        for section in sections:
+            self._generations[section] += 1
+        for key in [k for k in self._entries if k[0] in sections]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self._ttl}
+
+
+calendar_cache = CalendarCache()
+
+
+def invalidate_calendar(*sections: str) -> None:
+    """Drop cached ranges of the given sections (all when none given)."""
+    calendar_cache.invalidate(*sections)
+
+
+# ============= SECTIONS =============
+
+def overlap_query(start: str, end: str) -> Dict[str, Any]:
+    """Intervals [start_date, end_date] that intersect [start, end]."""
+    return {"start_date": {"$lte": end}, "end_date": {"$gte": start}}
+
+
+async def load_events(db, start: Optional[str], end: Optional[str], event_type: Optional[str] = None,
+                      department_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    query: Dict[str, Any] = {"status": {"$ne": "cancelled"}}
+    if start and end:
+        query.update(overlap_query(start, end))
+    if event_type:
+        query["event_type"] = event_type
+    if department_id:
+        query["department_id"] = department_id
+    return await db.calendar_events.find(query, {"_id": 0}).sort("start_date", 1).to_list(None if start and end else 500)
+
+
+async def load_leaves(db, start: str, end: str) -> List[Dict[str, Any]]:
+    leaves = await db.leaves.find({"status": "approved", **overlap_query(start, end)}, {"_id": 0}).to_list(None)
+    employee_ids = list({l.get("employee_id") for l in leaves if l.get("employee_id")})
+    names = {
+        e["id"]: e.get("full_name")
+        async for e in db.employees.find({"id": {"$in": employee_ids}}, {"_id": 0, "id": 1, "full_name": 1})
+    }
+    events = []
+    for leave in leaves:
+        emp_name = names.get(leave.get("employee_id")) or "Employee"
+        events.append({
+            "id": f"leave-{leave.get('id', '')}",
+            "title": f"{emp_name} - {leave.get('leave_type', 'Leave')}",
+            "description": leave.get("reason", ""),
+            "event_type": "leave",
+            "start_date": leave.get("start_date"),
+            "end_date": leave.get("end_date"),
+            "all_day": True,
+            "color": "#f59e0b",
+            "organizer_name": emp_name,
+            "is_public": True,
+            "linked_leave_id": leave.get("id")
+        })
+    return events
+
+
+async def load_people(db, start: str, end: str) -> List[Dict[str, Any]]:
+    """Birthday and anniversary events in the range (both kinds; callers filter)."""
+    first, last = parse_day(start), parse_day(end)
+    if not first or not last or first > last:
+        return []
+    keys = range_keys(first, last)
+    key_filter = {"$in": keys} if keys is not None else {"$ne": None}
+    employees = await db.employees.find(
+        {"$or": [{"birth_md": key_filter}, {"hire_md": key_filter}]}, PEOPLE_PROJECTION
+    ).to_list(None)
+
+    events = []
+    for emp in employees:
+        name = emp.get("full_name", "Employee")
+        joined = parse_day(emp.get("hire_date") or emp.get("date_of_joining"))
+        for year in range(first.year, last.year + 1):
+            if emp.get("birth_md"):
+                birthday = occurrence(emp["birth_md"], year)
+                if first <= birthday <= last:
+                    events.append({
+                        "id": f"birthday-{emp.get('id')}-{year}",
+                        "title": f"🎂 {name}'s Birthday",
+                        "event_type": "birthday",
+                        "start_date": birthday.isoformat(),
+                        "end_date": birthday.isoformat(),
+                        "all_day": True,
+                        "color": "#ec4899",
+                        "is_public": True
+                    })
+            # Only show anniversaries after the first year
+            if emp.get("hire_md") and joined and year > joined.year:
+                anniversary = occurrence(emp["hire_md"], year)
+                if first <= anniversary <= last:
+                    events.append({
+                        "id": f"anniversary-{emp.get('id')}-{year}",
+                        "title": f"🎉 {name}'s {year - joined.year} Year Anniversary",
+                        "event_type": "anniversary",
+                        "start_date": anniversary.isoformat(),
+                        "end_date": anniversary.isoformat(),
+                        "all_day": True,
+                        "color": "#8b5cf6",
+                        "is_public": True
+                    })
+    return events
+
+
+async def load_holidays(db, start: str, end: str) -> List[Dict[str, Any]]:
+    holidays = await db.holidays.find({"date": {"$gte": start, "$lte": end}}, {"_id": 0}).to_list(None)
+    return [{
+        "id": f"holiday-{holiday.get('id', '')}",
+        "title": f"🏖️ {holiday.get('name', 'Holiday')}",
+        "event_type": "holiday",
+        "start_date": holiday.get("date"),
+        "end_date": holiday.get("date"),
+        "all_day": True,
+        "color": "#10b981",
+        "is_public": True,
+        "is_company_wide": True
+    } for holiday in holidays]
+
+
+# ============= ENGINE =============
+
+async def get_range(
+    db,
+    start: Optional[str],
+    end: Optional[str],
+    event_type: Optional[str] = None,
+    department_id: Optional[str] = None,
+    include_leaves: bool = True,
+    include_birthdays: bool = True,
+    include_anniversaries: bool = True,
+) -> List[Dict[str, Any]]:
+    """Every calendar entry in [start, end], sorted by start date.
+
+    Without a range only custom events are returned (at most 500), as before.
+    """
+    cache = calendar_cache
+    custom = cache.get(("events", start, end, event_type, department_id),
+                       lambda: load_events(db, start, end, event_type, department_id))
+    if not (start and end):
+        return list(await custom)
+
+    loads = [custom, cache.get(("holidays", start, end), lambda: load_holidays(db, start, end))]
+    if include_leaves:
+        loads.append(cache.get(("leaves", start, end), lambda: load_leaves(db, start, end)))
+    if include_birthdays or include_anniversaries:
+        loads.append(people_section(db, start, end, include_birthdays, include_anniversaries))
+    events = []
+    for section in await asyncio.gather(*loads):
+        events.extend(section)
+    events.sort(key=lambda x: x.get("start_date") or "")
+    return events
+
+
+async def people_section(db, start: str, end: str, birthdays: bool, anniversaries: bool) -> List[Dict[str, Any]]:
+    people = await calendar_cache.get(("people", start, end), lambda: load_people(db, start, end))
+    if birthdays and anniversaries:
+        return people
+    wanted = "birthday" if birthdays else "anniversary"
+    return [e for e in people if e["event_type"] == wanted]
+
+
+def calendar_cache_stats() -> Dict[str, Any]:
+    return calendar_cache.stats()
+
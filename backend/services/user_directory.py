@@ -0,0 +1,197 @@
+"""Batched user profile and presence lookups for the collaboration API.
+
+Handlers that decorate members, DMs or tasks with names, avatars and status
+take a request-scoped `UserLoader`. Lookups issued in the same event-loop tick
+are coalesced into a single `$in` query per collection (DataLoader-style), and
+results are memoized for the rest of the request. Behind that, a per-worker
+TTL + LRU cache shared by all requests absorbs repeat lookups of the same
+people: profiles for USER_PROFILE_TTL_SECONDS, presence for the shorter
+USER_STATUS_TTL_SECONDS. Local writes call `invalidate_user_profile()` /
+`invalidate_user_status()`; the TTLs bound staleness for other workers.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import os
+import time
+
+USER_PROFILE_TTL_SECONDS = float(os.environ.get("USER_PROFILE_TTL_SECONDS", "60"))
+USER_STATUS_TTL_SECONDS = float(os.environ.get("USER_STATUS_TTL_SECONDS", "5"))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "20000"))
+
+PROFILE_PROJECTION = {"_id": 0, "id": 1, "full_name": 1, "email": 1, "profile_picture": 1}
+STATUS_PROJECTION = {"_id": 0, "user_id": 1, "status": 1, "status_text": 1, "status_emoji": 1, "online": 1, "last_active": 1}
+
+
+def user_profile(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Display fields for a users document"""
+    return {
+        "id": user.get("id"),
+        "name": user.get("full_name", "Unknown"),
+        "email": user.get("email"),
+        "avatar": user.get("profile_picture"),
+    }
+
+
+def unknown_user(user_id: str) -> Dict[str, Any]:
+    return {"id": user_id, "name": "Unknown User", "email": None, "avatar": None}
+
+
+def offline_status(user_id: str) -> Dict[str, Any]:
+    return {"user_id": user_id, "status": "offline", "status_text": None, "status_emoji": None}
+
+
+class TTLCache:
+    """TTL + LRU map shared across requests; only what a fetch returned is stored."""
+
+    def __init__(self, ttl: float, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Bumped by invalidations so loads that raced them are not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def set_many(self, values: Dict[str, Any], generation: int) -> None:
+        if generation != self.generation:
+            return
+        expires = time.monotonic() + self._ttl
+        for key, value in values.items():
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        self.generation += 1
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self._ttl}
+
+
+profile_cache = TTLCache(USER_PROFILE_TTL_SECONDS)
+status_cache = TTLCache(USER_STATUS_TTL_SECONDS)
+
+
+class BatchLoader:
+    """Keys requested in the same tick are fetched together, once per request."""
+
+    def __init__(self, fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]], cache: TTLCache):
+        self._fetch = fetch
+        self._cache = cache
+        self._memo: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+
+    def load(self, key: str) -> asyncio.Future:
+        future = self._memo.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._memo[key] = loop.create_future()
+            self._pending.append(key)
+            if len(self._pending) == 1:
+                # Let the caller (and its siblings in a gather) queue more keys first
+                loop.call_soon(self._schedule)
+        return future
+
+    async def load_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(k) for k in keys))
+        return dict(zip(keys, values))
+
+    def _schedule(self) -> None:
+        self._task = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        try:
+            found = self._cache.get_many(keys)
+            missing = [k for k in keys if k not in found]
+            if missing:
+                generation = self._cache.generation
+                self.batches += 1
+                fetched = await self._fetch(missing)
+                self._cache.set_many(fetched, generation)
+                found.update(fetched)
+            for key in keys:
+                self._memo[key].set_result(found.get(key))
+        except Exception as e:
+            for key in keys:
+                future = self._memo.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+
+
+class UserLoader:
+    """Request-scoped profile and presence loader; create one per request."""
+
+    def __init__(self, db):
+        self.db = db
+        self.profiles = BatchLoader(self._fetch_profiles, profile_cache)
+        self.statuses = BatchLoader(self._fetch_statuses, status_cache)
+
+    async def _fetch_profiles(self, user_ids: List[str]) -> Dict[str, Any]:
+        users = await self.db.users.find({"id": {"$in": user_ids}}, PROFILE_PROJECTION).to_list(None)
+        return {u["id"]: user_profile(u) for u in users}
+
+    async def _fetch_statuses(self, user_ids: List[str]) -> Dict[str, Any]:
+        docs = await self.db.collab_user_status.find({"user_id": {"$in": user_ids}}, STATUS_PROJECTION).to_list(None)
+        # Most members never set a status; cache that too so they don't re-query every request
+        found = {uid: offline_status(uid) for uid in user_ids}
+        found.update((s["user_id"], s) for s in docs)
+        return found
+
+    async def profile(self, user_id: str) -> Dict[str, Any]:
+        """Display fields for one user (a copy the caller may modify)"""
+        return dict(await self.profiles.load(user_id) or unknown_user(user_id))
+
+    async def profiles_for(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = await self.profiles.load_many(user_ids)
+        return {uid: dict(p or unknown_user(uid)) for uid, p in found.items()}
+
+    async def status(self, user_id: str) -> Dict[str, Any]:
+        return dict(await self.statuses.load(user_id) or offline_status(user_id))
+
+    async def statuses_for(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = await self.statuses.load_many(user_ids)
+        return {uid: dict(s or offline_status(uid)) for uid, s in found.items()}
+
+    async def members(self, user_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Profiles with presence, in the given order: two queries however many users"""
+        user_ids = list(dict.fromkeys(user_ids))
+        profiles, statuses = await asyncio.gather(self.profiles_for(user_ids), self.statuses_for(user_ids))
+        return [
+            {**profiles[uid], "status": statuses[uid].get("status", "offline"), "status_text": statuses[uid].get("status_text")}
+            for uid in user_ids
+        ]
+
+
+def invalidate_user_profile(user_id: Optional[str] = None) -> None:
+    profile_cache.invalidate(user_id)
+
+
+def invalidate_user_status(user_id: Optional[str] = None) -> None:
+    status_cache.invalidate(user_id)
+
+
+def user_cache_stats() -> Dict[str, Any]:
+    return {"profiles": profile_cache.stats(), "statuses": status_cache.stats()}
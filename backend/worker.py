@@ -0,0 +1,44 @@
+"""Background job and mail worker for HR Platform.
+
+Run alongside the API, e.g. `python worker.py --concurrency 4`. Importing the
+server module registers every job handler (they live next to the endpoints
+that enqueue them); the HTTP app itself is not started. The same process
+delivers the outbound email queue and fires scheduled reports when they come
+due (disable the scheduler with REPORT_SCHEDULER_ENABLED=false).
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from server import db
+from routers.scheduled_reports import run_due_report
+from services.jobs import WorkerPool
+from services.mailer import MailWorker
+from services.report_scheduler import ReportScheduler
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("worker")
+
+
+async def main(concurrency: int) -> None:
+    pool = WorkerPool(db, concurrency=concurrency)
+    mail = MailWorker(db)
+    loops = [pool.run_forever(), mail.run_forever()]
+    if os.environ.get("REPORT_SCHEDULER_ENABLED", "true").lower() == "true":
+        loops.append(ReportScheduler(db, run_due_report).run_forever())
+    logger.info(f"Job worker {pool.worker_id} started with {concurrency} workers")
+    await asyncio.gather(*loops)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("JOB_WORKER_CONCURRENCY", "4")))
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.concurrency))
+    except KeyboardInterrupt:
+        pass
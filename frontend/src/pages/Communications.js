@@ -584,7 +584,7 @@ const Communications = () => {
             ) : (
               <div className="space-y-4">
                 {memos.map(memo => {
-                  const hasAcknowledged = memo.acknowledged_by?.some(a => a.employee_name === user?.full_name);
+                  const hasAcknowledged = memo.acknowledged ?? memo.acknowledged_by?.some(a => a.employee_name === user?.full_name);
                   return (
                     <div 
                       key={memo.id} 
@@ -1025,7 +1025,7 @@ const Communications = () => {
                       </td>
                       <td className="py-3 px-4">
                         {memo.requires_acknowledgment ? (
-                          <span className="text-sm">{memo.acknowledged_by?.length || 0} acknowledged</span>
+                          <span className="text-sm">{memo.ack_count ?? memo.acknowledged_by?.length ?? 0} acknowledged</span>
                         ) : (
                           <span className="text-slate-400 text-sm">Not required</span>
                         )}
@@ -0,0 +1,49 @@
+"""
+Shared fixtures for the in-process service tests
+"""
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+
+class RecordingCollection:
+    """A mongomock Motor collection that records each call made through it"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.calls = []
+
+    def __getattr__(self, method):
+        target = getattr(self._collection, method)
+        if not callable(target):
+            return target
+
+        def call(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return target(*args, **kwargs)
+        return call
+
+    def calls_to(self, method):
+        """Positional arguments of each call to `method`"""
+        return [args for name, args, _ in self.calls if name == method]
+
+
+class RecordingDB:
+    def __init__(self, db):
+        self._db = db
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = RecordingCollection(self._db[name])
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+@pytest.fixture
+def mongo_db():
+    """Empty in-memory database; `mongo_db.<collection>.calls` lists the calls made"""
+    return RecordingDB(AsyncMongoMockClient()["test_database"])
@@ -0,0 +1,214 @@
+"""
+Analytics Pipeline Tests
+Fixed dataset and expected payloads for the /analytics endpoints
+"""
+import asyncio
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import pytest  # noqa: E402
+
+from services import analytics  # noqa: E402
+
+NOW = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+MONTHS = ["Nov 2025", "Dec 2025", "Jan 2026", "Feb 2026", "Mar 2026", "Apr 2026",
+          "May 2026", "Jun 2026", "Jul 2026", "Aug 2026", "Sep 2026", "Oct 2026"]
+
+DEPARTMENTS = [{"id": "d1", "name": "Engineering"}, {"id": "d2", "name": "Sales"}]
+EMPLOYEES = [
+    {"id": "e1", "department_id": "d1", "position": "Engineer", "status": "active",
+     "salary": 120000, "hire_date": "2020-01-15"},
+    {"id": "e2", "department_id": "d1", "position": "Engineer", "status": "active",
+     "salary": 90000, "hire_date": "2026-06-10"},
+    {"id": "e3", "department_id": "d2", "position": "Account Executive", "status": "terminated",
+     "salary": 45000, "hire_date": "2025-09-01"},
+    {"id": "e4", "department_id": "d2", "position": "Director", "status": "active",
+     "salary": 160000, "created_at": "2026-10-02T09:00:00+00:00"},
+    # No department, no salary and a naive timestamp the trend charts skip
+    {"id": "e5", "status": "active", "salary": 0, "hire_date": "2026-10-05T10:00:00"},
+    {"id": "e6", "department_id": "d1", "position": "Engineer", "status": "terminated",
+     "salary": 70000, "hire_date": "2023-03-01"},
+]
+OFFBOARDING = [
+    {"employee_id": "e3", "last_working_date": "2026-08-20", "reason": "voluntary_resignation"},
+    {"employee_id": "e6", "last_working_date": "2026-10-01", "reason": "layoff"},
+    {"employee_id": "gone", "last_working_date": "2026-02-10"},
+]
+CANDIDATES = [
+    {"status": "hired", "source": "LinkedIn",
+     "applied_at": "2026-05-01T00:00:00Z", "hired_at": "2026-06-01T00:00:00Z"},
+    {"status": "hired", "created_at": "2026-07-01T00:00:00+00:00", "updated_at": "2026-07-11T00:00:00+00:00"},
+    {"status": "interview"},
+    {"status": "screening"},
+    {"status": "new"},
+    {"status": "rejected"},
+]
+JOBS = [
+    {"status": "open", "department_id": "d1"},
+    {"status": "open", "department_id": "d1"},
+    {"status": "open", "department_id": "missing"},
+    {"status": "closed", "department_id": "d2"},
+]
+
+
+async def seed(db):
+    for name, docs in (("departments", DEPARTMENTS), ("employees", EMPLOYEES), ("offboarding", OFFBOARDING),
+                       ("candidates", CANDIDATES), ("jobs", JOBS)):
+        await db[name].insert_many([dict(doc) for doc in docs])
+
+
+async def count_by_month(collection, date_expr, match=None):
+    # mongomock has no $substrCP; same grouping over the fetched documents
+    def date_of(doc):
+        if date_expr == analytics.hire_date_expr():
+            return analytics.hire_or_created(doc)
+        return doc.get(date_expr.lstrip("$"))
+
+    dates = [date_of(doc) async for doc in collection.find(match or {})]
+    return dict(Counter(d[:7] for d in dates if isinstance(d, str) and d))
+
+
+@pytest.fixture
+def analytics_db(monkeypatch, mongo_db):
+    monkeypatch.setattr(analytics, "count_by_month", count_by_month)
+    asyncio.run(seed(mongo_db))
+    return mongo_db
+
+
+def by_month(counts):
+    return [counts.get(month, 0) for month in MONTHS]
+
+
+class TestOverview:
+    def test_payload(self, analytics_db):
+        result = asyncio.run(analytics.compute_overview(analytics_db, NOW))
+
+        assert result["summary"] == {
+            "total_headcount": 4,
+            "new_hires_this_month": 2,
+            "terminations_this_month": 1,
+            "turnover_rate": 75.0,
+            "open_positions": 3,
+            "pending_candidates": 3,
+            "avg_salary": 92500.0,
+        }
+        assert [p["headcount"] for p in result["headcount_trend"]] == [
+            3, 3, 3, 3, 3, 3, 3, 4, 4, 4, 3, 3,
+        ]
+        assert [p["month"] for p in result["headcount_trend"]] == MONTHS
+        assert [p["hires"] for p in result["hiring_trend"]] == by_month({"Jun 2026": 1, "Oct 2026": 2})
+        assert result["salary_benchmarks"] == [
+            {"department": "Sales", "average": 160000.0, "median": 160000, "min": 160000, "max": 160000,
+             "count": 1},
+            {"department": "Engineering", "average": 105000.0, "median": 120000, "min": 90000,
+             "max": 120000, "count": 2},
+        ]
+        assert sorted(result["turnover_by_reason"], key=lambda r: r["reason"]) == [
+            {"reason": "Layoff", "count": 1},
+            {"reason": "Other", "count": 1},
+            {"reason": "Voluntary Resignation", "count": 1},
+        ]
+        assert result["department_distribution"][0] == {"department": "Engineering", "count": 2}
+        assert sorted(result["department_distribution"][1:], key=lambda r: r["department"]) == [
+            {"department": "Other", "count": 1},
+            {"department": "Sales", "count": 1},
+        ]
+
+
+class TestTurnover:
+    def test_payload(self, analytics_db):
+        result = asyncio.run(analytics.compute_turnover(analytics_db, NOW))
+
+        assert [p["month"] for p in result["monthly_turnover"]] == MONTHS
+        assert [p["terminations"] for p in result["monthly_turnover"]] == by_month(
+            {"Feb 2026": 1, "Aug 2026": 1, "Oct 2026": 1}
+        )
+        assert sorted(result["by_department"], key=lambda r: r["department"]) == [
+            {"department": "Engineering", "count": 1},
+            {"department": "Sales", "count": 1},
+        ]
+        assert result["by_tenure"] == [
+            {"tenure": "0-1 year", "count": 1},
+            {"tenure": "1-2 years", "count": 0},
+            {"tenure": "2-5 years", "count": 1},
+            {"tenure": "5+ years", "count": 0},
+        ]
+        assert result["total_terminations"] == 3
+
+
+class TestHiring:
+    def test_payload(self, analytics_db):
+        result = asyncio.run(analytics.compute_hiring(analytics_db, NOW))
+
+        assert result["funnel"] == {"applied": 6, "screening": 4, "interview": 3, "offer": 2, "hired": 2}
+        assert result["avg_time_to_hire"] == 20.5
+        assert sorted(result["by_source"], key=lambda r: r["source"]) == [
+            {"source": "Direct", "count": 1},
+            {"source": "LinkedIn", "count": 1},
+        ]
+        assert [p["month"] for p in result["monthly_hires"]] == [m[:3] for m in MONTHS]
+        assert [p["hires"] for p in result["monthly_hires"]] == by_month({"Jun 2026": 1, "Oct 2026": 2})
+        assert sorted(result["open_positions_by_dept"], key=lambda r: r["department"]) == [
+            {"department": "Engineering", "count": 2},
+            {"department": "Other", "count": 1},
+        ]
+        assert result["total_open_positions"] == 3
+        assert result["total_candidates"] == 6
+
+
+class TestSalary:
+    def test_payload(self, analytics_db):
+        result = asyncio.run(analytics.compute_salary(analytics_db))
+
+        assert result["overall"] == {
+            "total_payroll": 370000, "average": 123333.0, "median": 120000,
+            "min": 90000, "max": 160000, "employee_count": 3,
+        }
+        assert result["by_department"] == [
+            {"department": "Sales", "average": 160000.0, "median": 160000, "min": 160000, "max": 160000,
+             "count": 1},
+            {"department": "Engineering", "average": 105000.0, "median": 120000, "min": 90000,
+             "max": 120000, "count": 2},
+        ]
+        assert result["distribution"] == [
+            {"range": "0-30k", "count": 0},
+            {"range": "30k-50k", "count": 0},
+            {"range": "50k-75k", "count": 0},
+            {"range": "75k-100k", "count": 1},
+            {"range": "100k-150k", "count": 1},
+            {"range": "150k+", "count": 1},
+        ]
+        assert result["by_position"] == [
+            {"position": "Director", "average": 160000.0, "count": 1},
+            {"position": "Engineer", "average": 105000.0, "count": 2},
+        ]
+
+
+class TestForecast:
+    def test_payload(self, analytics_db):
+        result = asyncio.run(analytics.compute_forecast(analytics_db, NOW))
+
+        assert result["current_headcount"] == 4
+        hires = by_month({"Jun 2026": 1, "Oct 2026": 2})
+        terms = by_month({"Feb 2026": 1, "Aug 2026": 1, "Oct 2026": 1})
+        assert result["historical"] == [
+            {"month": m, "hires": h, "terminations": t, "net_change": h - t}
+            for m, h, t in zip(MONTHS, hires, terms)
+        ]
+        assert [p["month"] for p in result["forecast"]] == [
+            "Nov 2026", "Dec 2026", "Jan 2027", "Feb 2027", "Mar 2027", "Apr 2027",
+        ]
+        assert [p["projected_headcount"] for p in result["forecast"]] == [4, 4, 5, 5, 5, 5]
+        assert {(p["projected_hires"], p["projected_terminations"]) for p in result["forecast"]} == {(0, 0)}
+        assert result["trends"] == {
+            "avg_monthly_hires": 0.5,
+            "avg_monthly_terminations": 0.3,
+            "avg_net_change": 0.2,
+            "projected_year_end_headcount": 6,
+        }
@@ -0,0 +1,83 @@
+"""
+Analytics Snapshot API Tests
+Tests that dashboards served from snapshots follow writes
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+EMPLOYEE_EMAIL = "sarah.johnson@lojyn.com"
+EMPLOYEE_PASSWORD = "sarah123"
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    """Admin authorization headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+    )
+    assert response.status_code == 200, f"Admin login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def employee_headers():
+    """Employee authorization headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": EMPLOYEE_EMAIL, "password": EMPLOYEE_PASSWORD}
+    )
+    assert response.status_code == 200, f"Employee login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+class TestAnalyticsSnapshots:
+    """Tests for snapshot-backed dashboard and report endpoints"""
+    
+    def test_dashboard_counts_follow_department_writes(self, admin_headers):
+        """Creating and deleting a department moves the dashboard counter"""
+        before = requests.get(f"{BASE_URL}/api/dashboard/stats", headers=admin_headers).json()
+        
+        created = requests.post(
+            f"{BASE_URL}/api/departments",
+            json={"name": "TEST_Snapshot Dept", "branch_id": "TEST_branch"},
+            headers=admin_headers
+        )
+        assert created.status_code == 200
+        dept_id = created.json()["id"]
+        
+        during = requests.get(f"{BASE_URL}/api/dashboard/stats", headers=admin_headers).json()
+        assert during["total_departments"] == before["total_departments"] + 1
+        
+        requests.delete(f"{BASE_URL}/api/departments/{dept_id}", headers=admin_headers)
+        after = requests.get(f"{BASE_URL}/api/dashboard/stats", headers=admin_headers).json()
+        assert after["total_departments"] == before["total_departments"]
+    
+    def test_reports_overview_is_stable_between_writes(self, admin_headers):
+        """Two reads with no writes in between serve the same snapshot"""
+        first = requests.get(f"{BASE_URL}/api/reports/overview", headers=admin_headers)
+        second = requests.get(f"{BASE_URL}/api/reports/overview", headers=admin_headers)
+        
+        assert first.status_code == 200
+        assert first.json() == second.json()
+        assert "employees" in first.json()
+    
+    def test_rebuild_reports_work_done(self, admin_headers):
+        """A manual rebuild recounts counters and recomputes every cached report"""
+        response = requests.post(f"{BASE_URL}/api/system/analytics-snapshots/rebuild", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["payloads"] > 0
+        assert data["counters"] > 0
+    
+    def test_employee_cannot_rebuild(self, employee_headers):
+        """Only super admins may trigger a rebuild"""
+        response = requests.post(f"{BASE_URL}/api/system/analytics-snapshots/rebuild", headers=employee_headers)
+        assert response.status_code == 403
@@ -0,0 +1,91 @@
+"""
+Background Jobs API Tests
+Tests for queuing long-running admin operations and polling their status
+"""
+import pytest
+import requests
+import os
+import time
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+EMPLOYEE_EMAIL = "sarah.johnson@lojyn.com"
+EMPLOYEE_PASSWORD = "sarah123"
+
+
+def login(email, password):
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    """Admin authorization headers"""
+    return login(ADMIN_EMAIL, ADMIN_PASSWORD)
+
+
+@pytest.fixture(scope="module")
+def employee_headers():
+    """Employee authorization headers"""
+    return login(EMPLOYEE_EMAIL, EMPLOYEE_PASSWORD)
+
+
+def wait_for_job(job_id, headers, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"{BASE_URL}/api/background-jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(1)
+    pytest.skip("No job worker picked up the job in time")
+
+
+class TestBackgroundJobs:
+    """Tests for background=true endpoints and GET /api/background-jobs/{job_id}"""
+
+    def test_bulk_import_in_background(self, admin_headers):
+        """Queued import answers 202 and reports per-row results when finished"""
+        response = requests.post(
+            f"{BASE_URL}/api/employees/bulk-import",
+            params={"background": "true"},
+            json={"employees": [{"email": "not-a-valid-row"}]},
+            headers=admin_headers
+        )
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["kind"] == "employees.import"
+        assert data["status"] == "queued"
+        assert data["status_url"] == f"/api/background-jobs/{data['job_id']}"
+
+        job = wait_for_job(data["job_id"], admin_headers)
+        assert job["status"] == "completed"
+        assert job["result"]["failed"] == 1
+        assert "payload" not in job
+
+    def test_jobs_listed_for_admin(self, admin_headers):
+        """Admins see queued jobs in the job list"""
+        response = requests.get(f"{BASE_URL}/api/background-jobs", params={"kind": "employees.import"}, headers=admin_headers)
+
+        assert response.status_code == 200
+        for job in response.json():
+            assert job["kind"] == "employees.import"
+            assert "payload" not in job
+
+    def test_employee_cannot_see_admin_job(self, admin_headers, employee_headers):
+        """Jobs are only visible to their creator and admins"""
+        jobs = requests.get(f"{BASE_URL}/api/background-jobs", headers=admin_headers).json()
+        others = [j for j in jobs if j.get("created_by")]
+        if not others:
+            pytest.skip("No jobs to check")
+
+        response = requests.get(f"{BASE_URL}/api/background-jobs/{others[0]['id']}", headers=employee_headers)
+        assert response.status_code == 403
+
+    def test_unknown_job(self, admin_headers):
+        response = requests.get(f"{BASE_URL}/api/background-jobs/does-not-exist", headers=admin_headers)
+        assert response.status_code == 404
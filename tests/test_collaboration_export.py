@@ -0,0 +1,125 @@
+"""
+Collaboration Chat Export Tests
+Streamed NDJSON/CSV/zip exports, resuming, and background export files
+"""
+import csv
+import io
+import json
+import time
+import zipfile
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+EMPLOYEE_EMAIL = "sarah.johnson@lojyn.com"
+EMPLOYEE_PASSWORD = "sarah123"
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def employee_headers():
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": EMPLOYEE_EMAIL, "password": EMPLOYEE_PASSWORD})
+    assert response.status_code == 200, f"Employee login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def channel(admin_headers):
+    channel = requests.post(
+        f"{BASE_URL}/api/collaborations/channels",
+        headers=admin_headers,
+        json={"name": "TEST_export", "type": "public"}
+    ).json()
+    url = f"{BASE_URL}/api/collaborations/channels/{channel['id']}/messages"
+    first = requests.post(url, headers=admin_headers, json={"content": "export 0"}).json()
+    for i in range(1, 3):
+        requests.post(url, headers=admin_headers, json={"content": f"export {i}"})
+    requests.post(url, headers=admin_headers, json={"content": "reply", "parent_id": first["id"]})
+    yield channel
+    requests.delete(f"{BASE_URL}/api/collaborations/channels/{channel['id']}", headers=admin_headers)
+
+
+def export(headers, channel, **params):
+    response = requests.get(
+        f"{BASE_URL}/api/collaborations/channels/{channel['id']}/export", headers=headers, params=params
+    )
+    assert response.status_code == 200, response.text
+    return response
+
+
+class TestChatExport:
+    def test_json_keeps_its_shape(self, admin_headers, channel):
+        data = export(admin_headers, channel).json()
+        assert data["channel"]["id"] == channel["id"]
+        assert data["message_count"] == len(data["messages"])
+        assert "search_terms" not in data["messages"][0]
+
+    def test_ndjson_resumes_after_a_message(self, admin_headers, channel):
+        lines = export(admin_headers, channel, format="ndjson").text.splitlines()
+        messages = [json.loads(line) for line in lines]
+        assert any(m.get("parent_id") for m in messages)
+
+        rest = export(admin_headers, channel, format="ndjson", after=messages[1]["id"]).text.splitlines()
+        assert [json.loads(line)["id"] for line in rest] == [m["id"] for m in messages[2:]]
+
+    def test_csv_and_zip(self, admin_headers, channel):
+        rows = list(csv.reader(io.StringIO(export(admin_headers, channel, format="csv").text)))
+        assert rows[0][:3] == ["created_at", "id", "parent_id"]
+
+        archive = zipfile.ZipFile(io.BytesIO(export(admin_headers, channel, format="zip").content))
+        assert {"channel.json", "messages.ndjson", "files.ndjson", "manifest.json"} <= set(archive.namelist())
+        manifest = json.loads(archive.read("manifest.json"))
+        assert manifest["message_count"] == len(archive.read("messages.ndjson").splitlines()) == len(rows) - 1
+
+    def test_background_export_writes_a_file(self, admin_headers, channel):
+        response = requests.get(
+            f"{BASE_URL}/api/collaborations/channels/{channel['id']}/export",
+            headers=admin_headers,
+            params={"format": "ndjson", "background": "true"}
+        )
+        assert response.status_code == 202
+        assert response.json()["status_url"].startswith("/api/background-jobs/")
+        status_url = f"{BASE_URL}{response.json()['status_url']}"
+        for _ in range(30):
+            job = requests.get(status_url, headers=admin_headers).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            time.sleep(1)
+        else:
+            pytest.skip("No job worker is processing the queue")
+        assert job["status"] == "completed", job.get("error")
+
+        download = requests.get(f"{BASE_URL}{job['result']['file_url']}", headers=admin_headers)
+        assert download.status_code == 200
+        assert len(download.text.splitlines()) == job["result"]["message_count"]
+
+    def test_unknown_format_is_rejected(self, admin_headers, channel):
+        response = requests.get(
+            f"{BASE_URL}/api/collaborations/channels/{channel['id']}/export",
+            headers=admin_headers,
+            params={"format": "xml"}
+        )
+        assert response.status_code == 400
+
+    def test_admins_can_export_private_channels_they_are_not_in(self, admin_headers, employee_headers):
+        private = requests.post(
+            f"{BASE_URL}/api/collaborations/channels",
+            headers=employee_headers,
+            json={"name": "TEST_export_private", "type": "private"}
+        ).json()
+        try:
+            data = export(admin_headers, private).json()
+            assert data["channel"]["id"] == private["id"]
+        finally:
+            requests.delete(f"{BASE_URL}/api/collaborations/channels/{private['id']}", headers=employee_headers)
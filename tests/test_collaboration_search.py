@@ -0,0 +1,121 @@
+"""
+Collaboration Search Tests
+Query parsing for the indexed search, and search scoping against the running API
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+import requests
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services.collab_search import SearchQuery, indexed, run_search, search_terms  # noqa: E402
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+EMPLOYEE_EMAIL = "sarah.johnson@lojyn.com"
+EMPLOYEE_PASSWORD = "sarah123"
+
+
+class TestSearchQuery:
+    def test_terms_are_distinct_and_lowercased(self):
+        assert search_terms("Budget review", "budget, REVIEW; Q3") == ["budget", "review", "q3"]
+        assert indexed({"content": "Hello World"}, "collab_messages")["search_terms"] == ["hello", "world"]
+
+    def test_query_syntax(self):
+        query = SearchQuery('budget "q3 plan" rev* -draft x*')
+        assert query.words == ["budget"]
+        assert query.phrases == ["q3 plan"]
+        assert query.prefixes == ["rev"]  # single-letter prefixes are ignored
+        assert query.excluded == ["draft"]
+        assert query.text_search() == 'budget "q3 plan" -draft'
+
+    def test_prefix_only_query_is_escaped(self):
+        query = SearchQuery("ab.cd* -old")
+        assert not query.ranked
+        assert query.filter() == {"$and": [
+            {"search_terms": {"$nin": ["old"]}},
+            {"search_terms": {"$regex": "^ab"}},
+            {"search_terms": {"$regex": "^cd"}},
+        ]}
+
+    def test_exclusion_only_query_filters_on_search_terms(self):
+        query = SearchQuery("-draft -old")
+        assert not query.empty and not query.ranked
+        assert query.filter() == {"search_terms": {"$nin": ["draft", "old"]}}
+        assert SearchQuery("").empty
+        assert SearchQuery("- x*").empty
+
+    def test_exclusion_only_search_returns_the_rest_newest_first(self, mongo_db):
+        async def run():
+            await mongo_db.collab_messages.insert_many([
+                indexed({"id": f"m{i}", "channel_id": "c1", "content": content, "created_at": f"2026-01-0{i}"},
+                        "collab_messages")
+                for i, content in enumerate(["Draft plan", "Final plan", "Old notes", "Agenda"], start=1)
+            ])
+            return await run_search(mongo_db.collab_messages, SearchQuery("-draft -old"), {"channel_id": "c1"}, 1)
+
+        page = asyncio.run(run())
+        assert [m["id"] for m in page["items"]] == ["m4"] and page["has_more"] is True
+        assert "search_terms" not in page["items"][0]
+
+
+class TestSearchEndpoints:
+    """End-to-end against the running API"""
+
+    @pytest.fixture(scope="class")
+    def admin_headers(self):
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        assert response.status_code == 200, f"Admin login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+
+    @pytest.fixture(scope="class")
+    def employee_headers(self):
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": EMPLOYEE_EMAIL, "password": EMPLOYEE_PASSWORD})
+        assert response.status_code == 200, f"Employee login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+
+    def test_private_channel_messages_stay_private(self, admin_headers, employee_headers):
+        channel = requests.post(
+            f"{BASE_URL}/api/collaborations/channels",
+            headers=admin_headers,
+            json={"name": "TEST_search_private", "type": "private"}
+        ).json()
+        try:
+            requests.post(
+                f"{BASE_URL}/api/collaborations/channels/{channel['id']}/messages",
+                headers=admin_headers,
+                json={"content": "zanzibarquux roadmap"}
+            )
+            mine = requests.get(
+                f"{BASE_URL}/api/collaborations/search/advanced",
+                headers=admin_headers,
+                params={"q": "zanzibarquux", "type": "messages"}
+            ).json()
+            assert [m["content"] for m in mine["messages"]] == ["zanzibarquux roadmap"]
+            assert "search_terms" not in mine["messages"][0]
+
+            prefixed = requests.get(
+                f"{BASE_URL}/api/collaborations/search",
+                headers=admin_headers,
+                params={"q": "zanzibarq*", "type": "messages"}
+            ).json()
+            assert len(prefixed["messages"]) == 1
+
+            theirs = requests.get(
+                f"{BASE_URL}/api/collaborations/search/advanced",
+                headers=employee_headers,
+                params={"q": "zanzibarquux", "type": "messages"}
+            ).json()
+            assert theirs["messages"] == []
+        finally:
+            requests.delete(f"{BASE_URL}/api/collaborations/channels/{channel['id']}", headers=admin_headers)
+
+    def test_regex_metacharacters_are_literal(self, admin_headers):
+        response = requests.get(f"{BASE_URL}/api/collaborations/search", headers=admin_headers, params={"q": "(a+)+*"})
+        assert response.status_code == 200
@@ -0,0 +1,60 @@
+"""
+Collaboration Unread Counts Tests
+Per-channel unread counts returned in one response
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+EMPLOYEE_EMAIL = "sarah.johnson@lojyn.com"
+EMPLOYEE_PASSWORD = "sarah123"
+
+
+def login(email, password):
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    return login(ADMIN_EMAIL, ADMIN_PASSWORD)
+
+
+@pytest.fixture(scope="module")
+def employee_headers():
+    return login(EMPLOYEE_EMAIL, EMPLOYEE_PASSWORD)
+
+
+@pytest.fixture
+def channel(admin_headers):
+    channel = requests.post(
+        f"{BASE_URL}/api/collaborations/channels",
+        headers=admin_headers,
+        json={"name": "TEST_unread", "type": "public"}
+    ).json()
+    yield channel
+    requests.delete(f"{BASE_URL}/api/collaborations/channels/{channel['id']}", headers=admin_headers)
+
+
+class TestUnreadCounts:
+    def test_counts_follow_messages_and_receipts(self, admin_headers, employee_headers, channel):
+        url = f"{BASE_URL}/api/collaborations/channels/{channel['id']}"
+        requests.post(f"{url}/read", headers=employee_headers)
+        for i in range(3):
+            requests.post(f"{url}/messages", headers=admin_headers, json={"content": f"message {i}"})
+
+        unread = requests.get(f"{BASE_URL}/api/collaborations/unread", headers=employee_headers).json()
+        assert unread[channel["id"]] == 3
+
+        # The sender's own messages are never unread for them
+        mine = requests.get(f"{BASE_URL}/api/collaborations/unread", headers=admin_headers).json()
+        assert channel["id"] not in mine
+
+        requests.post(f"{url}/read", headers=employee_headers)
+        unread = requests.get(f"{BASE_URL}/api/collaborations/unread", headers=employee_headers).json()
+        assert channel["id"] not in unread
@@ -0,0 +1,95 @@
+"""
+Config Cache Tests
+Versioned settings entries, cross-worker invalidation and ETag revalidation
+"""
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from starlette.requests import Request  # noqa: E402
+
+from services import config_cache  # noqa: E402
+from services.config_cache import ConfigCache, VersionCounters, conditional_response, etag_matches  # noqa: E402
+
+
+def request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "headers": headers})
+
+
+class TestConfigCache:
+    def test_entries_reload_only_when_their_version_moves(self, monkeypatch, mongo_db):
+        store = {"app_name": "A"}
+        loads = []
+
+        async def load(db):
+            loads.append(dict(store))
+            return dict(store)
+
+        monkeypatch.setitem(config_cache.LOADERS, "settings", load)
+        db = mongo_db
+        writer, reader = ConfigCache(VersionCounters(check_interval=0)), ConfigCache(VersionCounters(check_interval=3600))
+
+        async def run():
+            for _ in range(10):
+                await writer.get(db, "settings")
+                await reader.get(db, "settings")
+            store["app_name"] = "B"
+            await writer.bump(db, "settings")
+            fresh = (await writer.get(db, "settings")).value["app_name"]
+            # The other worker keeps its entry until its next version check
+            stale = (await reader.get(db, "settings")).value["app_name"]
+            reader.clear()
+            return fresh, stale, (await reader.get(db, "settings")).value["app_name"]
+
+        assert asyncio.run(run()) == ("B", "A", "B")
+        assert len(loads) == 4
+
+    def test_version_reads_are_throttled(self, monkeypatch, mongo_db):
+        async def load(db):
+            return None
+
+        monkeypatch.setitem(config_cache.LOADERS, "translations", load)
+        db = mongo_db
+        cache = ConfigCache(VersionCounters(check_interval=3600))
+
+        async def run():
+            for _ in range(20):
+                await cache.get(db, "translations")
+
+        asyncio.run(run())
+        assert len(db.config_versions.calls_to("find")) == 1
+        assert cache.stats()["hits"] == 19
+
+
+class TestConditionalResponses:
+    def test_render_is_memoized_per_payload(self):
+        entry = config_cache.ConfigEntry({"translations": {"hi": {"en": "Hi"}}}, 1)
+
+        def payload(doc):
+            return doc["translations"]
+
+        body, etag = entry.render(payload)
+        assert body == b'{"hi":{"en":"Hi"}}'
+        assert etag.startswith('W/"') and entry.render(payload) == (body, etag)
+
+    def test_if_none_match(self):
+        etag = 'W/"abc"'
+        assert etag_matches(request('W/"abc"'), etag)
+        assert etag_matches(request('"zzz", "abc"'), etag)
+        assert etag_matches(request("*"), etag)
+        assert not etag_matches(request('"abcd"'), etag)
+        assert not etag_matches(request(), etag)
+
+    def test_not_modified_has_no_body(self):
+        response = conditional_response(request('W/"abc"'), b"{}", 'W/"abc"')
+        assert response.status_code == 304 and response.body == b""
+        assert response.headers["etag"] == 'W/"abc"'
+
+        response = conditional_response(request('W/"old"'), b"{}", 'W/"abc"')
+        assert response.status_code == 200 and response.body == b"{}"
+        assert response.headers["cache-control"] == "no-cache"
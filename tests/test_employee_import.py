@@ -0,0 +1,91 @@
+"""
+Employee Bulk Import API Tests
+Tests for validation and per-row errors of JSON and multipart CSV imports
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    """Admin authorization headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+    )
+    assert response.status_code == 200, f"Admin login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+class TestEmployeeImport:
+    """Tests for POST /api/employees/bulk-import and /api/employees/bulk-import/csv"""
+
+    def test_json_rows_report_errors_by_row(self, admin_headers):
+        """Every rejected row is reported with its row number"""
+        response = requests.post(
+            f"{BASE_URL}/api/employees/bulk-import",
+            json={"employees": [
+                {"email": ADMIN_EMAIL, "full_name": "Existing User"},
+                {"full_name": "No Email"},
+                {"email": "not-an-email", "full_name": "Bad Email"},
+            ]},
+            headers=admin_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] == 0
+        assert data["failed"] == 3
+        errors = {e["row"]: e["error"] for e in data["errors"]}
+        assert errors[1] == "Email already exists"
+        assert errors[2].startswith("Missing required fields")
+        assert errors[3] == "Invalid email address"
+
+    def test_badly_typed_row_fails_alone(self, admin_headers):
+        """A field of the wrong type rejects its row instead of the request"""
+        response = requests.post(
+            f"{BASE_URL}/api/employees/bulk-import",
+            json={"employees": [
+                {"email": ADMIN_EMAIL, "full_name": "Existing User"},
+                {"email": "TEST_bad_gender@example.com", "full_name": "Bad", "gender": 5},
+            ]},
+            headers=admin_headers
+        )
+
+        assert response.status_code == 200
+        errors = {e["row"]: e["error"] for e in response.json()["errors"]}
+        assert errors[2].startswith("gender:")
+
+    def test_csv_upload(self, admin_headers):
+        """CSV headers map to the same fields as the JSON body"""
+        csv_body = (
+            "Email,Full_Name,Job_Title\n"
+            f"{ADMIN_EMAIL.upper()},Existing User,Admin\n"
+            "\n"
+            "dup@example.invalid,,\n"
+        )
+        response = requests.post(
+            f"{BASE_URL}/api/employees/bulk-import/csv",
+            files={"file": ("employees.csv", csv_body, "text/csv")},
+            headers=admin_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] == 0
+        assert [e["row"] for e in data["errors"]] == [1, 2]
+
+    def test_csv_without_rows(self, admin_headers):
+        response = requests.post(
+            f"{BASE_URL}/api/employees/bulk-import/csv",
+            files={"file": ("employees.csv", "email,full_name\n", "text/csv")},
+            headers=admin_headers
+        )
+        assert response.status_code == 400
@@ -0,0 +1,27 @@
+"""
+Employee Import Pipeline Tests
+Rows whose documents can't be built are reported without failing the import
+"""
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server  # noqa: E402
+
+
+class TestImportRows:
+    def test_bad_field_type_is_a_row_error(self, monkeypatch, mongo_db):
+        monkeypatch.setattr(server, "db", mongo_db)
+        result = asyncio.run(server.import_employees([
+            {"email": "good@example.com", "full_name": "Good"},
+            {"email": "bad@x.com", "full_name": "Bad", "gender": 5},
+            {"email": "later@example.com", "full_name": "Later"},
+        ]))
+
+        assert result["success"] == 2 and result["failed"] == 1
+        assert result["errors"] == [{"row": 2, "email": "bad@x.com", "error": "gender: Input should be a valid string"}]
+        assert sorted(e["email"] for e in result["created_employees"]) == ["good@example.com", "later@example.com"]
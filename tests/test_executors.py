@@ -0,0 +1,161 @@
+"""
+Executor Tests
+Bounded in-flight work, executor counters and survey aggregation off the event loop
+"""
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import pytest  # noqa: E402
+
+from services import executors  # noqa: E402
+from services.analytics import aggregate_survey_results  # noqa: E402
+from services.executors import BoundedExecutor  # noqa: E402
+
+
+def legacy_survey_results(survey, responses):
+    """The aggregation as it ran inline in the survey results route"""
+    results = {"survey": survey, "total_responses": len(responses), "questions": []}
+    for question in survey.get("questions", []):
+        q_id = question.get("id")
+        q_type = question.get("type")
+        q_results = {"question": question, "responses": []}
+        if q_type in ["single_choice", "multiple_choice"]:
+            option_counts = {}
+            for opt in question.get("options", []):
+                option_counts[opt] = 0
+            for resp in responses:
+                answer = resp.get("answers", {}).get(q_id)
+                if isinstance(answer, list):
+                    for a in answer:
+                        if a in option_counts:
+                            option_counts[a] += 1
+                elif answer in option_counts:
+                    option_counts[answer] += 1
+            q_results["summary"] = option_counts
+        elif q_type in ["rating", "scale"]:
+            values = []
+            for resp in responses:
+                answer = resp.get("answers", {}).get(q_id)
+                if answer is not None:
+                    try:
+                        values.append(float(answer))
+                    except:  # noqa: E722
+                        pass
+            if values:
+                q_results["summary"] = {
+                    "average": sum(values) / len(values), "min": min(values), "max": max(values), "count": len(values)
+                }
+        else:
+            q_results["responses"] = [
+                resp.get("answers", {}).get(q_id) for resp in responses if resp.get("answers", {}).get(q_id)
+            ]
+        results["questions"].append(q_results)
+    return results
+
+
+SURVEY = {
+    "id": "s1",
+    "questions": [
+        {"id": "q1", "type": "single_choice", "options": ["yes", "no"]},
+        {"id": "q2", "type": "multiple_choice", "options": ["a", "b", "c"]},
+        {"id": "q3", "type": "rating"},
+        {"id": "q4", "type": "scale"},
+        {"id": "q5", "type": "text"},
+        {"id": "q6", "type": "rating"},
+    ],
+}
+RESPONSES = [
+    {"answers": {"q1": "yes", "q2": ["a", "c", "z"], "q3": 4, "q4": "7", "q5": "Great", "q6": "n/a"}},
+    {"answers": {"q1": "no", "q2": ["a"], "q3": "5.5", "q4": None, "q5": ""}},
+    {"answers": {"q1": "maybe", "q2": "b", "q3": [1], "q4": 10 ** 400, "q5": "Fine"}},
+    {"answers": {}},
+    {},
+]
+
+
+class TestSurveyAggregation:
+    def test_matches_the_inline_aggregation(self):
+        assert aggregate_survey_results(SURVEY, RESPONSES) == legacy_survey_results(SURVEY, RESPONSES)
+
+    def test_expected_summaries(self):
+        questions = aggregate_survey_results(SURVEY, RESPONSES)["questions"]
+        assert questions[0]["summary"] == {"yes": 1, "no": 1}
+        assert questions[1]["summary"] == {"a": 2, "b": 1, "c": 1}
+        assert questions[2]["summary"] == {"average": 4.75, "min": 4.0, "max": 5.5, "count": 2}
+        assert questions[3]["summary"]["count"] == 1
+        assert questions[4]["responses"] == ["Great", "Fine"]
+        assert "summary" not in questions[5]
+
+    def test_runs_in_the_process_pool(self, monkeypatch):
+        pool = BoundedExecutor("cpu-test", executors._process_pool, 1)
+        monkeypatch.setattr(executors, "cpu_executor", pool)
+        try:
+            result = asyncio.run(executors.run_cpu_bound(aggregate_survey_results, SURVEY, RESPONSES))
+        finally:
+            pool.shutdown()
+        assert result == legacy_survey_results(SURVEY, RESPONSES)
+        assert pool.stats()["completed"] == 1
+
+
+class TestBoundedExecutor:
+    def test_semaphore_bounds_in_flight_calls_and_stats_count_them(self):
+        executor = BoundedExecutor("test", lambda n: ThreadPoolExecutor(max_workers=n), max_workers=4, max_pending=2)
+        release = threading.Event()
+        lock = threading.Lock()
+        running = {"now": 0, "max": 0}
+
+        def work(i):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            release.wait(5)
+            with lock:
+                running["now"] -= 1
+            if i == 5:
+                raise ValueError("bad input")
+            return i
+
+        async def run():
+            tasks = [asyncio.ensure_future(executor.run(work, i)) for i in range(6)]
+            while executor.stats()["in_flight"] < 2:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            during = executor.stats()
+            release.set()
+            return during, await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            during, results = asyncio.run(run())
+        finally:
+            executor.shutdown()
+        assert running["max"] == 2
+        assert (during["submitted"], during["in_flight"], during["waiting"], during["completed"]) == (6, 2, 4, 0)
+        assert results[:5] == [0, 1, 2, 3, 4] and isinstance(results[5], ValueError)
+
+        stats = executor.stats()
+        assert (stats["submitted"], stats["completed"], stats["failed"]) == (6, 5, 1)
+        assert (stats["in_flight"], stats["waiting"]) == (0, 0)
+        assert stats["max_pending"] == 2 and stats["max_run_ms"] > 0 and stats["avg_wait_ms"] > 0
+
+    def test_pool_starts_lazily_and_pending_defaults_to_a_factor_of_workers(self):
+        executor = BoundedExecutor("test", lambda n: ThreadPoolExecutor(max_workers=n), max_workers=3)
+        assert executor.stats()["started"] is False
+        assert executor.max_pending == 3 * executors.EXECUTOR_MAX_PENDING_FACTOR
+        assert asyncio.run(executor.run(pow, 2, 5)) == 32
+        assert executor.stats()["started"] is True
+        executor.shutdown()
+        assert executor.stats()["started"] is False
+
+    def test_failures_propagate(self):
+        executor = BoundedExecutor("test", lambda n: ThreadPoolExecutor(max_workers=n), max_workers=1)
+        with pytest.raises(ZeroDivisionError):
+            asyncio.run(executor.run(divmod, 1, 0))
+        executor.shutdown()
+        assert executor.stats()["failed"] == 1
@@ -0,0 +1,78 @@
+"""
+HTTP Cache Tests
+Version-derived ETags, 304 revalidation and static reference routes
+"""
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from fastapi import APIRouter, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from services.config_cache import VersionCounters  # noqa: E402
+from services.http_cache import ResponseCache  # noqa: E402
+
+
+def make_client(db, cache=None):
+    cache = cache or ResponseCache(db, VersionCounters(check_interval=3600))
+    router = APIRouter(prefix="/api")
+    calls = []
+
+    @router.get("/branches")
+    @cache.cached("branches")
+    async def get_branches(corporation_id: str = None):
+        calls.append(corporation_id)
+        return [{"id": "b1", "corporation_id": corporation_id}]
+
+    @router.get("/permissions")
+    @cache.cached(cache_control="private, max-age=300")
+    async def get_permissions():
+        return [{"id": "employees.view"}]
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app), cache, calls
+
+
+class TestResponseCache:
+    def test_revalidation_skips_the_handler_until_the_collection_changes(self, mongo_db):
+        client, cache, calls = make_client(mongo_db)
+        first = client.get("/api/branches")
+        etag = first.headers["etag"]
+        assert first.json() == [{"id": "b1", "corporation_id": None}]
+        assert etag.startswith('W/"') and first.headers["cache-control"] == "private, no-cache"
+
+        revalidated = client.get("/api/branches", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert calls == [None]
+
+        asyncio.run(cache.changed("branches"))
+        changed = client.get("/api/branches", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert calls == [None, None]
+
+    def test_a_write_on_another_worker_is_seen_by_the_next_revalidation(self, mongo_db):
+        client, _, calls = make_client(mongo_db, ResponseCache(mongo_db))
+        other_worker = ResponseCache(mongo_db, VersionCounters())
+        etag = client.get("/api/branches").headers["etag"]
+        assert client.get("/api/branches", headers={"If-None-Match": etag}).status_code == 304
+
+        asyncio.run(other_worker.changed("branches"))
+        changed = client.get("/api/branches", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert calls == [None, None]
+
+    def test_query_string_is_part_of_the_etag(self, mongo_db):
+        client, _, _ = make_client(mongo_db)
+        assert client.get("/api/branches").headers["etag"] != \
+            client.get("/api/branches", params={"corporation_id": "c1"}).headers["etag"]
+
+    def test_static_routes_hash_their_result(self, mongo_db):
+        client, _, _ = make_client(mongo_db)
+        first = client.get("/api/permissions")
+        assert first.headers["cache-control"] == "private, max-age=300"
+        assert client.get("/api/permissions", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
@@ -0,0 +1,107 @@
+"""
+Mailer Tests
+Sends queued messages through the SMTP worker to a local aiosmtpd sink
+"""
+import asyncio
+import os
+import socket
+import sys
+from email.mime.text import MIMEText
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services import mailer  # noqa: E402
+
+
+class SinkHandler:
+    """Collects envelopes and counts SMTP sessions (connections)"""
+
+    def __init__(self):
+        self.envelopes = []
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("busy"):
+            return "451 Try again later"
+        if address.startswith("nobody"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.envelopes.append(envelope)
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def sink():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = SinkHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, mailer.smtp_config({
+        "host": "127.0.0.1", "port": port,
+        "encryption": "none", "from_email": "hr@example.com",
+    })
+    controller.stop()
+
+
+def queued(msg_id, recipients):
+    msg = MIMEText("Report body")
+    msg["Subject"] = f"Report {msg_id}"
+    return {"id": msg_id, "recipients": recipients, "message": msg.as_string(), "attempts": 1}
+
+
+def send(config, docs):
+    worker = mailer.MailWorker(db=None)
+
+    async def run():
+        try:
+            return await worker._send_group(config, docs)
+        finally:
+            await worker.pool.close()
+
+    return asyncio.run(run())
+
+
+class TestMailWorker:
+    def test_messages_share_one_connection(self, sink):
+        """A batch for one SMTP config is sent over a single connection"""
+        handler, config = sink
+        docs = [queued(f"m{i}", [f"user{i}@example.com", f"cc{i}@example.com"]) for i in range(5)]
+
+        outcomes = send(config, docs)
+
+        assert [error for _, _, error in outcomes] == [None] * 5
+        assert len(handler.envelopes) == 5
+        assert len(handler.sessions) == 1
+        assert handler.envelopes[0].rcpt_tos == ["user0@example.com", "cc0@example.com"]
+
+    def test_refused_recipients(self, sink):
+        """Partly refused envelopes are sent; fully refused ones are classified"""
+        handler, config = sink
+        outcomes = send(config, [
+            queued("partial", ["ok@example.com", "nobody@example.com"]),
+            queued("busy", ["busy@example.com"]),
+            queued("gone", ["nobody@example.com"]),
+        ])
+
+        by_id = {doc["id"]: (transient, error) for doc, transient, error in outcomes}
+        assert by_id["partial"] == (False, None)
+        assert docs_refused(outcomes, "partial") == ["nobody@example.com"]
+        assert by_id["busy"][0] is True
+        assert by_id["gone"][0] is False
+        assert len(handler.envelopes) == 1
+
+
+def docs_refused(outcomes, msg_id):
+    return next(doc for doc, _, _ in outcomes if doc["id"] == msg_id).get("refused")
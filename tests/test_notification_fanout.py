@@ -0,0 +1,177 @@
+"""
+Notification Fan-out Tests
+Chunked per-user inserts, broadcast audience keys, counter deltas and the merged inbox
+"""
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services import notifications  # noqa: E402
+from services.notifications import (  # noqa: E402
+    Inbox, audience_for_target, audience_keys, count_new, create_broadcast, delete_broadcast, insert_for_users,
+    receipt_state, transition,
+)
+
+
+class TestFanOut:
+    def test_named_users_are_inserted_in_unordered_chunks(self, monkeypatch, mongo_db):
+        monkeypatch.setattr(notifications, "NOTIFICATION_INSERT_CHUNK", 1000)
+        db = mongo_db
+        user_ids = [f"u{i}" for i in range(2500)] + ["u0"]
+        ids = asyncio.run(insert_for_users(db, user_ids, {"title": "Hi", "type": "leave", "user_id": "", "id": ""}))
+
+        assert len(ids) == 2500 and len(set(ids.values())) == 2500
+        inserts = [(len(args[0]), kwargs["ordered"]) for name, args, kwargs in db.notifications.calls if name == "insert_many"]
+        assert inserts == [(1000, False), (1000, False), (500, False)]
+        inc = {"$inc": {"total": 1, "by_type.leave": 1, "unread": 1, "unread_by_type.leave": 1}}
+        counters = [(len(query["user_id"]["$in"]), update) for query, update in db.notification_counters.calls_to("update_many")]
+        assert counters == [(1000, inc), (1000, inc), (500, inc)]
+
+    def test_targets_map_to_audience_keys(self):
+        assert audience_for_target("all") == ["all"]
+        assert audience_for_target("admins") == ["role:super_admin", "role:corp_admin"]
+        assert audience_for_target("employees") == ["role:employee"]
+        assert audience_for_target("department", "d1") == ["department:d1"]
+        assert audience_for_target("department") is None
+        assert audience_for_target("nobody") is None
+
+    def test_user_keys_cover_every_target_they_belong_to(self):
+        keys = audience_keys("employee", department_id="d1", branch_id="b1")
+        assert keys == ["all", "role:employee", "department:d1", "branch:b1"]
+        assert audience_keys("corp_admin") == ["all", "role:corp_admin"]
+
+
+class TestCounters:
+    def test_transitions(self):
+        unread, read, gone = (True, True), (True, False), (False, False)
+        assert transition("leave", unread, read) == {"unread": -1, "unread_by_type.leave": -1}
+        assert transition("leave", unread, gone) == {
+            "total": -1, "by_type.leave": -1, "unread": -1, "unread_by_type.leave": -1
+        }
+        assert transition("leave", read, gone) == {"total": -1, "by_type.leave": -1}
+        assert transition("leave", read, read) == {}
+        assert transition("a.$b", gone, unread)["by_type.a__b"] == 1
+
+    def test_receipt_state(self):
+        assert receipt_state(None) == (True, True)
+        assert receipt_state({"is_read": True}) == (True, False)
+        assert receipt_state({"is_deleted": True, "is_read": False})[0] is False
+
+    def test_stream_applies_new_notifications_locally(self):
+        counts = {"total": 1, "unread": 0, "by_type": {"leave": 1}, "unread_by_type": {}}
+        after = count_new(counts, "leave")
+        assert after == {"total": 2, "unread": 1, "by_type": {"leave": 2}, "unread_by_type": {"leave": 1}}
+        assert counts["by_type"] == {"leave": 1}
+
+
+def at(day):
+    return f"2026-01-{day:02d}T00:00:00+00:00"
+
+
+async def seed_inbox(db):
+    await db.notifications.insert_many([
+        {"id": "n1", "user_id": "u1", "type": "leave", "is_read": False, "is_archived": False, "created_at": at(3)},
+        {"id": "n3", "user_id": "u1", "type": "leave", "is_read": True, "is_archived": False, "created_at": at(5)},
+        {"id": "x", "user_id": "u2", "type": "leave", "is_read": False, "is_archived": False, "created_at": at(6)},
+    ])
+    await db.notification_broadcasts.insert_many([
+        {"id": "b0", "audience": ["all"], "type": "news", "created_at": at(1)},
+        {"id": "b2", "audience": ["all"], "type": "news", "created_at": at(4)},
+        {"id": "b4", "audience": ["role:employee"], "type": "news", "created_at": at(6)},
+        {"id": "b5", "audience": ["role:super_admin"], "type": "news", "created_at": at(7)},
+    ])
+    return Inbox(db, "u1", audience_keys("employee"), since=at(2))
+
+
+def ids(notifications):
+    return [n["id"] for n in notifications]
+
+
+class TestInbox:
+    def test_list_merges_own_notifications_and_visible_broadcasts(self, mongo_db):
+        async def run():
+            inbox = await seed_inbox(mongo_db)
+            return await inbox.list(), await inbox.list(limit=2, skip=1), await inbox.list(is_read=True)
+
+        everything, page, read = asyncio.run(run())
+        assert ids(everything) == ["b4", "n3", "b2", "n1"]
+        assert everything[0]["broadcast"] is True and everything[0]["user_id"] == "u1"
+        assert "audience" not in everything[0] and everything[0]["is_read"] is False
+        assert ids(page) == ["n3", "b2"]
+        assert ids(read) == ["n3"]
+
+    def test_receipts_are_looked_up_by_broadcast_id(self, monkeypatch, mongo_db):
+        monkeypatch.setattr(notifications, "BROADCAST_SCAN_BATCH", 1)
+
+        async def run():
+            inbox = await seed_inbox(mongo_db)
+            await inbox.archive("b4")
+            await inbox.mark_read("b2")
+            return await inbox.list(), await inbox.list(is_read=False), await inbox.list(is_read=True)
+
+        everything, unread, read = asyncio.run(run())
+        assert ids(everything) == ["n3", "b2", "n1"]
+        assert ids(unread) == ["n1"] and ids(read) == ["n3", "b2"]
+        assert everything[1]["is_read"] is True and everything[1]["read_at"]
+        for query, *_ in mongo_db.notification_receipts.calls_to("find"):
+            assert set(query) == {"user_id", "broadcast_id"} and set(query["broadcast_id"]) == {"$in"}
+        assert all("id" not in query for query, *_ in mongo_db.notification_broadcasts.calls_to("find"))
+
+    def test_counts_follow_state_changes_and_new_broadcasts(self, monkeypatch, mongo_db):
+        monkeypatch.setattr(notifications, "_latest_broadcast", {"value": "", "expires": 0.0})
+
+        async def run():
+            inbox = await seed_inbox(mongo_db)
+            counts = [await inbox.counts()]
+            await inbox.mark_read("b4")
+            await inbox.delete("b2")
+            await inbox.mark_read("n1")
+            counts.append(await inbox.counts())
+            await create_broadcast(mongo_db, ["all"], {"title": "Hi", "type": "alert", "created_at": at(8)})
+            counts.append(await inbox.counts())
+            rebuilt = await inbox.rebuild_counts()
+            return counts, notifications.public_counts(rebuilt)
+
+        (first, changed, folded), rebuilt = asyncio.run(run())
+        assert first == {"total": 4, "unread": 3, "by_type": {"leave": 2, "news": 2},
+                         "unread_by_type": {"leave": 1, "news": 2}}
+        assert changed == {"total": 3, "unread": 0, "by_type": {"leave": 2, "news": 1}, "unread_by_type": {}}
+        assert folded == {"total": 4, "unread": 1, "by_type": {"leave": 2, "news": 1, "alert": 1},
+                          "unread_by_type": {"alert": 1}}
+        assert rebuilt == folded
+
+    def test_deleting_a_broadcast_updates_every_counter_that_includes_it(self, mongo_db):
+        async def run():
+            inbox = await seed_inbox(mongo_db)
+            reader = Inbox(mongo_db, "u2", audience_keys("employee"))
+            await inbox.counts()
+            await reader.counts()
+            await reader.mark_read("b2")
+            deleted = await delete_broadcast(mongo_db, "b2")
+            return deleted, await inbox.counts(), await reader.counts(), await inbox.list()
+
+        deleted, counts, reader_counts, listed = asyncio.run(run())
+        assert deleted is True
+        assert counts["by_type"]["news"] == 1 and counts["unread_by_type"]["news"] == 1
+        assert reader_counts["by_type"]["news"] == 2 and reader_counts["unread_by_type"]["news"] == 2
+        assert "b2" not in ids(listed)
+        assert asyncio.run(mongo_db.notification_receipts.count_documents({"broadcast_id": "b2"})) == 0
+
+    def test_mark_all_read_and_clear_all_cover_broadcasts(self, monkeypatch, mongo_db):
+        monkeypatch.setattr(notifications, "BROADCAST_SCAN_BATCH", 1)
+
+        async def run():
+            inbox = await seed_inbox(mongo_db)
+            marked = await inbox.mark_all_read()
+            unread = await inbox.list(is_read=False)
+            cleared = await inbox.clear_all()
+            return marked, unread, cleared, await inbox.list(), await inbox.rebuild_counts()
+
+        marked, unread, cleared, listed, rebuilt = asyncio.run(run())
+        assert marked == 3 and unread == []
+        assert cleared == 4 and listed == []
+        assert rebuilt["total"] == 0 and rebuilt["unread"] == 0
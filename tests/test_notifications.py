@@ -471,6 +471,75 @@ class TestNotificationIntegration:
                     headers=admin_headers
                 )
 
+    
+    def test_broadcast_state_is_per_user(self, admin_token, employee_token):
+        """Reading or archiving a broadcast only affects the user who did it"""
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        employee_headers = {"Authorization": f"Bearer {employee_token}"}
+        
+        unique_title = f"TEST_Broadcast_{int(time.time())}"
+        response = requests.post(
+            f"{BASE_URL}/api/notifications/announcement",
+            headers=admin_headers,
+            json={"title": unique_title, "message": "Broadcast state test", "target": "all"}
+        )
+        assert response.status_code == 200
+        broadcast_id = response.json()["broadcast_id"]
+        
+        def find(headers, **params):
+            response = requests.get(f"{BASE_URL}/api/notifications", headers=headers, params={"limit": 50, **params})
+            return next((n for n in response.json() if n["id"] == broadcast_id), None)
+        
+        assert find(employee_headers, is_read=False) is not None
+        requests.put(f"{BASE_URL}/api/notifications/{broadcast_id}/read", headers=employee_headers)
+        assert find(employee_headers, is_read=True)["is_read"] is True
+        assert find(admin_headers, is_read=False) is not None
+        
+        requests.put(f"{BASE_URL}/api/notifications/{broadcast_id}/archive", headers=employee_headers)
+        assert find(employee_headers) is None
+        assert find(admin_headers) is not None
+        
+        # An admin delete removes the broadcast for everyone
+        response = requests.delete(f"{BASE_URL}/api/notifications/{broadcast_id}", headers=admin_headers)
+        assert response.status_code == 200
+        assert find(admin_headers) is None
+    
+    def test_stream_pushes_counts_and_new_notifications(self, admin_token, employee_token):
+        """The event stream opens with the counters and pushes a new broadcast"""
+        import json
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        employee_headers = {"Authorization": f"Bearer {employee_token}"}
+        count = requests.get(f"{BASE_URL}/api/notifications/unread-count", headers=employee_headers).json()["count"]
+        
+        with requests.get(f"{BASE_URL}/api/notifications/stream", headers=employee_headers, stream=True, timeout=30) as stream:
+            assert stream.status_code == 200
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            lines = stream.iter_lines(decode_unicode=True)
+            
+            def next_event():
+                event = None
+                for line in lines:
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        return event, json.loads(line[len("data: "):])
+            
+            event, data = next_event()
+            assert event == "counts" and data["unread"] == count
+            
+            unique_title = f"TEST_Stream_{int(time.time())}"
+            broadcast_id = requests.post(
+                f"{BASE_URL}/api/notifications/announcement",
+                headers=admin_headers,
+                json={"title": unique_title, "message": "Stream test", "target": "all"}
+            ).json()["broadcast_id"]
+            
+            event, data = next_event()
+            assert event == "notification" and data["id"] == broadcast_id and data["is_read"] is False
+            event, data = next_event()
+            assert event == "counts" and data["unread"] == count + 1
+        
+        requests.delete(f"{BASE_URL}/api/notifications/{broadcast_id}", headers=admin_headers)
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,73 @@
+"""
+Org Chart API Tests
+Tests for subtree, depth-limited and lazily expanded org charts
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    """Admin authorization headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+    )
+    assert response.status_code == 200, f"Admin login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+class TestOrgChart:
+    """Tests for GET /api/org-chart and GET /api/org-chart/subtree/{employee_id}"""
+    
+    def test_full_chart_shape(self, admin_headers):
+        """Without parameters the whole chart is returned"""
+        response = requests.get(f"{BASE_URL}/api/org-chart", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        for key in ["nodes", "tree", "departments", "divisions", "branches", "corporations", "stats"]:
+            assert key in data
+        assert data["stats"]["total_employees"] == len(data["nodes"])
+    
+    def test_depth_zero_returns_roots_only(self, admin_headers):
+        """depth=0 returns root nodes with no children, flagged for lazy expansion"""
+        response = requests.get(f"{BASE_URL}/api/org-chart", params={"depth": 0}, headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        for node in data["tree"]:
+            assert node["children"] == []
+            if node.get("has_more"):
+                assert node["direct_reports_count"] > 0
+        assert len(data["nodes"]) == len(data["tree"])
+    
+    def test_root_and_subtree_agree(self, admin_headers):
+        """Expanding a root lazily yields the same children as a depth-1 chart"""
+        roots = requests.get(f"{BASE_URL}/api/org-chart", params={"depth": 0}, headers=admin_headers).json()["tree"]
+        if not roots:
+            pytest.skip("No employees in org chart")
+        root_id = roots[0]["id"]
+        
+        chart = requests.get(
+            f"{BASE_URL}/api/org-chart", params={"root": root_id, "depth": 1}, headers=admin_headers
+        ).json()
+        subtree = requests.get(f"{BASE_URL}/api/org-chart/subtree/{root_id}", headers=admin_headers).json()
+        
+        assert chart["tree"][0]["id"] == root_id
+        assert [c["id"] for c in chart["tree"][0]["children"]] == [c["id"] for c in subtree["children"]]
+    
+    def test_unknown_root_is_404(self, admin_headers):
+        response = requests.get(f"{BASE_URL}/api/org-chart", params={"root": "does-not-exist"}, headers=admin_headers)
+        assert response.status_code == 404
+    
+    def test_negative_depth_is_rejected(self, admin_headers):
+        response = requests.get(f"{BASE_URL}/api/org-chart", params={"depth": -1}, headers=admin_headers)
+        assert response.status_code == 400
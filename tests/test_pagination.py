@@ -0,0 +1,95 @@
+"""
+List Pagination & Streaming API Tests
+Tests for keyset pagination (limit/cursor) and NDJSON streaming on list endpoints
+"""
+import pytest
+import requests
+import json
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    """Admin authorization headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+    )
+    assert response.status_code == 200, f"Admin login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+class TestKeysetPagination:
+    """Tests for limit/cursor on GET /api/employees, /api/leaves, /api/attendance"""
+    
+    @pytest.mark.parametrize("path", ["/api/employees", "/api/leaves", "/api/attendance", "/api/expenses"])
+    def test_page_shape(self, admin_headers, path):
+        """A limit returns a page object instead of a bare list"""
+        response = requests.get(f"{BASE_URL}{path}", params={"limit": 2}, headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert "items" in data
+        assert "next_cursor" in data
+        assert data["limit"] == 2
+        assert len(data["items"]) <= 2
+    
+    def test_walking_pages_matches_full_list(self, admin_headers):
+        """Following next_cursor visits every employee exactly once"""
+        full = requests.get(f"{BASE_URL}/api/employees", headers=admin_headers).json()
+        
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            page = requests.get(f"{BASE_URL}/api/employees", params=params, headers=admin_headers).json()
+            seen.extend(e["id"] for e in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        
+        assert len(seen) == len(set(seen))
+        assert set(seen) == {e["id"] for e in full}
+    
+    def test_legacy_list_still_returned_without_params(self, admin_headers):
+        """Existing clients keep getting a plain list"""
+        response = requests.get(f"{BASE_URL}/api/leaves", headers=admin_headers)
+        
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+    
+    def test_invalid_cursor_rejected(self, admin_headers):
+        """Garbage cursors are a 400, not a 500"""
+        response = requests.get(f"{BASE_URL}/api/employees", params={"cursor": "not-a-cursor"}, headers=admin_headers)
+        assert response.status_code == 400
+
+
+class TestNdjsonStreaming:
+    """Tests for stream=true"""
+    
+    def test_stream_employees(self, admin_headers):
+        """Every streamed line is a standalone JSON document"""
+        response = requests.get(f"{BASE_URL}/api/employees", params={"stream": "true"}, headers=admin_headers, stream=True)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [line for line in response.iter_lines() if line]
+        for line in lines:
+            assert "id" in json.loads(line)
+    
+    def test_stream_leave_export_includes_names(self, admin_headers):
+        """Streamed exports are enriched with employee names"""
+        response = requests.get(f"{BASE_URL}/api/leaves/export", params={"stream": "true"}, headers=admin_headers, stream=True)
+        
+        assert response.status_code == 200
+        for line in response.iter_lines():
+            if line:
+                assert "employee_name" in json.loads(line)
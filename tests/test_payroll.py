@@ -0,0 +1,171 @@
+"""
+Payroll Generation Tests
+Chunked payslip amounts, duplicate-safe inserts, the generation lease and resuming a run
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import pytest  # noqa: E402
+from pymongo.errors import BulkWriteError  # noqa: E402
+
+from services import payroll  # noqa: E402
+from services.payroll import (  # noqa: E402
+    build_payslips, claim_generation, compute_amounts, generate_run, insert_chunk,
+)
+
+PERIOD = "2026-09"
+TEMPLATE = {"payroll_run_id": "r1", "pay_period": PERIOD, "status": "draft"}
+
+
+def structure(employee_id, basic, **fields):
+    return {"employee_id": employee_id, "employee_name": employee_id.upper(), "status": "active",
+            "basic_salary": basic, "tax_rate": 10, **fields}
+
+
+async def payslip_index(db):
+    await db.payslips.create_index([("employee_id", 1), ("pay_period", 1)], unique=True)
+
+
+class TestAmounts:
+    def test_chunk_amounts(self):
+        amounts = compute_amounts([
+            structure("e1", 1000, housing_allowance=200, social_security=50, other_deductions=None),
+            {"employee_id": "e2", "basic_salary": "500"},
+        ])
+        assert amounts["gross"] == [1200.0, 500.0]
+        assert amounts["tax"] == [120.0, 0.0]
+        assert amounts["deductions"] == [170.0, 0.0]
+        assert amounts["net"] == [1030.0, 500.0]
+
+    def test_payslips_carry_the_template_and_amounts(self):
+        slips = build_payslips([structure("e1", 1000, currency="EUR"), structure("e2", 2000)], TEMPLATE)
+        assert [s["employee_id"] for s in slips] == ["e1", "e2"]
+        assert all(s["payroll_run_id"] == "r1" and s["pay_period"] == PERIOD for s in slips)
+        assert [s["net_salary"] for s in slips] == [900.0, 1800.0]
+        assert [s["currency"] for s in slips] == ["EUR", "USD"]
+        assert slips[0]["basic_salary"] == 1000.0 and slips[0]["phone_allowance"] == 0.0
+        assert slips[0]["id"] != slips[1]["id"]
+
+
+class TestInsertChunk:
+    def test_duplicates_are_skipped(self, mongo_db):
+        async def run():
+            await payslip_index(mongo_db)
+            await mongo_db.payslips.insert_one({"id": "old", "employee_id": "e1", "pay_period": PERIOD})
+            created = await insert_chunk(mongo_db.payslips, [
+                {"id": "a", "employee_id": "e1", "pay_period": PERIOD},
+                {"id": "b", "employee_id": "e2", "pay_period": PERIOD},
+            ])
+            return created, await mongo_db.payslips.distinct("id")
+
+        created, stored = asyncio.run(run())
+        assert created == 1 and sorted(stored) == ["b", "old"]
+
+    def test_other_write_errors_are_raised(self):
+        class Rejecting:
+            async def insert_many(self, docs, ordered):
+                raise BulkWriteError({"writeErrors": [{"code": 11000}, {"code": 121}], "nInserted": 0})
+
+        with pytest.raises(BulkWriteError):
+            asyncio.run(insert_chunk(Rejecting(), [{"id": "a"}, {"id": "b"}]))
+
+
+class TestGenerationLease:
+    def test_only_one_live_generation_holds_a_run(self, mongo_db):
+        async def run():
+            await mongo_db.payroll_runs.insert_one({"id": "r1", "pay_period": PERIOD})
+            claims = [await claim_generation(mongo_db, "r1"), await claim_generation(mongo_db, "r1")]
+            dead = (datetime.now(timezone.utc) - timedelta(seconds=payroll.PAYROLL_LEASE_SECONDS + 1)).isoformat()
+            await mongo_db.payroll_runs.update_one({"id": "r1"}, {"$set": {"generation.heartbeat_at": dead}})
+            claims.append(await claim_generation(mongo_db, "r1"))
+            await mongo_db.payroll_runs.update_one({"id": "r1"}, {"$set": {"generation.status": "completed"}})
+            claims.append(await claim_generation(mongo_db, "r1"))
+            return claims, await claim_generation(mongo_db, "missing")
+
+        (first, second, after_dead, after_done), missing = asyncio.run(run())
+        assert first and first["id"] == "r1"
+        assert second is None
+        assert after_dead and after_done
+        assert missing is None
+
+
+class TestGenerateRun:
+    def seed(self, db):
+        async def run():
+            await payslip_index(db)
+            await db.payroll_runs.insert_one({"id": "r1", "pay_period": PERIOD})
+            await db.salary_structures.insert_many([
+                structure("e1", 1000), structure("e2", 2000), structure("e3", 3000),
+                structure("e4", 4000), structure("e5", 5000),
+                structure("e1", 9999),
+                structure("e6", 6000, status="inactive"),
+            ])
+        asyncio.run(run())
+
+    def test_resumes_after_an_interrupted_run(self, monkeypatch, mongo_db):
+        self.seed(mongo_db)
+        calls = []
+
+        async def failing_second_chunk(collection, docs):
+            calls.append(len(docs))
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return await insert_chunk(collection, docs)
+
+        async def run():
+            run_doc = await claim_generation(mongo_db, "r1")
+            monkeypatch.setattr(payroll, "insert_chunk", failing_second_chunk)
+            with pytest.raises(RuntimeError):
+                await generate_run(mongo_db, run_doc, TEMPLATE, chunk_size=2)
+            failed = await mongo_db.payroll_runs.find_one({"id": "r1"}, {"_id": 0})
+
+            monkeypatch.setattr(payroll, "insert_chunk", insert_chunk)
+            run_doc = await claim_generation(mongo_db, "r1")
+            result = await generate_run(mongo_db, run_doc, TEMPLATE, chunk_size=2)
+            slips = await mongo_db.payslips.find({}, {"_id": 0}).to_list(None)
+            return failed, result, slips, await mongo_db.payroll_runs.find_one({"id": "r1"}, {"_id": 0})
+
+        failed, result, slips, run_doc = asyncio.run(run())
+        assert failed["generation"]["status"] == "failed"
+        assert failed["generation"]["error"] == "connection lost"
+        assert failed["generation"]["created"] == 2
+
+        assert {k: result[k] for k in ("total", "processed", "created", "skipped")} == {
+            "total": 3, "processed": 3, "created": 3, "skipped": 0,
+        }
+        assert sorted(s["employee_id"] for s in slips) == ["e1", "e2", "e3", "e4", "e5"]
+        assert next(s for s in slips if s["employee_id"] == "e1")["basic_salary"] == 1000.0
+        assert result["count"] == 5 and result["gross"] == 15000.0 and result["net"] == 13500.0
+        assert run_doc["generation"]["status"] == "completed" and run_doc["status"] == "processing"
+        assert run_doc["total_employees"] == 5 and run_doc["total_net"] == 13500.0
+
+    def test_rerunning_a_completed_run_creates_nothing(self, mongo_db):
+        self.seed(mongo_db)
+
+        async def run():
+            first = await generate_run(mongo_db, {"id": "r1", "pay_period": PERIOD}, TEMPLATE, chunk_size=2)
+            again = await generate_run(mongo_db, {"id": "r1", "pay_period": PERIOD}, TEMPLATE, chunk_size=2)
+            return first, again, await mongo_db.payslips.count_documents({})
+
+        first, again, stored = asyncio.run(run())
+        assert first["created"] == 5 and again["total"] == 0 and again["created"] == 0
+        assert again["count"] == 5 and stored == 5
+
+    def test_payslips_written_concurrently_are_counted_as_skipped(self, monkeypatch, mongo_db):
+        self.seed(mongo_db)
+
+        async def racing_insert(collection, docs):
+            # Another generation wrote e2 after this one prefetched the period
+            if any(d["employee_id"] == "e2" for d in docs):
+                await collection.insert_one({"id": "other", "employee_id": "e2", "pay_period": PERIOD})
+            return await insert_chunk(collection, docs)
+
+        monkeypatch.setattr(payroll, "insert_chunk", racing_insert)
+        result = asyncio.run(generate_run(mongo_db, {"id": "r1", "pay_period": PERIOD}, TEMPLATE, chunk_size=2))
+        assert (result["created"], result["skipped"], result["count"]) == (4, 1, 5)
@@ -0,0 +1,113 @@
+"""
+Push Dispatcher Tests
+Runs the Web Push dispatcher against a local stub push service
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_ece
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from py_vapid import Vapid
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services.push import PushDispatcher  # noqa: E402
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+class StubPushService(BaseHTTPRequestHandler):
+    """201 for /ok, 410 for /gone, 503 once then 201 for /flaky, 400 for /bad"""
+    received = []
+    flaky_calls = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        StubPushService.received.append((self.path, dict(self.headers), body))
+        status = {"/ok": 201, "/gone": 410, "/bad": 400}.get(self.path)
+        if self.path == "/flaky":
+            StubPushService.flaky_calls += 1
+            status = 503 if StubPushService.flaky_calls == 1 else 201
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def push_service():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPushService)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def receiver():
+    """A browser-side subscription key pair"""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public = private_key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {"private_key": private_key, "p256dh": b64(public), "auth_secret": os.urandom(16)}
+
+
+@pytest.fixture(scope="module")
+def vapid_key():
+    vapid = Vapid()
+    vapid.generate_keys()
+    raw = vapid.private_key.private_numbers().private_value.to_bytes(32, "big")
+    return b64(raw)
+
+
+class TestPushDispatcher:
+    def test_delivery_stats(self, push_service, receiver, vapid_key):
+        """Sent, expired, retried and failed subscriptions are counted separately"""
+        def subscription(path):
+            return {"endpoint": f"{push_service}{path}", "p256dh": receiver["p256dh"],
+                    "auth": b64(receiver["auth_secret"])}
+
+        dispatcher = PushDispatcher(vapid_key, "mailto:test@example.com", concurrency=4, backoff=0.01)
+        subs = [subscription(p) for p in ["/ok", "/ok", "/gone", "/flaky", "/bad"]]
+
+        async def run():
+            try:
+                return await dispatcher.dispatch(subs, json.dumps({"title": "Hello"}).encode())
+            finally:
+                await dispatcher.close()
+
+        stats = asyncio.run(run())
+
+        assert stats.total == 5
+        assert stats.sent == 3
+        assert stats.expired == 1
+        assert stats.expired_endpoints == [f"{push_service}/gone"]
+        assert stats.failed == 1
+        assert stats.errors == {"http_400": 1}
+        assert stats.retries == 1
+
+    def test_payload_decrypts_for_subscriber(self, push_service, receiver):
+        """The stub service received an aes128gcm body the subscriber can decrypt"""
+        path, headers, body = next(r for r in StubPushService.received if r[0] == "/ok")
+        headers = {k.lower(): v for k, v in headers.items()}
+
+        assert headers["content-encoding"] == "aes128gcm"
+        assert headers["authorization"].startswith("vapid ")
+        plaintext = http_ece.decrypt(
+            body, private_key=receiver["private_key"], auth_secret=receiver["auth_secret"], version="aes128gcm"
+        )
+        assert json.loads(plaintext) == {"title": "Hello"}
@@ -0,0 +1,62 @@
+"""
+Read Tracking Tests
+Per-employee read documents, the parent counters and the legacy array backfill
+"""
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services.read_tracking import announcement_reads, legacy_memo_ack, memo_acks  # noqa: E402
+
+
+class TestMark:
+    def test_only_the_first_read_bumps_the_counter(self, mongo_db):
+        db = mongo_db
+
+        async def run():
+            await db.announcements.insert_one({"id": "a1", "read_count": 0})
+            marked = [
+                await announcement_reads.mark(db, "a1", "e1"),
+                await announcement_reads.mark(db, "a1", "e1"),
+                await announcement_reads.mark(db, "a1", "e2"),
+            ]
+            return marked, await db.announcements.find_one({"id": "a1"}), await db.announcement_reads.count_documents({})
+
+        marked, announcement, reads = asyncio.run(run())
+        assert marked == [True, False, True]
+        assert announcement["read_count"] == 2 and reads == 2
+
+    def test_extra_fields_are_stored_with_the_read(self, mongo_db):
+        db = mongo_db
+
+        async def run():
+            await memo_acks.mark(db, "m1", "e1", employee_name="Ada")
+            return await db.memo_acks.find_one({"memo_id": "m1", "employee_id": "e1"}, {"_id": 0})
+
+        ack = asyncio.run(run())
+        assert ack["employee_name"] == "Ada" and "acknowledged_at" in ack and ack["id"]
+
+
+class TestUnreadPipeline:
+    def test_anti_join_probes_the_employee_read(self):
+        pipeline = announcement_reads.unread_pipeline({"status": "published"}, "e1")
+        assert pipeline[0] == {"$match": {"status": "published"}}
+        lookup = pipeline[2]["$lookup"]
+        assert lookup["from"] == "announcement_reads"
+        assert lookup["pipeline"][0]["$match"]["$expr"]["$and"] == [
+            {"$eq": ["$announcement_id", "$$parent_id"]},
+            {"$eq": ["$employee_id", "e1"]},
+        ]
+        assert pipeline[-1] == {"$match": {"read": {"$size": 0}}}
+
+
+class TestLegacyEntries:
+    def test_memo_acknowledgements_keep_name_and_time(self):
+        entry = {"employee_id": "e1", "employee_name": "Ada", "acknowledged_at": "2026-01-01T00:00:00"}
+        assert legacy_memo_ack(entry) == (
+            "e1", {"employee_name": "Ada", "acknowledged_at": "2026-01-01T00:00:00"}
+        )
@@ -0,0 +1,139 @@
+"""
+Realtime Gateway Tests
+Broker fan-out across simulated replicas, and the collaboration WebSocket
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+import requests
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services.realtime import Broker, MemoryBackend, Subscriber, channel_topic  # noqa: E402
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+
+
+class TestBroker:
+    def test_fan_out_across_replicas(self):
+        """Every subscriber on every replica gets the event exactly once"""
+        async def run():
+            hub = []
+            a, b = Broker(), Broker()
+            await a.start(MemoryBackend(hub))
+            await b.start(MemoryBackend(hub))
+            topic = channel_topic("general")
+            subs = [Subscriber("u1"), Subscriber("u2"), Subscriber("u3")]
+            a.subscribe(subs[0], topic)
+            b.subscribe(subs[1], topic)
+            b.subscribe(subs[2], "channel:other")
+
+            await a.publish(topic, "message.created", {"id": "m1"}, channel_id="general")
+            return [s.queue.qsize() for s in subs], subs[1].queue.get_nowait()
+
+        sizes, event = asyncio.run(run())
+        assert sizes == [1, 1, 0]
+        assert event == {"type": "message.created", "channel_id": "general", "data": {"id": "m1"}}
+
+    def test_slow_subscriber_is_dropped(self):
+        """A full queue marks the subscriber overflowed; its oldest event makes room for a None sentinel"""
+        async def run():
+            broker = Broker()
+            slow = Subscriber("u1", maxsize=2)
+            broker.subscribe(slow, "presence")
+            for i in range(5):
+                await broker.publish("presence", "presence", {"n": i})
+            return slow
+
+        slow = asyncio.run(run())
+        assert slow.overflowed
+        assert slow.queue.get_nowait() == {"type": "presence", "data": {"n": 1}}
+        assert slow.queue.get_nowait() is None
+
+    def test_publish_many_relays_one_envelope(self):
+        """An event for several topics crosses replicas once and reaches each subscriber once"""
+        async def run():
+            hub = []
+            a, b = Broker(), Broker()
+            await a.start(MemoryBackend(hub))
+            await b.start(MemoryBackend(hub))
+            both, one, other = Subscriber("u1"), Subscriber("u2"), Subscriber("u3")
+            b.subscribe(both, "notifications:u1")
+            b.subscribe(both, "notifications:audience:all")
+            a.subscribe(one, "notifications:u2")
+            b.subscribe(other, "notifications:u3")
+
+            await a.publish_many(["notifications:u1", "notifications:u2", "notifications:audience:all"],
+                                 "notification", {"id": "n1"})
+            return [s.queue.qsize() for s in (both, one, other)]
+
+        assert asyncio.run(run()) == [1, 1, 0]
+
+    def test_connection_counting(self):
+        """Presence flips only on a user's first and last connection"""
+        broker = Broker()
+        first, second = Subscriber("u1"), Subscriber("u1")
+        assert broker.connect(first) is True
+        assert broker.connect(second) is False
+        broker.subscribe(first, channel_topic("general"))
+        assert broker.disconnect(first) is False
+        assert broker.stats()["subscriptions"] == 0
+        assert broker.disconnect(second) is True
+
+
+class TestCollaborationSocket:
+    """End-to-end against the running API"""
+
+    @pytest.fixture(scope="class")
+    def admin_token(self):
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+        )
+        assert response.status_code == 200, f"Admin login failed: {response.text}"
+        return response.json()["token"]
+
+    def test_message_is_pushed_to_subscribers(self, admin_token):
+        websockets = pytest.importorskip("websockets.sync.client")
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        channel = requests.post(
+            f"{BASE_URL}/api/collaborations/channels",
+            headers=headers,
+            json={"name": "TEST_realtime", "type": "public"}
+        ).json()
+
+        ws_url = BASE_URL.replace("http", "ws", 1) + f"/api/collaborations/ws?token={admin_token}"
+        try:
+            with websockets.connect(ws_url) as ws:
+                ws.send(json.dumps({"type": "subscribe", "channel_id": channel["id"]}))
+                events = []
+                while not any(e["type"] == "subscribed" for e in events):
+                    events.append(json.loads(ws.recv(timeout=10)))
+
+                sent = requests.post(
+                    f"{BASE_URL}/api/collaborations/channels/{channel['id']}/messages",
+                    headers=headers,
+                    json={"content": "pushed, not polled"}
+                ).json()
+                while True:
+                    event = json.loads(ws.recv(timeout=10))
+                    if event["type"] == "message.created":
+                        break
+                assert event["channel_id"] == channel["id"]
+                assert event["data"]["id"] == sent["id"]
+        finally:
+            requests.delete(f"{BASE_URL}/api/collaborations/channels/{channel['id']}", headers=headers)
+
+    def test_invalid_token_is_rejected(self):
+        websockets = pytest.importorskip("websockets.sync.client")
+        ws_url = BASE_URL.replace("http", "ws", 1) + "/api/collaborations/ws?token=invalid"
+        with pytest.raises(Exception):
+            with websockets.connect(ws_url) as ws:
+                ws.recv(timeout=10)
@@ -0,0 +1,81 @@
+"""
+Report Renderer Tests
+Concurrent renders of the same cached report share one write
+"""
+import asyncio
+import gc
+import os
+import sys
+import time
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services import report_renderer  # noqa: E402
+
+
+class TestRenderLocks:
+    def test_concurrent_renders_write_each_file_once(self, monkeypatch, tmp_path, mongo_db):
+        monkeypatch.setattr(report_renderer, "REPORTS_DIR", tmp_path)
+        monkeypatch.setattr(report_renderer, "_last_purge", time.monotonic())
+        writes = []
+        write_csv = report_renderer.write_csv
+
+        async def slow_write(*args):
+            writes.append(args[-1].name)
+            await asyncio.sleep(0.05)
+            return await write_csv(*args)
+
+        async def slow_pdf(render, csv_path, pdf_path, *args):
+            writes.append(os.path.basename(pdf_path))
+            await asyncio.sleep(0.05)
+            with open(pdf_path, "w") as f:
+                f.write("%PDF")
+
+        monkeypatch.setattr(report_renderer, "write_csv", slow_write)
+        monkeypatch.setattr(report_renderer, "run_cpu_bound", slow_pdf)
+        report = {"id": "r1", "name": "Headcount", "report_type": "summary"}
+        data = {"report_type": "summary", "date_range": {"start": "2026-01-01", "end": "2026-01-31"},
+                "data": {"total": 3}}
+
+        async def render(formats, delay=0):
+            await asyncio.sleep(delay)
+            return await report_renderer.render_report(mongo_db, report, data, formats)
+
+        async def run():
+            # The last caller arrives after the first has released the lock but
+            # while the second is still rendering the PDF
+            return await asyncio.gather(render(["csv"]), render(["csv", "pdf"]), render(["pdf"], delay=0.07))
+
+        asyncio.run(run())
+        assert sorted(writes) == sorted(p.name for p in tmp_path.iterdir())
+        assert len(writes) == 2
+        gc.collect()
+        assert len(report_renderer._render_locks) == 0
+
+
+class TestCacheKey:
+    def test_editing_a_leave_changes_the_key(self, monkeypatch, mongo_db):
+        import server
+        monkeypatch.setattr(server, "db", mongo_db)
+        report = {"id": "r2", "report_type": "leave"}
+        data = {"report_type": "leave"}
+
+        async def key():
+            version = await report_renderer.data_version(mongo_db, "leave", "2026-01-01", "2026-01-31", data)
+            return report_renderer.cache_key(report, "2026-01-01", "2026-01-31", version)
+
+        async def run():
+            await mongo_db.leaves.insert_one({
+                "id": "l1", "employee_id": "e1", "leave_type": "annual", "start_date": "2026-01-10",
+                "end_date": "2026-01-12", "status": "pending", "created_at": "2026-01-02T00:00:00+00:00",
+            })
+            keys = [await key()]
+            await server.update_leave("l1", {"status": "rejected"}, current_user=type("U", (), {"id": "u1"})())
+            keys.append(await key())
+            keys.append(await key())
+            return keys
+
+        before, after, again = asyncio.run(run())
+        assert before != after and after == again
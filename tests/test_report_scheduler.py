@@ -0,0 +1,138 @@
+"""
+Report Scheduler Tests
+next_run calculation in the report's timezone and across month lengths, claiming due reports
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services import report_scheduler  # noqa: E402
+from services.report_scheduler import ReportScheduler, calculate_next_run, next_run_for  # noqa: E402
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TestCalculateNextRun:
+    def test_monthly_clamps_to_month_length(self):
+        """Day 31 falls on the last day of shorter months"""
+        assert calculate_next_run("monthly", None, 31, "09:00", "UTC", utc(2026, 2, 10)) == "2026-02-28T09:00:00+00:00"
+        assert calculate_next_run("monthly", None, 31, "09:00", "UTC", utc(2026, 2, 28, 10)) == "2026-03-31T09:00:00+00:00"
+        assert calculate_next_run("monthly", None, 15, "09:00", "UTC", utc(2026, 12, 20)) == "2027-01-15T09:00:00+00:00"
+
+    def test_daily_follows_dst(self):
+        """09:00 Berlin is 08:00 UTC before the DST change and 07:00 UTC after it"""
+        assert calculate_next_run("daily", None, None, "09:00", "Europe/Berlin", utc(2026, 3, 27, 12)) == "2026-03-28T08:00:00+00:00"
+        assert calculate_next_run("daily", None, None, "09:00", "Europe/Berlin", utc(2026, 3, 28, 12)) == "2026-03-29T07:00:00+00:00"
+
+    def test_weekly_runs_later_the_same_day(self):
+        """A Friday 09:00 New York report checked at 08:00 local runs that morning"""
+        assert calculate_next_run("weekly", 4, None, "09:00", "America/New_York", utc(2026, 10, 16, 12)) == "2026-10-16T13:00:00+00:00"
+        assert calculate_next_run("weekly", 4, None, "09:00", "America/New_York", utc(2026, 10, 16, 14)) == "2026-10-23T13:00:00+00:00"
+
+    def test_next_run_is_strictly_after(self):
+        """A run at exactly its slot is scheduled for the following one"""
+        report = {"frequency": "daily", "time_of_day": "09:00", "timezone": "UTC"}
+        assert next_run_for(report, utc(2026, 5, 1, 9)) == "2026-05-02T09:00:00+00:00"
+
+    def test_invalid_schedule(self):
+        with pytest.raises(ValueError):
+            calculate_next_run("daily", tz_name="Mars/Olympus_Mons")
+        with pytest.raises(ValueError):
+            calculate_next_run("daily", time_of_day="25:00")
+
+
+class ReadTogether:
+    """Holds each reader of the due reports until `readers` have read them"""
+
+    def __init__(self, collection, readers):
+        self._find = collection.find
+        self._readers = readers
+        self._arrived = 0
+        self._all_read = asyncio.Event()
+
+    def find(self, *args, **kwargs):
+        cursor = self._find(*args, **kwargs)
+        gate = self
+
+        class Cursor:
+            def sort(self, *sort_args):
+                cursor.sort(*sort_args)
+                return self
+
+            async def to_list(self, length):
+                docs = await cursor.to_list(length)
+                gate._arrived += 1
+                if gate._arrived == gate._readers:
+                    gate._all_read.set()
+                await gate._all_read.wait()
+                return docs
+        return Cursor()
+
+
+def ago(**kwargs):
+    return (datetime.now(timezone.utc) - timedelta(**kwargs)).isoformat()
+
+
+class TestScheduler:
+    def test_a_due_report_is_claimed_by_one_replica(self, mongo_db):
+        async def noop(report):
+            pass
+
+        async def run():
+            await mongo_db.scheduled_reports.insert_many([
+                {"id": "due", "status": "active", "frequency": "daily", "time_of_day": "09:00", "next_run": ago(hours=1)},
+                {"id": "later", "status": "active", "frequency": "daily", "next_run": ago(hours=-1)},
+                {"id": "paused", "status": "paused", "frequency": "daily", "next_run": ago(hours=1)},
+            ])
+            mongo_db.scheduled_reports.find = ReadTogether(mongo_db.scheduled_reports, 2).find
+            replicas = [ReportScheduler(mongo_db, noop), ReportScheduler(mongo_db, noop)]
+            claims = await asyncio.gather(*(r.claim_due(10) for r in replicas))
+            return claims, await mongo_db.scheduled_reports.find_one({"id": "due"}, {"_id": 0})
+
+        claims, report = asyncio.run(run())
+        assert sorted(len(c) for c in claims) == [0, 1]
+        claimed = [c for replica in claims for c in replica][0]
+        assert claimed["id"] == "due" and claimed["next_run"] == report["next_run"]
+        assert report["next_run"] > datetime.now(timezone.utc).isoformat()
+        assert len(mongo_db.scheduled_reports.calls_to("find_one_and_update")) == 2
+
+    def test_a_report_with_an_invalid_schedule_is_paused(self, mongo_db):
+        async def run():
+            await mongo_db.scheduled_reports.insert_one(
+                {"id": "r1", "status": "active", "frequency": "daily", "timezone": "Mars/Olympus_Mons",
+                 "next_run": ago(minutes=5)}
+            )
+            claimed = await ReportScheduler(mongo_db, None).claim_due(10)
+            return claimed, await mongo_db.scheduled_reports.find_one({"id": "r1"}, {"_id": 0})
+
+        claimed, report = asyncio.run(run())
+        assert claimed == [] and report["status"] == "paused"
+        assert report["last_run_status"] == "invalid_schedule"
+
+    def test_abandoned_runs_are_failed(self, monkeypatch, mongo_db):
+        monkeypatch.setattr(report_scheduler, "REPORT_RUN_TIMEOUT_SECONDS", 600)
+
+        async def run():
+            await mongo_db.report_runs.insert_many([
+                {"id": "dead", "status": "generating", "started_at": ago(minutes=11)},
+                {"id": "live", "status": "generating", "started_at": ago(minutes=9)},
+                {"id": "done", "status": "completed", "started_at": ago(days=1)},
+            ])
+            failed = await ReportScheduler(mongo_db, None).fail_abandoned_runs()
+            runs = await mongo_db.report_runs.find({}, {"_id": 0}).to_list(None)
+            return failed, {r["id"]: r for r in runs}
+
+        failed, runs = asyncio.run(run())
+        assert failed == 1
+        assert runs["dead"]["status"] == "failed" and runs["dead"]["error_message"] == "Run was abandoned by its worker"
+        assert runs["dead"]["completed_at"]
+        assert runs["live"]["status"] == "generating" and runs["done"]["status"] == "completed"
@@ -302,6 +302,77 @@ class TestScheduledReportActions:
         assert "started_at" in run
 
 
+class TestReportFiles:
+    """Tests for rendered CSV/PDF report files"""
+    
+    @pytest.fixture
+    def employee_report(self, admin_headers):
+        response = requests.post(
+            f"{BASE_URL}/api/scheduled-reports",
+            headers=admin_headers,
+            json={
+                "name": "TEST_Employee Directory",
+                "report_type": "employees",
+                "format": "both",
+                "recipients": ["test@example.com"]
+            }
+        )
+        report = response.json()
+        yield report
+        requests.delete(f"{BASE_URL}/api/scheduled-reports/{report['id']}", headers=admin_headers)
+    
+    def test_download_csv_has_every_employee(self, admin_headers, employee_report):
+        """The CSV is not capped and matches the summary total"""
+        response = requests.get(
+            f"{BASE_URL}/api/scheduled-reports/{employee_report['id']}/download?format=csv",
+            headers=admin_headers
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        lines = response.text.strip().splitlines()
+        assert lines[0].startswith("Employee ID,Name,Email")
+        
+        preview = requests.post(
+            f"{BASE_URL}/api/scheduled-reports/preview",
+            headers=admin_headers,
+            json={"report_type": "employees"}
+        ).json()
+        assert len(lines) - 1 == preview["data"]["total_employees"]
+    
+    def test_download_pdf(self, admin_headers, employee_report):
+        response = requests.get(
+            f"{BASE_URL}/api/scheduled-reports/{employee_report['id']}/download?format=pdf",
+            headers=admin_headers
+        )
+        assert response.status_code == 200
+        assert response.content.startswith(b"%PDF")
+    
+    def test_run_records_files(self, admin_headers, employee_report):
+        """A run stores both rendered files, and the download reuses the same CSV"""
+        run = requests.post(
+            f"{BASE_URL}/api/scheduled-reports/{employee_report['id']}/run",
+            headers=admin_headers
+        ).json()
+        runs = requests.get(
+            f"{BASE_URL}/api/scheduled-reports/{employee_report['id']}/runs",
+            headers=admin_headers
+        ).json()
+        recorded = next(r for r in runs if r["id"] == run["run_id"])
+        assert [f["format"] for f in recorded["files"]] == ["csv", "pdf"]
+        assert recorded["file_size"] == sum(f["size"] for f in recorded["files"])
+        
+        response = requests.get(f"{BASE_URL}{recorded['file_url']}", headers=admin_headers)
+        assert response.status_code == 200
+        assert len(response.content) == recorded["files"][0]["size"]
+    
+    def test_employee_cannot_download(self, employee_headers, employee_report):
+        response = requests.get(
+            f"{BASE_URL}/api/scheduled-reports/{employee_report['id']}/download",
+            headers=employee_headers
+        )
+        assert response.status_code == 403
+
+
 class TestReportPreview:
     """Tests for report preview functionality"""
     
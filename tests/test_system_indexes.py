@@ -0,0 +1,75 @@
+"""
+System Index Registry API Tests
+Tests for the startup index reconciliation and drift report
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://collab-hub-hr.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@hrplatform.com"
+ADMIN_PASSWORD = "admin123"
+EMPLOYEE_EMAIL = "sarah.johnson@lojyn.com"
+EMPLOYEE_PASSWORD = "sarah123"
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    """Admin authorization headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+    )
+    assert response.status_code == 200, f"Admin login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def employee_headers():
+    """Employee authorization headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": EMPLOYEE_EMAIL, "password": EMPLOYEE_PASSWORD}
+    )
+    assert response.status_code == 200, f"Employee login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+class TestIndexRegistry:
+    """Tests for GET /api/system/indexes and POST /api/system/indexes/reconcile"""
+    
+    def test_report_has_all_sections(self, admin_headers):
+        """Verify the drift report exposes every reconciliation bucket"""
+        response = requests.get(f"{BASE_URL}/api/system/indexes", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        for key in ["created", "unchanged", "missing", "conflicts", "unmanaged", "errors"]:
+            assert key in data, f"Missing report section: {key}"
+        # Dry run never creates anything
+        assert data["created"] == []
+    
+    def test_core_indexes_exist_after_startup(self, admin_headers):
+        """Startup reconciliation should have created the hot-path indexes"""
+        response = requests.get(f"{BASE_URL}/api/system/indexes", headers=admin_headers)
+        
+        assert response.status_code == 200
+        unchanged = {(i["collection"], i["name"]) for i in response.json()["unchanged"]}
+        assert ("employees", "id_1") in unchanged
+        assert ("employees", "user_id_1") in unchanged
+        assert ("notifications", "user_id_1_is_archived_1_is_read_1_created_at_-1") in unchanged
+    
+    def test_reconcile_is_idempotent(self, admin_headers):
+        """A second reconcile must not create anything new"""
+        requests.post(f"{BASE_URL}/api/system/indexes/reconcile", headers=admin_headers)
+        response = requests.post(f"{BASE_URL}/api/system/indexes/reconcile", headers=admin_headers)
+        
+        assert response.status_code == 200
+        assert response.json()["created"] == []
+    
+    def test_employee_cannot_inspect_indexes(self, employee_headers):
+        """Only super admins may view the index report"""
+        response = requests.get(f"{BASE_URL}/api/system/indexes", headers=employee_headers)
+        assert response.status_code == 403
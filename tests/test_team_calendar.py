@@ -0,0 +1,74 @@
+"""
+Team Calendar Engine Tests
+Month-day keys, range expansion and the sectioned range cache
+"""
+import asyncio
+import os
+import sys
+from datetime import date
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services.team_calendar import (  # noqa: E402
+    CalendarCache, calendar_keys, occurrence, overlap_query, range_keys,
+)
+
+
+class TestMonthDayKeys:
+    def test_keys_follow_the_fields_being_written(self):
+        assert calendar_keys({"date_of_birth": "1990-05-15T00:00:00Z"}) == {"birth_md": "05-15"}
+        assert calendar_keys({"hire_date": "2020-01-31"}) == {"hire_md": "01-31"}
+        assert calendar_keys({"date_of_joining": "2019-07-04", "hire_date": None}) == {"hire_md": "07-04"}
+        assert calendar_keys({"date_of_birth": "not a date"}) == {"birth_md": None}
+        assert calendar_keys({"job_title": "Engineer"}) == {}
+
+    def test_leap_day_falls_on_feb_28_in_common_years(self):
+        assert occurrence("02-29", 2026) == date(2026, 2, 28)
+        assert occurrence("02-29", 2028) == date(2028, 2, 29)
+
+    def test_range_keys(self):
+        february = range_keys(date(2026, 2, 1), date(2026, 2, 28))
+        assert len(february) == 29 and "02-29" in february
+        assert range_keys(date(2025, 12, 30), date(2026, 1, 2)) == ["12-30", "12-31", "01-01", "01-02"]
+        assert range_keys(date(2026, 1, 1), date(2027, 1, 1)) is None
+
+    def test_overlap_query(self):
+        assert overlap_query("2026-02-01", "2026-02-28") == {
+            "start_date": {"$lte": "2026-02-28"}, "end_date": {"$gte": "2026-02-01"}
+        }
+
+
+class TestCalendarCache:
+    def test_sections_invalidate_independently(self):
+        cache = CalendarCache(ttl=60)
+        loads = []
+
+        async def load(section):
+            loads.append(section)
+            return [{"section": section}]
+
+        async def run():
+            for _ in range(2):
+                await cache.get(("leaves", "a", "b"), lambda: load("leaves"))
+                await cache.get(("holidays", "a", "b"), lambda: load("holidays"))
+            cache.invalidate("leaves")
+            await cache.get(("leaves", "a", "b"), lambda: load("leaves"))
+            await cache.get(("holidays", "a", "b"), lambda: load("holidays"))
+
+        asyncio.run(run())
+        assert loads == ["leaves", "holidays", "leaves"]
+
+    def test_result_raced_by_invalidation_is_not_cached(self):
+        cache = CalendarCache(ttl=60)
+
+        async def run():
+            async def stale_load():
+                cache.invalidate("events")
+                return ["stale"]
+            first = await cache.get(("events", "a", "b"), stale_load)
+            second = await cache.get(("events", "a", "b"), lambda: asyncio.sleep(0, ["fresh"]))
+            return first, second
+
+        assert asyncio.run(run()) == (["stale"], ["fresh"])
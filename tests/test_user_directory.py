@@ -0,0 +1,74 @@
+"""
+User Directory Tests
+Batched profile/presence loading for collaboration members and DMs
+"""
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services import user_directory  # noqa: E402
+from services.user_directory import UserLoader  # noqa: E402
+
+
+def seed(db, n_users):
+    async def run():
+        await db.users.insert_many([
+            {"id": f"u{i}", "full_name": f"User {i}", "email": f"u{i}@example.com"} for i in range(n_users)
+        ])
+        await db.collab_user_status.insert_one({"user_id": "u1", "status": "busy", "status_text": "In a meeting"})
+    asyncio.run(run())
+    return db
+
+
+def queried(collection, field):
+    """The ids each `find` asked for"""
+    return [sorted(args[0][field]["$in"]) for args in collection.calls_to("find")]
+
+
+def fresh_caches():
+    user_directory.invalidate_user_profile()
+    user_directory.invalidate_user_status()
+
+
+class TestUserLoader:
+    def test_members_cost_two_queries_regardless_of_size(self, mongo_db):
+        fresh_caches()
+        db = seed(mongo_db, 2000)
+        ids = [f"u{i}" for i in range(2000)] + ["ghost"]
+        members = asyncio.run(UserLoader(db).members(ids))
+
+        assert len(queried(db.users, "id")) == 1
+        assert len(queried(db.collab_user_status, "user_id")) == 1
+        assert [m["id"] for m in members] == ids
+        assert members[1]["status"] == "busy" and members[1]["status_text"] == "In a meeting"
+        assert members[2]["status"] == "offline"
+        assert members[-1]["name"] == "Unknown User"
+
+    def test_concurrent_loads_are_coalesced_and_memoized(self, mongo_db):
+        fresh_caches()
+        db = seed(mongo_db, 10)
+
+        async def run():
+            loader = UserLoader(db)
+            first = await asyncio.gather(loader.profile("u1"), loader.profile("u2"), loader.profile("u1"))
+            again = await loader.profile("u2")
+            return first, again
+
+        (a, b, c), again = asyncio.run(run())
+        assert queried(db.users, "id") == [["u1", "u2"]]
+        assert a["name"] == c["name"] == "User 1" and again["name"] == "User 2"
+
+    def test_cache_is_shared_across_requests_until_invalidated(self, mongo_db):
+        fresh_caches()
+        db = seed(mongo_db, 10)
+        asyncio.run(UserLoader(db).statuses_for(["u1", "u2"]))
+        asyncio.run(UserLoader(db).statuses_for(["u1", "u2"]))
+        assert len(queried(db.collab_user_status, "user_id")) == 1
+
+        user_directory.invalidate_user_status("u1")
+        asyncio.run(UserLoader(db).statuses_for(["u1", "u2"]))
+        assert queried(db.collab_user_status, "user_id")[-1] == ["u1"]